@@ -17,11 +17,14 @@
 import json
 import logging
 import os
+import threading
+import time
 
 from keystoneclient import access
 from keystoneclient import adapter
 import requests
 
+from tackerclient.common import cache
 from tackerclient.common import exceptions
 from tackerclient.common import utils
 from tackerclient.i18n import _
@@ -45,6 +48,8 @@ class HTTPClient(object):
 
     USER_AGENT = 'python-tackerclient'
     CONTENT_TYPE = 'application/json'
+    # Tokens are refreshed this number of seconds before they expire.
+    TOKEN_REFRESH_WINDOW = 60
 
     def __init__(self, username=None, user_id=None,
                  tenant_name=None, tenant_id=None,
@@ -53,8 +58,8 @@ class HTTPClient(object):
                  endpoint_url=None, insecure=False,
                  endpoint_type='publicURL',
                  auth_strategy='keystone', ca_cert=None, log_credentials=False,
-                 service_type='nfv-orchestration',
-                 **kwargs):
+                 service_type='nfv-orchestration', token_cache=False,
+                 background_refresh=False, **kwargs):
 
         self.username = username
         self.user_id = user_id
@@ -72,6 +77,19 @@ class HTTPClient(object):
         self.endpoint_url = endpoint_url
         self.auth_strategy = auth_strategy
         self.log_credentials = log_credentials
+        self.token_cache = cache.TokenCache() if token_cache else None
+        self.background_refresh = background_refresh
+        self.auth_ref = None
+        # Serializes (re-)authentication so that concurrent callers share
+        # a single token request.
+        self._auth_lock = threading.RLock()
+        self._auth_time = None
+        self._refresh_timer = None
+        self._refresh_stats = {'refresh_count': 0,
+                               'refresh_failures': 0,
+                               'last_refresh_duration': None,
+                               'total_refresh_duration': 0.0,
+                               'last_refresh_at': None}
         if insecure:
             self.verify_cert = False
         else:
@@ -88,11 +106,10 @@ class HTTPClient(object):
             kargs['content_type'] = kwargs['content_type']
 
         if self.log_credentials:
-            log_kargs = kargs
+            utils.http_log_req(_logger, args, kargs)
         else:
-            log_kargs = self._strip_credentials(kargs)
-
-        utils.http_log_req(_logger, args, log_kargs)
+            utils.http_log_req(_logger, args, kargs,
+                               redact=self._strip_credentials)
         try:
             resp, body = self.request(*args, **kargs)
         except requests.exceptions.SSLError as e:
@@ -108,20 +125,117 @@ class HTTPClient(object):
             raise exceptions.Unauthorized(message=body)
         return resp, body
 
-    def _strip_credentials(self, kwargs):
-        if kwargs.get('body') and self.password:
-            log_kwargs = kwargs.copy()
-            log_kwargs['body'] = kwargs['body'].replace(self.password,
-                                                        'REDACTED')
-            return log_kwargs
-        else:
-            return kwargs
+    def _strip_credentials(self, body):
+        return utils.redact_credentials(body, secrets=(self.password,))
+
+    def _token_cache_key(self):
+        return cache.TokenCache.make_key(
+            self.auth_url, self.user_id or self.username,
+            self.tenant_id or self.tenant_name, self.region_name,
+            self.password)
+
+    def _load_cached_token(self):
+        auth_ref, endpoint_url = self.token_cache.get_auth(
+            self._token_cache_key())
+        if auth_ref is None:
+            return False
+        if not self.endpoint_url:
+            self.endpoint_url = endpoint_url
+        self._set_auth_ref(auth_ref)
+        # As after an authentication, see _authenticate_keystone
+        self._auth_time = time.monotonic()
+        self._schedule_refresh()
+        return True
+
+    def _invalidate_cached_token(self):
+        if self.token_cache is not None:
+            self.token_cache.delete(self._token_cache_key())
 
     def authenticate_and_fetch_endpoint_url(self):
         if not self.auth_token:
-            self.authenticate()
+            with self._auth_lock:
+                if not self.auth_token and not (
+                        self.token_cache is not None and
+                        self.auth_strategy == 'keystone' and
+                        self._load_cached_token()):
+                    self.authenticate()
         elif not self.endpoint_url:
             self.endpoint_url = self._get_endpoint_url()
+        elif self._token_needs_refresh():
+            self.refresh_token(stale_token=self.auth_token)
+
+    def _token_needs_refresh(self):
+        # Only tokens obtained with our own credentials can be refreshed.
+        # Tokens are not refreshed again within the refresh window, so a
+        # skewed clock can not cause an authentication on every request.
+        if (self.auth_ref is None or self.auth_strategy != 'keystone' or
+                not self.password):
+            return False
+        if (self._auth_time is not None and
+                time.monotonic() - self._auth_time <
+                self.TOKEN_REFRESH_WINDOW):
+            return False
+        return self.auth_ref.will_expire_soon(
+            stale_duration=self.TOKEN_REFRESH_WINDOW)
+
+    def refresh_token(self, stale_token=None):
+        """Get a new token, unless another caller already replaced it.
+
+        :param stale_token: the token known to be expired or about to
+          expire. If the current token differs, it has been refreshed
+          concurrently and is used as is.
+        """
+        with self._auth_lock:
+            if stale_token is not None and self.auth_token != stale_token:
+                return
+            self._invalidate_cached_token()
+            start = time.monotonic()
+            try:
+                self.authenticate()
+            except Exception:
+                self._refresh_stats['refresh_failures'] += 1
+                raise
+            duration = time.monotonic() - start
+            stats = self._refresh_stats
+            stats['refresh_count'] += 1
+            stats['last_refresh_duration'] = duration
+            stats['total_refresh_duration'] += duration
+            stats['last_refresh_at'] = time.time()
+            _logger.debug("Refreshed token in %.3f seconds", duration)
+
+    def get_refresh_stats(self):
+        """Return counters and timings of token refreshes."""
+        with self._auth_lock:
+            return dict(self._refresh_stats)
+
+    def _schedule_refresh(self):
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        if (not self.background_refresh or self.auth_ref is None or
+                not self.auth_ref.expires):
+            return
+        delay = (self.auth_ref.expires.timestamp() - time.time() -
+                 self.TOKEN_REFRESH_WINDOW)
+        self._refresh_timer = threading.Timer(
+            max(delay, self.TOKEN_REFRESH_WINDOW), self._refresh_in_background,
+            args=(self.auth_token,))
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_in_background(self, token):
+        try:
+            self.refresh_token(stale_token=token)
+        except Exception as e:
+            # The next request refreshes the token inline.
+            _logger.warning("Background token refresh failed: %s", e)
+
+    def close(self):
+        """Stop the background token refresh."""
+        self.background_refresh = False
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
 
     def request(self, url, method, body=None, headers=None, **kwargs):
         """Request without authentication."""
@@ -147,6 +261,9 @@ class HTTPClient(object):
             verify=self.verify_cert,
             timeout=self.timeout,
             **kwargs)
+        if kwargs.get('stream'):
+            # The caller reads the body from the response
+            return resp, None
         if resp.headers.get('content-type') == 'application/zip':
             return resp, resp.content
 
@@ -176,14 +293,19 @@ class HTTPClient(object):
                                           **kwargs)
             return resp, body
         except exceptions.Unauthorized:
-            self.authenticate()
+            self.refresh_token(stale_token=kwargs['headers']['X-Auth-Token'])
+            kwargs['headers']['X-Auth-Token'] = self.auth_token
             resp, body = self._cs_request(
                 self.endpoint_url + url, method, **kwargs)
             return resp, body
 
     def _extract_service_catalog(self, body):
         """Set the client's service catalog from the response data."""
-        self.auth_ref = access.AccessInfo.factory(body=body)
+        self._set_auth_ref(access.AccessInfo.factory(body=body))
+        self._auth_time = time.monotonic()
+
+    def _set_auth_ref(self, auth_ref):
+        self.auth_ref = auth_ref
         self.service_catalog = self.auth_ref.service_catalog
         self.auth_token = self.auth_ref.auth_token
         self.auth_tenant_id = self.auth_ref.tenant_id
@@ -228,6 +350,10 @@ class HTTPClient(object):
         else:
             resp_body = None
         self._extract_service_catalog(resp_body)
+        if self.token_cache is not None:
+            self.token_cache.set_auth(self._token_cache_key(), self.auth_ref,
+                                      self.endpoint_url)
+        self._schedule_refresh()
 
     def _authenticate_noauth(self):
         if not self.endpoint_url:
@@ -278,6 +404,11 @@ class HTTPClient(object):
 
 class SessionClient(adapter.Adapter):
 
+    def __init__(self, *args, **kwargs):
+        super(SessionClient, self).__init__(*args, **kwargs)
+        # (auth_ref, endpoint) of the last service catalog lookup.
+        self._endpoint_cache = None
+
     def request(self, *args, **kwargs):
         kwargs.setdefault('authenticated', False)
         kwargs.setdefault('raise_exc', False)
@@ -301,27 +432,49 @@ class SessionClient(adapter.Adapter):
 
         resp = super(SessionClient, self).request(*args, **kwargs)
 
+        if kwargs.get('stream'):
+            # The caller reads the body from the response
+            return resp, None
         if resp.headers.get('content-type') == 'application/zip':
             return resp, resp.content
 
         return resp, resp.text
 
-    def _check_uri_length(self, url):
-        uri_len = len(self.endpoint_url) + len(url)
+    def _check_uri_length(self, url, endpoint_url=None):
+        uri_len = len(endpoint_url or self.endpoint_url) + len(url)
         if uri_len > MAX_URI_LEN:
             raise exceptions.RequestURITooLong(
                 excess=uri_len - MAX_URI_LEN)
 
     def do_request(self, url, method, **kwargs):
         kwargs.setdefault('authenticated', True)
-        self._check_uri_length(url)
+        endpoint_url = self.endpoint_url
+        self._check_uri_length(url, endpoint_url)
+        # NOTE: Pass the resolved endpoint so that the session does not
+        # look it up in the service catalog again.
+        kwargs.setdefault('endpoint_override', endpoint_url)
         return self.request(url, method, **kwargs)
 
+    def _get_auth_ref(self):
+        # NOTE: identity plugins replace their auth_ref whenever they
+        # (re-)authenticate, so it identifies the catalog an endpoint was
+        # resolved from.
+        return getattr(self.auth or self.session.auth, 'auth_ref', None)
+
     @property
     def endpoint_url(self):
         # NOTE(jamielennox): This is used purely by the CLI and should be
         # removed when the CLI gets smarter.
-        return self.get_endpoint()
+        cache = self._endpoint_cache
+        if cache is not None and cache[0] is self._get_auth_ref():
+            return cache[1]
+        endpoint = self.get_endpoint()
+        self._endpoint_cache = (self._get_auth_ref(), endpoint)
+        return endpoint
+
+    def invalidate(self, auth=None):
+        self._endpoint_cache = None
+        return super(SessionClient, self).invalidate(auth)
 
     @property
     def auth_token(self):
@@ -373,6 +526,8 @@ def construct_http_client(username=None,
                           ca_cert=None,
                           service_type='nfv-orchestration',
                           session=None,
+                          token_cache=False,
+                          background_refresh=False,
                           **kwargs):
 
     if session:
@@ -401,4 +556,6 @@ def construct_http_client(username=None,
                           service_type=service_type,
                           ca_cert=ca_cert,
                           log_credentials=log_credentials,
-                          auth_strategy=auth_strategy)
+                          auth_strategy=auth_strategy,
+                          token_cache=token_cache,
+                          background_refresh=background_refresh)
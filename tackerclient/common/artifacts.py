@@ -0,0 +1,341 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Mirroring of the additional artifacts of a VNF package.
+
+The artifacts listed in the additionalArtifacts of an onboarded package
+are downloaded concurrently into a directory tree mirroring their paths.
+Each artifact is streamed to a .part file while its checksum is
+computed, and renamed once complete and verified, so a file with the
+name of an artifact is always complete. A mirror can thus be resumed:
+the artifacts already downloaded are only checked against their
+checksum, and the others are downloaded again.
+
+A new version of a package often differs from the previous one in a few
+artifacts only. fetch_package rebuilds the tree of a package from its
+VNFD and its artifacts, reusing the artifacts whose checksum matches one
+found locally, in the content store or in previous versions of the
+package, and downloading the others only.
+"""
+
+import collections
+from concurrent import futures
+import hashlib
+import io
+import os
+import shutil
+import zipfile
+
+from tackerclient.common import cache
+from tackerclient.common import exceptions
+from tackerclient.common import fleet
+from tackerclient.i18n import _
+
+CHUNK_SIZE = 1024 * 1024
+PART_SUFFIX = '.part'
+
+# Status of the artifacts
+PENDING = 'PENDING'
+DOWNLOADING = 'DOWNLOADING'
+DOWNLOADED = 'DOWNLOADED'
+REUSED = 'REUSED'
+SKIPPED = 'SKIPPED'
+FAILED = 'FAILED'
+
+
+def _show_onboarded(client, vnf_package_id):
+    vnf_package = client.show_vnf_package(vnf_package_id)
+    if vnf_package.get('onboardingState') != 'ONBOARDED':
+        raise exceptions.InvalidInput(
+            reason=_('VNF package %(id)s is %(state)s, its artifacts are '
+                     'only available once it is ONBOARDED') % {
+                'id': vnf_package_id,
+                'state': vnf_package.get('onboardingState')})
+    return vnf_package
+
+
+def _artifacts(vnf_package):
+    return [artifact for artifact in
+            vnf_package.get('additionalArtifacts') or []
+            if artifact.get('artifactPath')]
+
+
+def get_artifacts(client, vnf_package_id):
+    """Return the additionalArtifacts of an onboarded VNF package.
+
+    :raises InvalidInput: if the package is not onboarded
+    """
+    return _artifacts(_show_onboarded(client, vnf_package_id))
+
+
+def target_path(directory, artifact_path):
+    """Return the local path of an artifact in a mirror directory.
+
+    :raises InvalidInput: if the artifact path leads out of the directory
+    """
+    directory = os.path.abspath(directory)
+    path = os.path.normpath(os.path.join(directory,
+                                         *artifact_path.split('/')))
+    if (os.path.isabs(artifact_path) or
+            not path.startswith(directory + os.sep)):
+        raise exceptions.InvalidInput(
+            reason=_('Artifact path %s is outside of the package') %
+            artifact_path)
+    return path
+
+
+def _new_digest(checksum):
+    algorithm = checksum['algorithm'].lower().replace('-', '')
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise exceptions.InvalidInput(
+            reason=_('Unsupported checksum algorithm %s') %
+            checksum['algorithm'])
+
+
+def _is_complete(path, checksum, chunk_size):
+    if not os.path.isfile(path):
+        return False
+    if not checksum:
+        return True
+    digest = _new_digest(checksum)
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(chunk_size), b''):
+            digest.update(data)
+    return digest.hexdigest() == checksum['hash'].lower()
+
+
+def _copy_verified(src, part, checksum, chunk_size):
+    # src is a readable file object
+    digest = _new_digest(checksum)
+    with open(part, 'wb') as f:
+        for data in iter(lambda: src.read(chunk_size), b''):
+            f.write(data)
+            digest.update(data)
+    if digest.hexdigest() != checksum['hash'].lower():
+        os.unlink(part)
+        return False
+    return True
+
+
+def _reuse_from_base(base, artifact_path, part, checksum, chunk_size):
+    """Copy an artifact of a previous package tree or CSAR file to part.
+
+    :returns: False unless the base has the artifact with the checksum
+    """
+    if os.path.isdir(base):
+        src = target_path(base, artifact_path)
+        if not _is_complete(src, checksum, chunk_size):
+            return False
+        shutil.copyfile(src, part)
+        return True
+    try:
+        with zipfile.ZipFile(base) as archive:
+            with archive.open(artifact_path) as src:
+                return _copy_verified(src, part, checksum, chunk_size)
+    except (KeyError, OSError, zipfile.BadZipFile):
+        return False
+
+
+def _reuse(artifact, part, store, bases, chunk_size):
+    checksum = artifact.get('checksum')
+    if not checksum:
+        # An artifact without checksum cannot be told unchanged
+        return False
+    key = cache.ContentStore.checksum_key(checksum)
+    if store is not None and key and store.materialize(key, part):
+        return True
+    for base in bases:
+        if _reuse_from_base(base, artifact['artifactPath'], part, checksum,
+                            chunk_size):
+            return True
+    return False
+
+
+def _fetch(client, vnf_package_id, artifact, path, chunk_size, store=None,
+           bases=()):
+    """Get an artifact unless it is complete already.
+
+    The artifact is reused from the content store or the bases if they
+    have it, else downloaded.
+
+    :returns: a tuple of (status, size)
+    """
+    checksum = artifact.get('checksum')
+    if _is_complete(path, checksum, chunk_size):
+        return SKIPPED, os.path.getsize(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = path + PART_SUFFIX
+    key = cache.ContentStore.checksum_key(checksum)
+    if _reuse(artifact, part, store, bases, chunk_size):
+        os.replace(part, path)
+        if store is not None and key and store.get(key) is None:
+            store.add(key, path)
+        return REUSED, os.path.getsize(path)
+    digest = _new_digest(checksum) if checksum else None
+    size = 0
+    resp = client.fork().stream_artifact_from_vnf_package(
+        vnf_package_id, artifact['artifactPath'])
+    try:
+        with open(part, 'wb') as f:
+            for data in resp.iter_content(chunk_size):
+                f.write(data)
+                size += len(data)
+                if digest is not None:
+                    digest.update(data)
+    finally:
+        resp.close()
+    if digest is not None and digest.hexdigest() != checksum['hash'].lower():
+        os.unlink(part)
+        raise exceptions.InvalidInput(
+            reason=_('Artifact %(path)s does not match its %(algorithm)s '
+                     'checksum') % {'path': artifact['artifactPath'],
+                                    'algorithm': checksum['algorithm']})
+    os.replace(part, path)
+    if store is not None and key:
+        store.add(key, path)
+    return DOWNLOADED, size
+
+
+def mirror(client, vnf_package_id, directory, artifact_paths=None,
+           store=None, bases=(), max_workers=fleet.DEFAULT_PARALLEL,
+           chunk_size=CHUNK_SIZE, progress=None):
+    """Download the artifacts of a VNF package into a directory.
+
+    :param client: a tackerclient.v1_0.client.Client, forked for each
+      download
+    :param vnf_package_id: ID of an onboarded VNF package
+    :param directory: the directory the artifact paths are relative to
+    :param artifact_paths: the paths of the artifacts to download, all
+      the additionalArtifacts by default
+    :param store: a tackerclient.common.cache.ContentStore the artifacts
+      are reused from when it has them, and added to otherwise
+    :param bases: paths of previous package trees or CSAR files the
+      artifacts are reused from when they have them, unchanged
+    :param max_workers: maximum number of artifacts downloaded
+      concurrently
+    :param chunk_size: size of the chunks written as they arrive
+    :param progress: callable called with the path of an artifact and
+      its status whenever it changes
+    :returns: a list of dicts, the results of the artifacts in the order
+      of additionalArtifacts, with artifactPath, path, status, size and
+      error keys
+    :raises InvalidInput: if the package is not onboarded, or if an
+      artifact path is unknown or outside of the directory
+    """
+    vnf_package = _show_onboarded(client, vnf_package_id)
+    return _mirror(client, vnf_package, directory, artifact_paths, store,
+                   bases, max_workers, chunk_size, progress)
+
+
+def _mirror(client, vnf_package, directory, artifact_paths, store, bases,
+            max_workers, chunk_size, progress):
+    vnf_package_id = vnf_package['id']
+    artifacts = _artifacts(vnf_package)
+    if artifact_paths is not None:
+        known = set(artifact['artifactPath'] for artifact in artifacts)
+        unknown = [path for path in artifact_paths if path not in known]
+        if unknown:
+            raise exceptions.InvalidInput(
+                reason=_('VNF package %(id)s has no artifact %(paths)s') % {
+                    'id': vnf_package_id, 'paths': ', '.join(unknown)})
+        artifacts = [artifact for artifact in artifacts
+                     if artifact['artifactPath'] in artifact_paths]
+    results = collections.OrderedDict(
+        (artifact['artifactPath'],
+         {'artifactPath': artifact['artifactPath'],
+          'path': target_path(directory, artifact['artifactPath']),
+          'status': PENDING, 'size': None, 'error': None})
+        for artifact in artifacts)
+
+    def set_status(artifact_path, status, error=None):
+        results[artifact_path]['status'] = status
+        if error is not None:
+            results[artifact_path]['error'] = str(error)
+        if progress is not None:
+            progress(artifact_path, status)
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for artifact in artifacts:
+            result = results[artifact['artifactPath']]
+            pending[executor.submit(
+                _fetch, client, vnf_package_id, artifact, result['path'],
+                chunk_size, store, bases)] = result['artifactPath']
+            set_status(result['artifactPath'], DOWNLOADING)
+        for future in futures.as_completed(pending):
+            artifact_path = pending[future]
+            try:
+                status, results[artifact_path]['size'] = future.result()
+            except Exception as e:
+                set_status(artifact_path, FAILED, e)
+                continue
+            set_status(artifact_path, status)
+    return list(results.values())
+
+
+def _fetch_vnfd(client, vnf_package, directory, store):
+    key = None
+    data = None
+    if store is not None:
+        key = store.vnfd_key(vnf_package.get('vnfdId'), 'application/zip')
+        data = store.read(key) if key else None
+    if data is None:
+        data = client.download_vnfd_from_vnf_package(vnf_package['id'],
+                                                     'application/zip')
+        if key:
+            store.put(key, data)
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        raise exceptions.InvalidInput(
+            reason=_('The VNFD of VNF package %(id)s is not a ZIP file: '
+                     '%(error)s') % {'id': vnf_package['id'], 'error': e})
+    names = []
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            path = target_path(directory, info.filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with archive.open(info) as src, open(path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            names.append(info.filename)
+    return names
+
+
+def fetch_package(client, vnf_package_id, directory, store=None, bases=(),
+                  max_workers=fleet.DEFAULT_PARALLEL, chunk_size=CHUNK_SIZE,
+                  progress=None):
+    """Rebuild the tree of a VNF package, downloading its changes only.
+
+    The VNFD is downloaded as a ZIP file and extracted into the
+    directory, then the artifacts are added under their artifact path
+    as mirror does. Unchanged artifacts, found with the same checksum in
+    the store or in the bases, are copied instead of downloaded. The
+    resulting tree can be packaged again with
+    tackerclient.common.csar.build.
+
+    :param store: a tackerclient.common.cache.ContentStore, the VNFD and
+      the artifacts are reused from it and added to it
+    :param bases: paths of previous package trees or CSAR files
+    :returns: a dict with the vnfdFiles key, the names of the files of
+      the VNFD, and the artifacts key, the results of mirror
+    :raises InvalidInput: if the package is not onboarded or its VNFD is
+      not a ZIP file
+    """
+    vnf_package = _show_onboarded(client, vnf_package_id)
+    vnfd_files = _fetch_vnfd(client, vnf_package, directory, store)
+    results = _mirror(client, vnf_package, directory, None, store, bases,
+                      max_workers, chunk_size, progress)
+    return {'vnfdFiles': vnfd_files, 'artifacts': results}
@@ -0,0 +1,628 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""On-disk caches shared by tacker client processes."""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from keystoneclient import access
+
+from tackerclient.common import utils
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_logger = logging.getLogger(__name__)
+
+# ioctl cloning a file on Linux file systems with reflinks
+_FICLONE = 0x40049409
+
+_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'tackerclient')
+
+
+def get_cache_dir():
+    """Return the cache directory, env[TACKERCLIENT_CACHE_DIR] if set."""
+    return utils.env('TACKERCLIENT_CACHE_DIR', default=DEFAULT_CACHE_DIR)
+
+
+def make_key(*parts):
+    """Return a cache key built from the given parts.
+
+    The key is a digest, so secrets may be part of it without being
+    written to disk.
+    """
+    data = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class FileCache(object):
+    """Store of JSON documents, one file per key.
+
+    The cache directory is only accessible by its owner and entries are
+    written atomically, so concurrent processes never read a partial
+    entry. Any error while reading or writing is logged and handled as
+    a cache miss.
+
+    :param namespace: sub directory of the cache directory
+    :param directory: cache directory, get_cache_dir() by default
+    :param ttl: default lifetime of entries in seconds, None for no
+      expiry
+    """
+
+    def __init__(self, namespace, directory=None, ttl=None):
+        self.path = os.path.join(directory or get_cache_dir(), namespace)
+        self.ttl = ttl
+
+    def _ensure_dir(self):
+        os.makedirs(self.path, mode=0o700, exist_ok=True)
+        if os.stat(self.path).st_mode & 0o077:
+            os.chmod(self.path, 0o700)
+
+    def _file(self, key):
+        return os.path.join(self.path, '%s.json' % key)
+
+    def get(self, key):
+        """Return the value stored for key, or None."""
+        try:
+            with open(self._file(key)) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (IOError, ValueError) as e:
+            _logger.debug("Ignoring unreadable cache entry %s: %s", key, e)
+            return None
+        expires_at = entry.get('expires_at')
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return entry.get('value')
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """Store value for key.
+
+        :param ttl: lifetime of the entry in seconds, the cache ttl by
+          default
+        :param expires_at: absolute expiry time as a POSIX timestamp,
+          takes precedence over ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if expires_at is None and ttl is not None:
+            expires_at = time.time() + ttl
+        entry = {'expires_at': expires_at, 'value': value}
+        try:
+            self._ensure_dir()
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(entry, f)
+                os.replace(tmp_path, self._file(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (IOError, OSError, TypeError, ValueError) as e:
+            _logger.debug("Unable to write cache entry %s: %s", key, e)
+
+    def delete(self, key):
+        try:
+            os.unlink(self._file(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.json'):
+                self.delete(name[:-len('.json')])
+
+
+class TokenCache(FileCache):
+    """Cache of Keystone tokens and the Tacker endpoints resolved with them.
+
+    Entries are keyed by auth URL, user, project and region, and expire
+    with their token. The cache is shared by the ``tacker`` shell and the
+    Python client.
+    """
+
+    # Tokens expiring within this number of seconds are not used.
+    STALE_DURATION = 30
+
+    def __init__(self, directory=None):
+        super(TokenCache, self).__init__('tokens', directory=directory)
+
+    @staticmethod
+    def make_key(auth_url, user, project, region_name, password=None):
+        return make_key(auth_url, user, project, region_name, password)
+
+    def get_auth(self, key):
+        """Return a tuple of (auth_ref, endpoint_url) or (None, None)."""
+        value = self.get(key)
+        if not value:
+            return None, None
+        try:
+            auth_ref = access.AccessInfo.factory(
+                body=value['body'], auth_token=value['auth_token'])
+        except Exception as e:
+            _logger.debug("Ignoring invalid cached token: %s", e)
+            self.delete(key)
+            return None, None
+        if auth_ref.will_expire_soon(stale_duration=self.STALE_DURATION):
+            self.delete(key)
+            return None, None
+        return auth_ref, value.get('endpoint_url')
+
+    def set_auth(self, key, auth_ref, endpoint_url=None):
+        if not auth_ref or not auth_ref.expires:
+            return
+        if auth_ref.version == 'v3':
+            body = {'token': dict(auth_ref)}
+        else:
+            body = {'access': dict(auth_ref)}
+        self.set(key, {'auth_token': auth_ref.auth_token,
+                       'body': body,
+                       'endpoint_url': endpoint_url},
+                 expires_at=auth_ref.expires.timestamp())
+
+
+def parse_cache_control(value):
+    """Return the directives of a Cache-Control header as a dict."""
+    directives = {}
+    for directive in (value or '').split(','):
+        name, _sep, arg = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+class ResponseCache(object):
+    """Cache of GET responses of the Tacker API.
+
+    Responses are kept in an in-memory LRU bounded by number of entries
+    and total body size, and optionally on disk so that they are shared
+    by processes. Their lifetime is the max-age of their Cache-Control
+    header, or ttl. Expired responses with an ETag are kept so that they
+    can be revalidated with If-None-Match.
+
+    Entries are grouped by scope (endpoint and project) and resource path.
+    A variant distinguishes requests of the same path, such as query
+    strings and the requested API version.
+
+    :param ttl: lifetime of responses without max-age in seconds,
+      env[TACKERCLIENT_HTTP_CACHE_TTL] or 30 by default
+    :param max_entries: maximum number of responses kept in memory
+    :param max_bytes: maximum total size of the bodies kept in memory
+    :param persistent: also store responses on disk
+    :param directory: cache directory, get_cache_dir() by default
+    """
+
+    # Larger responses are not cached.
+    MAX_ENTRY_SIZE = 1024 * 1024
+
+    def __init__(self, ttl=None, max_entries=256, max_bytes=8 * 1024 * 1024,
+                 persistent=True, directory=None):
+        if ttl is None:
+            ttl = utils.env_int('TACKERCLIENT_HTTP_CACHE_TTL', default=30)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = (FileCache('responses', directory=directory)
+                     if persistent else None)
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0,
+                       'stores': 0, 'invalidations': 0, 'evictions': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self):
+        """Return hit, miss, revalidation and eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._size
+        return stats
+
+    def _remember(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old['body'])
+            self._entries[key] = entry
+            self._size += len(entry['body'])
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     self._size > self.max_bytes):
+                _key, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted['body'])
+                self._stats['evictions'] += 1
+
+    def lookup(self, scope, path, variant):
+        """Return a tuple of (entry, fresh).
+
+        entry is None on a miss. A stale entry is only returned when it
+        can be revalidated with its ETag.
+        """
+        key = (scope, path, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.disk is not None:
+            group = self.disk.get(self._group_key(scope, path)) or {}
+            entry = group.get(path, {}).get(variant)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is not None:
+            if entry['expires_at'] > time.time():
+                self._count('hits')
+                return entry, True
+            if entry['headers'].get('ETag'):
+                return entry, False
+        self._count('misses')
+        return None, False
+
+    def _save(self, scope, path, variant, entry):
+        self._remember((scope, path, variant), entry)
+        if self.disk is not None:
+            disk_key = self._group_key(scope, path)
+            group = self.disk.get(disk_key) or {}
+            group.setdefault(path, {})[variant] = entry
+            self.disk.set(disk_key, group)
+
+    def store(self, scope, path, variant, status_code, headers, body):
+        """Store a response unless its Cache-Control forbids it."""
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if ('no-store' in directives or not isinstance(body, str) or
+                len(body) > self.MAX_ENTRY_SIZE):
+            return
+        ttl = self.ttl
+        if 'no-cache' in directives:
+            ttl = 0
+        elif directives.get('max-age'):
+            try:
+                ttl = int(directives['max-age'])
+            except ValueError:
+                pass
+        if ttl <= 0 and not headers.get('ETag'):
+            return
+        kept = {name: headers[name]
+                for name in ('Content-Type', 'ETag', 'Link')
+                if headers.get(name)}
+        self._save(scope, path, variant,
+                   {'status_code': status_code, 'headers': kept,
+                    'body': body, 'ttl': ttl,
+                    'expires_at': time.time() + ttl})
+        self._count('stores')
+
+    def revalidated(self, scope, path, variant, entry):
+        """Extend the lifetime of an entry confirmed by a 304 response."""
+        entry = dict(entry, expires_at=time.time() + entry['ttl'])
+        self._save(scope, path, variant, entry)
+        self._count('revalidated')
+        return entry
+
+    @staticmethod
+    def _split(path):
+        if path.endswith('.json'):
+            path = path[:-len('.json')]
+        return [part for part in path.split('/') if part]
+
+    def _group_key(self, scope, path):
+        # On disk the entries of a collection and of its members are
+        # stored together, so that they can be invalidated together.
+        return make_key(scope, self._split(path)[:3])
+
+    def _related(self, path, cached_path):
+        parts = self._split(path)
+        cached_parts = self._split(cached_path)
+        common = min(len(parts), len(cached_parts))
+        return parts[:common] == cached_parts[:common]
+
+    def invalidate(self, scope, path):
+        """Drop the entries of path, its ancestors and its descendants."""
+        with self._lock:
+            for key in [k for k in self._entries
+                        if k[0] == scope and self._related(path, k[1])]:
+                self._size -= len(self._entries.pop(key)['body'])
+        if self.disk is not None:
+            parts = self._split(path)
+            for length in range(1, min(len(parts), 3) + 1):
+                disk_key = make_key(scope, parts[:length])
+                group = self.disk.get(disk_key)
+                if not group:
+                    continue
+                group = {cached_path: variants
+                         for cached_path, variants in group.items()
+                         if not self._related(path, cached_path)}
+                if group:
+                    self.disk.set(disk_key, group)
+                else:
+                    self.disk.delete(disk_key)
+        self._count('invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+
+def _reflink(src, dst):
+    """Make dst a copy-on-write clone of src, return False if unsupported.
+
+    dst is opened for writing, it must be a new file and never a link to
+    an object.
+    """
+    try:
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        return True
+    except (AttributeError, OSError):
+        # fcntl is not available or the file system has no reflinks
+        return False
+
+
+class ContentStore(object):
+    """Content-addressed store of VNF packages, VNFDs and artifacts.
+
+    Objects are read-only files named by a key, the checksum of their
+    content given by the VNF package API, or for VNFDs which have none,
+    the VNFD ID. Objects whose checksum is known are verified before
+    they are stored and again before they are served, so the store never
+    serves content that does not match its key.
+
+    Objects are materialized to their target as a reflink where the file
+    system supports it, else as a hard link, else as a copy. The least
+    recently used objects are evicted when the store exceeds max_bytes.
+    The recency of an object is recorded in its access time, which leaves
+    the modification time of the hard links untouched.
+
+    :param directory: cache directory, get_cache_dir() by default
+    :param max_bytes: maximum total size of the objects,
+      env[TACKERCLIENT_CONTENT_CACHE_SIZE] MiB or 2 GiB by default
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = utils.env_int('TACKERCLIENT_CONTENT_CACHE_SIZE',
+                                      default=2048) * 1024 * 1024
+        self.path = os.path.join(directory or get_cache_dir(), 'content')
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def checksum_key(checksum):
+        """Return the key of the content with a checksum, or None.
+
+        :param checksum: a dict with algorithm and hash keys, as the
+          checksum of a VNF package or of its additional artifacts
+        """
+        if not checksum:
+            return None
+        algorithm = (checksum.get('algorithm') or '').lower().replace('-', '')
+        digest = (checksum.get('hash') or '').lower()
+        if (algorithm not in hashlib.algorithms_available or not digest or
+                not digest.isalnum()):
+            return None
+        return '%s-%s' % (algorithm, digest)
+
+    @staticmethod
+    def vnfd_key(vnfd_id, accept):
+        """Return the key of the VNFD of a VNFD ID in a format, or None."""
+        if not vnfd_id:
+            return None
+        return 'vnfd-%s' % make_key(vnfd_id, accept)
+
+    def _file(self, key):
+        return os.path.join(self.path, key)
+
+    def get(self, key):
+        """Return the path of the object stored for key, or None."""
+        path = self._file(key)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            return None
+        return path
+
+    def _verified(self, key):
+        """Return the path of the object for key if it matches key, or None.
+
+        Objects are verified when they are stored, but a hard link may
+        still have altered them afterwards: an object whose key is a
+        checksum is verified again, and deleted if it no longer matches.
+        VNFD objects have no checksum to verify.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        algorithm, _sep, expected = key.partition('-')
+        if algorithm not in hashlib.algorithms_available:
+            return path
+        digest = hashlib.new(algorithm)
+        try:
+            with open(path, 'rb') as f:
+                for data in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                    digest.update(data)
+        except OSError as e:
+            _logger.debug("Ignoring unreadable object %s: %s", key, e)
+            return None
+        if digest.hexdigest() == expected:
+            return path
+        _logger.warning("Deleting object %s, its content does not match "
+                        "its checksum", key)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        return None
+
+    def read(self, key):
+        """Return the content stored for key, or None."""
+        path = self._verified(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError as e:
+            _logger.debug("Ignoring unreadable object %s: %s", key, e)
+            return None
+
+    def put(self, key, data, checksum=None):
+        """Store data for key.
+
+        :param data: bytes, or a string stored encoded in UTF-8
+        :param checksum: the checksum data must match, as a dict with
+          algorithm and hash keys
+        :returns: True if data is stored
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return False
+        if checksum is not None:
+            algorithm, _sep, expected = (self.checksum_key(checksum) or
+                                         '').partition('-')
+            if (not expected or
+                    hashlib.new(algorithm, data).hexdigest() != expected):
+                _logger.warning("Not storing %s, its content does not match "
+                                "its checksum", key)
+                return False
+        try:
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                # Hard links to the object must not be able to alter it
+                os.chmod(tmp_path, 0o444)
+                os.replace(tmp_path, self._file(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            _logger.debug("Unable to store object %s: %s", key, e)
+            return False
+        self.evict()
+        return True
+
+    def materialize(self, key, target):
+        """Make target a file with the content stored for key.
+
+        :returns: False if nothing is stored for key
+        """
+        path = self._verified(key)
+        if path is None:
+            return False
+        # target may already be a link to the object: the object is
+        # linked or copied to a new file renamed to target, never written
+        # through target
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(target)), suffix='.tmp')
+        os.close(fd)
+        try:
+            if not _reflink(path, tmp_path):
+                try:
+                    os.unlink(tmp_path)
+                    os.link(path, tmp_path)
+                except OSError as e:
+                    _logger.debug("Unable to link object %s: %s", key, e)
+                    shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            # rename() does nothing when tmp_path and target are links to
+            # the same file
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+        return True
+
+    def add(self, key, path):
+        """Store a copy of a file for key.
+
+        The file is cloned as a reflink where the file system supports
+        it. Its content is expected to match key already.
+
+        :returns: True if the file is stored
+        """
+        try:
+            if os.path.getsize(path) > self.max_bytes:
+                return False
+            os.makedirs(self.path, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            os.close(fd)
+            try:
+                if not _reflink(path, tmp_path):
+                    shutil.copyfile(path, tmp_path)
+                os.chmod(tmp_path, 0o444)
+                os.replace(tmp_path, self._file(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            _logger.debug("Unable to store object %s: %s", key, e)
+            return False
+        self.evict()
+        return True
+
+    def _objects(self):
+        try:
+            entries = list(os.scandir(self.path))
+        except OSError:
+            return []
+        objects = []
+        for entry in entries:
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            objects.append((stat.st_atime, stat.st_size, entry.path))
+        return objects
+
+    def evict(self):
+        """Delete the least recently used objects beyond max_bytes."""
+        objects = sorted(self._objects())
+        size = sum(object_size for _atime, object_size, _path in objects)
+        for _atime, object_size, path in objects:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            size -= object_size
+
+    def clear(self):
+        for _atime, _size, path in self._objects():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
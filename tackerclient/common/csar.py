@@ -0,0 +1,581 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Build CSARs from VNF package directories and check CSAR files.
+
+The archive is produced as a stream of bytes, so that it can be sent in
+an upload request without an intermediate file. Files are split into
+chunks compressed concurrently, each chunk being a raw deflate stream
+flushed to a byte boundary and primed with the end of the previous
+chunk, so that the chunks of a file are concatenated into a single
+deflate stream as pigz does. zlib releases the GIL, so the chunks are
+compressed on all CPU cores by a pool of threads. Files which are
+already compressed, such as compressed images, are stored as is.
+
+The sizes and CRC of an entry are written after its data in a data
+descriptor, and ZIP64 records are used for large entries and archives.
+
+CSAR files are checked locally before they are uploaded: the layout of
+the package is checked from the central directory and the metadata
+files, then the declared hashes of the entries are verified
+concurrently.
+"""
+
+import collections
+from concurrent import futures
+import hashlib
+import os
+import struct
+import time
+from urllib import parse
+import zipfile
+import zlib
+
+from tackerclient.common import exceptions
+from tackerclient.i18n import _
+
+TOSCA_META = 'TOSCA-Metadata/TOSCA.meta'
+_REQUIRED_KEYS = ('TOSCA-Meta-File-Version', 'CSAR-Version', 'Created-By',
+                  'Entry-Definitions')
+# Keys of TOSCA.meta naming files of the package
+_FILE_KEYS = ('Entry-Definitions', 'ETSI-Entry-Manifest',
+              'ETSI-Entry-Change-Log', 'ETSI-Entry-Licenses',
+              'ETSI-Entry-Certificate', 'Name', 'Source')
+
+CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+# Extensions of the files stored without compression
+COMPRESSED_EXTENSIONS = ('.7z', '.bz2', '.gz', '.jar', '.jpeg', '.jpg',
+                         '.png', '.rar', '.tgz', '.txz', '.xz', '.zip',
+                         '.zst')
+# Files whose first chunk does not compress below this ratio are stored
+_MIN_COMPRESSION_RATIO = 0.95
+_SAMPLE_SIZE = 64 * 1024
+# Size of the deflate window, primed with the end of the previous chunk
+_WINDOW_SIZE = 32 * 1024
+
+_ZIP64_LIMIT = (1 << 31) - 1
+_ZIP_FILECOUNT_LIMIT = 0xffff
+_DEFLATED = 8
+_STORED = 0
+# Sizes and CRC in a data descriptor, UTF-8 names
+_FLAGS = 0x08 | 0x800
+
+
+def read_metadata(root):
+    """Return the blocks of the TOSCA.meta file of a package directory.
+
+    :returns: a list of dicts, the first one holding the TOSCA-Meta
+      keys, the next ones the keys of the blocks describing files
+    :raises InvalidInput: if the file is missing or malformed
+    """
+    path = os.path.join(root, TOSCA_META)
+    if not os.path.isfile(path):
+        raise exceptions.InvalidInput(
+            reason=_('%(root)s has no %(meta)s file') % {
+                'root': root, 'meta': TOSCA_META})
+    with open(path) as f:
+        return _parse_metadata(f, path)
+
+
+def _parse_metadata(lines, path):
+    blocks = [collections.OrderedDict()]
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            if blocks[-1]:
+                blocks.append(collections.OrderedDict())
+            continue
+        key, sep, value = line.partition(':')
+        if not sep or not key.strip():
+            raise exceptions.InvalidInput(
+                reason=_('Invalid line %(number)d of %(path)s, a '
+                         '"key: value" pair is expected') % {
+                    'number': number, 'path': path})
+        blocks[-1][key.strip()] = value.strip()
+    if not blocks[-1]:
+        blocks.pop()
+    return blocks
+
+
+def _get(block, key):
+    # Keys are compared case-insensitively, Created-by is commonly used
+    for name, value in block.items():
+        if name.lower() == key.lower():
+            return value
+    return None
+
+
+def validate(root):
+    """Check that a directory has the layout of a CSAR with TOSCA-Metadata.
+
+    The TOSCA.meta file must have the TOSCA-Meta keys, and the files it
+    refers to, except URIs, must be part of the package.
+
+    :returns: the TOSCA-Meta keys, as a dict
+    :raises InvalidInput: if the layout is invalid
+    """
+    if not os.path.isdir(root):
+        raise exceptions.InvalidInput(
+            reason=_('%s is not a directory') % root)
+    return _check_metadata(
+        read_metadata(root), root,
+        lambda name: os.path.isfile(os.path.join(root, name)))
+
+
+def _check_metadata(blocks, location, exists):
+    meta = blocks[0] if blocks else {}
+    missing = [key for key in _REQUIRED_KEYS if not _get(meta, key)]
+    if missing:
+        raise exceptions.InvalidInput(
+            reason=_('%(meta)s of %(root)s lacks %(keys)s') % {
+                'meta': TOSCA_META, 'root': location,
+                'keys': ', '.join(missing)})
+    for block in blocks:
+        for key in _FILE_KEYS:
+            name = _get(block, key)
+            if not name or parse.urlparse(name).scheme:
+                continue
+            if not exists(name):
+                raise exceptions.InvalidInput(
+                    reason=_('%(name)s, the %(key)s of %(meta)s, is not '
+                             'found in %(root)s') % {
+                        'name': name, 'key': key, 'meta': TOSCA_META,
+                        'root': location})
+    return meta
+
+
+class _Entry(object):
+    """A file of the archive and the fields of its ZIP headers."""
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, *name.split('/'))
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.mode = stat.st_mode
+        self.mtime = stat.st_mtime
+        self.method = _DEFLATED
+        self.zip64 = self.size > _ZIP64_LIMIT
+        self.offset = 0
+        self.crc = 0
+        self.compressed_size = 0
+
+    def dos_time(self):
+        t = time.localtime(self.mtime)
+        if t.tm_year < 1980:
+            return 0, (1 << 5) | 1
+        return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+                ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+    def local_header(self):
+        version = 45 if self.zip64 else 20
+        dos_time, dos_date = self.dos_time()
+        name = self.name.encode('utf-8')
+        extra = b''
+        size = 0
+        if self.zip64:
+            # The sizes are given in the data descriptor
+            extra = struct.pack('<HHQQ', 1, 16, 0, 0)
+            size = 0xffffffff
+        return struct.pack('<IHHHHHIIIHH', 0x04034b50, version, _FLAGS,
+                           self.method, dos_time, dos_date, 0, size, size,
+                           len(name), len(extra)) + name + extra
+
+    def data_descriptor(self):
+        if self.zip64:
+            return struct.pack('<IIQQ', 0x08074b50, self.crc,
+                               self.compressed_size, self.size)
+        return struct.pack('<IIII', 0x08074b50, self.crc,
+                           self.compressed_size, self.size)
+
+    def central_header(self):
+        version = 45 if self.zip64 else 20
+        dos_time, dos_date = self.dos_time()
+        name = self.name.encode('utf-8')
+        fields = []
+        size, compressed_size, offset = (self.size, self.compressed_size,
+                                         self.offset)
+        if self.zip64:
+            fields.extend((self.size, self.compressed_size))
+            size = compressed_size = 0xffffffff
+        if self.offset > _ZIP64_LIMIT:
+            fields.append(self.offset)
+            offset = 0xffffffff
+        extra = b''
+        if fields:
+            extra = struct.pack('<HH%dQ' % len(fields), 1, 8 * len(fields),
+                                *fields)
+        return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50,
+                           (3 << 8) | version, version, _FLAGS, self.method,
+                           dos_time, dos_date, self.crc, compressed_size,
+                           size, len(name), len(extra), 0, 0, 0,
+                           (self.mode & 0xffff) << 16,
+                           offset) + name + extra
+
+
+def list_files(root):
+    """Return the names of the files of a package directory.
+
+    The names are relative paths with / separators, TOSCA.meta first
+    and the other ones in order.
+    """
+    names = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        rel = os.path.relpath(dirpath, root)
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if not os.path.isfile(path):
+                continue
+            name = filename if rel == os.curdir else os.path.join(
+                rel, filename)
+            names.append(name.replace(os.sep, '/'))
+    names.sort(key=lambda name: (name != TOSCA_META, name))
+    return names
+
+
+def _is_compressible(name, sample):
+    if name.lower().endswith(COMPRESSED_EXTENSIONS):
+        return False
+    sample = sample[:_SAMPLE_SIZE]
+    if not sample:
+        return True
+    compressed = zlib.compress(sample, 1)
+    return len(compressed) < len(sample) * _MIN_COMPRESSION_RATIO
+
+
+def _compress(data, zdict, last, level):
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15,
+                                      zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(
+        zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _read_chunks(entry, chunk_size):
+    with open(entry.path, 'rb') as f:
+        chunk = f.read(chunk_size)
+        while True:
+            following = f.read(chunk_size) if chunk else b''
+            yield chunk, not following
+            if not following:
+                return
+            chunk = following
+
+
+def _plan(entries, executor, level, chunk_size):
+    """Yield the parts of the archive in order.
+
+    The parts are ('start', entry), ('data', entry, raw chunk, future of
+    its data) and ('end', entry) tuples. Chunks are read and submitted
+    for compression as the parts are consumed.
+    """
+    for entry in entries:
+        chunks = _read_chunks(entry, chunk_size)
+        first, last = next(chunks)
+        if not _is_compressible(entry.name, first):
+            entry.method = _STORED
+        yield ('start', entry)
+        previous = b''
+        for chunk, last in _chain(first, last, chunks):
+            if entry.method == _STORED:
+                data = futures.Future()
+                data.set_result(chunk)
+            else:
+                data = executor.submit(_compress, chunk,
+                                       previous[-_WINDOW_SIZE:], last,
+                                       level)
+            yield ('data', entry, chunk, data)
+            previous = chunk
+        yield ('end', entry)
+
+
+def _chain(first, last, chunks):
+    yield first, last
+    for chunk, last in chunks:
+        yield chunk, last
+
+
+def iter_csar(root, max_workers=None, level=COMPRESS_LEVEL,
+              chunk_size=CHUNK_SIZE):
+    """Yield the bytes of the CSAR of a package directory.
+
+    :param root: path of the package directory, checked with validate
+    :param max_workers: number of threads compressing chunks, the number
+      of CPUs by default
+    :param level: zlib compression level
+    :param chunk_size: size of the chunks compressed independently
+    :raises InvalidInput: if the layout of the directory is invalid
+    """
+    validate(root)
+    max_workers = max_workers or os.cpu_count() or 1
+    entries = [_Entry(root, name) for name in list_files(root)]
+    offset = 0
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque()
+        parts = _plan(entries, executor, level, chunk_size)
+        while True:
+            # Keep every worker busy with the next chunks, the memory
+            # used is bounded by the size of the window
+            for part in parts:
+                pending.append(part)
+                if len(pending) > max_workers * 2:
+                    break
+            if not pending:
+                break
+            part = pending.popleft()
+            entry = part[1]
+            if part[0] == 'start':
+                entry.offset = offset
+                data = entry.local_header()
+            elif part[0] == 'data':
+                entry.crc = zlib.crc32(part[2], entry.crc)
+                data = part[3].result()
+                entry.compressed_size += len(data)
+            else:
+                data = entry.data_descriptor()
+            offset += len(data)
+            yield data
+
+    directory = b''.join(entry.central_header() for entry in entries)
+    yield directory
+    yield _end_of_directory(len(entries), offset, len(directory))
+
+
+def _end_of_directory(count, offset, size):
+    records = b''
+    if (count > _ZIP_FILECOUNT_LIMIT or offset > _ZIP64_LIMIT or
+            size > _ZIP64_LIMIT):
+        records = struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                              count, count, size, offset)
+        records += struct.pack('<IIQI', 0x07064b50, 0, offset + size, 1)
+        count = min(count, _ZIP_FILECOUNT_LIMIT)
+        offset = min(offset, 0xffffffff)
+        size = min(size, 0xffffffff)
+    return records + struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count,
+                                 count, size, offset, 0)
+
+
+class CsarStream(object):
+    """The CSAR of a package directory, built while it is read.
+
+    It can be passed as the body of an upload request. Each iteration
+    builds the archive from the start, so a retried request sends it
+    whole again.
+    """
+
+    def __init__(self, root, **kwargs):
+        validate(root)
+        self.root = root
+        self.name = root
+        self.kwargs = kwargs
+        self._iter = None
+        self._buffer = b''
+
+    def __iter__(self):
+        return iter_csar(self.root, **self.kwargs)
+
+    def read(self, size=-1):
+        if self._iter is None:
+            self._iter = iter(self)
+        while size < 0 or len(self._buffer) < size:
+            data = next(self._iter, None)
+            if data is None:
+                break
+            self._buffer += data
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        if self._iter is not None:
+            self._iter.close()
+            self._iter = None
+
+
+def build(root, path, **kwargs):
+    """Write the CSAR of a package directory to a file.
+
+    :param kwargs: the options of iter_csar
+    """
+    with open(path, 'wb') as f:
+        for data in iter_csar(root, **kwargs):
+            f.write(data)
+
+
+def _read_manifest(data, path):
+    """Return the files declared by a manifest, with their hash if any.
+
+    :returns: a list of dicts with Source, and Algorithm and Hash keys
+      when they are given
+    """
+    files = []
+    for line in data.decode('utf-8', 'replace').splitlines():
+        line = line.strip()
+        if line.startswith('-----BEGIN'):
+            # The signature of the manifest
+            break
+        key, sep, value = line.partition(':')
+        key = key.strip().lower()
+        if key == 'source':
+            files.append({'Source': value.strip()})
+        elif key in ('algorithm', 'hash') and files:
+            files[-1][key.capitalize()] = value.strip()
+    return files
+
+
+def _hash_entry(archive, name, algorithm, chunk_size):
+    digest = hashlib.new(algorithm)
+    with archive.open(name) as f:
+        for data in iter(lambda: f.read(chunk_size), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _hash_algorithm(algorithm, path):
+    name = algorithm.lower().replace('-', '')
+    if name not in hashlib.algorithms_available:
+        raise exceptions.InvalidInput(
+            reason=_('Unsupported hash algorithm %(algorithm)s in '
+                     '%(path)s') % {'algorithm': algorithm, 'path': path})
+    return name
+
+
+def validate_archive(path, verify_hashes=True, max_workers=None,
+                     chunk_size=CHUNK_SIZE):
+    """Check a CSAR file before it is uploaded.
+
+    Only the central directory of the archive, TOSCA.meta and the
+    manifest are read to check the layout of the package, so that a
+    broken package is found in a fraction of a second whatever its size.
+    The entries whose hash is declared by TOSCA.meta or the manifest are
+    then decompressed and hashed concurrently, largest first.
+
+    :param path: path of the CSAR file
+    :param verify_hashes: check the declared hashes of the entries
+    :param max_workers: number of threads hashing entries, the number of
+      CPUs by default
+    :returns: the TOSCA-Meta keys, as a dict
+    :raises InvalidInput: if the package is invalid
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        raise exceptions.InvalidInput(
+            reason=_('%(path)s is not a valid CSAR file: %(error)s') % {
+                'path': path, 'error': e})
+    with archive:
+        infos = dict((info.filename, info) for info in archive.infolist()
+                     if not info.is_dir())
+        meta, blocks, manifest = _check_archive_metadata(path, archive,
+                                                         infos)
+        declared = [{'Source': _get(block, 'Source') or _get(block, 'Name'),
+                     'Algorithm': _get(block, 'Algorithm'),
+                     'Hash': _get(block, 'Hash')}
+                    for block in blocks[1:]]
+        if manifest:
+            manifest_files = _read_manifest(archive.read(manifest),
+                                            manifest)
+            for entry in manifest_files:
+                name = entry['Source']
+                if not parse.urlparse(name).scheme and name not in infos:
+                    raise exceptions.InvalidInput(
+                        reason=_('%(name)s, a Source of %(manifest)s, is '
+                                 'not found in %(path)s') % {
+                            'name': name, 'manifest': manifest,
+                            'path': path})
+            declared.extend(manifest_files)
+        if verify_hashes:
+            _verify_hashes(path, archive, infos, declared, max_workers,
+                           chunk_size)
+    return meta
+
+
+def _check_archive_metadata(path, archive, infos):
+    if TOSCA_META not in infos:
+        nested = [name for name in infos
+                  if name.endswith('/' + TOSCA_META)]
+        if nested:
+            raise exceptions.InvalidInput(
+                reason=_('%(meta)s of %(path)s is in %(dir)s, the package '
+                         'directory itself must not be archived') % {
+                    'meta': TOSCA_META, 'path': path,
+                    'dir': nested[0][:-len(TOSCA_META) - 1]})
+        # Without TOSCA-Metadata, the only YAML file at the root of the
+        # archive is the entry definitions
+        definitions = [name for name in infos if '/' not in name and
+                       name.lower().endswith(('.yaml', '.yml'))]
+        if len(definitions) != 1:
+            raise exceptions.InvalidInput(
+                reason=_('%(path)s has neither %(meta)s nor a single YAML '
+                         'file at its root') % {
+                    'path': path, 'meta': TOSCA_META})
+        entry = definitions[0]
+        meta = {'Entry-Definitions': entry}
+        manifest = os.path.splitext(entry)[0] + '.mf'
+        return meta, [meta], manifest if manifest in infos else None
+    try:
+        lines = archive.read(TOSCA_META).decode('utf-8').splitlines()
+    except (UnicodeDecodeError, zipfile.BadZipFile, zlib.error) as e:
+        raise exceptions.InvalidInput(
+            reason=_('%(meta)s of %(path)s is unreadable: %(error)s') % {
+                'meta': TOSCA_META, 'path': path, 'error': e})
+    blocks = _parse_metadata(lines, TOSCA_META)
+    meta = _check_metadata(blocks, path, lambda name: name in infos)
+    return meta, blocks, _get(meta, 'ETSI-Entry-Manifest')
+
+
+def _verify_hashes(path, archive, infos, declared, max_workers, chunk_size):
+    hashes = {}
+    for entry in declared:
+        name = entry.get('Source')
+        if (not name or not entry.get('Hash') or
+                parse.urlparse(name).scheme):
+            continue
+        if not entry.get('Algorithm'):
+            raise exceptions.InvalidInput(
+                reason=_('The hash of %(name)s in %(path)s has no '
+                         'algorithm') % {'name': name, 'path': path})
+        algorithm = _hash_algorithm(entry['Algorithm'], path)
+        hashes[(name, algorithm)] = (entry['Algorithm'],
+                                     entry['Hash'].lower())
+    # The largest entries are started first to balance the workers
+    keys = sorted(hashes, key=lambda key: -infos[key[0]].file_size)
+    errors = []
+    max_workers = max_workers or os.cpu_count() or 1
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # zipfile reads the members of an archive opened once under a
+        # lock, zlib and hashlib release the GIL for the rest
+        digests = [executor.submit(_hash_entry, archive, name, algorithm,
+                                   chunk_size)
+                   for name, algorithm in keys]
+        for (name, algorithm), digest in zip(keys, digests):
+            try:
+                digest = digest.result()
+            except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+                errors.append(_('%(name)s is corrupted: %(error)s') % {
+                    'name': name, 'error': e})
+                continue
+            declared_algorithm, expected = hashes[(name, algorithm)]
+            if digest != expected:
+                errors.append(_('%(name)s does not match its '
+                                '%(algorithm)s hash') % {
+                    'name': name, 'algorithm': declared_algorithm})
+    if errors:
+        raise exceptions.InvalidInput(
+            reason=_('Invalid CSAR file %(path)s: %(errors)s') % {
+                'path': path, 'errors': '; '.join(sorted(errors))})
@@ -161,6 +161,16 @@ class UnsupportedCommandVersion(TackerClientException):
     message = _("This command is not supported in version %(version)s")
 
 
+class LcmOperationFailed(TackerClientException):
+    message = _("%(operation)s operation %(op_occ)s of VNF instance "
+                "%(vnf_instance)s is %(state)s")
+
+
+class LcmOperationTimeout(TackerClientException):
+    message = _("%(operation)s operation of VNF instance %(vnf_instance)s "
+                "did not complete within %(timeout)s seconds")
+
+
 # Command line exceptions
 
 class TackerCLIError(TackerException):
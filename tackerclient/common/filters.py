@@ -0,0 +1,314 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Attribute-based filtering expressions of ETSI GS NFV-SOL 013.
+
+A filter is a list of simple expressions joined by ';', all of which
+must match::
+
+    (eq,vnfdId,abc);(in,instantiationState,INSTANTIATED,NOT_INSTANTIATED)
+    (cont,vnfInstanceName,'web,db');(gte,metadata/replicas,3)
+
+Values containing ',', ')' or "'" are enclosed in single quotes, and
+quotes inside quoted values are doubled. Attribute paths are separated
+by '/'. When an attribute along the path is an array, the expression
+matches if any of its elements matches.
+
+parse() validates an expression and returns a Filter, which is a
+predicate on records that can be evaluated without the Tacker API.
+"""
+
+import collections
+
+from tackerclient.common import exceptions
+from tackerclient.i18n import _
+
+# Operators taking exactly one value
+SINGLE_VALUE_OPERATORS = ('eq', 'neq', 'gt', 'gte', 'lt', 'lte')
+# Operators taking one or more values
+MULTI_VALUE_OPERATORS = ('in', 'nin', 'cont', 'ncont')
+OPERATORS = SINGLE_VALUE_OPERATORS + MULTI_VALUE_OPERATORS
+
+# Comparison operators and their Python counterparts
+_COMPARISONS = {'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+# Negative operators match the records their positive one does not match
+_NEGATIONS = {'neq': 'eq', 'nin': 'in', 'ncont': 'cont'}
+
+Expression = collections.namedtuple('Expression', ['op', 'path', 'values'])
+
+
+def quote_value(value):
+    """Return value quoted for use in a filter expression if needed."""
+    if value and not any(c in value for c in ",)'"):
+        return value
+    return "'%s'" % value.replace("'", "''")
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _make_matcher(op, values):
+    """Return a function telling whether a scalar matches op and values."""
+    if op in ('eq', 'in'):
+        strings = frozenset(values)
+        numbers = frozenset(n for n in map(_to_number, values)
+                            if n is not None)
+        booleans = frozenset(v == 'true' for v in values
+                             if v in ('true', 'false'))
+
+        def match(value):
+            kind = type(value)
+            if kind is str:
+                return value in strings
+            if kind is bool:
+                return value in booleans
+            if kind is int or kind is float:
+                return value in numbers
+            return False
+    elif op == 'cont':
+        def match(value):
+            return (type(value) is str and
+                    any(v in value for v in values))
+    else:
+        string = values[0]
+        number = _to_number(string)
+        compare = {'gt': lambda a, b: a > b,
+                   'gte': lambda a, b: a >= b,
+                   'lt': lambda a, b: a < b,
+                   'lte': lambda a, b: a <= b}[op]
+
+        def match(value):
+            kind = type(value)
+            if kind is str:
+                return compare(value, string)
+            if (kind is int or kind is float) and number is not None:
+                return compare(value, number)
+            return False
+    return match
+
+
+def _resolve(value, path, start=0):
+    """Return the value at path, a list if an array was traversed."""
+    for i in range(start, len(path)):
+        if type(value) is dict:
+            value = value.get(path[i])
+        elif type(value) is list:
+            found = []
+            for item in value:
+                item = _resolve(item, path, i)
+                if type(item) is list:
+                    found.extend(item)
+                else:
+                    found.append(item)
+            return found
+        else:
+            return None
+    return value
+
+
+def _string_test(op, index, values):
+    """Return the source of the test of op on a string value."""
+    if op in ('eq', 'in'):
+        return 'value in strings_%d' % index
+    if op == 'cont':
+        if len(values) == 1:
+            return 'substring_%d in value' % index
+        return 'any(s in value for s in substrings_%d)' % index
+    return 'value %s bound_%d' % (_COMPARISONS[op], index)
+
+
+def _number_test(op, index, values):
+    """Return the source of the test of op on an int value."""
+    if op in ('eq', 'in'):
+        return 'value in numbers_%d' % index
+    if op == 'cont' or _to_number(values[0]) is None:
+        return 'False'
+    return 'value %s number_%d' % (_COMPARISONS[op], index)
+
+
+def _getter_lines(path, index, depth=1, indent='    '):
+    """Return the source lines setting value to the value at path."""
+    if depth == 1:
+        lines = [indent + 'value = record.get(name_%d_0)' % index]
+    else:
+        lines = []
+    if depth == len(path):
+        return lines
+    lines.append(indent + 'if type(value) is dict:')
+    lines.append(indent + '    value = value.get(name_%d_%d)' % (index, depth))
+    lines.extend(_getter_lines(path, index, depth + 1, indent + '    '))
+    lines.append(indent + 'else:')
+    lines.append(indent + '    value = resolve(value, path_%d, %d)' % (
+        index, depth))
+    return lines
+
+
+def _compile(expressions):
+    """Return a function evaluating all expressions on a record.
+
+    The function is generated so that evaluating a filter costs a single
+    Python call in the common case of string and integer attributes.
+    Other values, arrays and missing attributes are handled by a generic
+    matcher.
+    """
+    namespace = {'resolve': _resolve}
+    lines = ['def match(record):']
+    for index, (op, path, values) in enumerate(expressions):
+        positive = _NEGATIONS.get(op, op)
+        match = _make_matcher(positive, values)
+
+        def match_any(value, match=match):
+            if type(value) is list:
+                return any(match(item) for item in value)
+            return match(value)
+
+        namespace.update({
+            'path_%d' % index: path,
+            'strings_%d' % index: frozenset(values),
+            'substring_%d' % index: values[0],
+            'substrings_%d' % index: values,
+            'bound_%d' % index: values[0],
+            'numbers_%d' % index: frozenset(
+                n for n in map(_to_number, values) if n is not None),
+            'number_%d' % index: _to_number(values[0]),
+            'match_%d' % index: match_any,
+        })
+        for depth, name in enumerate(path):
+            namespace['name_%d_%d' % (index, depth)] = name
+        lines.extend(_getter_lines(path, index))
+        lines.append('    if type(value) is str:')
+        lines.append('        matched = %s' % _string_test(
+            positive, index, values))
+        lines.append('    elif type(value) is int:')
+        lines.append('        matched = %s' % _number_test(
+            positive, index, values))
+        lines.append('    else:')
+        lines.append('        matched = match_%d(value)' % index)
+        lines.append('    if %smatched:' % ('' if op in _NEGATIONS
+                                            else 'not '))
+        lines.append('        return False')
+    lines.append('    return True')
+    exec(compile('\n'.join(lines), '<filter>', 'exec'), namespace)
+    return namespace['match']
+
+
+class Filter(object):
+    """Compiled attribute-based filter.
+
+    A Filter is called with a record, a dict as returned by the Tacker
+    API, and returns whether the record matches all its expressions.
+    """
+
+    def __init__(self, expressions):
+        self.expressions = tuple(expressions)
+        self._match = _compile(self.expressions)
+
+    def __call__(self, record):
+        return self._match(record)
+
+    def __str__(self):
+        return ';'.join(
+            '(%s,%s,%s)' % (e.op, '/'.join(e.path),
+                            ','.join(quote_value(v) for v in e.values))
+            for e in self.expressions)
+
+    def __repr__(self):
+        return '<Filter %s>' % self
+
+    def select(self, records):
+        """Return the records matching the filter."""
+        return [record for record in records if self._match(record)]
+
+
+def _parse_error(expr, pos, reason):
+    msg = _("Invalid filter %(expr)s at position %(pos)d: %(reason)s")
+    return exceptions.InvalidInput(
+        reason=msg % {'expr': expr, 'pos': pos, 'reason': reason})
+
+
+def _parse_value(expr, pos):
+    """Return a tuple of (value, next position)."""
+    if expr.startswith("'", pos):
+        chars = []
+        pos += 1
+        while True:
+            end = expr.find("'", pos)
+            if end < 0:
+                raise _parse_error(expr, pos, _("unterminated quote"))
+            chars.append(expr[pos:end])
+            if not expr.startswith("'", end + 1):
+                return ''.join(chars), end + 1
+            chars.append("'")
+            pos = end + 2
+    end = pos
+    while end < len(expr) and expr[end] not in ",)'":
+        end += 1
+    if end == pos:
+        raise _parse_error(expr, pos, _("missing value"))
+    return expr[pos:end], end
+
+
+def _parse_expression(expr, pos):
+    """Return a tuple of (Expression, next position)."""
+    if not expr.startswith('(', pos):
+        raise _parse_error(expr, pos, _("expected '('"))
+    pos += 1
+    comma = expr.find(',', pos)
+    if comma < 0:
+        raise _parse_error(expr, pos, _("expected an operator"))
+    op = expr[pos:comma]
+    if op not in OPERATORS:
+        raise _parse_error(
+            expr, pos, _("unknown operator '%(op)s', expected one of "
+                         "%(ops)s") % {'op': op, 'ops': ', '.join(OPERATORS)})
+    pos = comma + 1
+    end = pos
+    while end < len(expr) and expr[end] not in ',()\';':
+        end += 1
+    path = tuple(expr[pos:end].split('/'))
+    if not all(path):
+        raise _parse_error(expr, pos, _("invalid attribute name"))
+    if not expr.startswith(',', end):
+        raise _parse_error(expr, end, _("expected ',' and a value"))
+    pos = end
+    values = []
+    while expr.startswith(',', pos):
+        value, pos = _parse_value(expr, pos + 1)
+        values.append(value)
+    if not expr.startswith(')', pos):
+        raise _parse_error(expr, pos, _("expected ')'"))
+    if op in SINGLE_VALUE_OPERATORS and len(values) != 1:
+        raise _parse_error(
+            expr, pos, _("operator '%s' takes a single value") % op)
+    return Expression(op, path, tuple(values)), pos + 1
+
+
+def parse(expr):
+    """Parse a filter expression into a Filter.
+
+    :raises InvalidInput: if expr is not a valid filter
+    """
+    expressions = []
+    pos = 0
+    while True:
+        expression, pos = _parse_expression(expr, pos)
+        expressions.append(expression)
+        if pos == len(expr):
+            return Filter(expressions)
+        if not expr.startswith(';', pos):
+            raise _parse_error(expr, pos, _("expected ';'"))
+        pos += 1
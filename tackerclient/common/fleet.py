@@ -0,0 +1,483 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Batch creation and instantiation of VNF instances from a manifest.
+
+A YAML (or JSON) manifest lists the VNF instances under ``vnfs``. The
+``defaults`` are merged into every entry, nested mappings key by key::
+
+    defaults:
+      vnfdId: b1bb0ce7-ebca-4fa7-95ed-4840d70a1177
+      instantiate:
+        flavourId: simple
+        vimConnectionInfo: [...]
+    vnfs:
+      - name: db-1
+      - name: web-1
+        dependsOn: [db-1]
+        instantiate:
+          additionalParams: {lcm-operation-user-data: ./web.py}
+
+A CSV manifest has one row per VNF instance with name, vnfdId,
+description and dependsOn (names separated with ";") columns. The
+instantiate request is read from the file of an instantiateFile column
+and its attributes are overridden with ``instantiate.<attr>[.<attr>...]``
+columns, whose values are parsed as JSON when possible. Base instantiate
+parameters can be given to load_manifest() for both formats.
+
+Each VNF instance is created, instantiated and waited for. A VNF
+instance is only created once the VNF instances it depends on are
+instantiated. The steps can be recorded into a journal, from which an
+interrupted run is resumed.
+"""
+
+import copy
+import csv
+import datetime
+import json
+import os
+import time
+
+import yaml
+
+from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.common import scheduler
+from tackerclient.common import utils
+from tackerclient.i18n import _
+
+DEFAULT_PARALLEL = utils.DEFAULT_PARALLEL
+# Seconds to wait for an instantiation to complete
+DEFAULT_TIMEOUT = utils.env_int('TACKERCLIENT_FLEET_TIMEOUT', default=1800)
+# Seconds between two checks of an operation occurrence
+POLL_INTERVAL = 5
+
+BATCH_CREATE = 'batch-create'
+
+CREATE = 'create'
+INSTANTIATE = 'instantiate'
+WAIT = 'wait'
+
+_KEYS = ('name', 'vnfdId', 'description', 'dependsOn', 'instantiate')
+_FAILED_STATES = ('FAILED_TEMP', 'FAILED', 'ROLLED_BACK')
+
+
+def merge(base, override):
+    """Return base with the values of override, merging nested dicts."""
+    if not isinstance(base, dict) or not isinstance(override, dict):
+        return copy.deepcopy(override)
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        merged[key] = merge(merged.get(key), value)
+    return merged
+
+
+def _load_file(path):
+    try:
+        with open(path) as f:
+            return yaml.load(f, Loader=yaml.SafeLoader)
+    except (IOError, yaml.YAMLError) as e:
+        raise exceptions.InvalidInput(
+            reason=_('Failed to load %(path)s: %(e)s') % {'path': path,
+                                                          'e': e})
+
+
+def _parse_cell(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _load_csv(path):
+    try:
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+    except (IOError, csv.Error) as e:
+        raise exceptions.InvalidInput(
+            reason=_('Failed to load %(path)s: %(e)s') % {'path': path,
+                                                          'e': e})
+    vnfs = []
+    for row in rows:
+        vnf = {}
+        instantiate = {}
+        for column, value in row.items():
+            if column is None or not value:
+                continue
+            if column == 'instantiateFile':
+                instantiate = merge(_load_file(os.path.join(
+                    os.path.dirname(path), value)), instantiate)
+            elif column == 'dependsOn':
+                vnf['dependsOn'] = value.replace(';', ' ').split()
+            elif column.startswith('instantiate.'):
+                attrs = column.split('.')[1:]
+                override = _parse_cell(value)
+                for attr in reversed(attrs):
+                    override = {attr: override}
+                instantiate = merge(instantiate, override)
+            else:
+                vnf[column] = value
+        if instantiate:
+            vnf['instantiate'] = instantiate
+        vnfs.append(vnf)
+    return vnfs
+
+
+def load_manifest(path, base_params=None):
+    """Return the VNF instances listed in a manifest file.
+
+    :param path: path of a YAML, JSON or CSV (.csv) manifest
+    :param base_params: instantiate request parameters overridden by the
+      manifest
+    :returns: a list of dicts with name, vnfdId, description, dependsOn
+      and instantiate keys
+    :raises InvalidInput: if the manifest cannot be loaded or is invalid
+    """
+    if path.lower().endswith('.csv'):
+        defaults, entries = {}, _load_csv(path)
+    else:
+        manifest = _load_file(path)
+        if isinstance(manifest, list):
+            manifest = {'vnfs': manifest}
+        if (not isinstance(manifest, dict) or
+                not isinstance(manifest.get('vnfs'), list)):
+            raise exceptions.InvalidInput(
+                reason=_('%s does not have a list of vnfs') % path)
+        defaults = manifest.get('defaults') or {}
+        entries = manifest['vnfs']
+    if base_params:
+        defaults = merge({'instantiate': base_params}, defaults)
+
+    vnfs = []
+    names = set()
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise exceptions.InvalidInput(
+                reason=_('Entry %(i)d of %(path)s is not a mapping') %
+                {'i': i, 'path': path})
+        vnf = merge(defaults, entry)
+        unknown = set(vnf) - set(_KEYS)
+        if unknown:
+            raise exceptions.InvalidInput(
+                reason=_('Unknown attributes %(attrs)s in entry %(i)d') %
+                {'attrs': ', '.join(sorted(unknown)), 'i': i})
+        for key in ('name', 'vnfdId'):
+            if not vnf.get(key):
+                raise exceptions.InvalidInput(
+                    reason=_('Entry %(i)d has no %(key)s') % {'i': i,
+                                                              'key': key})
+        if vnf['name'] in names:
+            raise exceptions.InvalidInput(
+                reason=_('Duplicate VNF instance name %s') % vnf['name'])
+        names.add(vnf['name'])
+        vnf.setdefault('description', None)
+        vnf.setdefault('instantiate', None)
+        if isinstance(vnf.get('dependsOn'), str):
+            vnf['dependsOn'] = [vnf['dependsOn']]
+        vnf['dependsOn'] = list(vnf.get('dependsOn') or [])
+        vnfs.append(vnf)
+
+    for vnf in vnfs:
+        for dep in vnf['dependsOn']:
+            if dep not in names:
+                raise exceptions.InvalidInput(
+                    reason=_('%(name)s depends on unknown VNF instance '
+                             '%(dep)s') % {'name': vnf['name'], 'dep': dep})
+    if not vnfs:
+        raise exceptions.EmptyInput(reason=_('%s lists no VNF instance') %
+                                    path)
+    return vnfs
+
+
+def select_vnf_instances(client, filter_expr):
+    """Return the IDs of the instantiated VNF instances matching a filter."""
+    filters.parse(filter_expr)
+    vnf_instances = client.list_vnf_instances(
+        filter='(eq,instantiationState,INSTANTIATED);' + filter_expr)
+    return [vnf_instance['id'] for vnf_instance in vnf_instances]
+
+
+def find_operation(client, vnf_instance_id, operation):
+    """Return the latest operation occurrence of a VNF instance, or None."""
+    filter_expr = '(eq,vnfInstanceId,%s);(eq,operation,%s)' % (
+        filters.quote_value(vnf_instance_id), operation)
+    op_occs = client.list_vnf_lcm_op_occs(filter=filter_expr)
+    if not op_occs:
+        return None
+    return max(op_occs, key=lambda o: o.get('startTime') or '')
+
+
+def wait_for_operation(client, vnf_instance_id, operation,
+                       timeout=DEFAULT_TIMEOUT, poll_interval=POLL_INTERVAL,
+                       op_occ_id=None, on_state=None,
+                       final_state='COMPLETED', changed_since=None):
+    """Wait for an operation occurrence of a VNF instance to complete.
+
+    :param op_occ_id: ID of the operation occurrence, the latest one of
+      the operation is waited for if not given
+    :param on_state: callable called with the operation occurrence
+      whenever its operationState changes
+    :param final_state: operationState to wait for, ROLLED_BACK to wait
+      for a rollback
+    :param changed_since: stateEnteredTime of the operation occurrence when
+      the request was sent. Its state is ignored until it changes.
+    :returns: the completed operation occurrence
+    :raises LcmOperationFailed: if the operation failed or was rolled back
+    :raises LcmOperationTimeout: if the operation did not complete in time
+    """
+    deadline = time.time() + timeout
+    last_state = None
+    # The state of the operation is changed by the server
+    client = client.fork(fresh=True)
+    while True:
+        if op_occ_id:
+            op_occ = client.show_vnf_lcm_op_occs(op_occ_id)
+        else:
+            op_occ = find_operation(client, vnf_instance_id, operation)
+        if op_occ and (changed_since is None or
+                       op_occ.get('stateEnteredTime') != changed_since):
+            state = op_occ['operationState']
+            if state != last_state and on_state is not None:
+                on_state(op_occ)
+            last_state = state
+            if state == final_state:
+                return op_occ
+            if state in _FAILED_STATES or state == 'COMPLETED':
+                raise exceptions.LcmOperationFailed(
+                    operation=operation, op_occ=op_occ['id'],
+                    vnf_instance=vnf_instance_id, state=state)
+        if time.time() > deadline:
+            raise exceptions.LcmOperationTimeout(
+                operation=operation, vnf_instance=vnf_instance_id,
+                timeout=timeout)
+        time.sleep(poll_interval)
+
+
+def journal_vnfs(jrnl):
+    """Return the VNF instances of the batch creation of a journal.
+
+    :raises InvalidInput: if the journal is not one of a batch creation
+    """
+    if not jrnl.header or jrnl.header.get('kind') != BATCH_CREATE:
+        raise exceptions.InvalidInput(
+            reason=_('%s is not the journal of a batch creation') %
+            jrnl.path)
+    return jrnl.header['items']
+
+
+def _create_body(vnf):
+    body = {'vnfdId': vnf['vnfdId'], 'vnfInstanceName': vnf['name']}
+    if vnf['description']:
+        body['vnfInstanceDescription'] = vnf['description']
+    return body
+
+
+def _timestamp(seconds):
+    if seconds is None:
+        return None
+    return datetime.datetime.fromtimestamp(
+        seconds, tz=datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _vnf_report(vnf, state, tasks):
+    report = {'name': vnf['name'],
+              'vnfdId': vnf['vnfdId'],
+              'vnfInstanceId': state.get('vnfInstanceId'),
+              'vnfLcmOpOccId': state.get('vnfLcmOpOccId'),
+              'status': scheduler.SUCCEEDED,
+              'failedStep': None,
+              'error': None,
+              'steps': {}}
+    for step, task in tasks:
+        report['steps'][step] = {'status': task.status,
+                                 'startedAt': _timestamp(task.started_at),
+                                 'finishedAt': _timestamp(task.finished_at)}
+        if report['status'] != scheduler.SUCCEEDED:
+            continue
+        if task.status == scheduler.FAILED:
+            report['status'] = scheduler.FAILED
+            report['failedStep'] = step
+            report['error'] = str(task.error)
+        elif task.status == scheduler.SKIPPED:
+            report['status'] = scheduler.SKIPPED
+    return report
+
+
+class _Step(object):
+    """A step of a VNF instance, recorded into the journal if any.
+
+    run() returns the attributes to record and keep in the state of the
+    VNF instance. When resuming, a step which succeeded is not run again
+    and recover() looks for the outcome of a step which was started, so
+    that requests accepted before a crash are not sent twice.
+    """
+
+    def __init__(self, client, jrnl, vnf, state):
+        self.client = client
+        self.journal = jrnl
+        self.vnf = vnf
+        self.state = state
+
+    def run(self):
+        raise NotImplementedError()
+
+    def recover(self):
+        return None
+
+    def _record(self, status, **attrs):
+        if self.journal is not None:
+            self.journal.record(item=self.vnf['name'], step=self.name,
+                                status=status, **attrs)
+
+    def __call__(self):
+        status = None
+        if self.journal is not None:
+            status = self.journal.step_status(self.vnf['name'], self.name)
+        if status == scheduler.SUCCEEDED:
+            return
+        attrs = self.recover() if status is not None else None
+        if attrs is None:
+            self._record(scheduler.RUNNING)
+            try:
+                attrs = self.run()
+            except Exception as e:
+                self._record(scheduler.FAILED, error=str(e))
+                raise
+        self.state.update(attrs)
+        self._record(scheduler.SUCCEEDED, **attrs)
+
+
+class _Create(_Step):
+    name = CREATE
+
+    def run(self):
+        vnf_instance = self.client.fork().create_vnf_instance(
+            _create_body(self.vnf))
+        return {'vnfInstanceId': vnf_instance['id']}
+
+    def recover(self):
+        filter_expr = '(eq,vnfInstanceName,%s);(eq,vnfdId,%s)' % (
+            filters.quote_value(self.vnf['name']),
+            filters.quote_value(self.vnf['vnfdId']))
+        vnf_instances = self.client.fork().list_vnf_instances(
+            filter=filter_expr)
+        if not vnf_instances:
+            return None
+        return {'vnfInstanceId': vnf_instances[0]['id']}
+
+
+class _Instantiate(_Step):
+    name = INSTANTIATE
+
+    def run(self):
+        client = self.client.fork()
+        client.instantiate_vnf_instance(self.state['vnfInstanceId'],
+                                        self.vnf['instantiate'])
+        return {'vnfLcmOpOccId': client.last_vnf_lcm_op_occ_id}
+
+    def recover(self):
+        if self.state.get('vnfLcmOpOccId'):
+            return {'vnfLcmOpOccId': self.state['vnfLcmOpOccId']}
+        op_occ = find_operation(self.client.fork(),
+                                self.state['vnfInstanceId'], 'INSTANTIATE')
+        if op_occ is None:
+            return None
+        return {'vnfLcmOpOccId': op_occ['id']}
+
+
+class _Wait(_Step):
+    name = WAIT
+
+    def __init__(self, client, jrnl, vnf, state, timeout, poll_interval):
+        super(_Wait, self).__init__(client, jrnl, vnf, state)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def run(self):
+        op_occ = wait_for_operation(
+            self.client.fork(), self.state['vnfInstanceId'], 'INSTANTIATE',
+            timeout=self.timeout, poll_interval=self.poll_interval,
+            op_occ_id=self.state.get('vnfLcmOpOccId'),
+            on_state=lambda op_occ: self._record(
+                scheduler.RUNNING,
+                operationState=op_occ['operationState']))
+        return {'vnfLcmOpOccId': op_occ['id'],
+                'operationState': op_occ['operationState']}
+
+
+def deploy(client, vnfs, max_workers=DEFAULT_PARALLEL,
+           timeout=DEFAULT_TIMEOUT, poll_interval=POLL_INTERVAL,
+           progress=None, journal=None):
+    """Create and instantiate VNF instances.
+
+    VNF instances without instantiate parameters are only created.
+
+    :param client: a tackerclient.v1_0.client.Client, forked for each step
+    :param vnfs: VNF instances as returned by load_manifest()
+    :param max_workers: maximum number of steps run concurrently. Waiting
+      for an instantiation occupies a worker.
+    :param timeout: seconds to wait for each instantiation
+    :param poll_interval: seconds between two checks of an instantiation
+    :param progress: callable called with the VNF instance name, the step
+      and its status whenever the status of a step changes
+    :param journal: a tackerclient.common.journal.Journal recording the
+      steps. The steps which succeeded in a journal of an interrupted
+      run are not run again, see journal_vnfs() to resume it.
+    :returns: the report of the run, a dict with summary and vnfs keys
+    """
+    if journal is not None and journal.header is None:
+        journal.record(kind=BATCH_CREATE, items=vnfs)
+
+    def on_status(task):
+        name, step = task.name.rsplit('/', 1)
+        progress(name, step, task.status)
+
+    sched = scheduler.Scheduler(max_workers,
+                                progress=on_status if progress else None)
+    states = {}
+    last_steps = dict((vnf['name'], WAIT if vnf['instantiate'] else CREATE)
+                      for vnf in vnfs)
+    all_tasks = []
+    for vnf in vnfs:
+        name = vnf['name']
+        state = states[name] = {}
+        if journal is not None and name in journal.items:
+            for key in ('vnfInstanceId', 'vnfLcmOpOccId'):
+                if journal.items[name].get(key):
+                    state[key] = journal.items[name][key]
+        steps = [_Create(client, journal, vnf, state)]
+        if vnf['instantiate']:
+            steps += [_Instantiate(client, journal, vnf, state),
+                      _Wait(client, journal, vnf, state, timeout,
+                            poll_interval)]
+        depends_on = ['%s/%s' % (dep, last_steps[dep])
+                      for dep in vnf['dependsOn']]
+        tasks = []
+        for step in steps:
+            task = sched.add('%s/%s' % (name, step.name), step,
+                             depends_on=depends_on)
+            tasks.append((step.name, task))
+            depends_on = [task.name]
+        all_tasks.append(tasks)
+
+    started_at = time.time()
+    sched.run()
+    reports = [_vnf_report(vnf, states[vnf['name']], tasks)
+               for vnf, tasks in zip(vnfs, all_tasks)]
+    summary = dict((status, 0) for status in (
+        scheduler.SUCCEEDED, scheduler.FAILED, scheduler.SKIPPED))
+    for report in reports:
+        summary[report['status']] += 1
+    return {'startedAt': _timestamp(started_at),
+            'finishedAt': _timestamp(time.time()),
+            'summary': summary,
+            'vnfs': reports}
@@ -0,0 +1,314 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Local SQLite mirror of VNF instances, VNF packages and LCM op-occs.
+
+The mirror answers list queries without going to the Tacker API. Each
+collection is synchronized when it is older than the requested maximum
+age:
+
+* VNF packages are listed again.
+* LCM operation occurrences are fetched incrementally, using the newest
+  stateEnteredTime seen so far as a cursor.
+* VNF instances touched by new operation occurrences are fetched again,
+  whichever collection is synchronized since both share the cursor.
+  The whole collection is listed again every FULL_SYNC_INTERVAL seconds
+  since creating or deleting an instance is not an LCM operation.
+
+LCCN notifications can also be applied with apply_notification().
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from tackerclient.common import cache
+from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.common import utils
+from tackerclient.i18n import _
+
+VNF_INSTANCES = 'vnf_instances'
+VNF_PACKAGES = 'vnf_packages'
+VNF_LCM_OP_OCCS = 'vnf_lcm_op_occs'
+KINDS = (VNF_INSTANCES, VNF_PACKAGES, VNF_LCM_OP_OCCS)
+
+# Default maximum age in seconds of the mirror when querying it
+DEFAULT_MAX_AGE = utils.env_int('TACKERCLIENT_INVENTORY_MAX_AGE',
+                                default=300)
+# Interval in seconds between full synchronizations of VNF instances
+FULL_SYNC_INTERVAL = utils.env_int('TACKERCLIENT_INVENTORY_FULL_SYNC',
+                                   default=3600)
+
+# Attributes copied into indexed columns
+_COLUMNS = {
+    'state': ('instantiationState', 'onboardingState', 'operationState'),
+    'vnfd_id': ('vnfdId',),
+    'vnf_provider': ('vnfProvider',),
+    'vnf_instance_id': ('vnfInstanceId',),
+    'state_entered_time': ('stateEnteredTime',),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT,
+    vnfd_id TEXT,
+    vnf_provider TEXT,
+    vnf_instance_id TEXT,
+    state_entered_time TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (scope, kind, id)
+);
+CREATE INDEX IF NOT EXISTS resources_state
+    ON resources (scope, kind, state);
+CREATE INDEX IF NOT EXISTS resources_vnfd_id
+    ON resources (scope, kind, vnfd_id);
+CREATE INDEX IF NOT EXISTS resources_vnf_instance_id
+    ON resources (scope, kind, vnf_instance_id);
+CREATE TABLE IF NOT EXISTS syncs (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    full_synced_at REAL NOT NULL,
+    cursor TEXT,
+    PRIMARY KEY (scope, kind)
+);
+"""
+
+
+def get_scope(client):
+    """Return the scope of the mirror for a v1_0 Client.
+
+    Resources of different endpoints, projects and VNF LCM API versions
+    are kept apart.
+    """
+    lcm_client = client.vnf_lcm_client
+    auth_info = lcm_client.get_auth_info()
+    return cache.make_key(auth_info['endpoint_url'],
+                          auth_info.get('auth_tenant_id'),
+                          lcm_client.vnf_instances_path)
+
+
+class Inventory(object):
+    """SQLite store of Tacker resources.
+
+    :param path: database file, inventory.sqlite in the cache directory
+      by default
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            directory = cache.get_cache_dir()
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            path = os.path.join(directory, 'inventory.sqlite')
+        if not os.path.exists(path):
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_sync(self, scope, kind):
+        return self._conn.execute(
+            'SELECT synced_at, full_synced_at, cursor FROM syncs '
+            'WHERE scope = ? AND kind = ?', (scope, kind)).fetchone()
+
+    def age(self, scope, kind):
+        """Return the seconds since kind was synchronized, or None."""
+        row = self._get_sync(scope, kind)
+        return time.time() - row[0] if row else None
+
+    @staticmethod
+    def _row(scope, kind, record):
+        row = [scope, kind, record['id']]
+        for names in _COLUMNS.values():
+            row.append(next((record[name] for name in names
+                             if isinstance(record.get(name), str)), None))
+        row.append(json.dumps(record))
+        return row
+
+    def _upsert(self, scope, kind, records):
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO resources (scope, kind, id, %s, data) '
+            'VALUES (?, ?, ?, %s?)' % (', '.join(_COLUMNS),
+                                       '?, ' * len(_COLUMNS)),
+            [self._row(scope, kind, record) for record in records])
+
+    def _delete(self, scope, kind, ids=None):
+        if ids is None:
+            self._conn.execute(
+                'DELETE FROM resources WHERE scope = ? AND kind = ?',
+                (scope, kind))
+        else:
+            self._conn.executemany(
+                'DELETE FROM resources WHERE scope = ? AND kind = ? AND '
+                'id = ?', [(scope, kind, id_) for id_ in ids])
+
+    def _set_sync(self, scope, kind, full, cursor=None):
+        now = time.time()
+        row = self._get_sync(scope, kind)
+        full_synced_at = now if full or row is None else row[1]
+        self._conn.execute(
+            'INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?, ?)',
+            (scope, kind, now, full_synced_at, cursor))
+
+    def sync(self, client, scope, kind, max_age=None, force=False):
+        """Synchronize kind unless it is younger than max_age seconds.
+
+        :returns: True if the API was queried
+        """
+        if max_age is None:
+            max_age = DEFAULT_MAX_AGE
+        age = self.age(scope, kind)
+        if not force and age is not None and age <= max_age:
+            return False
+        with self._conn:
+            if kind == VNF_PACKAGES:
+                records = client.list_vnf_packages(
+                    all_fields=None)['vnf_packages']
+                self._delete(scope, kind)
+                self._upsert(scope, kind, records)
+                self._set_sync(scope, kind, full=True)
+            elif kind == VNF_LCM_OP_OCCS:
+                self._sync_op_occs(client, scope)
+            elif kind == VNF_INSTANCES:
+                self._sync_instances(client, scope, force)
+            else:
+                raise exceptions.InvalidInput(
+                    reason=_('Unknown inventory collection %s') % kind)
+        return True
+
+    def _sync_op_occs(self, client, scope, refresh_instances=True):
+        """Fetch op-occs entered a state since the last sync.
+
+        The mirrored VNF instances touched by these op-occs are fetched
+        again unless refresh_instances is False: the cursor moves past
+        the op-occs, a later sync of the instances would not see them.
+
+        :returns: the op-occs fetched
+        """
+        row = self._get_sync(scope, VNF_LCM_OP_OCCS)
+        cursor = row[2] if row else None
+        params = {}
+        if cursor:
+            params['filter'] = '(gte,stateEnteredTime,%s)' % cursor
+        records = client.list_vnf_lcm_op_occs(**params)
+        self._upsert(scope, VNF_LCM_OP_OCCS, records)
+        times = [r['stateEnteredTime'] for r in records
+                 if r.get('stateEnteredTime')]
+        if cursor:
+            times.append(cursor)
+        self._set_sync(scope, VNF_LCM_OP_OCCS, full=not cursor,
+                       cursor=max(times) if times else None)
+        if refresh_instances and self._get_sync(scope, VNF_INSTANCES):
+            self._refresh_instances(client, scope, {
+                r['vnfInstanceId'] for r in records
+                if r.get('vnfInstanceId')})
+        return records
+
+    def _sync_instances(self, client, scope, force):
+        row = self._get_sync(scope, VNF_INSTANCES)
+        if (force or row is None or
+                time.time() - row[1] > FULL_SYNC_INTERVAL):
+            records = client.list_vnf_instances()
+            self._delete(scope, VNF_INSTANCES)
+            self._upsert(scope, VNF_INSTANCES, records)
+            if self._get_sync(scope, VNF_LCM_OP_OCCS) is None:
+                self._sync_op_occs(client, scope, refresh_instances=False)
+            self._set_sync(scope, VNF_INSTANCES, full=True)
+            return
+
+        self._sync_op_occs(client, scope)
+        self._set_sync(scope, VNF_INSTANCES, full=False)
+
+    def _refresh_instances(self, client, scope, vnf_instance_ids):
+        records, deleted = [], []
+        for vnf_instance_id in sorted(vnf_instance_ids):
+            try:
+                records.append(client.show_vnf_instance(vnf_instance_id))
+            except exceptions.TackerClientException as e:
+                if e.status_code != 404:
+                    raise
+                deleted.append(vnf_instance_id)
+        self._upsert(scope, VNF_INSTANCES, records)
+        self._delete(scope, VNF_INSTANCES, deleted)
+
+    def apply_notification(self, scope, notification):
+        """Apply a VNF LCM notification (LCCN) to the mirror."""
+        notification_type = notification.get('notificationType')
+        vnf_instance_id = notification.get('vnfInstanceId')
+        with self._conn:
+            if notification_type == 'VnfIdentifierDeletionNotification':
+                self._delete(scope, VNF_INSTANCES, [vnf_instance_id])
+            elif notification_type == 'VnfIdentifierCreationNotification':
+                if not self.get(scope, VNF_INSTANCES, vnf_instance_id):
+                    self._upsert(scope, VNF_INSTANCES, [
+                        {'id': vnf_instance_id,
+                         'instantiationState': 'NOT_INSTANTIATED'}])
+            elif notification_type == 'VnfLcmOperationOccurrenceNotification':
+                op_occ = self.get(scope, VNF_LCM_OP_OCCS,
+                                  notification['vnfLcmOpOccId']) or {}
+                op_occ.update({
+                    'id': notification['vnfLcmOpOccId'],
+                    'vnfInstanceId': vnf_instance_id,
+                    'operation': notification.get('operation'),
+                    'operationState': notification.get('operationState'),
+                    'stateEnteredTime': notification.get('timeStamp'),
+                    'isAutomaticInvocation': notification.get(
+                        'isAutomaticInvocation')})
+                self._upsert(scope, VNF_LCM_OP_OCCS, [op_occ])
+
+    def get(self, scope, kind, id_):
+        row = self._conn.execute(
+            'SELECT data FROM resources WHERE scope = ? AND kind = ? AND '
+            'id = ?', (scope, kind, id_)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, scope, kind, filter_expr=None, **columns):
+        """Return the records of kind matching filter_expr.
+
+        :param columns: values of the indexed columns (state, vnfd_id,
+          vnf_provider, vnf_instance_id) to select
+        """
+        sql = 'SELECT data FROM resources WHERE scope = ? AND kind = ?'
+        args = [scope, kind]
+        for name, value in sorted(columns.items()):
+            if name not in _COLUMNS:
+                raise exceptions.InvalidInput(
+                    reason=_('Unknown inventory column %s') % name)
+            sql += ' AND %s = ?' % name
+            args.append(value)
+        records = [json.loads(row[0])
+                   for row in self._conn.execute(sql + ' ORDER BY id', args)]
+        if filter_expr:
+            records = filters.parse(filter_expr).select(records)
+        return records
+
+
+def list_resources(client, kind, filter_expr=None, max_age=None):
+    """List kind from the mirror, synchronizing it if older than max_age."""
+    scope = get_scope(client)
+    with Inventory() as inventory:
+        inventory.sync(client, scope, kind, max_age=max_age)
+        return inventory.query(scope, kind, filter_expr)
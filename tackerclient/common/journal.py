@@ -0,0 +1,126 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Append-only journal of batch LCM runs.
+
+A journal is a file of JSON records, one per line. The first record
+describes the run, e.g. the VNF instances of a batch creation, and the
+next ones the steps of its items::
+
+    {"kind": "batch-create", "items": [...], "time": ...}
+    {"item": "vnf-1", "step": "create", "status": "RUNNING", "time": ...}
+    {"item": "vnf-1", "step": "create", "status": "SUCCEEDED",
+     "vnfInstanceId": "...", "time": ...}
+
+Each record is written with a single write() to a file opened in append
+mode and is synced to disk before record() returns, so a record is
+either fully in the journal or not at all. A partial record left by a
+crash during the write is dropped when the journal is opened again.
+"""
+
+import json
+import os
+import threading
+import time
+
+from tackerclient.common import exceptions
+from tackerclient.i18n import _
+
+
+class Journal(object):
+    """Journal of a batch run.
+
+    Opening a journal replays its records: the header is available as
+    ``header`` and the state of each item as ``items``, a dict mapping
+    item names to the attributes of their records merged in order, with
+    the status of their steps under ``steps``.
+
+    :param path: path of the journal file, created if it does not exist
+    :raises InvalidInput: if the journal cannot be read
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.items = {}
+        self._lock = threading.Lock()
+        created = not os.path.exists(path)
+        try:
+            self._fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT,
+                               0o600)
+        except OSError as e:
+            raise exceptions.InvalidInput(
+                reason=_('Failed to open journal %(path)s: %(e)s') %
+                {'path': path, 'e': e})
+        if created:
+            # Make the new directory entry durable as well
+            dir_fd = os.open(os.path.dirname(os.path.abspath(path)),
+                             os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        else:
+            self._replay()
+
+    def _replay(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            # Drop the partial record of an interrupted write
+            os.ftruncate(self._fd, end)
+            os.fsync(self._fd)
+        for lineno, line in enumerate(data[:end].splitlines(), 1):
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise exceptions.InvalidInput(
+                    reason=_('Invalid record at line %(lineno)d of journal '
+                             '%(path)s: %(e)s') %
+                    {'lineno': lineno, 'path': self.path, 'e': e})
+            self._apply(record)
+
+    def _apply(self, record):
+        name = record.get('item')
+        if name is None:
+            if self.header is None:
+                self.header = record
+            return
+        item = self.items.setdefault(name, {'steps': {}})
+        for key, value in record.items():
+            if key == 'step':
+                item['steps'][value] = record.get('status')
+            elif key not in ('item', 'status', 'time'):
+                item[key] = value
+
+    def record(self, **data):
+        """Append a record and wait until it is on disk."""
+        data['time'] = time.time()
+        line = (json.dumps(data, sort_keys=True) + '\n').encode('utf-8')
+        with self._lock:
+            os.write(self._fd, line)
+            os.fsync(self._fd)
+            self._apply(data)
+
+    def step_status(self, name, step):
+        """Return the last recorded status of a step of an item, or None."""
+        return self.items.get(name, {}).get('steps', {}).get(step)
+
+    def close(self):
+        os.close(self._fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,267 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Bulk onboarding of VNF packages.
+
+A VNF package is created for each CSAR, then its content is uploaded,
+streamed from its file or fetched by the server from its URI. Create and
+upload requests are sent concurrently. The packages being processed are
+then tracked by a single loop, which fetches all of them with one bulk
+request per poll. The poll interval starts short and grows while no
+package changes state, so that quick onboardings are noticed early
+without polling slow ones too often.
+"""
+
+import collections
+from concurrent import futures
+import os
+import time
+from urllib import parse
+
+from keystoneclient import exceptions as ks_exc
+import requests
+
+from tackerclient.common import exceptions
+from tackerclient.common import fleet
+from tackerclient.i18n import _
+
+CSAR_EXTENSIONS = ('.csar', '.zip')
+URI_SCHEMES = ('http', 'https', 'ftp')
+
+# Bounds of the adaptive poll interval, in seconds
+MIN_POLL_INTERVAL = 0.5
+POLL_BACKOFF = 2
+
+# Status of the packages
+PENDING = 'PENDING'
+CREATING = 'CREATING'
+UPLOADING = 'UPLOADING'
+PROCESSING = 'PROCESSING'
+ONBOARDED = 'ONBOARDED'
+FAILED = 'FAILED'
+
+# Steps of the onboarding, by the status of the packages during them
+_STEPS = collections.OrderedDict(((CREATING, 'create'),
+                                  (UPLOADING, 'upload'),
+                                  (PROCESSING, 'process')))
+
+
+def find_sources(sources):
+    """Return the CSARs to onboard.
+
+    :param sources: CSAR file paths, directories whose .csar and .zip
+      files are onboarded in name order, or http, https and ftp URIs
+    :returns: a list of dicts with a source key, and a path or a url key
+    :raises InvalidInput: if a source is neither a file, a directory nor
+      a URI
+    :raises EmptyInput: if no CSAR is found
+    """
+    csars = []
+    for source in sources:
+        if parse.urlparse(source).scheme in URI_SCHEMES:
+            csars.append({'source': source, 'url': source})
+        elif os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                path = os.path.join(source, name)
+                if (name.lower().endswith(CSAR_EXTENSIONS) and
+                        os.path.isfile(path)):
+                    csars.append({'source': path, 'path': path})
+        elif os.path.isfile(source):
+            csars.append({'source': source, 'path': source})
+        else:
+            raise exceptions.InvalidInput(
+                reason=_('%s is neither a CSAR file, a directory nor a '
+                         'URI') % source)
+    seen = set()
+    for csar in csars:
+        if csar['source'] in seen:
+            raise exceptions.InvalidInput(
+                reason=_('%s is given twice') % csar['source'])
+        seen.add(csar['source'])
+    if not csars:
+        raise exceptions.EmptyInput(reason=_('No CSAR found in %s') %
+                                    ', '.join(sources))
+    return csars
+
+
+def _timed(func, *args):
+    # The start time excludes the time spent queued for a worker
+    start = time.time()
+    return func(*args), start
+
+
+def _create(client, user_data):
+    body = {}
+    if user_data:
+        body['userDefinedData'] = user_data
+    return client.fork().create_vnf_package(body)['id']
+
+
+def _upload(client, vnf_package_id, csar, auth):
+    if 'url' in csar:
+        client.fork().upload_vnf_package(vnf_package_id, url=csar['url'],
+                                         **auth)
+        return
+    # The open file is streamed rather than read into memory
+    with open(csar['path'], 'rb') as file_data:
+        client.fork().upload_vnf_package(vnf_package_id, file_data)
+
+
+def onboard(client, csars, user_data=None, user_name=None, password=None,
+            max_workers=fleet.DEFAULT_PARALLEL,
+            timeout=fleet.DEFAULT_TIMEOUT, poll_interval=fleet.POLL_INTERVAL,
+            progress=None):
+    """Create VNF packages, upload their content and wait for them.
+
+    :param client: a tackerclient.v1_0.client.Client, forked for each
+      request
+    :param csars: the CSARs to onboard, as returned by find_sources
+    :param user_data: userDefinedData of the created packages
+    :param user_name: user name of the URIs requiring authentication
+    :param password: password of the URIs requiring authentication
+    :param max_workers: maximum number of requests sent concurrently
+    :param timeout: seconds to wait for the processing of each package
+    :param poll_interval: maximum number of seconds between two checks
+      of the packages being processed
+    :param progress: callable called with the source of a package and
+      its status whenever it changes
+    :returns: a list of dicts, the results of the CSARs in order, with
+      source, vnfPkgId, vnfdId, status, failedStep, error and timings
+      keys. The timings are the seconds spent in the create, upload and
+      process steps.
+    """
+    auth = {}
+    if user_name:
+        auth['userName'] = user_name
+    if password:
+        auth['password'] = password
+    results = collections.OrderedDict(
+        (csar['source'], {'source': csar['source'], 'vnfPkgId': None,
+                          'vnfdId': None, 'status': PENDING,
+                          'failedStep': None, 'error': None,
+                          'timings': collections.OrderedDict()})
+        for csar in csars)
+    csars = dict((csar['source'], csar) for csar in csars)
+    # Start time of the current step, by source
+    started = {}
+
+    def set_status(source, status, error=None):
+        result = results[source]
+        now = time.time()
+        step = _STEPS.get(result['status'])
+        if step is not None:
+            result['timings'][step] = round(now - started[source], 3)
+        started[source] = now
+        result['status'] = status
+        if status == FAILED:
+            result['failedStep'] = step
+            result['error'] = str(error)
+        if progress is not None:
+            progress(source, status)
+
+    # Sources by the future of their pending request
+    pending = {}
+    # Deadlines of the packages being processed, by package ID
+    waiting = {}
+    min_interval = min(MIN_POLL_INTERVAL, poll_interval)
+    interval = min_interval
+    next_poll = 0
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for source in results:
+            pending[executor.submit(_timed, _create, client,
+                                    user_data)] = source
+            set_status(source, CREATING)
+        while pending or waiting:
+            delay = max(0, next_poll - time.time()) if waiting else None
+            if pending:
+                done, _not_done = futures.wait(
+                    pending, timeout=delay,
+                    return_when=futures.FIRST_COMPLETED)
+            else:
+                time.sleep(delay)
+                done = ()
+
+            for future in done:
+                source = pending.pop(future)
+                result = results[source]
+                try:
+                    vnf_package_id, started[source] = future.result()
+                except Exception as e:
+                    set_status(source, FAILED, e)
+                    continue
+                if result['status'] == CREATING:
+                    result['vnfPkgId'] = vnf_package_id
+                    set_status(source, UPLOADING)
+                    pending[executor.submit(
+                        _timed, _upload, client, vnf_package_id,
+                        csars[source], auth)] = source
+                else:
+                    waiting[result['vnfPkgId']] = time.time() + timeout
+                    set_status(source, PROCESSING)
+
+            if not waiting or time.time() < next_poll:
+                continue
+            changed = _poll(client, results, waiting, timeout, set_status)
+            # Poll again soon while packages change state, less and less
+            # often while none does
+            if changed:
+                interval = min_interval
+            else:
+                interval = min(interval * POLL_BACKOFF, poll_interval)
+            next_poll = time.time() + interval
+    return list(results.values())
+
+
+def _poll(client, results, waiting, timeout, set_status):
+    sources = dict((result['vnfPkgId'], source)
+                   for source, result in results.items())
+    try:
+        vnf_packages, missing = client.fork(fresh=True).get_vnf_packages(
+            list(waiting))
+    except (exceptions.TackerClientException, ks_exc.ClientException,
+            requests.exceptions.RequestException) as e:
+        # Including transport errors of the session: retried at the next
+        # poll, until the deadlines expire
+        vnf_packages, missing = [], []
+        error = e
+    else:
+        error = None
+    changed = False
+    for vnf_package_id in missing:
+        del waiting[vnf_package_id]
+        set_status(sources[vnf_package_id], FAILED,
+                   _('VNF package %s is not found') % vnf_package_id)
+        changed = True
+    for vnf_package in vnf_packages:
+        source = sources[vnf_package['id']]
+        state = vnf_package['onboardingState']
+        if state == ONBOARDED:
+            del waiting[vnf_package['id']]
+            results[source]['vnfdId'] = vnf_package.get('vnfdId')
+            set_status(source, ONBOARDED)
+            changed = True
+        elif state in ('CREATED', 'ERROR'):
+            # The package goes back to CREATED when its processing failed
+            del waiting[vnf_package['id']]
+            set_status(source, FAILED,
+                       _('Onboarding of VNF package %(id)s failed, its '
+                         'onboardingState is %(state)s') % {
+                             'id': vnf_package['id'], 'state': state})
+            changed = True
+    now = time.time()
+    for vnf_package_id, deadline in list(waiting.items()):
+        if now > deadline:
+            del waiting[vnf_package_id]
+            set_status(sources[vnf_package_id], FAILED, error or _(
+                "VNF package %(id)s is not onboarded after %(timeout)s "
+                "seconds") % {'id': vnf_package_id, 'timeout': timeout})
+    return changed
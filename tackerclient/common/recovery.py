@@ -0,0 +1,187 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Bulk error handling of VNF LCM operation occurrences.
+
+Retry, rollback, fail or cancel requests are sent concurrently for many
+operation occurrences, optionally spaced out to a maximum rate. The
+operations can then be waited for by a single loop, which fetches all
+the unsettled operations with one bulk request per poll interval.
+"""
+
+import collections
+from concurrent import futures
+import time
+
+from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.common import fleet
+from tackerclient.common import scheduler
+from tackerclient.i18n import _
+
+RETRY = 'retry'
+ROLLBACK = 'rollback'
+FAIL = 'fail'
+CANCEL = 'cancel'
+
+# Operation state reached by a successful action
+FINAL_STATES = {RETRY: 'COMPLETED',
+                ROLLBACK: 'ROLLED_BACK',
+                FAIL: 'FAILED',
+                CANCEL: 'FAILED_TEMP'}
+_SETTLED_STATES = ('COMPLETED', 'FAILED_TEMP', 'FAILED', 'ROLLED_BACK')
+
+# Status of the operation occurrences
+ACCEPTED = 'ACCEPTED'
+SUCCEEDED = 'SUCCEEDED'
+FAILED = 'FAILED'
+
+
+def select_op_occs(client, filter_expr):
+    """Return the operation occurrences matching a filter.
+
+    Only their simple attributes are fetched, the complex ones such as
+    operationParams and resourceChanges are excluded.
+    """
+    filters.parse(filter_expr)
+    return client.list_vnf_lcm_op_occs(filter=filter_expr,
+                                       exclude_default=None)
+
+
+def _request(client, limiter, action, op_occ_id, cancel_mode):
+    client = client.fork()
+    limiter.wait()
+    if action == RETRY:
+        client.retry_vnf_instance(op_occ_id)
+    elif action == ROLLBACK:
+        client.rollback_vnf_instance(op_occ_id)
+    elif action == FAIL:
+        client.fail_vnf_instance(op_occ_id)
+    else:
+        client.cancel_vnf_instance(op_occ_id, {'cancelMode': cancel_mode})
+
+
+def run(client, op_occs, action, cancel_mode='GRACEFUL',
+        max_workers=fleet.DEFAULT_PARALLEL, rate=None, wait=False,
+        timeout=fleet.DEFAULT_TIMEOUT, poll_interval=fleet.POLL_INTERVAL,
+        progress=None):
+    """Run an error handling action on operation occurrences.
+
+    :param client: a tackerclient.v1_0.client.Client, forked for each
+      request
+    :param op_occs: the operation occurrences, dicts with an id key and
+      the stateEnteredTime key from before the action if it is known.
+      A settled state entered at that time is the one the action
+      started from, not its outcome.
+    :param action: one of RETRY, ROLLBACK, FAIL and CANCEL
+    :param cancel_mode: the cancelMode of the CANCEL requests
+    :param max_workers: maximum number of requests sent concurrently
+    :param rate: maximum number of requests started per second, no limit
+      if None
+    :param wait: wait for the operations to settle
+    :param timeout: seconds to wait for each operation
+    :param poll_interval: seconds between two checks of the operations
+    :param progress: callable called with the operation occurrence ID
+      and its status whenever it changes
+    :returns: a dict mapping the operation occurrence IDs to their
+      results, dicts with status, operationState and error keys
+    """
+    if action not in FINAL_STATES:
+        raise exceptions.InvalidInput(
+            reason=_('Unknown action %s') % action)
+    limiter = scheduler.RateLimiter(rate)
+    final_state = FINAL_STATES[action]
+    entered_times = dict((op_occ['id'], op_occ.get('stateEnteredTime'))
+                         for op_occ in op_occs)
+    results = collections.OrderedDict(
+        (op_occ['id'], {'status': None,
+                        'operationState': op_occ.get('operationState'),
+                        'error': None})
+        for op_occ in op_occs)
+
+    def set_status(op_occ_id, status, error=None):
+        results[op_occ_id]['status'] = status
+        if error is not None:
+            results[op_occ_id]['error'] = str(error)
+        if progress is not None:
+            progress(op_occ_id, status)
+
+    # Deadlines of the operations to wait for, by operation occurrence ID
+    waiting = {}
+    next_poll = 0
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        requests = dict(
+            (executor.submit(_request, client, limiter, action, op_occ_id,
+                             cancel_mode), op_occ_id)
+            for op_occ_id in results)
+        while requests or waiting:
+            delay = max(0, next_poll - time.time()) if waiting else None
+            if requests:
+                done, _pending = futures.wait(
+                    requests, timeout=delay,
+                    return_when=futures.FIRST_COMPLETED)
+            else:
+                time.sleep(delay)
+                done = ()
+
+            for future in done:
+                op_occ_id = requests.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    set_status(op_occ_id, FAILED, e)
+                    continue
+                if wait:
+                    waiting[op_occ_id] = time.time() + timeout
+                set_status(op_occ_id, ACCEPTED)
+
+            if not waiting or time.time() < next_poll:
+                continue
+            next_poll = time.time() + poll_interval
+            try:
+                current, missing = client.fork(
+                    fresh=True).get_vnf_lcm_op_occs(list(waiting),
+                                                    exclude_default=None)
+            except exceptions.TackerClientException as e:
+                # Retried at the next poll, until the deadlines expire
+                current, missing = [], []
+                error = e
+            else:
+                error = None
+            for op_occ_id in missing:
+                del waiting[op_occ_id]
+                set_status(op_occ_id, FAILED,
+                           _('LCM operation %s is not found') % op_occ_id)
+            for op_occ in current:
+                state = op_occ['operationState']
+                results[op_occ['id']]['operationState'] = state
+                entered_time = op_occ.get('stateEnteredTime')
+                if (state not in _SETTLED_STATES or entered_time and
+                        entered_time == entered_times[op_occ['id']]):
+                    continue
+                del waiting[op_occ['id']]
+                if state == final_state:
+                    set_status(op_occ['id'], SUCCEEDED)
+                else:
+                    set_status(op_occ['id'], FAILED,
+                               _('LCM operation %(id)s is %(state)s') % {
+                                   'id': op_occ['id'], 'state': state})
+            now = time.time()
+            for op_occ_id, deadline in list(waiting.items()):
+                if now > deadline:
+                    del waiting[op_occ_id]
+                    set_status(op_occ_id, FAILED, error or _(
+                        "LCM operation %(id)s is still %(state)s after "
+                        "%(timeout)s seconds") % {
+                            'id': op_occ_id, 'timeout': timeout,
+                            'state': results[op_occ_id]['operationState']})
+    return results
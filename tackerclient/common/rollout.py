@@ -0,0 +1,178 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Rolling change of the VNF package of VNF instances.
+
+The VNF instances are upgraded in waves: a canary wave, then waves
+growing by a factor until all the instances are upgraded. The instances
+of a wave are upgraded concurrently, at most max_in_flight at a time,
+and the next wave only starts once all the operations of a wave are
+finished. The rollout stops after a wave whose ratio of failed
+operations is over the threshold. Failed operations can be rolled back.
+"""
+
+import collections
+import math
+
+from tackerclient.common import exceptions
+from tackerclient.common import fleet
+from tackerclient.common import scheduler
+from tackerclient.i18n import _
+
+DEFAULT_CANARY = 1
+DEFAULT_GROWTH = 2.0
+
+CHANGE_VNFPKG = 'CHANGE_VNFPKG'
+
+# Status of the VNF instances in addition to the scheduler ones
+NOT_STARTED = 'NOT_STARTED'
+ROLLING_BACK = 'ROLLING_BACK'
+ROLLED_BACK = 'ROLLED_BACK'
+
+_ROLLBACK_STATUS = {scheduler.RUNNING: ROLLING_BACK,
+                    scheduler.SUCCEEDED: ROLLED_BACK,
+                    scheduler.FAILED: scheduler.FAILED}
+
+
+def plan_waves(count, canary=DEFAULT_CANARY, growth=DEFAULT_GROWTH):
+    """Return the sizes of the waves upgrading count VNF instances."""
+    if canary < 1:
+        raise exceptions.InvalidInput(
+            reason=_('The canary wave size must be a positive number'))
+    if growth < 1:
+        raise exceptions.InvalidInput(
+            reason=_('The wave growth factor must be at least 1'))
+    waves = []
+    size = canary
+    remaining = count
+    while remaining > 0:
+        waves.append(min(size, remaining))
+        remaining -= size
+        size = int(math.ceil(size * growth))
+    return waves
+
+
+def _upgrade(client, result, body, timeout, poll_interval):
+    client = client.fork()
+    client.change_vnfpkg_vnf_instance(result['vnfInstanceId'], body)
+    result['vnfLcmOpOccId'] = client.last_vnf_lcm_op_occ_id
+    fleet.wait_for_operation(
+        client, result['vnfInstanceId'], CHANGE_VNFPKG, timeout=timeout,
+        poll_interval=poll_interval, op_occ_id=result['vnfLcmOpOccId'],
+        on_state=lambda op_occ: _update(result, op_occ))
+
+
+def _rollback(client, result, timeout, poll_interval):
+    client = client.fork()
+    changed_since = result.get('stateEnteredTime')
+    client.rollback_vnf_instance(result['vnfLcmOpOccId'])
+    fleet.wait_for_operation(
+        client, result['vnfInstanceId'], CHANGE_VNFPKG, timeout=timeout,
+        poll_interval=poll_interval, op_occ_id=result['vnfLcmOpOccId'],
+        on_state=lambda op_occ: _update(result, op_occ),
+        final_state='ROLLED_BACK', changed_since=changed_since)
+
+
+def _update(result, op_occ):
+    result['vnfLcmOpOccId'] = op_occ['id']
+    result['operationState'] = op_occ['operationState']
+    result['stateEnteredTime'] = op_occ.get('stateEnteredTime')
+
+
+def _run(tasks, max_in_flight, on_status):
+    sched = scheduler.Scheduler(max_in_flight, progress=on_status)
+    for name, func in tasks:
+        sched.add(name, func)
+    return sched.run()
+
+
+def change_vnfpkg(client, vnf_instance_ids, body, canary=DEFAULT_CANARY,
+                  growth=DEFAULT_GROWTH, max_in_flight=fleet.DEFAULT_PARALLEL,
+                  max_failure_rate=0, rollback=False,
+                  timeout=fleet.DEFAULT_TIMEOUT,
+                  poll_interval=fleet.POLL_INTERVAL, progress=None):
+    """Change the VNF package of VNF instances in waves.
+
+    :param client: a tackerclient.v1_0.client.Client of the v2 API,
+      forked for each operation
+    :param vnf_instance_ids: IDs of the VNF instances, in upgrade order
+    :param body: the ChangeCurrentVnfPkgRequest sent for each instance
+    :param canary: number of VNF instances of the first wave
+    :param growth: factor by which each wave is larger than the previous
+    :param max_in_flight: maximum number of operations run concurrently
+    :param max_failure_rate: percentage of failed operations in a wave
+      above which the rollout stops
+    :param rollback: roll back the failed operations
+    :param timeout: seconds to wait for each operation
+    :param poll_interval: seconds between two checks of an operation
+    :param progress: callable called with the wave number, the VNF
+      instance ID and its status whenever it changes
+    :returns: the report of the rollout, a dict with summary, stopped,
+      waves and vnfs keys
+    """
+    results = collections.OrderedDict(
+        (vnf_id, {'vnfInstanceId': vnf_id, 'wave': None,
+                  'status': NOT_STARTED, 'vnfLcmOpOccId': None,
+                  'operationState': None, 'error': None})
+        for vnf_id in vnf_instance_ids)
+    waves = []
+    stopped = False
+    start = 0
+    for number, size in enumerate(
+            plan_waves(len(results), canary, growth), 1):
+        wave_ids = list(results)[start:start + size]
+        start += size
+
+        def on_status(task, number=number, rolling_back=False):
+            result = results[task.name]
+            status = task.status
+            if rolling_back:
+                status = _ROLLBACK_STATUS[status]
+            result['status'] = status
+            if task.status == scheduler.FAILED:
+                error = str(task.error)
+                if rolling_back:
+                    error = _('%(error)s, rollback failed: %(e)s') % {
+                        'error': result['error'], 'e': error}
+                result['error'] = error
+            if progress is not None:
+                progress(number, task.name, status)
+
+        for vnf_id in wave_ids:
+            results[vnf_id]['wave'] = number
+        upgrades = [(vnf_id, lambda r=results[vnf_id]: _upgrade(
+            client, r, body, timeout, poll_interval)) for vnf_id in wave_ids]
+        tasks = _run(upgrades, max_in_flight, on_status)
+        failed = [task.name for task in tasks
+                  if task.status == scheduler.FAILED]
+
+        if rollback:
+            rollbacks = [(vnf_id, lambda r=results[vnf_id]: _rollback(
+                client, r, timeout, poll_interval)) for vnf_id in failed
+                if results[vnf_id]['operationState'] == 'FAILED_TEMP']
+            _run(rollbacks, max_in_flight,
+                 lambda task, n=number: on_status(task, n, True))
+
+        waves.append({'wave': number, 'size': size, 'failed': len(failed)})
+        if len(failed) * 100 > max_failure_rate * size:
+            stopped = True
+            break
+
+    summary = collections.OrderedDict(
+        (status, 0) for status in (scheduler.SUCCEEDED, scheduler.FAILED,
+                                   ROLLED_BACK, NOT_STARTED))
+    for result in results.values():
+        summary[result['status']] += 1
+    return {'summary': summary,
+            'stopped': stopped,
+            'waves': waves,
+            'vnfs': list(results.values())}
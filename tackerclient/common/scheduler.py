@@ -0,0 +1,200 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Run interdependent tasks with a bounded number of workers.
+
+Tasks are started in the order they were added as soon as the tasks they
+depend on have succeeded and a worker is free. A task whose dependency
+failed or was skipped is skipped itself, the other tasks go on.
+"""
+
+import collections
+from concurrent import futures
+import threading
+import time
+
+from tackerclient.common import exceptions
+from tackerclient.i18n import _
+
+PENDING = 'PENDING'
+RUNNING = 'RUNNING'
+SUCCEEDED = 'SUCCEEDED'
+FAILED = 'FAILED'
+SKIPPED = 'SKIPPED'
+
+
+class Task(object):
+    """A named call and its outcome."""
+
+    def __init__(self, name, func, depends_on):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in (SUCCEEDED, FAILED, SKIPPED)
+
+    def __repr__(self):
+        return '<Task %s %s>' % (self.name, self.status)
+
+
+class Scheduler(object):
+    """Run tasks with at most max_workers of them at a time.
+
+    :param max_workers: maximum number of tasks running concurrently
+    :param progress: callable called with a task whenever its status
+      changes. It is called from the thread calling run().
+    """
+
+    def __init__(self, max_workers, progress=None):
+        if max_workers < 1:
+            raise exceptions.InvalidInput(
+                reason=_('The number of workers must be a positive number'))
+        self.max_workers = max_workers
+        self.progress = progress
+        self.tasks = collections.OrderedDict()
+
+    def add(self, name, func, depends_on=()):
+        """Add a task calling func() once the depends_on tasks succeeded."""
+        if name in self.tasks:
+            raise exceptions.InvalidInput(
+                reason=_('Duplicate task %s') % name)
+        task = Task(name, func, depends_on)
+        self.tasks[name] = task
+        return task
+
+    def _check(self):
+        for task in self.tasks.values():
+            for dep in task.depends_on:
+                if dep not in self.tasks:
+                    raise exceptions.InvalidInput(
+                        reason=_('Task %(task)s depends on unknown task '
+                                 '%(dep)s') % {'task': task.name, 'dep': dep})
+        # Kahn's algorithm, the tasks left over are part of a cycle
+        remaining = dict((name, len(set(task.depends_on)))
+                         for name, task in self.tasks.items())
+        dependents = self._dependents()
+        ready = [name for name, count in remaining.items() if not count]
+        while ready:
+            name = ready.pop()
+            del remaining[name]
+            for dependent in dependents[name]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        if remaining:
+            raise exceptions.InvalidInput(
+                reason=_('Dependency cycle between tasks %s') %
+                ', '.join(sorted(remaining)))
+
+    def _dependents(self):
+        dependents = dict((name, []) for name in self.tasks)
+        for task in self.tasks.values():
+            for dep in set(task.depends_on):
+                dependents[dep].append(task.name)
+        return dependents
+
+    def _set_status(self, task, status):
+        task.status = status
+        if self.progress is not None:
+            self.progress(task)
+
+    def run(self):
+        """Run the tasks and return them, in the order they were added.
+
+        :raises InvalidInput: if a task depends on an unknown task or on
+          itself through other tasks
+        """
+        self._check()
+        dependents = self._dependents()
+        waiting = dict((name, len(set(task.depends_on)))
+                       for name, task in self.tasks.items())
+        ready = collections.deque(
+            task for task in self.tasks.values() if not waiting[task.name])
+        # Keep the order tasks were added in when several become ready
+        order = dict((name, i) for i, name in enumerate(self.tasks))
+        running = {}
+
+        def skip(task):
+            pending = [task]
+            while pending:
+                task = pending.pop()
+                if task.done:
+                    continue
+                task.finished_at = time.time()
+                self._set_status(task, SKIPPED)
+                pending.extend(self.tasks[name]
+                               for name in dependents[task.name])
+
+        with futures.ThreadPoolExecutor(
+                max_workers=self.max_workers) as executor:
+            while ready or running:
+                while ready and len(running) < self.max_workers:
+                    task = ready.popleft()
+                    task.started_at = time.time()
+                    self._set_status(task, RUNNING)
+                    running[executor.submit(task.func)] = task
+
+                done, _pending = futures.wait(
+                    running, return_when=futures.FIRST_COMPLETED)
+                newly_ready = []
+                for future in done:
+                    task = running.pop(future)
+                    task.finished_at = time.time()
+                    try:
+                        task.result = future.result()
+                    except Exception as e:
+                        task.error = e
+                        self._set_status(task, FAILED)
+                        for name in dependents[task.name]:
+                            skip(self.tasks[name])
+                        continue
+                    self._set_status(task, SUCCEEDED)
+                    for name in dependents[task.name]:
+                        waiting[name] -= 1
+                        if not waiting[name] and not self.tasks[name].done:
+                            newly_ready.append(self.tasks[name])
+                newly_ready.sort(key=lambda t: order[t.name])
+                ready.extend(newly_ready)
+        return list(self.tasks.values())
+
+
+class RateLimiter(object):
+    """Space out calls so that at most rate of them start per second.
+
+    :param rate: maximum number of calls per second, no limit if None
+    """
+
+    def __init__(self, rate=None):
+        if rate is not None and rate <= 0:
+            raise exceptions.InvalidInput(
+                reason=_('The rate must be a positive number'))
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def wait(self):
+        """Block until the next call is allowed to start."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
@@ -0,0 +1,221 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Batch termination and deletion of VNF instances.
+
+Terminate requests are sent concurrently. The VNF instances to delete
+are then tracked by a single loop, which fetches all the instances whose
+termination is in progress with one bulk request per poll interval, and
+each instance is deleted as soon as it is NOT_INSTANTIATED.
+
+The requests can be recorded into a journal, from which an interrupted
+run is resumed: the VNF instances already deleted, or terminated when
+they are not deleted, are skipped, and the terminations in progress are
+waited for instead of being requested again.
+"""
+
+import collections
+from concurrent import futures
+import time
+
+from tackerclient.common import exceptions
+from tackerclient.common import fleet
+from tackerclient.common import scheduler
+from tackerclient.i18n import _
+
+# Seconds to wait for a termination when no graceful timeout is given
+TERMINATION_TIMEOUT = 300
+
+TERMINATING = 'TERMINATING'
+TERMINATED = 'TERMINATED'
+DELETING = 'DELETING'
+DELETED = 'DELETED'
+FAILED = 'FAILED'
+
+BATCH_TERMINATE = 'batch-terminate'
+
+# Steps of the VNF instances recorded into a journal
+TERMINATE = 'terminate'
+DELETE = 'delete'
+
+_FAILED_STATES = ('FAILED_TEMP', 'FAILED', 'ROLLED_BACK')
+
+
+def journal_request(jrnl):
+    """Return the request of the batch termination of a journal.
+
+    :returns: the VNF instance IDs, the TerminateVnfRequest and whether
+      the VNF instances are deleted
+    :raises InvalidInput: if the journal is not one of a batch termination
+    """
+    if not jrnl.header or jrnl.header.get('kind') != BATCH_TERMINATE:
+        raise exceptions.InvalidInput(
+            reason=_('%s is not the journal of a batch termination') %
+            jrnl.path)
+    return jrnl.header['items'], jrnl.header['body'], jrnl.header['delete']
+
+
+def _terminate(client, vnf_instance_id, body, recover=False):
+    client = client.fork()
+    if recover:
+        # The request may have been accepted before the run was interrupted
+        op_occ = fleet.find_operation(client, vnf_instance_id, 'TERMINATE')
+        if op_occ is not None and (op_occ['operationState'] not in
+                                   _FAILED_STATES):
+            return op_occ['id']
+    client.terminate_vnf_instance(vnf_instance_id, body)
+    return client.last_vnf_lcm_op_occ_id
+
+
+def _delete(client, vnf_instance_id):
+    client.fork().delete_vnf_instance(vnf_instance_id)
+
+
+def terminate(client, vnf_instance_ids, body, delete=False,
+              max_workers=fleet.DEFAULT_PARALLEL,
+              timeout=TERMINATION_TIMEOUT, poll_interval=fleet.POLL_INTERVAL,
+              progress=None, journal=None):
+    """Terminate VNF instances, and delete them once terminated.
+
+    :param client: a tackerclient.v1_0.client.Client, forked for each
+      request
+    :param vnf_instance_ids: IDs of the VNF instances
+    :param body: the TerminateVnfRequest sent for each instance
+    :param delete: delete the VNF instances once they are terminated
+    :param max_workers: maximum number of requests sent concurrently
+    :param timeout: seconds to wait for each termination
+    :param poll_interval: seconds between two checks of the terminations
+    :param progress: callable called with the VNF instance ID and its
+      status whenever it changes
+    :param journal: a tackerclient.common.journal.Journal recording the
+      requests and their op-occ IDs. The VNF instances whose run is
+      finished in a journal of an interrupted run are skipped, see
+      journal_request() to resume it.
+    :returns: a dict mapping the VNF instance IDs to their results, dicts
+      with status and error keys
+    """
+    results = collections.OrderedDict(
+        (vnf_id, {'status': None, 'error': None})
+        for vnf_id in vnf_instance_ids)
+
+    def set_status(vnf_id, status, error=None):
+        results[vnf_id]['status'] = status
+        if error is not None:
+            results[vnf_id]['error'] = str(error)
+        if progress is not None:
+            progress(vnf_id, status)
+
+    def record(vnf_id, step, status, **attrs):
+        if journal is not None:
+            journal.record(item=vnf_id, step=step, status=status, **attrs)
+
+    if journal is not None and journal.header is None:
+        journal.record(kind=BATCH_TERMINATE, items=list(results), body=body,
+                       delete=delete)
+
+    # VNF instance IDs by the future of their pending request
+    requests = {}
+    # Deadlines of the terminations to wait for, by VNF instance ID
+    waiting = {}
+    # VNF instances whose deletion was requested by an interrupted run
+    deleted = set()
+    next_poll = 0
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for vnf_id in results:
+            steps = {}
+            if journal is not None:
+                steps = journal.items.get(vnf_id, {}).get('steps', {})
+            if steps.get(DELETE) == scheduler.SUCCEEDED:
+                set_status(vnf_id, DELETED)
+            elif steps.get(TERMINATE) == scheduler.SUCCEEDED:
+                if delete:
+                    waiting[vnf_id] = time.time() + timeout
+                    if steps.get(DELETE) == scheduler.RUNNING:
+                        deleted.add(vnf_id)
+                set_status(vnf_id, TERMINATING)
+            else:
+                recover = steps.get(TERMINATE) == scheduler.RUNNING
+                record(vnf_id, TERMINATE, scheduler.RUNNING)
+                requests[executor.submit(_terminate, client, vnf_id, body,
+                                         recover=recover)] = vnf_id
+        while requests or waiting:
+            delay = max(0, next_poll - time.time()) if waiting else None
+            if requests:
+                done, _pending = futures.wait(
+                    requests, timeout=delay,
+                    return_when=futures.FIRST_COMPLETED)
+            else:
+                time.sleep(delay)
+                done = ()
+
+            for future in done:
+                vnf_id = requests.pop(future)
+                step = TERMINATE
+                if results[vnf_id]['status'] == DELETING:
+                    step = DELETE
+                try:
+                    op_occ_id = future.result()
+                except Exception as e:
+                    record(vnf_id, step, FAILED, error=str(e))
+                    set_status(vnf_id, FAILED, e)
+                    continue
+                if step == DELETE:
+                    record(vnf_id, DELETE, scheduler.SUCCEEDED)
+                    set_status(vnf_id, DELETED)
+                    continue
+                record(vnf_id, TERMINATE, scheduler.SUCCEEDED,
+                       vnfLcmOpOccId=op_occ_id)
+                if delete:
+                    waiting[vnf_id] = time.time() + timeout
+                    set_status(vnf_id, TERMINATING)
+                else:
+                    set_status(vnf_id, TERMINATING)
+
+            if not waiting or time.time() < next_poll:
+                continue
+            next_poll = time.time() + poll_interval
+            try:
+                vnf_instances, missing = client.fork(
+                    fresh=True).get_vnf_instances(list(waiting),
+                                                  exclude_default=None)
+            except exceptions.TackerClientException as e:
+                # Retried at the next poll, until the deadlines expire
+                vnf_instances, missing = [], []
+                error = e
+            else:
+                error = None
+            for vnf_id in missing:
+                del waiting[vnf_id]
+                if vnf_id in deleted:
+                    record(vnf_id, DELETE, scheduler.SUCCEEDED)
+                    set_status(vnf_id, DELETED)
+                    continue
+                set_status(vnf_id, FAILED,
+                           _('VNF instance %s is not found') % vnf_id)
+            for vnf_instance in vnf_instances:
+                vnf_id = vnf_instance['id']
+                if vnf_instance['instantiationState'] == 'NOT_INSTANTIATED':
+                    del waiting[vnf_id]
+                    set_status(vnf_id, TERMINATED)
+                    set_status(vnf_id, DELETING)
+                    record(vnf_id, DELETE, scheduler.RUNNING)
+                    requests[executor.submit(_delete, client, vnf_id)] = vnf_id
+            now = time.time()
+            for vnf_id, deadline in list(waiting.items()):
+                if now > deadline:
+                    del waiting[vnf_id]
+                    set_status(vnf_id, FAILED, error or _(
+                        "Couldn't verify vnf instance is terminated within "
+                        "'%(timeout)s' seconds. Unable to delete vnf "
+                        "instance %(id)s") % {'timeout': timeout,
+                                              'id': vnf_id})
+    return results
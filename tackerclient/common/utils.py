@@ -20,6 +20,7 @@
 import argparse
 import logging
 import os
+import re
 
 from oslo_utils import encodeutils
 from oslo_utils import importutils
@@ -27,6 +28,8 @@ from oslo_utils import importutils
 from tackerclient.common import exceptions
 from tackerclient.i18n import _
 
+_logger = logging.getLogger(__name__)
+
 
 def env(*vars, **kwargs):
     """Returns the first environment variable set.
@@ -40,6 +43,27 @@ def env(*vars, **kwargs):
     return kwargs.get('default', '')
 
 
+def env_int(*vars, **kwargs):
+    """Returns the first environment variable set, as an integer.
+
+    Defaults to keyword arg default if none is set or if the value is not
+    an integer, so that a wrong setting does not break every command.
+    """
+    value = env(*vars)
+    if value:
+        try:
+            return int(value)
+        except ValueError:
+            _logger.warning("Ignoring %(vars)s=%(value)s, not an integer",
+                            {'vars': '/'.join(vars), 'value': value})
+    return kwargs.get('default')
+
+
+# Default number of requests or LCM operations run concurrently by bulk
+# getters and by the commands acting on several resources.
+DEFAULT_PARALLEL = env_int('TACKERCLIENT_PARALLEL', default=8)
+
+
 def get_client_class(api_name, version, version_map):
     """Returns the client class for the requested API version.
 
@@ -108,13 +132,47 @@ def str2dict(strdict):
     return dict([kv.split('=', 1) for kv in strdict.split(',')])
 
 
-def http_log_req(_logger, args, kwargs):
+# Request and response bodies longer than this number of characters are
+# truncated in HTTP debug logs.
+HTTP_LOG_BODY_MAX_LENGTH = env_int('TACKERCLIENT_DEBUG_BODY_MAX_LENGTH',
+                                   default=4096)
+
+_BINARY_CONTENT_TYPES = ('application/zip', 'application/octet-stream')
+
+
+def http_log_body(body, content_type=None, max_length=None, redact=None):
+    """Return a representation of an HTTP body suitable for debug logs.
+
+    File-like and binary bodies are replaced by a short placeholder and
+    text bodies are truncated to max_length characters,
+    HTTP_LOG_BODY_MAX_LENGTH by default, so logging a request never reads
+    or copies a whole package. redact is only given the logged part of a
+    text body.
+    """
+    if not body:
+        return body
+    if max_length is None:
+        max_length = HTTP_LOG_BODY_MAX_LENGTH
+    if hasattr(body, 'read'):
+        return '<file-like object %s>' % getattr(body, 'name', '')
+    if (isinstance(body, bytes) or
+            (content_type and content_type.split(';')[0].strip() in
+             _BINARY_CONTENT_TYPES)):
+        return '<binary data: %d bytes>' % len(body)
+    if max_length and len(body) > max_length:
+        logged = body[:max_length]
+        return '%s... <truncated %d characters>' % (
+            redact(logged) if redact else logged, len(body) - max_length)
+    return redact(body) if redact else body
+
+
+def http_log_req(_logger, args, kwargs, redact=None):
     if not _logger.isEnabledFor(logging.DEBUG):
         return
 
     string_parts = ['curl -i']
     for element in args:
-        if element in ('GET', 'POST', 'DELETE', 'PUT'):
+        if element in ('GET', 'POST', 'DELETE', 'PUT', 'PATCH'):
             string_parts.append(' -X %s' % element)
         else:
             string_parts.append(' %s' % element)
@@ -124,7 +182,9 @@ def http_log_req(_logger, args, kwargs):
         string_parts.append(header)
 
     if 'body' in kwargs and kwargs['body']:
-        string_parts.append(" -d '%s'" % (kwargs['body']))
+        body = http_log_body(kwargs['body'], kwargs.get('content_type'),
+                             redact=redact)
+        string_parts.append(" -d '%s'" % body)
     req = encodeutils.safe_encode("".join(string_parts))
     _logger.debug("\nREQ: %s\n", req)
 
@@ -135,7 +195,35 @@ def http_log_resp(_logger, resp, body):
     _logger.debug("RESP:%(code)s %(headers)s %(body)s\n",
                   {'code': resp.status_code,
                    'headers': resp.headers,
-                   'body': body})
+                   'body': http_log_body(
+                       body, resp.headers.get('content-type'))})
+
+
+def redact_credentials(body, secrets=(), keys=('password',),
+                       replacement='REDACTED'):
+    """Hide credentials in an HTTP body to be logged.
+
+    The string values of the given keys are replaced, up to the end of
+    the body when the value was cut by http_log_body. A body without
+    these keys falls back to replacing the known secret values. The body
+    is not parsed, so it is logged as it was sent.
+
+    :param body: the body of a request, bodies other than strings are
+      returned unchanged
+    :param secrets: secret values to hide from other bodies
+    :param keys: names of the JSON attributes holding credentials
+    """
+    if not isinstance(body, str):
+        return body
+    pattern = r'("(?:%s)"\s*:\s*")(?:[^"\\]|\\.)*' % '|'.join(
+        re.escape(key) for key in keys)
+    body, count = re.subn(
+        pattern, lambda match: match.group(1) + replacement, body)
+    if not count:
+        for secret in secrets:
+            if secret:
+                body = body.replace(secret, replacement)
+    return body
 
 
 def _safe_encode_without_obj(data):
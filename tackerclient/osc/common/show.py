@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+from concurrent import futures
+import logging
+
+from osc_lib.command import command
+
+from tackerclient.common import exceptions
+from tackerclient.common import utils
+from tackerclient.i18n import _
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PARALLEL = utils.DEFAULT_PARALLEL
+
+
+class ShowMany(command.ShowOne):
+    """Display one or more resources.
+
+    Subclasses register their ID argument with add_id_arguments() and
+    implement show(), which returns the display columns and data of one
+    resource. take_action() displays a single resource. With several IDs,
+    run() fetches the resources concurrently, sharing the authenticated
+    client, and displays them in the order of their IDs as soon as they
+    are available: one table each, or one JSON document per line with
+    -f json.
+    """
+
+    def add_id_arguments(self, parser, dest, metavar, help):
+        self._id_dest = dest
+        parser.add_argument(
+            dest,
+            metavar=metavar,
+            help=help + _(' ("-" to read IDs from standard input)'))
+        parser.add_argument(
+            'more_ids',
+            metavar=metavar,
+            nargs='*',
+            help=_('More IDs to display'))
+        parser.add_argument(
+            '--parallel',
+            metavar='<count>',
+            type=int,
+            default=DEFAULT_PARALLEL,
+            help=_('Maximum number of resources fetched concurrently '
+                   '(default: %d)') % DEFAULT_PARALLEL)
+
+    @abc.abstractmethod
+    def show(self, client, resource_id):
+        """Return the display columns and data of a resource."""
+
+    def get_ids(self, parsed_args):
+        ids = []
+        for resource_id in ([getattr(parsed_args, self._id_dest)] +
+                            parsed_args.more_ids):
+            if resource_id == '-':
+                ids.extend(self.app.stdin.read().split())
+            else:
+                ids.append(resource_id)
+        if not ids:
+            raise exceptions.InvalidInput(reason=_('No ID given'))
+        if parsed_args.parallel < 1:
+            raise exceptions.InvalidInput(
+                reason=_('--parallel must be a positive number'))
+        return ids
+
+    def take_action(self, parsed_args):
+        client = self.app.client_manager.tackerclient
+        ids = self.get_ids(parsed_args)
+        if len(ids) > 1:
+            raise exceptions.InvalidInput(
+                reason=_('Several resources are displayed by run()'))
+        return self.show(client, ids[0])
+
+    def run(self, parsed_args):
+        ids = self.get_ids(parsed_args)
+        if len(ids) == 1:
+            # take_action() displays it, without reading stdin again
+            setattr(parsed_args, self._id_dest, ids[0])
+            parsed_args.more_ids = []
+            return super(ShowMany, self).run(parsed_args)
+
+        parsed_args = self._run_before_hooks(parsed_args)
+        self.formatter = self._formatter_plugins[parsed_args.formatter].obj
+        if parsed_args.formatter == 'json':
+            parsed_args.noindent = True
+        client = self.app.client_manager.tackerclient
+        error_count = 0
+        with futures.ThreadPoolExecutor(
+                max_workers=min(parsed_args.parallel, len(ids))) as executor:
+            results = [executor.submit(self.show, client.fork(), resource_id)
+                       for resource_id in ids]
+            for resource_id, result in zip(ids, results):
+                try:
+                    columns, values = result.result()
+                except Exception as e:
+                    error_count += 1
+                    LOG.error(_("Failed to display '%(id)s': %(e)s"),
+                              {'id': resource_id, 'e': e})
+                    continue
+                columns, values = self._run_after_hooks(
+                    parsed_args, (columns, values))
+                self.produce_output(parsed_args, columns, values)
+                self.app.stdout.flush()
+
+        if error_count > 0:
+            msg = (_("Failed to display %(error_count)s of %(total)s "
+                     "resources.") % {'error_count': error_count,
+                                      'total': len(ids)})
+            raise exceptions.CommandError(message=msg)
+        return 0
@@ -16,6 +16,7 @@
 import logging
 
 from osc_lib import utils
+from oslo_utils import strutils
 
 
 LOG = logging.getLogger(__name__)
@@ -45,7 +46,10 @@ def make_client(instance):
               'endpoint_type': instance._interface,
               'interface': instance._interface,
               'session': instance.session,
-              'api_version': api_version
+              'api_version': api_version,
+              'negotiate_api_version': strutils.bool_from_string(
+                  utils.env('TACKERCLIENT_NEGOTIATE_API_VERSION'),
+                  default=False),
               }
 
     client = tacker_client(**kwargs)
@@ -32,6 +32,7 @@ from osc_lib import utils
 from oslo_serialization import jsonutils
 
 from tackerclient.common import exceptions
+from tackerclient.common import utils as tacker_utils
 from tackerclient.i18n import _
 
 
@@ -39,6 +40,17 @@ LIST_BOTH = 'both'
 LIST_SHORT_ONLY = 'short_only'
 LIST_LONG_ONLY = 'long_only'
 
+# Complex column values whose JSON form is longer than this number of
+# characters are truncated in human readable output. 0, the default,
+# displays full values.
+COMPLEX_DATA_MAX_LENGTH = tacker_utils.env_int(
+    'TACKERCLIENT_COMPLEX_DATA_MAX_LENGTH', default=0)
+
+# 'pretty' renders complex column values as indented JSON, 'compact'
+# renders them as single-line JSON.
+COMPLEX_DATA_FORMAT = utils.env('TACKERCLIENT_COMPLEX_DATA_FORMAT',
+                                default='pretty')
+
 
 def format_dict_with_indention(data):
     """Return a formatted string of key value pairs
@@ -52,6 +64,31 @@ def format_dict_with_indention(data):
     return jsonutils.dumps(data, indent=4)
 
 
+def format_complex_data(data, max_length=None, compact=False):
+    """Return a JSON string of complex data, optionally bounded in size.
+
+    :param data: a dict or a list
+    :param max_length: maximum number of characters to render. None or 0
+      means no limit.
+    :param compact: render single-line JSON instead of indented JSON
+    :rtype: a string, or None if data is None
+    """
+
+    if data is None:
+        return None
+    if compact:
+        rendered = jsonutils.dumps(data)
+    else:
+        rendered = format_dict_with_indention(data)
+    if max_length and len(rendered) > max_length:
+        msg = _("... (truncated %(omitted)d characters, set "
+                "TACKERCLIENT_COMPLEX_DATA_MAX_LENGTH=0 to display "
+                "the full value)")
+        return rendered[:max_length] + msg % {
+            'omitted': len(rendered) - max_length}
+    return rendered
+
+
 def get_column_definitions(attr_map, long_listing):
     """Return table headers and column names for a listing table.
 
@@ -120,6 +157,36 @@ def get_columns(item, attr_map=None):
             tuple(col[1] for col in columns))
 
 
+def get_attribute_selectors(columns, attr_map, complex_fields):
+    """Return the attribute selector parameters to fetch only columns.
+
+    The complex attributes of a resource are only included into a
+    response when requested, so that the columns selected with -c can be
+    fetched with exclude_default and fields query parameters.
+
+    :param columns: headers of the columns to display, as given with -c.
+    :param attr_map: a list of table entry definitions, the same format
+      is used as for get_column_definitions attr_map.
+    :param complex_fields: attributes excluded by exclude_default.
+    :return: a dict of query parameters, empty if no columns are given or
+      if a column is unknown.
+    """
+    if not columns:
+        return {}
+    _hdr_map_dict = dict((hdr, col) for col, hdr, listing_mode in attr_map)
+    if any(column not in _hdr_map_dict for column in columns):
+        return {}
+    params = {'exclude_default': None}
+    fields = []
+    for column in columns:
+        attr = _hdr_map_dict[column]
+        if attr in complex_fields and attr not in fields:
+            fields.append(attr)
+    if fields:
+        params['fields'] = ','.join(fields)
+    return params
+
+
 # TODO(amotoki): Use osc-lib version once osc-lib provides this.
 def add_project_owner_option_to_parser(parser):
     """Register project and project domain options.
@@ -143,6 +210,31 @@ def add_project_owner_option_to_parser(parser):
     )
 
 
+def add_inventory_options_to_parser(parser):
+    """Register options to list resources from the local inventory.
+
+    :param parser: argparse.Argument parser object.
+
+    """
+    parser.add_argument(
+        '--from-cache',
+        action='store_true',
+        default=False,
+        help=_('List resources from the local inventory mirror instead of '
+               'the Tacker API. The mirror is synchronized first if it is '
+               'older than --max-age.'),
+    )
+    parser.add_argument(
+        '--max-age',
+        metavar='<seconds>',
+        type=int,
+        default=None,
+        help=_('Maximum age in seconds of the inventory mirror used with '
+               '--from-cache. Defaults to '
+               'env[TACKERCLIENT_INVENTORY_MAX_AGE] or 300.'),
+    )
+
+
 # The following methods are borrowed from openstackclient.identity.common
 # as it is not exposed officially.
 # TODO(amotoki): Use osc-lib version once osc-lib provides this.
@@ -212,9 +304,26 @@ def _find_identity_resource(identity_client_manager, name_or_id,
 
 
 class FormatComplexDataColumn(cliff_columns.FormattableColumn):
+    """Column rendering a complex value as JSON.
+
+    The value is rendered only when cliff asks for the human readable
+    form of a displayed cell, and the result is memoized. Machine
+    readable formatters (json, yaml, value, ...) get the raw value.
+    """
+
+    max_length = COMPLEX_DATA_MAX_LENGTH
+    compact = COMPLEX_DATA_FORMAT == 'compact'
+
+    def __init__(self, value):
+        super(FormatComplexDataColumn, self).__init__(value)
+        self._rendered = None
 
     def human_readable(self):
-        return format_dict_with_indention(self._value)
+        if self._rendered is None:
+            self._rendered = format_complex_data(
+                self._value, max_length=self.max_length,
+                compact=self.compact)
+        return self._rendered
 
 
 def jsonfile2body(file_path):
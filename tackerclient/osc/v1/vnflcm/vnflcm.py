@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from functools import reduce
+import json
 import logging
 import time
 
@@ -20,7 +22,15 @@ from osc_lib.command import command
 from osc_lib import utils
 
 from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.common import fleet
+from tackerclient.common import inventory
+from tackerclient.common import journal
+from tackerclient.common import rollout
+from tackerclient.common import scheduler
+from tackerclient.common import teardown
 from tackerclient.i18n import _
+from tackerclient.osc.common import show
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
 
@@ -147,20 +157,19 @@ class CreateVnfLcm(command.ShowOne):
         return (display_columns, data)
 
 
-class ShowVnfLcm(command.ShowOne):
+class ShowVnfLcm(show.ShowMany):
     _description = _("Display VNF instance details")
 
     def get_parser(self, prog_name):
         parser = super(ShowVnfLcm, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_INSTANCE,
+        self.add_id_arguments(
+            parser, _VNF_INSTANCE,
             metavar="<vnf-instance>",
             help=_("VNF instance ID to display"))
         return parser
 
-    def take_action(self, parsed_args):
-        client = self.app.client_manager.tackerclient
-        obj = client.show_vnf_instance(parsed_args.vnf_instance)
+    def show(self, client, vnf_instance):
+        obj = client.show_vnf_instance(vnf_instance)
         display_columns, columns = _get_columns(obj, action='show')
         data = utils.get_item_properties(
             sdk_utils.DictModel(obj),
@@ -172,19 +181,116 @@ class ShowVnfLcm(command.ShowOne):
 class ListVnfLcm(command.Lister):
     _description = _("List VNF Instance")
 
+    # Complex attributes the server excludes with exclude_default
+    _complex_fields = ('vimConnectionInfo', 'instantiatedVnfInfo',
+                       'vnfConfigurableProperties', 'metadata', 'extensions')
+
     def get_parser(self, prog_name):
         parser = super(ListVnfLcm, self).get_parser(prog_name)
+        parser.add_argument(
+            "--filter",
+            metavar="<filter>",
+            help=_("Attribute-based-filtering parameters"),
+        )
+        fields_exclusive_group = parser.add_mutually_exclusive_group(
+            required=False)
+        fields_exclusive_group.add_argument(
+            "--all-fields",
+            action="store_true",
+            default=False,
+            help=_("Include all complex attributes in the response"),
+        )
+        fields_exclusive_group.add_argument(
+            "--fields",
+            metavar="<fields>",
+            help=_("Complex attributes to be included into the response"),
+        )
+        fields_exclusive_group.add_argument(
+            "--exclude-fields",
+            metavar="<exclude-fields>",
+            help=_("Complex attributes to be excluded from the response"),
+        )
+        parser.add_argument(
+            "--exclude-default",
+            action="store_true",
+            default=False,
+            help=_("Exclude all complex attributes from the response. This "
+                   "is the default unless --all-fields or --exclude-fields "
+                   "is given. Cannot be used with --all-fields"),
+        )
+        tacker_osc_utils.add_inventory_options_to_parser(parser)
         return parser
 
+    def case_modify(self, field):
+        return reduce(
+            lambda x, y: x + (' ' if y.isupper() else '') + y, field).title()
+
+    def get_attributes(self, extra_fields=None, all_fields=False,
+                       exclude_fields=None):
+        attrs = list(_attr_map)
+        fields = list(extra_fields or [])
+        if all_fields:
+            fields.extend(self._complex_fields)
+        elif exclude_fields is not None:
+            fields.extend(field for field in self._complex_fields
+                          if field not in exclude_fields)
+        known = [attr[0] for attr in attrs]
+        for field in fields:
+            if field not in known:
+                known.append(field)
+                attrs.append((field, self.case_modify(field),
+                              tacker_osc_utils.LIST_BOTH))
+        return tuple(attrs)
+
     def take_action(self, parsed_args):
+        if parsed_args.all_fields and parsed_args.exclude_default:
+            raise exceptions.CommandError(message=_(
+                "--exclude-default cannot be used with --all-fields"))
+        if parsed_args.from_cache and (parsed_args.fields or
+                                       parsed_args.exclude_fields):
+            # The inventory holds the records as listed by default.
+            raise exceptions.CommandError(message=_(
+                "--fields and --exclude-fields cannot be used with "
+                "--from-cache"))
         _params = {}
+        extra_fields = []
+        exclude_fields = None
+        if parsed_args.filter:
+            filters.parse(parsed_args.filter)
+            _params['filter'] = parsed_args.filter
+        if parsed_args.fields:
+            _params['fields'] = parsed_args.fields
+            extra_fields = [field.split('/')[0]
+                            for field in parsed_args.fields.split(',')]
+        if parsed_args.exclude_fields:
+            _params['exclude_fields'] = parsed_args.exclude_fields
+            exclude_fields = parsed_args.exclude_fields.split(',')
+        if parsed_args.all_fields:
+            _params['all_fields'] = None
+        elif parsed_args.exclude_default or not parsed_args.exclude_fields:
+            # Only the simple attributes are displayed, so complex ones
+            # are not requested unless asked for.
+            _params['exclude_default'] = None
+
         client = self.app.client_manager.tackerclient
-        vnf_instances = client.list_vnf_instances(**_params)
+        if parsed_args.from_cache:
+            vnf_instances = inventory.list_resources(
+                client, inventory.VNF_INSTANCES,
+                filter_expr=parsed_args.filter,
+                max_age=parsed_args.max_age)
+        else:
+            vnf_instances = client.list_vnf_instances(**_params)
         headers, columns = tacker_osc_utils.get_column_definitions(
-            _attr_map, long_listing=True)
+            self.get_attributes(extra_fields, parsed_args.all_fields,
+                                exclude_fields), long_listing=True)
+        list_formatters = dict(formatters)
+        list_formatters.update(
+            (field, tacker_osc_utils.FormatComplexDataColumn)
+            for field in self._complex_fields)
         return (headers,
                 (utils.get_dict_properties(
-                    s, columns, mixed_case_fields=_mixed_case_fields,
+                    s, columns, formatters=list_formatters,
+                    mixed_case_fields=_mixed_case_fields,
                 ) for s in vnf_instances))
 
 
@@ -271,10 +377,30 @@ class TerminateVnfLcm(command.Command):
 
     def get_parser(self, prog_name):
         parser = super(TerminateVnfLcm, self).get_parser(prog_name)
-        parser.add_argument(
+        target_group = parser.add_mutually_exclusive_group(required=True)
+        target_group.add_argument(
             _VNF_INSTANCE,
             metavar="<vnf-instance>",
+            nargs='?',
             help=_("VNF instance ID to terminate"))
+        target_group.add_argument(
+            '--filter',
+            metavar="<filter>",
+            help=_("Attribute-based-filtering parameters selecting the "
+                   "instantiated VNF instances to terminate, e.g. "
+                   "(eq,vnfdId,<vnfd-id>)"))
+        target_group.add_argument(
+            '--resume',
+            metavar="<journal-file>",
+            help=_('Resume the run recorded in a journal file. The VNF '
+                   'instances and the request are read from the journal, '
+                   'the finished ones are skipped and the terminations in '
+                   'progress are waited for.'))
+        parser.add_argument(
+            'more_vnf_instances',
+            metavar="<vnf-instance>",
+            nargs='*',
+            help=_("More VNF instance IDs to terminate"))
         parser.add_argument(
             "--termination-type",
             default='GRACEFUL',
@@ -296,6 +422,19 @@ class TerminateVnfLcm(command.Command):
             default=False,
             help=_("Delete VNF Instance subsequently after it's termination"),
         )
+        parser.add_argument(
+            '--parallel',
+            metavar="<count>",
+            type=int,
+            default=fleet.DEFAULT_PARALLEL,
+            help=_('Maximum number of requests sent concurrently when '
+                   'several VNF instances are terminated '
+                   '(default: %d)') % fleet.DEFAULT_PARALLEL)
+        parser.add_argument(
+            '--journal',
+            metavar="<journal-file>",
+            help=_('Record each request into a new journal file, from '
+                   'which the run can be resumed if it is interrupted.'))
         return parser
 
     def args2body(self, parsed_args):
@@ -314,6 +453,46 @@ class TerminateVnfLcm(command.Command):
 
     def take_action(self, parsed_args):
         client = self.app.client_manager.tackerclient
+        if parsed_args.resume:
+            if parsed_args.journal:
+                raise exceptions.InvalidInput(
+                    reason=_('A resumed run is recorded into its own '
+                             'journal'))
+            jrnl = journal.Journal(parsed_args.resume)
+            try:
+                vnf_instances, body, delete = teardown.journal_request(jrnl)
+            except exceptions.InvalidInput:
+                jrnl.close()
+                raise
+            return self._terminate_many(client, vnf_instances, body, delete,
+                                        parsed_args, jrnl)
+        if parsed_args.filter:
+            if parsed_args.more_vnf_instances:
+                raise exceptions.InvalidInput(
+                    reason=_('VNF instance IDs cannot be given with '
+                             '--filter'))
+            vnf_instances = fleet.select_vnf_instances(client,
+                                                       parsed_args.filter)
+            if not vnf_instances:
+                print(_('No VNF instance matches the filter'))
+                return
+        else:
+            vnf_instances = list(dict.fromkeys(
+                [parsed_args.vnf_instance] + parsed_args.more_vnf_instances))
+        if (parsed_args.filter or parsed_args.journal or
+                len(vnf_instances) > 1):
+            jrnl = None
+            if parsed_args.journal:
+                jrnl = journal.Journal(parsed_args.journal)
+                if jrnl.header is not None:
+                    jrnl.close()
+                    raise exceptions.InvalidInput(
+                        reason=_('Journal %s already exists, use --resume '
+                                 'to resume its run') % parsed_args.journal)
+            return self._terminate_many(client, vnf_instances,
+                                        self.args2body(parsed_args),
+                                        parsed_args.D, parsed_args, jrnl)
+
         result = client.terminate_vnf_instance(parsed_args.vnf_instance,
                                                self.args2body(parsed_args))
         if not result:
@@ -332,6 +511,44 @@ class TerminateVnfLcm(command.Command):
                     print(_("VNF Instance '%(id)s' is deleted successfully") %
                           {'id': parsed_args.vnf_instance})
 
+    def _terminate_many(self, client, vnf_instances, body, delete,
+                        parsed_args, jrnl=None):
+        def progress(vnf_instance, status):
+            self.app.stderr.write('%s %s\n' % (vnf_instance, status))
+            self.app.stderr.flush()
+
+        timeout = VNF_INSTANCE_TERMINATION_TIMEOUT
+        if body.get('gracefulTerminationTimeout'):
+            timeout = body['gracefulTerminationTimeout'] + EXTRA_WAITING_TIME
+        try:
+            results = teardown.terminate(
+                client, vnf_instances, body, delete=delete,
+                max_workers=parsed_args.parallel, timeout=timeout,
+                poll_interval=SLEEP_TIME, progress=progress, journal=jrnl)
+        finally:
+            if jrnl is not None:
+                jrnl.close()
+
+        error_count = 0
+        for vnf_instance, result in results.items():
+            if result['status'] == teardown.FAILED:
+                error_count += 1
+                LOG.error(_("Failed to terminate vnf instance with "
+                            "ID '%(vnf)s': %(e)s"),
+                          {'vnf': vnf_instance, 'e': result['error']})
+        total = len(vnf_instances)
+        if error_count > 0:
+            msg = (_("Failed to terminate %(error_count)s of %(total)s "
+                     "vnf instances.") % {'error_count': error_count,
+                                          'total': total})
+            raise exceptions.CommandError(message=msg)
+        if delete:
+            print(_("All %s vnf instances are terminated and deleted "
+                    "successfully") % total)
+        else:
+            print(_("Terminate requests for all %s vnf instances have been "
+                    "accepted.") % total)
+
     def _wait_until_vnf_is_terminated(self, client, vnf_instance_id,
                                       graceful_timeout=None):
         # wait until vnf instance 'instantiationState' is set to
@@ -346,6 +563,7 @@ class TerminateVnfLcm(command.Command):
             timeout = VNF_INSTANCE_TERMINATION_TIMEOUT
 
         start_time = int(time.time())
+        client = client.fork(fresh=True)
         while True:
             vnf_instance = client.show_vnf_instance(vnf_instance_id)
             if vnf_instance['instantiationState'] == 'NOT_INSTANTIATED':
@@ -589,3 +807,255 @@ class ChangeVnfPkgVnfLcm(command.Command):
         if not result:
             print((_('Change Current VNF Package for VNF Instance %s '
                      'has been accepted.') % parsed_args.vnf_instance))
+
+
+class BatchCreateVnfLcm(command.Command):
+    """Vnf lcm batch create
+
+    BatchCreateVnfLcm creates and instantiates the VNF instances listed in
+    a manifest, see tackerclient.common.fleet for its format.
+    """
+
+    _description = _("Create and instantiate VNF instances from a manifest")
+
+    def get_parser(self, prog_name):
+        parser = super(BatchCreateVnfLcm, self).get_parser(prog_name)
+        parser.add_argument(
+            'manifest',
+            metavar="<manifest-file>",
+            nargs='?',
+            help=_('YAML, JSON or CSV (.csv) file listing the VNF instances '
+                   'to create, with their vnfdId, instantiate request '
+                   'parameters and dependencies. Not used with --resume.'))
+        parser.add_argument(
+            '--base-params',
+            metavar="<param-file>",
+            help=_('Instantiate request parameters shared by all the VNF '
+                   'instances in a json file, overridden by the manifest.'))
+        parser.add_argument(
+            '--parallel',
+            metavar="<count>",
+            type=int,
+            default=fleet.DEFAULT_PARALLEL,
+            help=_('Maximum number of create, instantiate and wait steps '
+                   'run concurrently (default: %d)') % fleet.DEFAULT_PARALLEL)
+        parser.add_argument(
+            '--timeout',
+            metavar="<seconds>",
+            type=int,
+            default=fleet.DEFAULT_TIMEOUT,
+            help=_('Time to wait for the instantiation of each VNF '
+                   'instance (default: %d)') % fleet.DEFAULT_TIMEOUT)
+        parser.add_argument(
+            '--report',
+            metavar="<report-file>",
+            help=_('Write the result of each VNF instance to a json file.'))
+        journal_group = parser.add_mutually_exclusive_group()
+        journal_group.add_argument(
+            '--journal',
+            metavar="<journal-file>",
+            help=_('Record each step into a new journal file, from which '
+                   'the run can be resumed if it is interrupted.'))
+        journal_group.add_argument(
+            '--resume',
+            metavar="<journal-file>",
+            help=_('Resume the run recorded in a journal file. Finished '
+                   'steps are skipped and the operations which were in '
+                   'progress are waited for.'))
+        return parser
+
+    def _load(self, parsed_args):
+        if parsed_args.resume:
+            if parsed_args.manifest or parsed_args.base_params:
+                raise exceptions.InvalidInput(
+                    reason=_('The manifest of a resumed run is read from '
+                             'its journal'))
+            jrnl = journal.Journal(parsed_args.resume)
+            return fleet.journal_vnfs(jrnl), jrnl
+
+        if not parsed_args.manifest:
+            raise exceptions.InvalidInput(
+                reason=_('A manifest file is required'))
+        base_params = None
+        if parsed_args.base_params:
+            base_params = tacker_osc_utils.jsonfile2body(
+                parsed_args.base_params)
+        vnfs = fleet.load_manifest(parsed_args.manifest,
+                                   base_params=base_params)
+        jrnl = None
+        if parsed_args.journal:
+            jrnl = journal.Journal(parsed_args.journal)
+            if jrnl.header is not None:
+                jrnl.close()
+                raise exceptions.InvalidInput(
+                    reason=_('Journal %s already exists, use --resume to '
+                             'resume its run') % parsed_args.journal)
+        return vnfs, jrnl
+
+    def take_action(self, parsed_args):
+        client = self.app.client_manager.tackerclient
+        vnfs, jrnl = self._load(parsed_args)
+        last_steps = dict(
+            (vnf['name'], fleet.WAIT if vnf['instantiate'] else fleet.CREATE)
+            for vnf in vnfs)
+        finished = set()
+
+        def progress(name, step, status):
+            if status in (scheduler.FAILED, scheduler.SKIPPED) or (
+                    status == scheduler.SUCCEEDED and
+                    step == last_steps[name]):
+                finished.add(name)
+            self.app.stderr.write('[%d/%d] %s %s %s\n' % (
+                len(finished), len(vnfs), name, step, status))
+            self.app.stderr.flush()
+
+        try:
+            report = fleet.deploy(client, vnfs,
+                                  max_workers=parsed_args.parallel,
+                                  timeout=parsed_args.timeout,
+                                  progress=progress, journal=jrnl)
+        finally:
+            if jrnl is not None:
+                jrnl.close()
+
+        if parsed_args.report:
+            with open(parsed_args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+
+        for result in report['vnfs']:
+            if result['status'] == scheduler.FAILED:
+                LOG.error(_("Failed to %(step)s VNF instance '%(name)s': "
+                            "%(e)s"), {'step': result['failedStep'],
+                                       'name': result['name'],
+                                       'e': result['error']})
+        summary = report['summary']
+        if summary[scheduler.FAILED] or summary[scheduler.SKIPPED]:
+            msg = (_("Failed to create %(failed)s and skipped %(skipped)s of "
+                     "%(total)s VNF instances.") % {
+                'failed': summary[scheduler.FAILED],
+                'skipped': summary[scheduler.SKIPPED],
+                'total': len(vnfs)})
+            raise exceptions.CommandError(message=msg)
+        print(_('All %s VNF instances are created successfully') % len(vnfs))
+
+
+class BatchChangeVnfPkgVnfLcm(command.Command):
+    """Vnf lcm batch change-vnfpkg
+
+    BatchChangeVnfPkgVnfLcm changes the VNF package of the VNF instances
+    matching a filter in waves, see tackerclient.common.rollout.
+    """
+
+    _description = _("Change the current VNF package of VNF instances in "
+                     "waves")
+
+    def get_parser(self, prog_name):
+        parser = super(BatchChangeVnfPkgVnfLcm, self).get_parser(prog_name)
+        parser.add_argument(
+            'request_file',
+            metavar="<param-file>",
+            help=_("Specify change-vnfpkg request parameters "
+                   "in a json file."))
+        parser.add_argument(
+            '--filter',
+            metavar="<filter>",
+            required=True,
+            help=_("Attribute-based-filtering parameters selecting the "
+                   "instantiated VNF instances to change, e.g. "
+                   "(eq,vnfdId,<vnfd-id>)"))
+        parser.add_argument(
+            '--canary',
+            metavar="<count>",
+            type=int,
+            default=rollout.DEFAULT_CANARY,
+            help=_('Number of VNF instances of the first wave '
+                   '(default: %d)') % rollout.DEFAULT_CANARY)
+        parser.add_argument(
+            '--growth',
+            metavar="<factor>",
+            type=float,
+            default=rollout.DEFAULT_GROWTH,
+            help=_('Factor by which each wave is larger than the previous '
+                   'one (default: %s)') % rollout.DEFAULT_GROWTH)
+        parser.add_argument(
+            '--parallel',
+            metavar="<count>",
+            type=int,
+            default=fleet.DEFAULT_PARALLEL,
+            help=_('Maximum number of operations in progress '
+                   '(default: %d)') % fleet.DEFAULT_PARALLEL)
+        parser.add_argument(
+            '--max-failure-rate',
+            metavar="<percent>",
+            type=float,
+            default=0,
+            help=_('Stop after a wave whose percentage of failed operations '
+                   'is over this value (default: 0)'))
+        parser.add_argument(
+            '--rollback',
+            action='store_true',
+            default=False,
+            help=_('Roll back the failed operations'))
+        parser.add_argument(
+            '--timeout',
+            metavar="<seconds>",
+            type=int,
+            default=fleet.DEFAULT_TIMEOUT,
+            help=_('Time to wait for each operation '
+                   '(default: %d)') % fleet.DEFAULT_TIMEOUT)
+        parser.add_argument(
+            '--report',
+            metavar="<report-file>",
+            help=_('Write the result of each VNF instance to a json file.'))
+        return parser
+
+    def take_action(self, parsed_args):
+        client = self.app.client_manager.tackerclient
+        body = tacker_osc_utils.jsonfile2body(parsed_args.request_file)
+        vnf_instance_ids = fleet.select_vnf_instances(client,
+                                                      parsed_args.filter)
+        if not vnf_instance_ids:
+            print(_('No VNF instance matches the filter'))
+            return
+        waves = rollout.plan_waves(len(vnf_instance_ids), parsed_args.canary,
+                                   parsed_args.growth)
+        self.app.stderr.write(
+            _('Changing the VNF package of %(count)d VNF instances in '
+              '%(waves)d waves\n') % {'count': len(vnf_instance_ids),
+                                      'waves': len(waves)})
+
+        def progress(wave, vnf_instance_id, status):
+            self.app.stderr.write('[%d/%d] %s %s\n' % (
+                wave, len(waves), vnf_instance_id, status))
+            self.app.stderr.flush()
+
+        report = rollout.change_vnfpkg(
+            client, vnf_instance_ids, body, canary=parsed_args.canary,
+            growth=parsed_args.growth, max_in_flight=parsed_args.parallel,
+            max_failure_rate=parsed_args.max_failure_rate,
+            rollback=parsed_args.rollback, timeout=parsed_args.timeout,
+            progress=progress)
+
+        if parsed_args.report:
+            with open(parsed_args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+
+        for result in report['vnfs']:
+            if result['error']:
+                LOG.error(_("Failed to change the VNF package of VNF "
+                            "instance '%(id)s': %(e)s"),
+                          {'id': result['vnfInstanceId'],
+                           'e': result['error']})
+        summary = report['summary']
+        if report['stopped'] or summary[scheduler.FAILED] or summary[
+                rollout.ROLLED_BACK]:
+            msg = (_("Failed to change the VNF package of %(failed)s of "
+                     "%(total)s VNF instances, %(not_started)s not "
+                     "started.") % {
+                'failed': (summary[scheduler.FAILED] +
+                           summary[rollout.ROLLED_BACK]),
+                'total': len(vnf_instance_ids),
+                'not_started': summary[rollout.NOT_STARTED]})
+            raise exceptions.CommandError(message=msg)
+        print(_('The VNF package of all %s VNF instances is changed '
+                'successfully') % len(vnf_instance_ids))
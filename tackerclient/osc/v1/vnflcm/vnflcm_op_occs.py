@@ -10,14 +10,26 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import logging
+
 from osc_lib.command import command
 from osc_lib import utils
+
+from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.common import fleet
+from tackerclient.common import inventory
+from tackerclient.common import recovery
 from tackerclient.i18n import _
+from tackerclient.osc.common import show
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
 
 _VNF_LCM_OP_OCC_ID = 'vnf_lcm_op_occ_id'
 
+LOG = logging.getLogger(__name__)
+
 _MIXED_CASE_FIELDS = ['operationState', 'stateEnteredTime', 'startTime',
                       'vnfInstanceId', 'grantId', 'isAutomaticInvocation',
                       'isCancelPending', 'cancelMode', 'operationParams',
@@ -70,6 +82,131 @@ def _get_columns(vnflcm_op_occ_obj, action=None):
                                                            column_map)
 
 
+def _add_target_arguments(parser):
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument(
+        _VNF_LCM_OP_OCC_ID,
+        metavar="<vnf-lcm-op-occ-id>",
+        nargs='?',
+        help=_('VNF lifecycle management operation occurrence ID.'))
+    target_group.add_argument(
+        '--filter',
+        metavar="<filter>",
+        help=_("Attribute-based-filtering parameters selecting the LCM "
+               "operation occurrences to act on, e.g. "
+               "(eq,operationState,FAILED_TEMP);(eq,operation,INSTANTIATE)"))
+    # The defaults of the bulk options are set by _take_bulk_action, so
+    # that _check_target_arguments can tell the options given
+    parser.add_argument(
+        '--parallel',
+        metavar="<count>",
+        type=int,
+        help=_('Maximum number of requests sent concurrently with '
+               '--filter (default: %d)') % fleet.DEFAULT_PARALLEL)
+    parser.add_argument(
+        '--rate',
+        metavar="<requests-per-second>",
+        type=float,
+        help=_('Maximum number of requests sent per second with --filter '
+               '(default: no limit)'))
+    parser.add_argument(
+        '--wait',
+        action='store_true',
+        help=_('Wait for the LCM operations selected with --filter to '
+               'settle'))
+    parser.add_argument(
+        '--timeout',
+        metavar="<seconds>",
+        type=int,
+        help=_('Seconds to wait for each LCM operation with --wait '
+               '(default: %d)') % fleet.DEFAULT_TIMEOUT)
+
+
+def _check_target_arguments(parsed_args):
+    """Reject the bulk options given with an LCM operation occurrence ID.
+
+    Raises:
+        CommandError: if a bulk option is given without --filter.
+    """
+    if parsed_args.filter:
+        return
+    given = [option for option, value in (
+        ('--parallel', parsed_args.parallel), ('--rate', parsed_args.rate),
+        ('--wait', parsed_args.wait or None),
+        ('--timeout', parsed_args.timeout)) if value is not None]
+    if given:
+        msg = (_("%s can only be used with --filter") % ', '.join(given))
+        raise exceptions.CommandError(message=msg)
+
+
+def _take_bulk_action(app, parsed_args, action, show=False):
+    """Run an action on the LCM operation occurrences matching --filter.
+
+    The result of each operation and a summary are printed. With show, for
+    ShowOne commands, the results are returned as the columns and data of
+    a ShowOne, one field per operation, and the summary is written to
+    stderr.
+
+    Raises:
+        CommandError: if the action failed for any operation.
+    """
+    client = app.client_manager.tackerclient
+    op_occs = recovery.select_op_occs(client, parsed_args.filter)
+    if not op_occs:
+        msg = _('No LCM operation occurrence matches the filter')
+        if show:
+            app.stderr.write(msg + '\n')
+            return (), ()
+        print(msg)
+        return
+
+    def progress(op_occ_id, status):
+        app.stderr.write('%s %s\n' % (op_occ_id, status))
+        app.stderr.flush()
+
+    results = recovery.run(
+        client, op_occs, action,
+        cancel_mode=getattr(parsed_args, 'cancel_mode', 'GRACEFUL'),
+        max_workers=(fleet.DEFAULT_PARALLEL if parsed_args.parallel is None
+                     else parsed_args.parallel),
+        rate=parsed_args.rate, wait=parsed_args.wait,
+        timeout=(fleet.DEFAULT_TIMEOUT if parsed_args.timeout is None
+                 else parsed_args.timeout),
+        poll_interval=fleet.POLL_INTERVAL, progress=progress)
+
+    summary = collections.Counter()
+    rows = collections.OrderedDict()
+    for op_occ_id, result in results.items():
+        summary[result['status']] += 1
+        if result['status'] == recovery.FAILED:
+            LOG.error(_("Failed to %(action)s LCM operation %(id)s: "
+                        "%(e)s"), {'action': action, 'id': op_occ_id,
+                                   'e': result['error']})
+            continue
+        rows[op_occ_id] = '%s (%s)' % (result['status'],
+                                       result['operationState'])
+        if not show:
+            print(_('LCM operation %(id)s: %(row)s') % {
+                'id': op_occ_id, 'row': rows[op_occ_id]})
+    total = len(results)
+    msg = (_('%(action)s of %(total)s LCM operations: %(summary)s') % {
+        'action': action.capitalize(), 'total': total,
+        'summary': ', '.join('%s %s' % (count, status)
+                             for status, count in sorted(summary.items()))})
+    if show:
+        app.stderr.write(msg + '\n')
+    else:
+        print(msg)
+    if summary[recovery.FAILED]:
+        msg = (_("Failed to %(action)s %(error_count)s of %(total)s LCM "
+                 "operations.") % {'action': action,
+                                   'error_count': summary[recovery.FAILED],
+                                   'total': total})
+        raise exceptions.CommandError(message=msg)
+    if show:
+        return tuple(rows), tuple(rows.values())
+
+
 class RollbackVnfLcmOp(command.Command):
     def get_parser(self, prog_name):
         """Add arguments to parser.
@@ -81,10 +218,7 @@ class RollbackVnfLcmOp(command.Command):
             parser([ArgumentParser]):
         """
         parser = super(RollbackVnfLcmOp, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_LCM_OP_OCC_ID,
-            metavar="<vnf-lcm-op-occ-id>",
-            help=_('VNF lifecycle management operation occurrence ID.'))
+        _add_target_arguments(parser)
 
         return parser
 
@@ -94,6 +228,9 @@ class RollbackVnfLcmOp(command.Command):
         Args:
             parsed_args ([Namespace]): arguments of CLI.
         """
+        _check_target_arguments(parsed_args)
+        if parsed_args.filter:
+            return _take_bulk_action(self.app, parsed_args, recovery.ROLLBACK)
         client = self.app.client_manager.tackerclient
         result = client.rollback_vnf_instance(parsed_args.vnf_lcm_op_occ_id)
         if not result:
@@ -114,10 +251,7 @@ class CancelVnfLcmOp(command.ShowOne):
             parser([ArgumentParser]):
         """
         parser = super(CancelVnfLcmOp, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_LCM_OP_OCC_ID,
-            metavar="<vnf-lcm-op-occ-id>",
-            help=_('VNF lifecycle management operation occurrence ID.'))
+        _add_target_arguments(parser)
         parser.add_argument(
             "--cancel-mode",
             default='GRACEFUL',
@@ -133,6 +267,10 @@ class CancelVnfLcmOp(command.ShowOne):
         Args:
             parsed_args ([Namespace]): arguments of CLI.
         """
+        _check_target_arguments(parsed_args)
+        if parsed_args.filter:
+            return _take_bulk_action(self.app, parsed_args, recovery.CANCEL,
+                                     show=True)
         client = self.app.client_manager.tackerclient
         result = client.cancel_vnf_instance(
             parsed_args.vnf_lcm_op_occ_id,
@@ -155,10 +293,7 @@ class FailVnfLcmOp(command.ShowOne):
             parser([ArgumentParser]):
         """
         parser = super(FailVnfLcmOp, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_LCM_OP_OCC_ID,
-            metavar="<vnf-lcm-op-occ-id>",
-            help=_('VNF lifecycle management operation occurrence ID.'))
+        _add_target_arguments(parser)
         return parser
 
     def take_action(self, parsed_args):
@@ -167,6 +302,10 @@ class FailVnfLcmOp(command.ShowOne):
         Args:
             parsed_args ([Namespace]): arguments of CLI.
         """
+        _check_target_arguments(parsed_args)
+        if parsed_args.filter:
+            return _take_bulk_action(self.app, parsed_args, recovery.FAIL,
+                                     show=True)
         client = self.app.client_manager.tackerclient
         obj = client.fail_vnf_instance(parsed_args.vnf_lcm_op_occ_id)
         display_columns, columns = _get_columns(obj)
@@ -191,10 +330,7 @@ class RetryVnfLcmOp(command.Command):
         """
 
         parser = super(RetryVnfLcmOp, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_LCM_OP_OCC_ID,
-            metavar="<vnf-lcm-op-occ-id>",
-            help=_('VNF lifecycle management operation occurrence ID.'))
+        _add_target_arguments(parser)
         return parser
 
     def take_action(self, parsed_args):
@@ -203,6 +339,9 @@ class RetryVnfLcmOp(command.Command):
         Args:
             parsed_args ([Namespace]): arguments of CLI.
         """
+        _check_target_arguments(parsed_args)
+        if parsed_args.filter:
+            return _take_bulk_action(self.app, parsed_args, recovery.RETRY)
         client = self.app.client_manager.tackerclient
         result = client.retry_vnf_instance(parsed_args.vnf_lcm_op_occ_id)
         if not result:
@@ -213,6 +352,10 @@ class RetryVnfLcmOp(command.Command):
 class ListVnfLcmOp(command.Lister):
     _description = _("List LCM Operation Occurrences")
 
+    # Complex attributes the server excludes with exclude_default
+    _complex_fields = ('operationParams', 'error', 'resourceChanges',
+                       'changedInfo', 'changedExtConnectivity')
+
     def get_parser(self, program_name):
         """Add arguments to parser.
 
@@ -240,6 +383,7 @@ class ListVnfLcmOp(command.Lister):
             metavar="<exclude-fields>",
             help=_("Complex attributes to be excluded from the response"),
         )
+        tacker_osc_utils.add_inventory_options_to_parser(parser)
         return parser
 
     def get_attributes(self, exclude=None):
@@ -293,6 +437,7 @@ class ListVnfLcmOp(command.Lister):
         extra_fields = []
 
         if parsed_args.filter:
+            filters.parse(parsed_args.filter)
             params['filter'] = parsed_args.filter
         if parsed_args.fields:
             params['fields'] = parsed_args.fields
@@ -303,9 +448,18 @@ class ListVnfLcmOp(command.Lister):
             params['exclude-fields'] = parsed_args.exclude_fields
             fields = parsed_args.exclude_fields.split(',')
             exclude_fields.extend(fields)
+        if not (parsed_args.fields or parsed_args.exclude_fields):
+            params.update(tacker_osc_utils.get_attribute_selectors(
+                parsed_args.columns, self.get_attributes(),
+                self._complex_fields))
 
         client = self.app.client_manager.tackerclient
-        vnflcm_op_occs = client.list_vnf_lcm_op_occs(**params)
+        if parsed_args.from_cache:
+            vnflcm_op_occs = inventory.list_resources(
+                client, inventory.VNF_LCM_OP_OCCS,
+                filter_expr=parsed_args.filter, max_age=parsed_args.max_age)
+        else:
+            vnflcm_op_occs = client.list_vnf_lcm_op_occs(**params)
         headers, columns = tacker_osc_utils.get_column_definitions(
             self.get_attributes(exclude=exclude_fields),
             long_listing=True)
@@ -318,7 +472,7 @@ class ListVnfLcmOp(command.Lister):
         return (headers, dictionary_properties)
 
 
-class ShowVnfLcmOp(command.ShowOne):
+class ShowVnfLcmOp(show.ShowMany):
     _description = _("Display Operation Occurrence details")
 
     def get_parser(self, program_name):
@@ -331,20 +485,20 @@ class ShowVnfLcmOp(command.ShowOne):
             parser([ArgumentParser]):
         """
         parser = super(ShowVnfLcmOp, self).get_parser(program_name)
-        parser.add_argument(
-            _VNF_LCM_OP_OCC_ID,
+        self.add_id_arguments(
+            parser, _VNF_LCM_OP_OCC_ID,
             metavar="<vnf-lcm-op-occ-id>",
             help=_('VNF lifecycle management operation occurrence ID.'))
         return parser
 
-    def take_action(self, parsed_args):
-        """Execute show_vnf_lcm_op_occs and output response.
+    def show(self, client, vnf_lcm_op_occ_id):
+        """Execute show_vnf_lcm_op_occs and return the data to display.
 
         Args:
-            parsed_args ([Namespace]): arguments of CLI.
+            client ([Client]): tacker client.
+            vnf_lcm_op_occ_id ([str]): operation occurrence ID.
         """
-        client = self.app.client_manager.tackerclient
-        obj = client.show_vnf_lcm_op_occs(parsed_args.vnf_lcm_op_occ_id)
+        obj = client.show_vnf_lcm_op_occs(vnf_lcm_op_occ_id)
         display_columns, columns = _get_columns(obj, action='show')
         data = utils.get_item_properties(
             sdk_utils.DictModel(obj),
@@ -18,7 +18,9 @@ import logging
 from osc_lib.command import command
 from osc_lib import utils
 from tackerclient.common import exceptions
+from tackerclient.common import filters
 from tackerclient.i18n import _
+from tackerclient.osc.common import show
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
 
@@ -144,6 +146,7 @@ class ListLccnSubscription(command.Lister):
         params = {}
 
         if parsed_args.filter:
+            filters.parse(parsed_args.filter)
             params['filter'] = parsed_args.filter
 
         client = self.app.client_manager.tackerclient
@@ -159,20 +162,19 @@ class ListLccnSubscription(command.Lister):
         return (headers, dictionary_properties)
 
 
-class ShowLccnSubscription(command.ShowOne):
+class ShowLccnSubscription(show.ShowMany):
     _description = _("Display Lccn Subscription details")
 
     def get_parser(self, program_name):
         parser = super(ShowLccnSubscription, self).get_parser(program_name)
-        parser.add_argument(
-            _LCCN_SUBSCRIPTION_ID,
+        self.add_id_arguments(
+            parser, _LCCN_SUBSCRIPTION_ID,
             metavar="<subscription-id>",
             help=_('Lccn Subscription ID to display'))
         return parser
 
-    def take_action(self, parsed_args):
-        client = self.app.client_manager.tackerclient
-        obj = client.show_lccn_subscription(parsed_args.subscription_id)
+    def show(self, client, subscription_id):
+        obj = client.show_lccn_subscription(subscription_id)
         display_columns, columns = _get_columns(obj)
         data = utils.get_item_properties(
             sdk_utils.DictModel(obj),
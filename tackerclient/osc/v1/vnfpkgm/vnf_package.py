@@ -14,6 +14,7 @@
 #    under the License.
 
 from functools import reduce
+import json
 import logging
 import sys
 
@@ -21,8 +22,16 @@ from osc_lib.cli import parseractions
 from osc_lib.command import command
 from osc_lib import utils
 
+from tackerclient.common import artifacts
+from tackerclient.common import cache
+from tackerclient.common import csar
 from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.common import fleet
+from tackerclient.common import inventory
+from tackerclient.common import onboarding
 from tackerclient.i18n import _
+from tackerclient.osc.common import show
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
 
@@ -103,6 +112,10 @@ class CreateVnfPackage(command.ShowOne):
 class ListVnfPackage(command.Lister):
     _description = _("List VNF Packages")
 
+    # Complex attributes the server excludes with exclude_default
+    _complex_fields = ('checksum', 'softwareImages', 'userDefinedData',
+                       'additionalArtifacts')
+
     def get_parser(self, prog_name):
         LOG.debug('get_parser(%s)', prog_name)
         parser = super(ListVnfPackage, self).get_parser(prog_name)
@@ -138,6 +151,7 @@ class ListVnfPackage(command.Lister):
                    " with --fields and --filter. For all other combinations"
                    " tacker server will throw bad request error"),
         )
+        tacker_osc_utils.add_inventory_options_to_parser(parser)
         return parser
 
     def case_modify(self, field):
@@ -148,11 +162,7 @@ class ListVnfPackage(command.Lister):
                        exclude_fields=None, exclude_default=False):
         fields = ['id', 'vnfProductName', 'onboardingState',
                   'usageState', 'operationalState', '_links']
-        complex_fields = [
-            'checksum',
-            'softwareImages',
-            'userDefinedData',
-            'additionalArtifacts']
+        complex_fields = list(self._complex_fields)
         simple_fields = ['vnfdVersion', 'vnfProvider', 'vnfSoftwareVersion',
                          'vnfdId']
 
@@ -186,6 +196,7 @@ class ListVnfPackage(command.Lister):
         all_fields = False
         exclude_default = False
         if parsed_args.filter:
+            filters.parse(parsed_args.filter)
             _params['filter'] = parsed_args.filter
         if parsed_args.fields:
             _params['fields'] = parsed_args.fields
@@ -202,9 +213,20 @@ class ListVnfPackage(command.Lister):
         if parsed_args.all_fields:
             _params['all_fields'] = None
             all_fields = True
+        if not (parsed_args.fields or parsed_args.exclude_fields or
+                parsed_args.all_fields or parsed_args.exclude_default):
+            _params.update(tacker_osc_utils.get_attribute_selectors(
+                parsed_args.columns, self.get_attributes(),
+                self._complex_fields))
 
         client = self.app.client_manager.tackerclient
-        data = client.list_vnf_packages(**_params)
+        if parsed_args.from_cache:
+            data = {'vnf_packages': inventory.list_resources(
+                client, inventory.VNF_PACKAGES,
+                filter_expr=parsed_args.filter,
+                max_age=parsed_args.max_age)}
+        else:
+            data = client.list_vnf_packages(**_params)
         headers, columns = tacker_osc_utils.get_column_definitions(
             self.get_attributes(extra_fields, all_fields, exclude_fields,
                                 exclude_default), long_listing=True)
@@ -215,22 +237,21 @@ class ListVnfPackage(command.Lister):
                 ) for s in data['vnf_packages']))
 
 
-class ShowVnfPackage(command.ShowOne):
+class ShowVnfPackage(show.ShowMany):
     _description = _("Show VNF Package Details")
 
     def get_parser(self, prog_name):
         LOG.debug('get_parser(%s)', prog_name)
         parser = super(ShowVnfPackage, self).get_parser(prog_name)
-        parser.add_argument(
-            'vnf_package',
+        self.add_id_arguments(
+            parser, 'vnf_package',
             metavar="<vnf-package>",
             help=_("VNF package ID")
         )
         return parser
 
-    def take_action(self, parsed_args):
-        client = self.app.client_manager.tackerclient
-        vnf_package = client.show_vnf_package(parsed_args.vnf_package)
+    def show(self, client, vnf_package_id):
+        vnf_package = client.show_vnf_package(vnf_package_id)
         display_columns, columns = _get_columns(vnf_package)
         data = utils.get_item_properties(
             sdk_utils.DictModel(vnf_package),
@@ -261,6 +282,13 @@ class UploadVnfPackage(command.Command):
             metavar="<Uri>",
             help=_("Uri of the VNF package content"),
         )
+        file_source.add_argument(
+            "--directory",
+            metavar="<dir>",
+            help=_("Build a VNF CSAR package from a directory with the "
+                   "TOSCA-Metadata layout and upload it as it is built, "
+                   "without an intermediate file"),
+        )
         parser.add_argument(
             "--user-name",
             metavar="<user-name>",
@@ -271,10 +299,19 @@ class UploadVnfPackage(command.Command):
             metavar="<password>",
             help=_("Password for authentication"),
         )
+        parser.add_argument(
+            "--no-validate",
+            action="store_true",
+            help=_("Do not check the VNF CSAR package given with --path "
+                   "locally before uploading it"),
+        )
         return parser
 
     def take_action(self, parsed_args):
         client = self.app.client_manager.tackerclient
+        if parsed_args.path and not parsed_args.no_validate:
+            # Fail before sending a package the server would reject
+            csar.validate_archive(parsed_args.path)
         attrs = {}
         if parsed_args.user_name:
             attrs['userName'] = parsed_args.user_name
@@ -289,6 +326,8 @@ class UploadVnfPackage(command.Command):
         try:
             if parsed_args.path:
                 file_data = open(parsed_args.path, 'rb')
+            elif parsed_args.directory:
+                file_data = csar.CsarStream(parsed_args.directory)
             result = client.upload_vnf_package(parsed_args.vnf_package,
                                                file_data, **attrs)
             if not result:
@@ -356,6 +395,46 @@ class DeleteVnfPackage(command.Command):
         return
 
 
+def _add_cache_argument(parser):
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=_("Serve the content from the local content store if it is "
+               "there, else download it and add it to the store. The store "
+               "is bounded to env[TACKERCLIENT_CONTENT_CACHE_SIZE] MiB, "
+               "2048 by default."),
+    )
+
+
+def _download(store, key, checksum, path, download):
+    """Download content through the content store.
+
+    :param store: a tackerclient.common.cache.ContentStore
+    :param key: the key of the content in the store, None if it is not
+      cacheable
+    :param checksum: the checksum the content must match to be stored
+    :param path: the file the content is saved to, None for stdout
+    :param download: callable returning the content from the server
+    :returns: the content, as the server returns it, or None if it is
+      found in the store and has been saved to path already
+    """
+    if key is not None:
+        if path is None:
+            data = store.read(key)
+            if data is not None:
+                # The HTTP clients return ZIP files as bytes, and any
+                # other content as text, stored encoded in UTF-8
+                if data.startswith(b'PK\x03\x04'):
+                    return data
+                return data.decode('utf-8')
+        elif store.materialize(key, path):
+            return None
+    body = download()
+    if key is not None:
+        store.put(key, body, checksum)
+    return body
+
+
 class DownloadVnfPackage(command.Command):
     _description = _("Download VNF package contents or VNFD of an on-boarded "
                      "VNF package.")
@@ -391,10 +470,88 @@ class DownloadVnfPackage(command.Command):
                    "then you can specify 'both' option value. "
                    "Provide this option only when --vnfd is set.")
         )
+        _add_cache_argument(parser)
+        parser.add_argument(
+            "--delta",
+            metavar="<directory>",
+            help=_("Rebuild the package tree in a directory instead of "
+                   "downloading the package file: the VNFD and the "
+                   "artifacts are fetched separately, and the artifacts "
+                   "whose checksum matches one in the local content cache "
+                   "or in a --base are reused instead of downloaded.")
+        )
+        parser.add_argument(
+            "--base",
+            metavar="<path>",
+            action="append",
+            dest="bases",
+            default=[],
+            help=_("Package directory or CSAR file of a previous version "
+                   "of the package to reuse unchanged artifacts from "
+                   "(repeat option to give several bases). "
+                   "Provide this option only when --delta is set.")
+        )
+        parser.add_argument(
+            '--parallel',
+            metavar="<count>",
+            type=int,
+            default=fleet.DEFAULT_PARALLEL,
+            help=_('Maximum number of artifacts downloaded concurrently '
+                   'with --delta (default: %d)') % fleet.DEFAULT_PARALLEL)
         return parser
 
+    def _take_delta_action(self, client, parsed_args):
+        def progress(artifact_path, status):
+            self.app.stderr.write('%s %s\n' % (artifact_path, status))
+            self.app.stderr.flush()
+
+        fetched = artifacts.fetch_package(
+            client, parsed_args.vnf_package, parsed_args.delta,
+            store=cache.ContentStore(), bases=parsed_args.bases,
+            max_workers=parsed_args.parallel, progress=progress)
+
+        results = fetched['artifacts']
+        counts = dict((status, [0, 0]) for status in (
+            artifacts.DOWNLOADED, artifacts.REUSED, artifacts.SKIPPED))
+        error_count = 0
+        for result in results:
+            if result['status'] == artifacts.FAILED:
+                error_count += 1
+                LOG.error(_("Failed to fetch artifact %(path)s of VNF "
+                            "package %(id)s: %(e)s"),
+                          {'path': result['artifactPath'],
+                           'id': parsed_args.vnf_package,
+                           'e': result['error']})
+                continue
+            counts[result['status']][0] += 1
+            counts[result['status']][1] += result['size']
+        if error_count:
+            msg = (_("Failed to fetch %(error_count)s of %(total)s "
+                     "artifacts.") % {'error_count': error_count,
+                                      'total': len(results)})
+            raise exceptions.CommandError(message=msg)
+        print(_("VNF package %(id)s is saved to %(directory)s: %(vnfd)d VNFD "
+                "files, %(downloaded)d artifacts downloaded (%(d_size)d "
+                "bytes), %(reused)d reused (%(r_size)d bytes), %(skipped)d "
+                "already present") % {
+            'id': parsed_args.vnf_package, 'directory': parsed_args.delta,
+            'vnfd': len(fetched['vnfdFiles']),
+            'downloaded': counts[artifacts.DOWNLOADED][0],
+            'd_size': counts[artifacts.DOWNLOADED][1],
+            'reused': counts[artifacts.REUSED][0],
+            'r_size': counts[artifacts.REUSED][1],
+            'skipped': counts[artifacts.SKIPPED][0]})
+
     def take_action(self, parsed_args):
         client = self.app.client_manager.tackerclient
+        if parsed_args.delta:
+            if parsed_args.vnfd or parsed_args.file:
+                msg = _("--delta cannot be used with --vnfd or --file")
+                raise exceptions.CommandError(message=msg)
+            return self._take_delta_action(client, parsed_args)
+        if parsed_args.bases:
+            msg = _("--base can only be used with --delta")
+            raise exceptions.CommandError(message=msg)
         if parsed_args.vnfd:
             if sys.stdout.isatty() and not (parsed_args.file and
                                             parsed_args.type != "text/plain"):
@@ -403,14 +560,36 @@ class DownloadVnfPackage(command.Command):
                        "save downloaded VNFD data or use redirection.")
                 sdk_utils.exit(msg)
 
-            body = client.download_vnfd_from_vnf_package(
-                parsed_args.vnf_package, parsed_args.type)
+        store = key = checksum = None
+        if parsed_args.cache:
+            store = cache.ContentStore()
+            # Only the content of onboarded packages never changes
+            vnf_package = client.show_vnf_package(parsed_args.vnf_package)
+            if vnf_package.get('onboardingState') == 'ONBOARDED':
+                if parsed_args.vnfd:
+                    key = store.vnfd_key(vnf_package.get('vnfdId'),
+                                         parsed_args.type)
+                else:
+                    checksum = vnf_package.get('checksum')
+                    key = store.checksum_key(checksum)
+
+        if parsed_args.vnfd:
+            body = _download(
+                store, key, None, parsed_args.file,
+                lambda: client.download_vnfd_from_vnf_package(
+                    parsed_args.vnf_package, parsed_args.type))
+            if body is None:
+                return
 
             if not parsed_args.file:
                 print(body)
                 return
         else:
-            body = client.download_vnf_package(parsed_args.vnf_package)
+            body = _download(
+                store, key, checksum, parsed_args.file,
+                lambda: client.download_vnf_package(parsed_args.vnf_package))
+            if body is None:
+                return
 
         sdk_utils.save_data(body, parsed_args.file)
 
@@ -438,6 +617,7 @@ class DownloadVnfPackageArtifact(command.Command):
                    "file data. If this is not specified and "
                    "there is no redirection then data will not be saved.")
         )
+        _add_cache_argument(parser)
         return parser
 
     def take_action(self, parsed_args):
@@ -450,8 +630,23 @@ class DownloadVnfPackageArtifact(command.Command):
                 "save downloaded vnf package artifact data "
                 "or use redirection.")
             sdk_utils.exit(msg)
-        body = client.download_artifact_from_vnf_package(
-            parsed_args.vnf_package, parsed_args.artifact_path)
+
+        store = key = checksum = None
+        if parsed_args.cache:
+            store = cache.ContentStore()
+            vnf_package = client.show_vnf_package(parsed_args.vnf_package)
+            if vnf_package.get('onboardingState') == 'ONBOARDED':
+                checksums = dict(
+                    (artifact.get('artifactPath'), artifact.get('checksum'))
+                    for artifact in vnf_package.get('additionalArtifacts', []))
+                checksum = checksums.get(parsed_args.artifact_path)
+                key = store.checksum_key(checksum)
+        body = _download(
+            store, key, checksum, parsed_args.file,
+            lambda: client.download_artifact_from_vnf_package(
+                parsed_args.vnf_package, parsed_args.artifact_path))
+        if body is None:
+            return
 
         if not parsed_args.file:
             print(body)
@@ -460,6 +655,83 @@ class DownloadVnfPackageArtifact(command.Command):
             sdk_utils.save_data(body, parsed_args.file)
 
 
+class MirrorVnfPackageArtifacts(command.Command):
+    """Vnf package artifact mirror
+
+    MirrorVnfPackageArtifacts downloads the additional artifacts of a VNF
+    package concurrently into a directory, see
+    tackerclient.common.artifacts.
+    """
+
+    _description = _("Download the artifacts of an on-boarded VNF package "
+                     "into a directory.")
+
+    def get_parser(self, prog_name):
+        LOG.debug('get_parser(%s)', prog_name)
+        parser = super(MirrorVnfPackageArtifacts, self).get_parser(prog_name)
+        parser.add_argument(
+            "vnf_package",
+            metavar="<vnf-package>",
+            help=_("VNF package ID")
+        )
+        parser.add_argument(
+            "directory",
+            metavar="<directory>",
+            help=_("Directory the artifacts are saved to, under their "
+                   "artifact path. Artifacts already downloaded there are "
+                   "only checked against their checksum.")
+        )
+        parser.add_argument(
+            "--artifact",
+            metavar="<artifact-path>",
+            action="append",
+            dest="artifact_paths",
+            help=_("Path of an artifact to download, all the artifacts by "
+                   "default (repeat option to download several artifacts)")
+        )
+        parser.add_argument(
+            '--parallel',
+            metavar="<count>",
+            type=int,
+            default=fleet.DEFAULT_PARALLEL,
+            help=_('Maximum number of artifacts downloaded concurrently '
+                   '(default: %d)') % fleet.DEFAULT_PARALLEL)
+        return parser
+
+    def take_action(self, parsed_args):
+        client = self.app.client_manager.tackerclient
+
+        def progress(artifact_path, status):
+            self.app.stderr.write('%s %s\n' % (artifact_path, status))
+            self.app.stderr.flush()
+
+        results = artifacts.mirror(
+            client, parsed_args.vnf_package, parsed_args.directory,
+            artifact_paths=parsed_args.artifact_paths,
+            max_workers=parsed_args.parallel, progress=progress)
+
+        error_count = 0
+        for result in results:
+            if result['status'] == artifacts.FAILED:
+                error_count += 1
+                LOG.error(_("Failed to download artifact %(path)s of VNF "
+                            "package %(id)s: %(e)s"),
+                          {'path': result['artifactPath'],
+                           'id': parsed_args.vnf_package,
+                           'e': result['error']})
+                continue
+            print(_("%(path)s: %(status)s, %(size)d bytes") % {
+                'path': result['path'], 'status': result['status'],
+                'size': result['size']})
+        if error_count:
+            msg = (_("Failed to download %(error_count)s of %(total)s "
+                     "artifacts.") % {'error_count': error_count,
+                                      'total': len(results)})
+            raise exceptions.CommandError(message=msg)
+        print(_('All %s artifacts are downloaded successfully')
+              % len(results))
+
+
 class UpdateVnfPackage(command.ShowOne):
     _description = _("Update information about an individual VNF package")
 
@@ -520,3 +792,107 @@ class UpdateVnfPackage(command.ShowOne):
             columns, formatters=formatters,
             mixed_case_fields=_mixed_case_fields)
         return (display_columns, data)
+
+
+class OnboardVnfPackage(command.Command):
+    """Vnf package onboard
+
+    OnboardVnfPackage creates a VNF package for each CSAR, uploads its
+    content and waits for it to be onboarded, see
+    tackerclient.common.onboarding.
+    """
+
+    _description = _("Create, upload and onboard VNF packages from CSARs")
+
+    def get_parser(self, prog_name):
+        LOG.debug('get_parser(%s)', prog_name)
+        parser = super(OnboardVnfPackage, self).get_parser(prog_name)
+        parser.add_argument(
+            'sources',
+            metavar="<csar>",
+            nargs='+',
+            help=_("VNF CSAR file, directory whose .csar and .zip files are "
+                   "onboarded, or Uri of a VNF package content"))
+        parser.add_argument(
+            '--user-data',
+            metavar='<key=value>',
+            action=parseractions.KeyValueAction,
+            help=_('User defined data for the VNF packages '
+                   '(repeat option to set multiple user defined data)'),
+        )
+        parser.add_argument(
+            "--user-name",
+            metavar="<user-name>",
+            help=_("User name for authentication to the Uris"),
+        )
+        parser.add_argument(
+            "--password",
+            metavar="<password>",
+            help=_("Password for authentication to the Uris"),
+        )
+        parser.add_argument(
+            '--parallel',
+            metavar="<count>",
+            type=int,
+            default=fleet.DEFAULT_PARALLEL,
+            help=_('Maximum number of create and upload requests sent '
+                   'concurrently (default: %d)') % fleet.DEFAULT_PARALLEL)
+        parser.add_argument(
+            '--timeout',
+            metavar="<seconds>",
+            type=int,
+            default=fleet.DEFAULT_TIMEOUT,
+            help=_('Time to wait for the onboarding of each VNF package '
+                   'once uploaded (default: %d)') % fleet.DEFAULT_TIMEOUT)
+        parser.add_argument(
+            '--report',
+            metavar="<report-file>",
+            help=_('Write the result of each VNF package to a json file.'))
+        return parser
+
+    def take_action(self, parsed_args):
+        client = self.app.client_manager.tackerclient
+        csars = onboarding.find_sources(parsed_args.sources)
+        finished = set()
+
+        def progress(source, status):
+            if status in (onboarding.ONBOARDED, onboarding.FAILED):
+                finished.add(source)
+            self.app.stderr.write('[%d/%d] %s %s\n' % (
+                len(finished), len(csars), source, status))
+            self.app.stderr.flush()
+
+        results = onboarding.onboard(
+            client, csars, user_data=parsed_args.user_data,
+            user_name=parsed_args.user_name, password=parsed_args.password,
+            max_workers=parsed_args.parallel, timeout=parsed_args.timeout,
+            poll_interval=fleet.POLL_INTERVAL, progress=progress)
+
+        if parsed_args.report:
+            with open(parsed_args.report, 'w') as f:
+                json.dump(results, f, indent=2)
+
+        error_count = 0
+        for result in results:
+            timings = ', '.join('%s %.1fs' % item
+                                for item in result['timings'].items())
+            if result['status'] == onboarding.FAILED:
+                error_count += 1
+                LOG.error(_("Failed to %(step)s VNF package of '%(source)s' "
+                            "(%(id)s): %(e)s"),
+                          {'step': result['failedStep'],
+                           'source': result['source'],
+                           'id': result['vnfPkgId'], 'e': result['error']})
+                continue
+            print(_("%(source)s: VNF package %(id)s, VNFD ID %(vnfd)s "
+                    "(%(timings)s)") % {'source': result['source'],
+                                        'id': result['vnfPkgId'],
+                                        'vnfd': result['vnfdId'],
+                                        'timings': timings})
+        if error_count:
+            msg = (_("Failed to onboard %(error_count)s of %(total)s VNF "
+                     "packages.") % {'error_count': error_count,
+                                     'total': len(results)})
+            raise exceptions.CommandError(message=msg)
+        print(_('All %s VNF packages are onboarded successfully')
+              % len(results))
@@ -18,7 +18,9 @@ import logging
 from osc_lib.command import command
 from osc_lib import utils
 
+from tackerclient.common import filters
 from tackerclient.i18n import _
+from tackerclient.osc.common import show
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
 
@@ -104,6 +106,7 @@ class ListVnfFmAlarm(command.Lister):
         _params = {}
 
         if parsed_args.filter:
+            filters.parse(parsed_args.filter)
             _params['filter'] = parsed_args.filter
 
         client = self.app.client_manager.tackerclient
@@ -117,20 +120,19 @@ class ListVnfFmAlarm(command.Lister):
                 ) for s in data['vnf_fm_alarms']))
 
 
-class ShowVnfFmAlarm(command.ShowOne):
+class ShowVnfFmAlarm(show.ShowMany):
     _description = _("Display VNF FM alarm details")
 
     def get_parser(self, prog_name):
         parser = super(ShowVnfFmAlarm, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_FM_ALARM_ID,
+        self.add_id_arguments(
+            parser, _VNF_FM_ALARM_ID,
             metavar="<vnf-fm-alarm-id>",
             help=_("VNF FM alarm ID to display"))
         return parser
 
-    def take_action(self, parsed_args):
-        client = self.app.client_manager.tackerclient
-        obj = client.show_vnf_fm_alarm(parsed_args.vnf_fm_alarm_id)
+    def show(self, client, vnf_fm_alarm_id):
+        obj = client.show_vnf_fm_alarm(vnf_fm_alarm_id)
         display_columns, columns = _get_columns(obj, action='show')
         data = utils.get_item_properties(
             sdk_utils.DictModel(obj), columns,
@@ -19,6 +19,7 @@ from osc_lib.command import command
 from osc_lib import utils
 
 from tackerclient.common import exceptions
+from tackerclient.common import filters
 from tackerclient.i18n import _
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
@@ -93,6 +94,7 @@ class ListVnfFmSub(command.Lister):
     def take_action(self, parsed_args):
         _params = {}
         if parsed_args.filter:
+            filters.parse(parsed_args.filter)
             _params['filter'] = parsed_args.filter
 
         client = self.app.client_manager.tackerclient
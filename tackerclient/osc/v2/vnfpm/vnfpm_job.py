@@ -20,7 +20,9 @@ from osc_lib.command import command
 from osc_lib import utils
 
 from tackerclient.common import exceptions
+from tackerclient.common import filters
 from tackerclient.i18n import _
+from tackerclient.osc.common import show
 from tackerclient.osc import sdk_utils
 from tackerclient.osc import utils as tacker_osc_utils
 
@@ -97,6 +99,10 @@ class CreateVnfPmJob(command.ShowOne):
 class ListVnfPmJob(command.Lister):
     _description = _("List VNF PM jobs")
 
+    # Complex attributes the server excludes with exclude_default
+    _complex_fields = ('objectInstanceIds', 'subObjectInstanceIds',
+                       'criteria', 'reports')
+
     def get_parser(self, prog_name):
         LOG.debug('get_parser(%s)', prog_name)
         parser = super(ListVnfPmJob, self).get_parser(prog_name)
@@ -141,11 +147,7 @@ class ListVnfPmJob(command.Lister):
     def get_attributes(self, extra_fields=None, all_fields=False,
                        exclude_fields=None, exclude_default=False):
         fields = ['id', 'objectType', '_links']
-        complex_fields = [
-            'objectInstanceIds',
-            'subObjectInstanceIds',
-            'criteria',
-            'reports']
+        complex_fields = list(self._complex_fields)
         simple_fields = ['callbackUri']
 
         if extra_fields:
@@ -178,6 +180,7 @@ class ListVnfPmJob(command.Lister):
         all_fields = False
         exclude_default = False
         if parsed_args.filter:
+            filters.parse(parsed_args.filter)
             _params['filter'] = parsed_args.filter
         if parsed_args.fields:
             _params['fields'] = parsed_args.fields
@@ -194,6 +197,11 @@ class ListVnfPmJob(command.Lister):
         if parsed_args.all_fields:
             _params['all_fields'] = None
             all_fields = True
+        if not (parsed_args.fields or parsed_args.exclude_fields or
+                parsed_args.all_fields or parsed_args.exclude_default):
+            _params.update(tacker_osc_utils.get_attribute_selectors(
+                parsed_args.columns, self.get_attributes(),
+                self._complex_fields))
 
         client = self.app.client_manager.tackerclient
         data = client.list_vnf_pm_jobs(**_params)
@@ -207,20 +215,19 @@ class ListVnfPmJob(command.Lister):
                 ) for s in data['vnf_pm_jobs']))
 
 
-class ShowVnfPmJob(command.ShowOne):
+class ShowVnfPmJob(show.ShowMany):
     _description = _("Display VNF PM job details")
 
     def get_parser(self, prog_name):
         parser = super(ShowVnfPmJob, self).get_parser(prog_name)
-        parser.add_argument(
-            _VNF_PM_JOB_ID,
+        self.add_id_arguments(
+            parser, _VNF_PM_JOB_ID,
             metavar="<vnf-pm-job-id>",
             help=_("VNF PM job ID to display"))
         return parser
 
-    def take_action(self, parsed_args):
-        client = self.app.client_manager.tackerclient
-        obj = client.show_vnf_pm_job(parsed_args.vnf_pm_job_id)
+    def show(self, client, vnf_pm_job_id):
+        obj = client.show_vnf_pm_job(vnf_pm_job_id)
         display_columns, columns = _get_columns(obj, action='show')
         data = utils.get_item_properties(
             sdk_utils.DictModel(obj), columns,
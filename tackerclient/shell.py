@@ -36,7 +36,9 @@ from keystoneclient import discover
 from keystoneclient import exceptions as ks_exc
 from keystoneclient import session
 from oslo_utils import encodeutils
+from oslo_utils import strutils
 
+from tackerclient.common import cache
 from tackerclient.common import clientmanager
 from tackerclient.common import command as openstack_command
 from tackerclient.common import exceptions as exc
@@ -48,6 +50,14 @@ from tackerclient.version import __version__
 
 
 VERSION = '1.0'
+# Lifetime in seconds of cached Keystone version discovery results
+DISCOVERY_CACHE_TTL = utils.env_int('TACKERCLIENT_DISCOVERY_CACHE_TTL',
+                                    default=86400)
+# Failures of a command showing that the cached token or discovery data
+# may be stale, unlike connection errors and timeouts of the endpoint
+_AUTH_FAILURES = (exc.Unauthorized, ks_exc.Unauthorized,
+                  ks_exc.AuthorizationFailure, ks_exc.EndpointNotFound,
+                  ks_exc.DiscoveryFailure)
 TACKER_API_VERSION = '1.0'
 
 
@@ -162,6 +172,12 @@ class TackerShell(app.App):
         # password flow auth
         self.auth_client = None
         self.api_version = apiversion
+        # Set by authenticate_user() when --os-cache is used
+        self.token_cache = None
+        self.discovery_cache = None
+        self._auth_plugin = None
+        self._cached_auth_ref = None
+        self._discovery_from_cache = False
 
     def build_option_parser(self, description, version):
         """Return an argparse option parser for this application.
@@ -433,6 +449,14 @@ class TackerShell(app.App):
                    "not be verified against any certificate authorities. "
                    "This option should be used with caution."))
 
+        parser.add_argument(
+            '--os-cache',
+            action='store_true',
+            default=strutils.bool_from_string(env('OS_CACHE')),
+            help=_('Cache Keystone version discovery, tokens and service '
+                   'endpoints on disk between invocations, defaults to '
+                   'env[OS_CACHE].'))
+
     def _bash_completion(self):
         """Prints all of the commands and options for bash-completion."""
         commands = set()
@@ -525,8 +549,15 @@ class TackerShell(app.App):
                          else ' '.join([self.NAME, cmd_name])
                          )
             cmd_parser = cmd.get_parser(full_name)
-            return run_command(cmd, cmd_parser, sub_argv)
+            result = run_command(cmd, cmd_parser, sub_argv)
+            self._update_token_cache()
+            return result
         except Exception as e:
+            if isinstance(e, _AUTH_FAILURES):
+                # The cached token or the auth URL it was obtained from
+                # may be stale, discover and authenticate again next time.
+                self._invalidate_token_cache()
+                self._invalidate_discovery_cache()
             if self.options.verbose_level >= self.DEBUG_LEVEL:
                 self.log.exception("%s", e)
                 raise
@@ -604,8 +635,17 @@ class TackerShell(app.App):
                     raise exc.CommandError(
                         _("You must provide an auth url via"
                           " either --os-auth-url or via env[OS_AUTH_URL]"))
+            self.discovery_cache = (
+                cache.FileCache('discovery', ttl=DISCOVERY_CACHE_TTL)
+                if self.options.os_cache else None)
             auth_session = self._get_keystone_session()
             auth = auth_session.auth
+            if self.options.os_cache and not self.options.os_token:
+                self._load_cached_token(auth)
+            if self._discovery_from_cache and self._cached_auth_ref is None:
+                auth_session = self._authenticate_with_cached_discovery(
+                    auth_session)
+                auth = auth_session.auth
         else:   # not keystone
             if not self.options.os_url:
                 raise exc.CommandError(
@@ -641,6 +681,37 @@ class TackerShell(app.App):
             log_credentials=True)
         return
 
+    def _token_cache_key(self):
+        project = (self.options.os_project_id or self.options.os_tenant_id or
+                   self.options.os_project_name or
+                   self.options.os_tenant_name)
+        return cache.TokenCache.make_key(
+            self.options.os_auth_url,
+            self.options.os_user_id or self.options.os_username,
+            project, self.options.os_region_name, self.options.os_password)
+
+    def _load_cached_token(self, auth):
+        self.token_cache = cache.TokenCache()
+        self._auth_plugin = auth
+        auth_ref, _endpoint = self.token_cache.get_auth(
+            self._token_cache_key())
+        if auth_ref is not None:
+            auth.auth_ref = auth_ref
+        self._cached_auth_ref = auth_ref
+
+    def _update_token_cache(self):
+        if self.token_cache is None:
+            return
+        auth_ref = getattr(self._auth_plugin, 'auth_ref', None)
+        if auth_ref is not None and auth_ref is not self._cached_auth_ref:
+            self.token_cache.set_auth(self._token_cache_key(), auth_ref)
+            self._cached_auth_ref = auth_ref
+
+    def _invalidate_token_cache(self):
+        if self.token_cache is not None:
+            self.token_cache.delete(self._token_cache_key())
+            self._cached_auth_ref = None
+
     def initialize_app(self, argv):
         """Global app init bits:
 
@@ -719,6 +790,41 @@ class TackerShell(app.App):
         )
 
     def _discover_auth_versions(self, session, auth_url):
+        self._discovery_from_cache = False
+        if self.discovery_cache is None:
+            return self._discover_auth_versions_live(session, auth_url)
+        cached = self.discovery_cache.get(cache.make_key(auth_url))
+        if cached and cached.get('auth_url') == auth_url:
+            versions = cached.get('versions')
+            if isinstance(versions, list) and len(versions) == 2:
+                self._discovery_from_cache = True
+                return tuple(versions)
+        versions = self._discover_auth_versions_live(session, auth_url)
+        self.discovery_cache.set(cache.make_key(auth_url),
+                                 {'auth_url': auth_url,
+                                  'versions': list(versions)})
+        return versions
+
+    def _authenticate_with_cached_discovery(self, auth_session):
+        # The Keystone versions were discovered by an earlier run and may
+        # be stale. Authenticate before the command sends any request, so
+        # that a failure is retried once with live discovery without
+        # running the command twice.
+        try:
+            auth_session.get_token()
+        except ks_exc.ClientException as e:
+            self.log.debug("Retrying with live Keystone version discovery "
+                           "after: %s", e)
+            self._invalidate_discovery_cache()
+            auth_session = self._get_keystone_session()
+        return auth_session
+
+    def _invalidate_discovery_cache(self):
+        if self.discovery_cache is not None:
+            self.discovery_cache.delete(
+                cache.make_key(self.options.os_auth_url))
+
+    def _discover_auth_versions_live(self, session, auth_url):
         # discover the API versions the server is supporting base on the
         # given URL
         try:
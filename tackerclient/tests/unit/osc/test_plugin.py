@@ -0,0 +1,37 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+import ddt
+import fixtures
+import testtools
+
+from tackerclient.osc import plugin
+
+
+@ddt.ddt
+class TestMakeClient(testtools.TestCase):
+
+    @ddt.data(('1', True), ('true', True), ('0', False), ('false', False),
+              ('no', False), ('', False))
+    @ddt.unpack
+    @mock.patch('tackerclient.v1_0.client.Client')
+    def test_negotiate_api_version(self, value, expected, mock_client):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_NEGOTIATE_API_VERSION', value))
+        instance = mock.Mock(_api_version={plugin.API_NAME: '1'})
+
+        plugin.make_client(instance)
+
+        self.assertIs(expected,
+                      mock_client.call_args[1]['negotiate_api_version'])
@@ -0,0 +1,122 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+from oslo_serialization import jsonutils
+import testtools
+
+from tackerclient.osc import utils as tacker_osc_utils
+
+
+class TestFormatComplexData(testtools.TestCase):
+
+    def setUp(self):
+        super(TestFormatComplexData, self).setUp()
+        self.data = {'key1': 'value1', 'key2': ['a', 'b']}
+
+    def test_format_none(self):
+        self.assertIsNone(tacker_osc_utils.format_complex_data(None))
+
+    def test_format_pretty(self):
+        self.assertEqual(
+            jsonutils.dumps(self.data, indent=4),
+            tacker_osc_utils.format_complex_data(self.data))
+
+    def test_format_compact(self):
+        self.assertEqual(
+            jsonutils.dumps(self.data),
+            tacker_osc_utils.format_complex_data(self.data, compact=True))
+
+    def test_format_truncated(self):
+        for compact, rendered in (
+                (False, jsonutils.dumps(self.data, indent=4)),
+                (True, jsonutils.dumps(self.data))):
+            actual = tacker_osc_utils.format_complex_data(
+                self.data, max_length=10, compact=compact)
+            self.assertTrue(actual.startswith(rendered[:10] + '...'))
+            self.assertIn('truncated %d characters' % (len(rendered) - 10),
+                          actual)
+
+    def test_not_truncated_by_default(self):
+        self.assertEqual(0, tacker_osc_utils.COMPLEX_DATA_MAX_LENGTH)
+        self.assertEqual(0,
+                         tacker_osc_utils.FormatComplexDataColumn.max_length)
+
+    def test_format_not_truncated_within_limit(self):
+        self.assertEqual(
+            jsonutils.dumps(self.data, indent=4),
+            tacker_osc_utils.format_complex_data(self.data, max_length=1000))
+
+
+class TestFormatComplexDataColumn(testtools.TestCase):
+
+    def test_human_readable(self):
+        data = {'key': 'value'}
+        column = tacker_osc_utils.FormatComplexDataColumn(data)
+        self.assertEqual(jsonutils.dumps(data, indent=4),
+                         column.human_readable())
+        self.assertEqual(data, column.machine_readable())
+
+    @mock.patch.object(tacker_osc_utils, 'format_complex_data',
+                       return_value='rendered')
+    def test_human_readable_is_lazy_and_memoized(self, mock_format):
+        column = tacker_osc_utils.FormatComplexDataColumn({'key': 'value'})
+        self.assertFalse(mock_format.called)
+
+        column.machine_readable()
+        self.assertFalse(mock_format.called)
+
+        self.assertEqual('rendered', column.human_readable())
+        self.assertEqual('rendered', column.human_readable())
+        mock_format.assert_called_once_with(
+            {'key': 'value'},
+            max_length=tacker_osc_utils.FormatComplexDataColumn.max_length,
+            compact=tacker_osc_utils.FormatComplexDataColumn.compact)
+
+    def test_human_readable_compact(self):
+        data = {'key': 'value'}
+        with mock.patch.object(tacker_osc_utils.FormatComplexDataColumn,
+                               'compact', True):
+            column = tacker_osc_utils.FormatComplexDataColumn(data)
+            self.assertEqual(jsonutils.dumps(data), column.human_readable())
+
+
+class TestGetAttributeSelectors(testtools.TestCase):
+
+    attr_map = (('id', 'ID', tacker_osc_utils.LIST_BOTH),
+                ('operationState', 'Operation State',
+                 tacker_osc_utils.LIST_BOTH),
+                ('error', 'Error', tacker_osc_utils.LIST_BOTH),
+                ('resourceChanges', 'Resource Changes',
+                 tacker_osc_utils.LIST_BOTH))
+    complex_fields = ('error', 'resourceChanges', 'changedInfo')
+
+    def _get(self, columns):
+        return tacker_osc_utils.get_attribute_selectors(
+            columns, self.attr_map, self.complex_fields)
+
+    def test_no_columns(self):
+        self.assertEqual({}, self._get([]))
+        self.assertEqual({}, self._get(None))
+
+    def test_simple_columns(self):
+        self.assertEqual({'exclude_default': None},
+                         self._get(['ID', 'Operation State']))
+
+    def test_complex_columns(self):
+        self.assertEqual(
+            {'exclude_default': None, 'fields': 'resourceChanges,error'},
+            self._get(['ID', 'Resource Changes', 'Error', 'Error']))
+
+    def test_unknown_column(self):
+        self.assertEqual({}, self._get(['ID', 'Unknown']))
@@ -15,6 +15,10 @@
 
 import copy
 import filecmp
+import hashlib
+from io import BytesIO
+from io import StringIO
+import json
 import os
 import shutil
 import sys
@@ -22,6 +26,7 @@ import tempfile
 from unittest import mock
 
 import ddt
+import fixtures
 import zipfile
 
 from tackerclient import client as root_client
@@ -181,6 +186,33 @@ class TestListVnfPackage(TestVnfPackage):
         self.assertCountEqual(self.get_list_columns(), actual_columns)
         self.assertListItemsEqual(expected_data, list(data))
 
+    def test_take_action_with_columns(self):
+        parsed_args = self.check_parser(
+            self.list_vnf_package, ['-c', 'Id', '-c', 'Onboarding State'],
+            [('columns', ['Id', 'Onboarding State'])])
+        list_mock = self.requests_mock.register_uri(
+            'GET', self.url + '/vnfpkgm/v1/vnf_packages',
+            json=self._vnf_packages, headers=self.header)
+
+        self.list_vnf_package.take_action(parsed_args)
+
+        self.assertEqual({'exclude_default': ['']},
+                         list_mock.last_request.qs)
+
+    def test_take_action_with_columns_and_fields(self):
+        parsed_args = self.check_parser(
+            self.list_vnf_package,
+            ['-c', 'Id', '--fields', 'softwareImages'],
+            [('columns', ['Id']), ('fields', 'softwareImages')])
+        list_mock = self.requests_mock.register_uri(
+            'GET', self.url + '/vnfpkgm/v1/vnf_packages',
+            json=self._vnf_packages, headers=self.header)
+
+        self.list_vnf_package.take_action(parsed_args)
+
+        self.assertEqual({'fields': ['softwareimages']},
+                         list_mock.last_request.qs)
+
     @ddt.data('all_fields', 'exclude_default')
     def test_take_action(self, arg):
         parsed_args = self.check_parser(
@@ -543,6 +575,59 @@ class TestUploadVnfPackage(TestVnfPackage):
                 body=mock.ANY, headers=mock.ANY,
                 content_type='application/zip', accept='json')
 
+    def test_upload_vnf_package_from_directory(self):
+        directory = ('./tackerclient/tests/unit/osc/v1/fixture_data/'
+                     'sample_vnf_package')
+        arglist = [self._vnf_package['id'], '--directory', directory]
+        verifylist = [('directory', directory),
+                      ('vnf_package', self._vnf_package['id'])]
+        parsed_args = self.check_parser(self.upload_vnf_package, arglist,
+                                        verifylist)
+        self._mock_request_url_for_upload('PUT')
+
+        self.upload_vnf_package.take_action(parsed_args)
+
+        body = self.requests_mock.request_history[0].body
+        archive = zipfile.ZipFile(BytesIO(b''.join(body)))
+        self.assertIsNone(archive.testzip())
+        self.assertIn('TOSCA-Metadata/TOSCA.meta', archive.namelist())
+
+    def test_upload_vnf_package_from_invalid_directory(self):
+        temp_dir = self.useFixture(fixtures.TempDir()).path
+        arglist = [self._vnf_package['id'], '--directory', temp_dir]
+        verifylist = [('directory', temp_dir),
+                      ('vnf_package', self._vnf_package['id'])]
+        parsed_args = self.check_parser(self.upload_vnf_package, arglist,
+                                        verifylist)
+
+        self.assertRaises(exceptions.InvalidInput,
+                          self.upload_vnf_package.take_action, parsed_args)
+        self.assertEqual(0, len(self.requests_mock.request_history))
+
+    @ddt.data(True, False)
+    def test_upload_vnf_package_invalid_csar(self, no_validate):
+        temp_dir = self.useFixture(fixtures.TempDir()).path
+        path = os.path.join(temp_dir, 'package.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('Definitions/vnfd.yaml', 'vnfd')
+        arglist = [self._vnf_package['id'], '--path', path]
+        if no_validate:
+            arglist.append('--no-validate')
+        verifylist = [('path', path), ('no_validate', no_validate),
+                      ('vnf_package', self._vnf_package['id'])]
+        parsed_args = self.check_parser(self.upload_vnf_package, arglist,
+                                        verifylist)
+        self._mock_request_url_for_upload('PUT')
+
+        if no_validate:
+            self.upload_vnf_package.take_action(parsed_args)
+            self.assertEqual(1, len(self.requests_mock.request_history))
+        else:
+            self.assertRaises(exceptions.InvalidInput,
+                              self.upload_vnf_package.take_action,
+                              parsed_args)
+            self.assertEqual(0, len(self.requests_mock.request_history))
+
     def test_upload_vnf_package_with_conflict_error(self):
         # Scenario in which vnf package is already in on-boarded state
         zip_file, temp_dir = _create_zip()
@@ -850,6 +935,129 @@ class TestDownloadVnfPackage(TestVnfPackage):
         self.assertTrue(self._check_valid_zip_file(local_file.name))
         shutil.rmtree(temp_dir)
 
+    def _mock_show_onboarded(self, **attrs):
+        vnf_package_obj = vnf_package_fakes.vnf_package_obj(
+            onboarded_state=True)
+        vnf_package_obj.update(attrs)
+        return self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnfpkgm/v1/vnf_packages',
+                                self._vnf_package['id']),
+            json=vnf_package_obj, headers=self.header)
+
+    def test_download_vnf_package_with_cache(self):
+        temp_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR', temp_dir))
+        test_file, zip_dir = _create_zip()
+        self.addCleanup(shutil.rmtree, zip_dir)
+        with open(test_file, 'rb') as f:
+            vnf_package_data = f.read()
+        show_mock = self._mock_show_onboarded(checksum={
+            'algorithm': 'SHA-512',
+            'hash': hashlib.sha512(vnf_package_data).hexdigest()})
+        download_mock = self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnfpkgm/v1/vnf_packages',
+                                self._vnf_package['id'], 'package_content'),
+            headers={'content-type': 'application/zip'},
+            content=vnf_package_data)
+
+        for name in ('first.zip', 'second.zip'):
+            path = os.path.join(temp_dir, name)
+            parsed_args = self.check_parser(
+                self.download_vnf_package,
+                [self._vnf_package['id'], '--file', path, '--cache'],
+                [('file', path), ('cache', True)])
+            self.download_vnf_package.take_action(parsed_args)
+            self.assertTrue(filecmp.cmp(test_file, path))
+
+        self.assertEqual(2, show_mock.call_count)
+        self.assertEqual(1, download_mock.call_count)
+
+    def test_download_vnfd_with_cache(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR',
+            self.useFixture(fixtures.TempDir()).path))
+        self._mock_show_onboarded(vnfdId='vnfd-1')
+        self._mock_request_url_for_download_vnfd('text/plain', 'vnfd')
+        parsed_args = self.check_parser(
+            self.download_vnf_package,
+            [self._vnf_package['id'], '--vnfd', '--type', 'text/plain',
+             '--cache'],
+            [('vnfd', True), ('cache', True)])
+
+        outputs = []
+        for _i in range(2):
+            with mock.patch.object(sys, 'stdout', StringIO()) as stdout:
+                self.download_vnf_package.take_action(parsed_args)
+            outputs.append(stdout.getvalue())
+
+        # The output does not depend on the state of the store
+        self.assertEqual(['vnfd\n', 'vnfd\n'], outputs)
+        self.assertEqual(1, len([
+            request for request in self.requests_mock.request_history
+            if request.path.endswith('/vnfd')]))
+
+    def test_download_vnf_package_delta(self):
+        temp_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR', temp_dir))
+        self.app.stderr = StringIO()
+        contents = {'Scripts/install.sh': b'echo install v2',
+                    'Files/images/image.img': b'\x00\xff' * 1000}
+        base = os.path.join(temp_dir, 'v1')
+        os.makedirs(os.path.join(base, 'Files', 'images'))
+        with open(os.path.join(base, 'Files', 'images', 'image.img'),
+                  'wb') as f:
+            f.write(contents['Files/images/image.img'])
+        self._mock_show_onboarded(vnfdId='vnfd-1', additionalArtifacts=[
+            {'artifactPath': path,
+             'checksum': {'algorithm': 'SHA-256',
+                          'hash': hashlib.sha256(data).hexdigest()},
+             'metadata': {}}
+            for path, data in contents.items()])
+        vnfd = BytesIO()
+        with zipfile.ZipFile(vnfd, 'w') as archive:
+            archive.writestr('Definitions/vnfd.yaml', 'vnfd')
+        self._mock_request_url_for_download_vnfd('application/zip',
+                                                 vnfd.getvalue())
+        url = os.path.join(self.url, 'vnfpkgm/v1/vnf_packages',
+                           self._vnf_package['id'], 'artifacts')
+        artifact_mocks = [self.requests_mock.register_uri(
+            'GET', url + '/' + path, content=data,
+            headers={'content-type': 'application/octet-stream'})
+            for path, data in contents.items()]
+        directory = os.path.join(temp_dir, 'v2')
+        parsed_args = self.check_parser(
+            self.download_vnf_package,
+            [self._vnf_package['id'], '--delta', directory, '--base', base],
+            [('delta', directory), ('bases', [base])])
+
+        with mock.patch('builtins.print') as mock_print:
+            self.download_vnf_package.take_action(parsed_args)
+
+        self.assertEqual([1, 0], [m.call_count for m in artifact_mocks])
+        for path, data in dict(contents, **{
+                'Definitions/vnfd.yaml': b'vnfd'}).items():
+            with open(os.path.join(directory, path), 'rb') as f:
+                self.assertEqual(data, f.read())
+        mock_print.assert_called_once_with(
+            'VNF package %s is saved to %s: 1 VNFD files, 1 artifacts '
+            'downloaded (15 bytes), 1 reused (2000 bytes), 0 already '
+            'present' % (self._vnf_package['id'], directory))
+        self.assertIn('Files/images/image.img REUSED',
+                      self.app.stderr.getvalue())
+
+    def test_download_vnf_package_delta_invalid(self):
+        for arglist in (['--delta', 'dir', '--vnfd'],
+                        ['--delta', 'dir', '--file', 'file'],
+                        ['--base', 'dir', '--file', 'file']):
+            parsed_args = self.check_parser(
+                self.download_vnf_package,
+                [self._vnf_package['id']] + arglist, [])
+            self.assertRaises(exceptions.CommandError,
+                              self.download_vnf_package.take_action,
+                              parsed_args)
+
 
 @ddt.ddt
 class TestDownloadVnfPackageArtifact(TestVnfPackage):
@@ -906,3 +1114,188 @@ class TestDownloadVnfPackageArtifact(TestVnfPackage):
         self.download_vnf_package_artifacts.take_action(parsed_args)
         self.assertTrue(filecmp.cmp(test_file, local_file.name),
                         "Downloaded contents don't match test file")
+
+    def test_download_artifacts_with_cache(self):
+        temp_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR', temp_dir))
+        artifact_data = 'echo install'
+        vnf_package_obj = vnf_package_fakes.vnf_package_obj(
+            onboarded_state=True)
+        vnf_package_obj['additionalArtifacts'] = [{
+            'artifactPath': 'Scripts/install.sh',
+            'checksum': {
+                'algorithm': 'SHA-256',
+                'hash': hashlib.sha256(artifact_data.encode()).hexdigest()},
+            'metadata': {}}]
+        self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnfpkgm/v1/vnf_packages',
+                                self._vnf_package['id']),
+            json=vnf_package_obj, headers=self.header)
+        self._mock_request_url_for_download_artifacts('Scripts/install.sh',
+                                                      artifact_data)
+
+        for name in ('first.sh', 'second.sh'):
+            path = os.path.join(temp_dir, name)
+            parsed_args = self.check_parser(
+                self.download_vnf_package_artifacts,
+                [self._vnf_package['id'], 'Scripts/install.sh', '--file',
+                 path, '--cache'],
+                [('file', path), ('cache', True)])
+            self.download_vnf_package_artifacts.take_action(parsed_args)
+            with open(path) as f:
+                self.assertEqual(artifact_data, f.read())
+
+        self.assertEqual(1, len([
+            request for request in self.requests_mock.request_history
+            if request.path.endswith('/artifacts/scripts/install.sh')]))
+
+
+class TestMirrorVnfPackageArtifacts(TestVnfPackage):
+
+    def setUp(self):
+        super(TestMirrorVnfPackageArtifacts, self).setUp()
+        self.mirror_artifacts = vnf_package.MirrorVnfPackageArtifacts(
+            self.app, self.app_args, cmd_name='vnf package artifact mirror')
+        self.app.stderr = StringIO()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+        self.vnf_package_obj = vnf_package_fakes.vnf_package_obj(
+            onboarded_state=True)
+        self.contents = {'Scripts/install.sh': b'echo install',
+                         'Files/images/image.img': b'\x00\xff' * 1000}
+        self.vnf_package_obj['additionalArtifacts'] = [
+            {'artifactPath': path,
+             'checksum': {'algorithm': 'SHA-256',
+                          'hash': hashlib.sha256(data).hexdigest()},
+             'metadata': {}}
+            for path, data in self.contents.items()]
+        self.url_base = os.path.join(self.url, 'vnfpkgm/v1/vnf_packages',
+                                     self.vnf_package_obj['id'])
+        self.requests_mock.register_uri('GET', self.url_base,
+                                        json=self.vnf_package_obj,
+                                        headers=self.header)
+
+    def _mock_artifact(self, path, **kwargs):
+        if 'json' not in kwargs:
+            kwargs['content'] = self.contents[path]
+        kwargs.setdefault('headers',
+                          {'content-type': 'application/octet-stream'})
+        return self.requests_mock.register_uri(
+            'GET', self.url_base + '/artifacts/' + path, **kwargs)
+
+    def test_take_action(self):
+        for path in self.contents:
+            self._mock_artifact(path)
+        parsed_args = self.check_parser(
+            self.mirror_artifacts,
+            [self.vnf_package_obj['id'], self.dir, '--parallel', '2'],
+            [('directory', self.dir), ('parallel', 2),
+             ('artifact_paths', None)])
+
+        with mock.patch('builtins.print') as mock_print:
+            self.mirror_artifacts.take_action(parsed_args)
+
+        for path, data in self.contents.items():
+            with open(os.path.join(self.dir, path), 'rb') as f:
+                self.assertEqual(data, f.read())
+        mock_print.assert_called_with(
+            'All 2 artifacts are downloaded successfully')
+        self.assertIn('Scripts/install.sh DOWNLOADED',
+                      self.app.stderr.getvalue())
+
+    def test_take_action_failure(self):
+        self._mock_artifact('Scripts/install.sh')
+        self._mock_artifact('Files/images/image.img', status_code=404,
+                            json={'itemNotFound': {
+                                'message': 'Not found', 'code': 404}},
+                            headers=self.header)
+        parsed_args = self.check_parser(
+            self.mirror_artifacts,
+            [self.vnf_package_obj['id'], self.dir, '--artifact',
+             'Scripts/install.sh', '--artifact', 'Files/images/image.img'],
+            [('artifact_paths', ['Scripts/install.sh',
+                                 'Files/images/image.img'])])
+
+        e = self.assertRaises(exceptions.CommandError,
+                              self.mirror_artifacts.take_action, parsed_args)
+
+        self.assertEqual('Failed to download 1 of 2 artifacts.', str(e))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.dir, 'Scripts', 'install.sh')))
+        self.assertIn('Files/images/image.img FAILED',
+                      self.app.stderr.getvalue())
+
+
+class TestOnboardVnfPackage(TestVnfPackage):
+
+    def setUp(self):
+        super(TestOnboardVnfPackage, self).setUp()
+        self.onboard_vnf_package = vnf_package.OnboardVnfPackage(
+            self.app, self.app_args, cmd_name='vnf package onboard')
+        self.app.stderr = StringIO()
+
+    def test_onboard_no_options(self):
+        self.assertRaises(base.ParserException, self.check_parser,
+                          self.onboard_vnf_package, [], [])
+
+    def _mock_onboarding(self, onboarding_state):
+        vnf_package_obj = vnf_package_fakes.vnf_package_obj(
+            onboarded_state=onboarding_state == 'ONBOARDED')
+        vnf_package_obj['onboardingState'] = onboarding_state
+        url = self.url + '/vnfpkgm/v1/vnf_packages'
+        self.requests_mock.register_uri(
+            'POST', url, json=vnf_package_fakes.vnf_package_obj(),
+            headers=self.header, status_code=201)
+        self.requests_mock.register_uri(
+            'PUT', url + '/' + vnf_package_obj['id'] + '/package_content',
+            headers={'content-type': 'application/zip'}, status_code=202)
+        self.requests_mock.register_uri(
+            'GET', url, json=[vnf_package_obj], headers=self.header)
+        return vnf_package_obj
+
+    def test_onboard_vnf_package(self):
+        zip_file, temp_dir = _create_zip()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        report = os.path.join(temp_dir, 'report.json')
+        arglist = [zip_file, '--user-data', 'release=1', '--parallel', '2',
+                   '--report', report]
+        verifylist = [('sources', [zip_file]),
+                      ('user_data', {'release': '1'}), ('parallel', 2),
+                      ('report', report)]
+        parsed_args = self.check_parser(self.onboard_vnf_package, arglist,
+                                        verifylist)
+        vnf_package_obj = self._mock_onboarding('ONBOARDED')
+
+        sys.stdout = buffer = StringIO()
+        self.onboard_vnf_package.take_action(parsed_args)
+
+        create = self.requests_mock.request_history[0]
+        self.assertEqual({'userDefinedData': {'release': '1'}},
+                         create.json())
+        self.assertIn('(in,id,%s)' % vnf_package_obj['id'],
+                      self.requests_mock.request_history[2].qs['filter'])
+        self.assertIn('%s: VNF package %s, VNFD ID %s' % (
+            zip_file, vnf_package_obj['id'], vnf_package_obj['vnfdId']),
+            buffer.getvalue())
+        self.assertIn('All 1 VNF packages are onboarded successfully',
+                      buffer.getvalue())
+        with open(report) as f:
+            result, = json.load(f)
+        self.assertEqual('ONBOARDED', result['status'])
+        self.assertEqual(['create', 'upload', 'process'],
+                         list(result['timings']))
+
+    def test_onboard_vnf_package_failed(self):
+        zip_file, temp_dir = _create_zip()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        parsed_args = self.check_parser(self.onboard_vnf_package,
+                                        [zip_file], [])
+        self._mock_onboarding('CREATED')
+
+        sys.stdout = StringIO()
+        result = self.assertRaises(exceptions.CommandError,
+                                   self.onboard_vnf_package.take_action,
+                                   parsed_args)
+
+        self.assertEqual('Failed to onboard 1 of 1 VNF packages.',
+                         str(result))
@@ -15,15 +15,18 @@
 
 import copy
 from io import StringIO
+import json
 import os
 import sys
 from unittest import mock
 
 import ddt
+import fixtures
 from oslo_utils.fixture import uuidsentinel
 
 from tackerclient import client as root_client
 from tackerclient.common import exceptions
+from tackerclient.common import journal
 from tackerclient.osc import utils as tacker_osc_utils
 from tackerclient.osc.v1.vnflcm import vnflcm
 from tackerclient.tests.unit.osc import base
@@ -156,7 +159,76 @@ class TestShowVnfLcm(TestVnfLcm):
             vnflcm_fakes.get_vnflcm_data(vnf_instance, columns=attributes),
             data)
 
+    def _register_vnf_instances(self, count):
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=count)
+        for vnf_instance in vnf_instances:
+            self.requests_mock.register_uri(
+                'GET', os.path.join(self.url, 'vnflcm/v1/vnf_instances',
+                                    vnf_instance['id']),
+                json=vnf_instance, headers=self.header)
+        return vnf_instances
+
+    def test_run_many_json(self):
+        vnf_instances = self._register_vnf_instances(3)
+        ids = [vnf_instance['id'] for vnf_instance in vnf_instances]
+        self.app.stdout = StringIO()
+        self.app.stdin = StringIO('\n'.join(ids[1:]) + '\n')
+        parsed_args = self.check_parser(
+            self.show_vnf_lcm, [ids[0], '-', '-f', 'json', '-c', 'ID',
+                                '--parallel', '2'],
+            [('vnf_instance', ids[0]), ('more_ids', ['-']),
+             ('parallel', 2)])
+
+        self.show_vnf_lcm.run(parsed_args)
+
+        self.assertEqual(
+            ['{"ID": "%s"}' % vnf_instance_id for vnf_instance_id in ids],
+            self.app.stdout.getvalue().splitlines())
+
+    def test_run_one_from_stdin(self):
+        vnf_instance, = self._register_vnf_instances(1)
+        self.app.stdout = StringIO()
+        self.app.stdin = StringIO(vnf_instance['id'] + '\n')
+        parsed_args = self.check_parser(
+            self.show_vnf_lcm, ['-', '-f', 'json', '-c', 'ID'],
+            [('vnf_instance', '-')])
+
+        self.show_vnf_lcm.run(parsed_args)
+
+        self.assertEqual({'ID': vnf_instance['id']},
+                         json.loads(self.app.stdout.getvalue()))
+
+    def test_run_many_table(self):
+        vnf_instances = self._register_vnf_instances(2)
+        self.app.stdout = StringIO()
+        parsed_args = self.check_parser(
+            self.show_vnf_lcm,
+            [vnf_instance['id'] for vnf_instance in vnf_instances], [])
+
+        self.show_vnf_lcm.run(parsed_args)
+
+        output = self.app.stdout.getvalue()
+        self.assertEqual(2, output.count('| Instantiation State '))
+        for vnf_instance in vnf_instances:
+            self.assertIn(vnf_instance['id'], output)
 
+    def test_run_many_with_error(self):
+        vnf_instances = self._register_vnf_instances(2)
+        self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v1/vnf_instances',
+                                'missing'),
+            status_code=404, json={})
+        self.app.stdout = StringIO()
+        parsed_args = self.check_parser(
+            self.show_vnf_lcm, [vnf_instances[0]['id'], 'missing',
+                                vnf_instances[1]['id'], '-f', 'json'], [])
+
+        self.assertRaises(exceptions.CommandError,
+                          self.show_vnf_lcm.run, parsed_args)
+        self.assertEqual(2, len(self.app.stdout.getvalue().splitlines()))
+
+
+@ddt.ddt
 class TestListVnfLcm(TestVnfLcm):
 
     def setUp(self):
@@ -184,6 +256,98 @@ class TestListVnfLcm(TestVnfLcm):
                               actual_columns)
         self.assertCountEqual(expected_data, list(data))
 
+    def test_take_action_excludes_default(self):
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=3)
+        parsed_args = self.check_parser(self.list_vnf_instance, [], [])
+        list_mock = self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v1/vnf_instances'),
+            json=vnf_instances, headers=self.header)
+
+        self.list_vnf_instance.take_action(parsed_args)
+
+        self.assertEqual({'exclude_default': ['']},
+                         list_mock.last_request.qs)
+
+    @ddt.data(
+        (['--filter', '(eq,vnfdId,x)', '--fields', 'vnfPkgId'],
+         {'filter': ['(eq,vnfdid,x)'], 'fields': ['vnfpkgid'],
+          'exclude_default': ['']},
+         ['Vnf Pkg Id']),
+        (['--fields', 'metadata/key', '--exclude-default'],
+         {'fields': ['metadata/key'], 'exclude_default': ['']},
+         ['Metadata']),
+        (['--exclude-fields', 'instantiatedVnfInfo'],
+         {'exclude_fields': ['instantiatedvnfinfo']},
+         ['Vim Connection Info', 'Vnf Configurable Properties',
+          'Metadata', 'Extensions']),
+        (['--all-fields'],
+         {'all_fields': ['']},
+         ['Vim Connection Info', 'Instantiated Vnf Info',
+          'Vnf Configurable Properties', 'Metadata', 'Extensions']),
+    )
+    @ddt.unpack
+    def test_take_action_with_projection(self, arglist, expected_qs,
+                                         extra_columns):
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=1)
+        parsed_args = self.check_parser(self.list_vnf_instance, arglist, [])
+        list_mock = self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v1/vnf_instances'),
+            json=vnf_instances, headers=self.header)
+
+        actual_columns, data = self.list_vnf_instance.take_action(
+            parsed_args)
+
+        self.assertEqual(expected_qs, list_mock.last_request.qs)
+        self.assertEqual(
+            [attr[1] for attr in vnflcm._attr_map] + extra_columns,
+            list(actual_columns))
+        self.assertEqual(len(actual_columns), len(list(data)[0]))
+
+    @ddt.data(['--all-fields', '--exclude-default'],
+              ['--from-cache', '--fields', 'metadata'],
+              ['--from-cache', '--exclude-fields', 'metadata'])
+    def test_take_action_with_conflicting_options(self, arglist):
+        parsed_args = self.check_parser(self.list_vnf_instance, arglist, [])
+
+        self.assertRaises(exceptions.CommandError,
+                          self.list_vnf_instance.take_action, parsed_args)
+        self.assertFalse(self.requests_mock.called)
+
+    def test_take_action_with_invalid_filter(self):
+        parsed_args = self.check_parser(
+            self.list_vnf_instance, ['--filter', '(eq,vnfdId)'],
+            [('filter', '(eq,vnfdId)')])
+
+        self.assertRaises(exceptions.InvalidInput,
+                          self.list_vnf_instance.take_action, parsed_args)
+        self.assertFalse(self.requests_mock.called)
+
+    def test_take_action_from_cache(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR',
+            self.useFixture(fixtures.TempDir()).path))
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=3)
+        list_mock = self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v1/vnf_instances'),
+            json=vnf_instances, headers=self.header)
+        self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v1/vnf_lcm_op_occs'),
+            json=[], headers=self.header)
+        parsed_args = self.check_parser(
+            self.list_vnf_instance, ['--from-cache', '--max-age', '60'],
+            [('from_cache', True), ('max_age', 60)])
+
+        headers, columns = tacker_osc_utils.get_column_definitions(
+            vnflcm._attr_map, long_listing=True)
+        expected_data = [vnflcm_fakes.get_vnflcm_data(
+            vnf_instance_obj, columns=columns, list_action=True)
+            for vnf_instance_obj in vnf_instances]
+        for _ in range(2):
+            actual_columns, data = self.list_vnf_instance.take_action(
+                parsed_args)
+            self.assertCountEqual(expected_data, list(data))
+        self.assertEqual(1, list_mock.call_count)
+
     def test_take_action_with_pagination(self):
         vnf_instances = vnflcm_fakes.create_vnf_instances(count=3)
         next_links_num = 3
@@ -547,6 +711,132 @@ class TestTerminateVnfLcm(TestVnfLcm):
                           self.terminate_vnf_instance.take_action,
                           parsed_args)
 
+    def _mock_terminate_many(self, vnf_instances, failing=()):
+        list_url = os.path.join(self.url, 'vnflcm/v1/vnf_instances')
+
+        def list_vnf_instances(request, context):
+            context.headers.update(self.header)
+            if '(in,id,' in request.qs['filter'][0]:
+                # Terminations are complete at the first poll
+                return [dict(v, instantiationState='NOT_INSTANTIATED')
+                        for v in vnf_instances if v['id'] not in failing]
+            return vnf_instances
+
+        self.requests_mock.register_uri('GET', list_url,
+                                        json=list_vnf_instances)
+        for vnf_instance in vnf_instances:
+            url = os.path.join(list_url, vnf_instance['id'])
+            location = os.path.join(self.url, 'vnflcm/v1/vnf_lcm_op_occs',
+                                    'op-' + vnf_instance['id'])
+            self.requests_mock.register_uri(
+                'POST', os.path.join(url, 'terminate'), json={},
+                headers=dict(self.header, Location=location),
+                status_code=409 if vnf_instance['id'] in failing else 202)
+            self.requests_mock.register_uri('DELETE', url, json={},
+                                            headers=self.header)
+
+    def test_take_action_many(self):
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=3)
+        vnf_ids = [vnf_instance['id'] for vnf_instance in vnf_instances]
+        arglist = vnf_ids + ['--D', '--parallel', '2']
+        verifylist = [('vnf_instance', vnf_ids[0]),
+                      ('more_vnf_instances', vnf_ids[1:]),
+                      ('D', True), ('parallel', 2)]
+        parsed_args = self.check_parser(self.terminate_vnf_instance, arglist,
+                                        verifylist)
+        self._mock_terminate_many(vnf_instances)
+        self.app.stderr = StringIO()
+
+        sys.stdout = buffer = StringIO()
+        result = self.terminate_vnf_instance.take_action(parsed_args)
+
+        self.assertIsNone(result)
+        self.assertIn('All 3 vnf instances are terminated and deleted '
+                      'successfully', buffer.getvalue())
+        self.assertEqual(
+            sorted(vnf_ids),
+            sorted(r.path.rsplit('/', 1)[1]
+                   for r in self.requests_mock.request_history
+                   if r.method == 'DELETE'))
+        self.assertIn('%s DELETED' % vnf_ids[2], self.app.stderr.getvalue())
+
+    def test_take_action_filter(self):
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=2)
+        arglist = ['--filter', '(eq,vnfdId,vnfd-1)']
+        verifylist = [('vnf_instance', None),
+                      ('filter', '(eq,vnfdId,vnfd-1)')]
+        parsed_args = self.check_parser(self.terminate_vnf_instance, arglist,
+                                        verifylist)
+        self._mock_terminate_many(vnf_instances,
+                                  failing=[vnf_instances[1]['id']])
+        self.app.stderr = StringIO()
+
+        result = self.assertRaises(exceptions.CommandError,
+                                   self.terminate_vnf_instance.take_action,
+                                   parsed_args)
+
+        self.assertEqual('Failed to terminate 1 of 2 vnf instances.',
+                         str(result))
+        self.assertEqual(
+            '(eq,instantiationstate,instantiated);(eq,vnfdid,vnfd-1)',
+            self.requests_mock.request_history[0].qs['filter'][0])
+        self.assertFalse(any(r.method == 'DELETE'
+                             for r in self.requests_mock.request_history))
+
+    def test_take_action_resume(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'terminate.journal')
+        vnf_instances = vnflcm_fakes.create_vnf_instances(count=2)
+        vnf_ids = [vnf_instance['id'] for vnf_instance in vnf_instances]
+        parsed_args = self.check_parser(
+            self.terminate_vnf_instance,
+            vnf_ids + ['--D', '--journal', path],
+            [('journal', path), ('D', True)])
+        self._mock_terminate_many(vnf_instances, failing=[vnf_ids[1]])
+        self.app.stderr = StringIO()
+        self.assertRaises(exceptions.CommandError,
+                          self.terminate_vnf_instance.take_action,
+                          parsed_args)
+        with journal.Journal(path) as jrnl:
+            self.assertEqual('op-' + vnf_ids[0],
+                             jrnl.items[vnf_ids[0]]['vnfLcmOpOccId'])
+
+        sent = len(self.requests_mock.request_history)
+        self._mock_terminate_many(vnf_instances)
+        parsed_args = self.check_parser(
+            self.terminate_vnf_instance, ['--resume', path],
+            [('resume', path), ('vnf_instance', None)])
+        sys.stdout = buffer = StringIO()
+        self.terminate_vnf_instance.take_action(parsed_args)
+
+        self.assertIn('All 2 vnf instances are terminated and deleted '
+                      'successfully', buffer.getvalue())
+        # Only the instance whose termination failed is requested again
+        self.assertEqual(
+            [('POST', vnf_ids[1]), ('DELETE', vnf_ids[1])],
+            [(r.method, r.path.split('/')[4])
+             for r in self.requests_mock.request_history[sent:]
+             if r.method != 'GET'])
+
+    def test_take_action_resume_with_journal(self):
+        parsed_args = self.check_parser(
+            self.terminate_vnf_instance,
+            ['--resume', 'path', '--journal', 'other'],
+            [('resume', 'path'), ('journal', 'other')])
+        self.assertRaises(exceptions.InvalidInput,
+                          self.terminate_vnf_instance.take_action,
+                          parsed_args)
+
+    def test_take_action_resume_with_ids(self):
+        arglist = ['--resume', 'path', 'vnf-1']
+        self.assertRaises(base.ParserException, self.check_parser,
+                          self.terminate_vnf_instance, arglist, [])
+
+    def test_take_action_filter_with_ids(self):
+        arglist = ['--filter', '(eq,vnfdId,vnfd-1)', 'vnf-1']
+        self.assertRaises(base.ParserException, self.check_parser,
+                          self.terminate_vnf_instance, arglist, [])
+
 
 class TestDeleteVnfLcm(TestVnfLcm):
 
@@ -992,6 +1282,134 @@ class TestChangeVnfPkgVnfLcm(TestVnfLcm):
         self.assertEqual(expected_msg, str(ex))
 
 
+class TestBatchCreateVnfLcm(TestVnfLcm):
+
+    def setUp(self):
+        super(TestBatchCreateVnfLcm, self).setUp()
+        self.batch_create_vnf_lcm = vnflcm.BatchCreateVnfLcm(
+            self.app, self.app_args, cmd_name='vnflcm batch create')
+        self.app.stderr = StringIO()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+        self.manifest = os.path.join(self.dir, 'fleet.yaml')
+        with open(self.manifest, 'w') as f:
+            f.write('defaults: {vnfdId: %s}\n'
+                    'vnfs:\n'
+                    '  - name: vnf-1\n'
+                    '  - name: vnf-2\n'
+                    '    dependsOn: [vnf-1]\n' % uuidsentinel.vnfd_id)
+        self.base_params = os.path.join(self.dir, 'base.json')
+        with open(self.base_params, 'w') as f:
+            f.write('{"flavourId": "simple"}')
+        self.report = os.path.join(self.dir, 'report.json')
+        self.vnf_instances = vnflcm_fakes.create_vnf_instances(count=2)
+
+    def _mock_requests(self, op_state, created=None):
+        self.requests_mock.register_uri(
+            'POST', os.path.join(self.url, 'vnflcm/v1/vnf_instances'),
+            [{'json': vnf_instance, 'headers': self.header}
+             for vnf_instance in created or self.vnf_instances])
+        for vnf_instance in self.vnf_instances:
+            op_occ_url = os.path.join(self.url, 'vnflcm/v1/vnf_lcm_op_occs',
+                                      'op-' + vnf_instance['id'])
+            self.requests_mock.register_uri(
+                'POST', os.path.join(self.url, 'vnflcm/v1/vnf_instances',
+                                     vnf_instance['id'], 'instantiate'),
+                headers=dict(self.header, Location=op_occ_url),
+                status_code=202)
+            self.requests_mock.register_uri(
+                'GET', op_occ_url, headers=self.header,
+                json={'id': 'op-' + vnf_instance['id'],
+                      'operationState': op_state})
+
+    def test_take_action(self):
+        arglist = [self.manifest, '--base-params', self.base_params,
+                   '--parallel', '2', '--report', self.report]
+        verifylist = [('manifest', self.manifest),
+                      ('base_params', self.base_params),
+                      ('parallel', 2),
+                      ('report', self.report)]
+        parsed_args = self.check_parser(self.batch_create_vnf_lcm, arglist,
+                                        verifylist)
+        self._mock_requests('COMPLETED')
+
+        sys.stdout = buffer = StringIO()
+        self.batch_create_vnf_lcm.take_action(parsed_args)
+
+        self.assertEqual('All 2 VNF instances are created successfully',
+                         buffer.getvalue().strip())
+        self.assertIn('[2/2] vnf-2 wait SUCCEEDED',
+                      self.app.stderr.getvalue())
+        with open(self.report) as f:
+            report = json.load(f)
+        self.assertEqual(['vnf-1', 'vnf-2'],
+                         [vnf['name'] for vnf in report['vnfs']])
+        self.assertEqual([vnf_instance['id']
+                          for vnf_instance in self.vnf_instances],
+                         [vnf['vnfInstanceId'] for vnf in report['vnfs']])
+        self.assertEqual(['op-' + vnf_instance['id']
+                          for vnf_instance in self.vnf_instances],
+                         [vnf['vnfLcmOpOccId'] for vnf in report['vnfs']])
+        instantiate_body = [request.json()
+                            for request in self.requests_mock.request_history
+                            if request.path.endswith('/instantiate')]
+        self.assertEqual([{'flavourId': 'simple'}] * 2, instantiate_body)
+
+    def test_take_action_failed(self):
+        arglist = [self.manifest, '--base-params', self.base_params]
+        parsed_args = self.check_parser(self.batch_create_vnf_lcm, arglist,
+                                        [])
+        self._mock_requests('FAILED_TEMP')
+
+        exception = self.assertRaises(
+            exceptions.CommandError, self.batch_create_vnf_lcm.take_action,
+            parsed_args)
+
+        self.assertEqual('Failed to create 1 and skipped 1 of 2 VNF '
+                         'instances.', exception.message)
+
+    def test_take_action_resume(self):
+        journal_file = os.path.join(self.dir, 'fleet.journal')
+        arglist = [self.manifest, '--base-params', self.base_params,
+                   '--journal', journal_file]
+        parsed_args = self.check_parser(self.batch_create_vnf_lcm, arglist,
+                                        [('journal', journal_file)])
+        self._mock_requests('FAILED_TEMP')
+        self.assertRaises(exceptions.CommandError,
+                          self.batch_create_vnf_lcm.take_action, parsed_args)
+
+        # The failed operation was retried by the operator
+        self._mock_requests('COMPLETED', created=self.vnf_instances[1:])
+        first_run_count = len(self.requests_mock.request_history)
+        parsed_args = self.check_parser(self.batch_create_vnf_lcm,
+                                        ['--resume', journal_file],
+                                        [('resume', journal_file)])
+        sys.stdout = buffer = StringIO()
+        self.batch_create_vnf_lcm.take_action(parsed_args)
+
+        self.assertEqual('All 2 VNF instances are created successfully',
+                         buffer.getvalue().strip())
+        # vnf-1 is not created nor instantiated again
+        op_occs_path = '/vnflcm/v1/vnf_lcm_op_occs/op-'
+        self.assertEqual(
+            ['GET ' + op_occs_path + self.vnf_instances[0]['id'],
+             'POST /vnflcm/v1/vnf_instances',
+             'POST /vnflcm/v1/vnf_instances/%s/instantiate' %
+             self.vnf_instances[1]['id'],
+             'GET ' + op_occs_path + self.vnf_instances[1]['id']],
+            ['%s %s' % (request.method, request.path) for request in
+             self.requests_mock.request_history[first_run_count:]])
+
+    def test_take_action_existing_journal(self):
+        journal_file = os.path.join(self.dir, 'fleet.journal')
+        with open(journal_file, 'w') as f:
+            f.write('{"kind": "batch-create", "items": []}\n')
+        parsed_args = self.check_parser(
+            self.batch_create_vnf_lcm,
+            [self.manifest, '--journal', journal_file], [])
+        self.assertRaises(exceptions.InvalidInput,
+                          self.batch_create_vnf_lcm.take_action, parsed_args)
+
+
 class TestVnfLcmV1(base.FixturedTestCase):
     client_fixture_class = client.ClientFixture
     api_version = '1'
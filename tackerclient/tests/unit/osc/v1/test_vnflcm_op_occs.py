@@ -20,6 +20,7 @@ from oslo_utils.fixture import uuidsentinel
 from unittest import mock
 
 from tackerclient.common import exceptions
+from tackerclient.common import fleet
 from tackerclient.osc import utils as tacker_osc_utils
 from tackerclient.osc.v1.vnflcm import vnflcm_op_occs
 from tackerclient.tests.unit.osc import base
@@ -61,6 +62,25 @@ class TestVnfLcm(base.FixturedTestCase):
         self.client_manager = self.cs
         self.app.client_manager.tackerclient = self.client_manager
 
+    def _mock_bulk(self, vnflcm_op_occs, action, state, failing=()):
+        list_url = os.path.join(self.url, 'vnflcm/v1/vnf_lcm_op_occs')
+
+        def list_vnf_lcm_op_occs(request, context):
+            context.headers.update(self.header)
+            if '(in,id,' in request.qs['filter'][0]:
+                return [dict(o, operationState=state,
+                             stateEnteredTime='2024-01-01T00:00:00Z')
+                        for o in vnflcm_op_occs]
+            return vnflcm_op_occs
+
+        self.requests_mock.register_uri('GET', list_url,
+                                        json=list_vnf_lcm_op_occs)
+        for vnflcm_op_occ in vnflcm_op_occs:
+            self.requests_mock.register_uri(
+                'POST', os.path.join(list_url, vnflcm_op_occ['id'], action),
+                headers=self.header, json={},
+                status_code=409 if vnflcm_op_occ['id'] in failing else 202)
+
 
 @ddt.ddt
 class TestCancelVnfLcmOp(TestVnfLcm):
@@ -184,6 +204,7 @@ class TestRollbackVnfLcmOp(TestVnfLcm):
                           parsed_args)
 
 
+@ddt.ddt
 class TestFailVnfLcmOp(TestVnfLcm):
 
     def setUp(self):
@@ -292,6 +313,35 @@ class TestFailVnfLcmOp(TestVnfLcm):
         self.assertRaises(base.ParserException, self.check_parser,
                           self.fail_vnf_lcm, arg_list, verify_list)
 
+    def test_take_action_filter(self):
+        vnflcm_op_occs = vnflcm_op_occs_fakes.create_vnflcm_op_occs(count=2)
+        parsed_args = self.check_parser(
+            self.fail_vnf_lcm,
+            ['--filter', '(eq,operationState,FAILED_TEMP)'], [])
+        self._mock_bulk(vnflcm_op_occs, 'fail', 'FAILED')
+        self.app.stderr = StringIO()
+
+        columns, data = self.fail_vnf_lcm.take_action(parsed_args)
+
+        self.assertEqual(tuple(o['id'] for o in vnflcm_op_occs), columns)
+        self.assertEqual(('ACCEPTED (STARTING)',) * 2, data)
+        self.assertIn('Fail of 2 LCM operations: 2 ACCEPTED',
+                      self.app.stderr.getvalue())
+
+    @ddt.data(['--parallel', '2'], ['--rate', '1'], ['--wait'],
+              ['--timeout', '10'])
+    def test_take_action_bulk_option_with_id(self, arg_list):
+        parsed_args = self.check_parser(
+            self.fail_vnf_lcm,
+            [uuidsentinel.vnf_lcm_op_occ_id] + arg_list, [])
+
+        result = self.assertRaises(exceptions.CommandError,
+                                   self.fail_vnf_lcm.take_action,
+                                   parsed_args)
+
+        self.assertEqual('%s can only be used with --filter' % arg_list[0],
+                         str(result))
+
 
 class TestRetryVnfLcmOp(TestVnfLcm):
 
@@ -406,6 +456,59 @@ class TestRetryVnfLcmOp(TestVnfLcm):
         self.assertRaises(base.ParserException, self.check_parser,
                           self.retry_vnf_lcm, arg_list, verify_list)
 
+    def test_take_action_filter(self):
+        vnflcm_op_occs = vnflcm_op_occs_fakes.create_vnflcm_op_occs(count=3)
+        arg_list = ['--filter', '(eq,operationState,FAILED_TEMP)',
+                    '--parallel', '2', '--rate', '100', '--wait']
+        verify_list = [('vnf_lcm_op_occ_id', None),
+                       ('filter', '(eq,operationState,FAILED_TEMP)'),
+                       ('parallel', 2), ('rate', 100), ('wait', True)]
+        parsed_args = self.check_parser(
+            self.retry_vnf_lcm, arg_list, verify_list)
+        self._mock_bulk(vnflcm_op_occs, 'retry', 'COMPLETED')
+        self.app.stderr = StringIO()
+        mock.patch.object(fleet, 'POLL_INTERVAL', 0).start()
+        self.addCleanup(mock.patch.stopall)
+
+        sys.stdout = buffer = StringIO()
+        self.retry_vnf_lcm.take_action(parsed_args)
+
+        actual_message = buffer.getvalue()
+        for vnflcm_op_occ in vnflcm_op_occs:
+            self.assertIn('LCM operation %s: SUCCEEDED (COMPLETED)'
+                          % vnflcm_op_occ['id'], actual_message)
+        self.assertIn('Retry of 3 LCM operations: 3 SUCCEEDED',
+                      actual_message)
+        self.assertIn('exclude_default',
+                      self.requests_mock.request_history[0].qs)
+
+    def test_take_action_filter_failed(self):
+        vnflcm_op_occs = vnflcm_op_occs_fakes.create_vnflcm_op_occs(count=2)
+        arg_list = ['--filter', '(eq,operationState,FAILED_TEMP)']
+        parsed_args = self.check_parser(self.retry_vnf_lcm, arg_list, [])
+        self._mock_bulk(vnflcm_op_occs, 'retry', 'COMPLETED',
+                        failing=[vnflcm_op_occs[0]['id']])
+        self.app.stderr = StringIO()
+
+        sys.stdout = buffer = StringIO()
+        result = self.assertRaises(exceptions.CommandError,
+                                   self.retry_vnf_lcm.take_action,
+                                   parsed_args)
+
+        self.assertEqual('Failed to retry 1 of 2 LCM operations.',
+                         str(result))
+        self.assertIn('LCM operation %s: ACCEPTED'
+                      % vnflcm_op_occs[1]['id'], buffer.getvalue())
+        # Without --wait, the operations are not polled
+        self.assertEqual(1, len([r for r in self.requests_mock.request_history
+                                 if r.method == 'GET']))
+
+    def test_take_action_filter_with_id(self):
+        arg_list = ['--filter', '(eq,operationState,FAILED_TEMP)',
+                    uuidsentinel.vnf_lcm_op_occ_id]
+        self.assertRaises(base.ParserException, self.check_parser,
+                          self.retry_vnf_lcm, arg_list, [])
+
 
 class TestListVnfLcmOp(TestVnfLcm):
 
@@ -482,6 +585,31 @@ class TestListVnfLcmOp(TestVnfLcm):
                           self.list_vnflcm_op_occ.take_action,
                           parsed_args)
 
+    def test_take_action_with_columns(self):
+        parsed_args = self.check_parser(
+            self.list_vnflcm_op_occ, ['-c', 'ID', '-c', 'Operation State'],
+            [('columns', ['ID', 'Operation State'])])
+        list_mock = self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v1/vnf_lcm_op_occs'),
+            json=vnflcm_op_occs_fakes.create_vnflcm_op_occs(count=1),
+            headers=self.header)
+
+        self.list_vnflcm_op_occ.take_action(parsed_args)
+
+        self.assertEqual({'exclude_default': ['']},
+                         list_mock.last_request.qs)
+
+    def test_take_action_with_invalid_filter_not_sent(self):
+        parsed_args = self.check_parser(
+            self.list_vnflcm_op_occ,
+            ["--filter", '(eq,operationState)'],
+            [('filter', '(eq,operationState)')])
+
+        self.assertRaises(exceptions.InvalidInput,
+                          self.list_vnflcm_op_occ.take_action,
+                          parsed_args)
+        self.assertFalse(self.requests_mock.called)
+
     def test_take_action_internal_server_error(self):
 
         parsed_args = self.check_parser(
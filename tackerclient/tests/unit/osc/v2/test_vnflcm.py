@@ -195,3 +195,87 @@ class TestChangeVnfPkgVnfLcm(test_vnflcm.TestVnfLcm):
 
         expected_msg = "Failed to load parameter file."
         self.assertIn(expected_msg, str(ex))
+
+
+class TestBatchChangeVnfPkgVnfLcm(test_vnflcm.TestVnfLcm):
+    api_version = '2'
+
+    def setUp(self):
+        super(TestBatchChangeVnfPkgVnfLcm, self).setUp()
+        self.batch_change_vnfpkg_vnf_lcm = vnflcm.BatchChangeVnfPkgVnfLcm(
+            self.app, self.app_args,
+            cmd_name='vnflcm batch change-vnfpkg')
+        self.app.stderr = StringIO()
+        self.sample_param_file = (
+            "./tackerclient/osc/v2/vnflcm/samples/"
+            "change_vnfpkg_vnf_instance_param_sample.json")
+        self.vnf_instances = vnflcm_fakes.create_vnf_instances(count=3)
+        self.requests_mock.register_uri(
+            'GET', os.path.join(self.url, 'vnflcm/v2/vnf_instances'),
+            json=self.vnf_instances, headers=self.header)
+
+    def _mock_change_vnfpkg(self, vnf_instance, op_state):
+        op_occ_url = os.path.join(self.url, 'vnflcm/v2/vnf_lcm_op_occs',
+                                  'op-' + vnf_instance['id'])
+        self.requests_mock.register_uri(
+            'POST', os.path.join(self.url, 'vnflcm/v2/vnf_instances',
+                                 vnf_instance['id'], 'change_vnfpkg'),
+            headers=dict(self.header, Location=op_occ_url), status_code=202)
+        self.requests_mock.register_uri(
+            'GET', op_occ_url, headers=self.header,
+            json={'id': 'op-' + vnf_instance['id'],
+                  'operationState': op_state})
+
+    def test_take_action(self):
+        arglist = [self.sample_param_file, '--filter',
+                   '(eq,vnfdId,old)', '--parallel', '2']
+        verifylist = [('request_file', self.sample_param_file),
+                      ('filter', '(eq,vnfdId,old)'),
+                      ('canary', 1),
+                      ('growth', 2.0),
+                      ('parallel', 2)]
+        parsed_args = self.check_parser(self.batch_change_vnfpkg_vnf_lcm,
+                                        arglist, verifylist)
+        for vnf_instance in self.vnf_instances:
+            self._mock_change_vnfpkg(vnf_instance, 'COMPLETED')
+
+        sys.stdout = buffer = StringIO()
+        self.batch_change_vnfpkg_vnf_lcm.take_action(parsed_args)
+
+        self.assertEqual('The VNF package of all 3 VNF instances is '
+                         'changed successfully', buffer.getvalue().strip())
+        self.assertIn('in 2 waves', self.app.stderr.getvalue())
+        self.assertIn('[2/2] %s SUCCEEDED' % self.vnf_instances[2]['id'],
+                      self.app.stderr.getvalue())
+        # requests_mock lowercases query strings
+        self.assertEqual(
+            '(eq,instantiationState,INSTANTIATED);(eq,vnfdId,old)'.lower(),
+            self.requests_mock.request_history[0].qs['filter'][0])
+
+    def test_take_action_stop(self):
+        arglist = [self.sample_param_file, '--filter', '(eq,vnfdId,old)',
+                   '--rollback']
+        parsed_args = self.check_parser(self.batch_change_vnfpkg_vnf_lcm,
+                                        arglist, [('rollback', True)])
+        self._mock_change_vnfpkg(self.vnf_instances[0], 'FAILED_TEMP')
+        self.requests_mock.register_uri(
+            'POST', os.path.join(
+                self.url, 'vnflcm/v2/vnf_lcm_op_occs',
+                'op-' + self.vnf_instances[0]['id'], 'rollback'),
+            [{'status_code': 409, 'json': {}}])
+
+        exception = self.assertRaises(
+            exceptions.CommandError,
+            self.batch_change_vnfpkg_vnf_lcm.take_action, parsed_args)
+
+        self.assertEqual('Failed to change the VNF package of 1 of 3 VNF '
+                         'instances, 2 not started.', exception.message)
+
+    def test_take_action_invalid_filter(self):
+        arglist = [self.sample_param_file, '--filter', '(eq,vnfdId']
+        parsed_args = self.check_parser(self.batch_change_vnfpkg_vnf_lcm,
+                                        arglist, [])
+        self.assertRaises(exceptions.InvalidInput,
+                          self.batch_change_vnfpkg_vnf_lcm.take_action,
+                          parsed_args)
+        self.assertFalse(self.requests_mock.called)
@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from unittest import mock
+
+import fixtures
+from requests_mock.contrib import fixture as requests_mock_fixture
+import testtools
+
+from tackerclient.v1_0 import client as proxy_client
+
+TACKER_URL = 'http://nfv-orchestration'
+TOKEN = 'token'
+
+
+class TestSelectApiVersion(testtools.TestCase):
+
+    def test_select(self):
+        versions = [{'version': '1.1.0'}, {'version': '1.2.0'},
+                    {'version': '1.4.0'}, {'version': '2.0.0'}]
+        self.assertEqual('1.2.0',
+                         proxy_client.select_api_version('1.3.0', versions))
+
+    def test_prefer_not_deprecated(self):
+        versions = [{'version': '1.3.0', 'isDeprecated': True},
+                    {'version': '1.2.0', 'isDeprecated': False}]
+        self.assertEqual('1.2.0',
+                         proxy_client.select_api_version('1.3.0', versions))
+
+    def test_no_match(self):
+        self.assertIsNone(proxy_client.select_api_version(
+            '2.1.0', [{'version': '1.3.0'}, {'version': 'x'}]))
+        self.assertIsNone(proxy_client.select_api_version('2.1.0', None))
+
+
+class TestApiVersionNegotiation(testtools.TestCase):
+
+    def setUp(self):
+        super(TestApiVersionNegotiation, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR',
+            self.useFixture(fixtures.TempDir()).path))
+        self.useFixture(fixtures.MockPatchObject(
+            proxy_client, '_negotiated_versions', {}))
+        self.requests_mock = self.useFixture(requests_mock_fixture.Fixture())
+        self.versions_mock = self.requests_mock.get(
+            TACKER_URL + '/vnfpm/v2/api_versions',
+            json={'uriPrefix': '/vnfpm/v2',
+                  'apiVersions': [{'version': '2.0.0'}]})
+        self.jobs_mock = self.requests_mock.get(
+            TACKER_URL + '/vnfpm/v2/pm_jobs', json=[])
+
+    def _make_client(self, **kwargs):
+        return proxy_client.Client(token=TOKEN, endpoint_url=TACKER_URL,
+                                   **kwargs)
+
+    def test_disabled_by_default(self):
+        self._make_client().list_vnf_pm_jobs()
+        self.assertFalse(self.versions_mock.called)
+        self.assertEqual('2.1.0',
+                         self.jobs_mock.last_request.headers['Version'])
+
+    def test_negotiate(self):
+        tacker = self._make_client(negotiate_api_version=True)
+        tacker.list_vnf_pm_jobs()
+        tacker.list_vnf_pm_jobs()
+        self.assertEqual(1, self.versions_mock.call_count)
+        self.assertEqual('2.0.0',
+                         self.jobs_mock.last_request.headers['Version'])
+
+        # Other clients of the process use the negotiated version
+        self._make_client(negotiate_api_version=True).list_vnf_pm_jobs()
+        self.assertEqual(1, self.versions_mock.call_count)
+
+    def test_negotiated_version_is_cached_on_disk(self):
+        self._make_client(negotiate_api_version=True).list_vnf_pm_jobs()
+        with mock.patch.object(proxy_client, '_negotiated_versions', {}):
+            self._make_client(negotiate_api_version=True).list_vnf_pm_jobs()
+        self.assertEqual(1, self.versions_mock.call_count)
+        self.assertEqual('2.0.0',
+                         self.jobs_mock.last_request.headers['Version'])
+
+    def test_fall_back_to_default_version(self):
+        self.requests_mock.get(TACKER_URL + '/vnfpm/v2/api_versions',
+                               status_code=404)
+        self._make_client(negotiate_api_version=True).list_vnf_pm_jobs()
+        self.assertEqual('2.1.0',
+                         self.jobs_mock.last_request.headers['Version'])
+
+    def test_negotiate_vnf_lcm(self):
+        versions_mock = self.requests_mock.get(
+            TACKER_URL + '/vnflcm/v1/api_versions',
+            json={'uriPrefix': '/vnflcm/v1',
+                  'apiVersions': [{'version': '1.3.0'},
+                                  {'version': '1.0.0'}]})
+        tacker = self._make_client(negotiate_api_version=True)
+        self.assertEqual({'Version': '1.3.0'}, tacker.vnf_lcm_client.headers)
+        self.assertTrue(versions_mock.called)
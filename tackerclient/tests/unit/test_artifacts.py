@@ -0,0 +1,281 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import hashlib
+import io
+import os
+import threading
+import zipfile
+
+import fixtures
+import testtools
+
+from tackerclient.common import artifacts
+from tackerclient.common import cache
+from tackerclient.common import exceptions
+
+
+class FakeResponse(object):
+
+    def __init__(self, data, barrier=None):
+        self.data = data
+        self.barrier = barrier
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        if self.barrier is not None:
+            # Every download must be in progress at the same time
+            self.barrier.wait()
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient(object):
+    """In-memory VNF package API serving the content of its artifacts."""
+
+    def __init__(self, contents, checksums=None, state='ONBOARDED',
+                 barrier=None, vnfd=None):
+        self.contents = contents
+        self.vnfd = vnfd
+        self.vnfd_downloads = 0
+        self.checksums = checksums or {}
+        self.state = state
+        self.barrier = barrier
+        self.lock = threading.Lock()
+        self.streams = []
+
+    def fork(self):
+        return copy.copy(self)
+
+    def show_vnf_package(self, vnf_package_id):
+        additional_artifacts = []
+        for path, data in self.contents.items():
+            checksum = self.checksums.get(path, {
+                'algorithm': 'SHA-256',
+                'hash': hashlib.sha256(data).hexdigest()})
+            additional_artifacts.append({'artifactPath': path,
+                                         'checksum': checksum,
+                                         'metadata': {}})
+        return {'id': vnf_package_id, 'onboardingState': self.state,
+                'vnfdId': 'vnfd-1',
+                'additionalArtifacts': additional_artifacts}
+
+    def download_vnfd_from_vnf_package(self, vnf_package_id, accept):
+        self.vnfd_downloads += 1
+        return self.vnfd
+
+    def stream_artifact_from_vnf_package(self, vnf_package_id, path):
+        resp = FakeResponse(self.contents[path], self.barrier)
+        with self.lock:
+            self.streams.append(resp)
+        return resp
+
+
+class TestMirror(testtools.TestCase):
+
+    def setUp(self):
+        super(TestMirror, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+        self.contents = {'Files/images/image.img': os.urandom(10000),
+                         'Scripts/install.sh': b'echo install\n',
+                         'Files/empty': b''}
+
+    def _read(self, artifact_path):
+        with open(os.path.join(self.dir, *artifact_path.split('/')),
+                  'rb') as f:
+            return f.read()
+
+    def test_mirror(self):
+        client = FakeClient(self.contents,
+                            barrier=threading.Barrier(3, timeout=5))
+        progress = []
+
+        results = artifacts.mirror(
+            client, 'pkg', self.dir, max_workers=3, chunk_size=1000,
+            progress=lambda *args: progress.append(args))
+
+        self.assertEqual(list(self.contents),
+                         [r['artifactPath'] for r in results])
+        self.assertEqual([artifacts.DOWNLOADED] * 3,
+                         [r['status'] for r in results])
+        self.assertEqual([10000, 13, 0], [r['size'] for r in results])
+        for path, data in self.contents.items():
+            self.assertEqual(data, self._read(path))
+        self.assertTrue(all(resp.closed for resp in client.streams))
+        self.assertEqual(
+            [artifacts.DOWNLOADING, artifacts.DOWNLOADED],
+            [status for path, status in progress
+             if path == 'Scripts/install.sh'])
+        self.assertEqual([], [name for _dirpath, _dirs, names
+                              in os.walk(self.dir) for name in names
+                              if name.endswith(artifacts.PART_SUFFIX)])
+
+    def test_mirror_resume(self):
+        artifacts.mirror(FakeClient(self.contents), 'pkg', self.dir)
+        # An interrupted download and a corrupted file
+        os.remove(os.path.join(self.dir, 'Scripts', 'install.sh'))
+        with open(os.path.join(self.dir, 'Scripts',
+                               'install.sh.part'), 'w') as f:
+            f.write('echo')
+        with open(os.path.join(self.dir, 'Files', 'empty'), 'w') as f:
+            f.write('corrupted')
+        client = FakeClient(self.contents)
+
+        results = artifacts.mirror(client, 'pkg', self.dir)
+
+        self.assertEqual(
+            [artifacts.SKIPPED, artifacts.DOWNLOADED, artifacts.DOWNLOADED],
+            [r['status'] for r in results])
+        self.assertEqual(2, len(client.streams))
+        self.assertEqual(b'echo install\n', self._read('Scripts/install.sh'))
+        self.assertEqual(b'', self._read('Files/empty'))
+
+    def test_mirror_checksum_mismatch(self):
+        client = FakeClient(self.contents, checksums={
+            'Scripts/install.sh': {'algorithm': 'SHA-512', 'hash': 'ab'},
+            'Files/empty': {'algorithm': 'MD6', 'hash': 'ab'}})
+
+        results = artifacts.mirror(client, 'pkg', self.dir)
+
+        image, script, empty = results
+        self.assertEqual(artifacts.DOWNLOADED, image['status'])
+        self.assertEqual(artifacts.FAILED, script['status'])
+        self.assertIn('does not match its SHA-512 checksum', script['error'])
+        self.assertFalse(os.path.exists(script['path']))
+        self.assertFalse(os.path.exists(
+            script['path'] + artifacts.PART_SUFFIX))
+        self.assertEqual(artifacts.FAILED, empty['status'])
+        self.assertIn('Unsupported checksum algorithm MD6', empty['error'])
+
+    def test_mirror_selected_artifacts(self):
+        client = FakeClient(self.contents)
+
+        results = artifacts.mirror(client, 'pkg', self.dir,
+                                   artifact_paths=['Scripts/install.sh'])
+
+        self.assertEqual(['Scripts/install.sh'],
+                         [r['artifactPath'] for r in results])
+        e = self.assertRaises(exceptions.InvalidInput, artifacts.mirror,
+                              client, 'pkg', self.dir,
+                              artifact_paths=['Scripts/missing.sh'])
+        self.assertIn('Scripts/missing.sh', str(e))
+
+    def test_mirror_invalid(self):
+        self.assertRaises(exceptions.InvalidInput, artifacts.mirror,
+                          FakeClient(self.contents, state='CREATED'), 'pkg',
+                          self.dir)
+        self.assertRaises(exceptions.InvalidInput, artifacts.mirror,
+                          FakeClient({'../outside': b''}), 'pkg', self.dir)
+        self.assertRaises(exceptions.InvalidInput, artifacts.target_path,
+                          self.dir, '/etc/passwd')
+
+
+class TestFetchPackage(testtools.TestCase):
+
+    def setUp(self):
+        super(TestFetchPackage, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+        self.store = cache.ContentStore(
+            directory=self.useFixture(fixtures.TempDir()).path)
+        vnfd = io.BytesIO()
+        with zipfile.ZipFile(vnfd, 'w') as archive:
+            archive.writestr('TOSCA-Metadata/TOSCA.meta', 'meta')
+            archive.writestr('Definitions/vnfd.yaml', 'vnfd')
+        self.vnfd = vnfd.getvalue()
+        self.old = {'Files/images/image.img': os.urandom(10000),
+                    'Scripts/install.sh': b'echo install\n'}
+        self.new = dict(self.old)
+        self.new['Scripts/install.sh'] = b'echo install v2\n'
+
+    def _path(self, directory, artifact_path):
+        return os.path.join(directory, *artifact_path.split('/'))
+
+    def _read(self, directory, artifact_path):
+        with open(self._path(directory, artifact_path), 'rb') as f:
+            return f.read()
+
+    def _check_tree(self, directory):
+        self.assertEqual(b'vnfd', self._read(directory,
+                                             'Definitions/vnfd.yaml'))
+        for path, data in self.new.items():
+            self.assertEqual(data, self._read(directory, path))
+
+    def test_fetch_package_from_store(self):
+        artifacts.fetch_package(FakeClient(self.old, vnfd=self.vnfd), 'pkg',
+                                self.dir, store=self.store)
+        client = FakeClient(self.new, vnfd=self.vnfd)
+        directory = os.path.join(self.dir, 'v2')
+
+        fetched = artifacts.fetch_package(client, 'pkg-2', directory,
+                                          store=self.store)
+
+        self.assertEqual(['TOSCA-Metadata/TOSCA.meta',
+                          'Definitions/vnfd.yaml'], fetched['vnfdFiles'])
+        self.assertEqual([artifacts.REUSED, artifacts.DOWNLOADED],
+                         [r['status'] for r in fetched['artifacts']])
+        self.assertEqual([b'echo install v2\n'],
+                         [resp.data for resp in client.streams])
+        # The VNFD of the same vnfdId is served by the store
+        self.assertEqual(0, client.vnfd_downloads)
+        self._check_tree(directory)
+
+    def test_fetch_package_from_bases(self):
+        tree = os.path.join(self.dir, 'tree')
+        artifacts.mirror(FakeClient(self.old), 'pkg', tree)
+        csar = os.path.join(self.dir, 'v1.zip')
+        with zipfile.ZipFile(csar, 'w') as archive:
+            archive.writestr('Files/images/image.img',
+                             self.old['Files/images/image.img'])
+        self.new['Files/other.img'] = b'other'
+        for i, (bases, status) in enumerate((([csar], artifacts.REUSED),
+                                            ([tree], artifacts.REUSED),
+                                            ([], artifacts.DOWNLOADED))):
+            client = FakeClient(self.new, vnfd=self.vnfd)
+            directory = os.path.join(self.dir, 'v2-%d' % i)
+
+            fetched = artifacts.fetch_package(client, 'pkg-2', directory,
+                                              bases=bases)
+
+            self.assertEqual(
+                [status, artifacts.DOWNLOADED, artifacts.DOWNLOADED],
+                [r['status'] for r in fetched['artifacts']])
+            self._check_tree(directory)
+
+    def test_fetch_package_changed_base(self):
+        tree = os.path.join(self.dir, 'tree')
+        artifacts.mirror(FakeClient(self.old), 'pkg', tree)
+        with open(self._path(tree, 'Files/images/image.img'), 'wb') as f:
+            f.write(b'corrupted')
+        client = FakeClient(self.new, vnfd=self.vnfd)
+        directory = os.path.join(self.dir, 'v2')
+
+        fetched = artifacts.fetch_package(client, 'pkg-2', directory,
+                                          bases=[tree, 'missing.zip'])
+
+        self.assertEqual([artifacts.DOWNLOADED] * 2,
+                         [r['status'] for r in fetched['artifacts']])
+        self._check_tree(directory)
+
+    def test_fetch_package_invalid_vnfd(self):
+        self.assertRaises(exceptions.InvalidInput, artifacts.fetch_package,
+                          FakeClient(self.new, vnfd=b'vnfd'), 'pkg',
+                          self.dir)
+        vnfd = io.BytesIO()
+        with zipfile.ZipFile(vnfd, 'w') as archive:
+            archive.writestr('../outside', 'vnfd')
+        self.assertRaises(exceptions.InvalidInput, artifacts.fetch_package,
+                          FakeClient(self.new, vnfd=vnfd.getvalue()), 'pkg',
+                          self.dir)
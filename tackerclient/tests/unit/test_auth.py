@@ -15,11 +15,17 @@
 #
 
 import copy
+import datetime
 import json
+import logging
+import threading
+import time
 from unittest import mock
 import uuid
 
+import fixtures
 from keystoneclient import exceptions as k_exceptions
+from oslo_utils import timeutils
 import requests
 import testtools
 
@@ -316,25 +322,25 @@ class CLITestAuthKeystone(testtools.TestCase):
                           resources)
 
     @mock.patch('tackerclient.client.HTTPClient.request')
-    @mock.patch('tackerclient.common.utils.http_log_req')
-    def test_strip_credentials_from_log(self, mock_http_log_req,
-                                        mock_request,):
+    def test_strip_credentials_from_log(self, mock_request):
+        logger = self.useFixture(fixtures.FakeLogger(
+            name='tackerclient.client', level=logging.DEBUG))
 
         body = ('{"auth": {"tenantId": "testtenant_id",'
                 '"passwordCredentials": {"password": "password",'
                 '"userId": "testuser_id"}}}')
         expected_body = ('{"auth": {"tenantId": "testtenant_id",'
-                         '"REDACTEDCredentials": {"REDACTED": "REDACTED",'
+                         '"passwordCredentials": {"password": "REDACTED",'
                          '"userId": "testuser_id"}}}')
-        _headers = {'headers': expected_headers, 'body': expected_body,
-                    'content_type': None}
 
         mock_request.return_value = (resp_200, json.dumps(KS_TOKEN_RESULT))
         self.client.do_request('/resource', 'GET', body=body)
 
-        args, kwargs = mock_http_log_req.call_args
         # Check that credentials are stripped while logging.
-        self.assertEqual(_headers, args[2])
+        self.assertIn(expected_body, logger.output)
+        self.assertNotIn('"password": "password"', logger.output)
+        # The request itself is sent with the credentials.
+        self.assertEqual(body, mock_request.call_args[1]['body'])
 
 
 class CLITestAuthKeystoneWithId(CLITestAuthKeystone):
@@ -371,3 +377,202 @@ class CLITestAuthKeystoneWithIdandName(CLITestAuthKeystone):
                                         password=PASSWORD,
                                         auth_url=AUTH_URL,
                                         region_name=REGION)
+
+
+class CLITestAuthKeystoneTokenCache(testtools.TestCase):
+
+    def setUp(self):
+        """Prepare the test environment."""
+        super(CLITestAuthKeystoneTokenCache, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR',
+            self.useFixture(fixtures.TempDir()).path))
+        self.token_result = copy.deepcopy(KS_TOKEN_RESULT)
+        self.token_result['access']['token']['expires'] = (
+            timeutils.utcnow() + datetime.timedelta(hours=1)).isoformat()
+
+    def _make_client(self, **kwargs):
+        return client.HTTPClient(username=USERNAME,
+                                 tenant_name=TENANT_NAME,
+                                 password=PASSWORD,
+                                 auth_url=AUTH_URL,
+                                 region_name=REGION,
+                                 token_cache=True,
+                                 **kwargs)
+
+    def _token_requests(self, mock_request):
+        return [c for c in mock_request.call_args_list
+                if c[0][0] == AUTH_URL + '/tokens']
+
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_token_is_reused_by_new_client(self, mock_request):
+        mock_request.return_value = (resp_200, json.dumps(self.token_result))
+        self._make_client().do_request('/resource', 'GET')
+        self.assertEqual(1, len(self._token_requests(mock_request)))
+
+        client_ = self._make_client()
+        client_.do_request('/resource', 'GET')
+        self.assertEqual(1, len(self._token_requests(mock_request)))
+        self.assertEqual(TOKEN, client_.auth_token)
+        self.assertEqual(ENDPOINT_URL, client_.endpoint_url)
+        mock_request.assert_called_with(
+            ENDPOINT_URL + '/resource', 'GET',
+            headers=expected_headers, content_type=None)
+
+    @mock.patch('threading.Timer')
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_cached_token_schedules_refresh(self, mock_request, mock_timer):
+        mock_request.return_value = (resp_200, json.dumps(self.token_result))
+        self._make_client().do_request('/resource', 'GET')
+
+        client_ = self._make_client(background_refresh=True)
+        client_.do_request('/resource', 'GET')
+
+        self.assertEqual(1, len(self._token_requests(mock_request)))
+        self.assertIsNotNone(client_._auth_time)
+        self.assertFalse(client_._token_needs_refresh())
+        mock_timer.return_value.start.assert_called_once_with()
+
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_token_cache_is_keyed_by_credentials(self, mock_request):
+        mock_request.return_value = (resp_200, json.dumps(self.token_result))
+        self._make_client().do_request('/resource', 'GET')
+        client_ = client.HTTPClient(username=USERNAME,
+                                    tenant_name=TENANT_NAME,
+                                    password='other',
+                                    auth_url=AUTH_URL,
+                                    region_name=REGION,
+                                    token_cache=True)
+        client_.do_request('/resource', 'GET')
+        self.assertEqual(2, len(self._token_requests(mock_request)))
+
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_expired_token_is_not_cached(self, mock_request):
+        mock_request.return_value = (resp_200, json.dumps(KS_TOKEN_RESULT))
+        self._make_client().do_request('/resource', 'GET')
+        self._make_client().do_request('/resource', 'GET')
+        self.assertEqual(2, len(self._token_requests(mock_request)))
+
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_token_cache_invalidated_on_401(self, mock_request):
+        mock_request.return_value = (resp_200, json.dumps(self.token_result))
+        self._make_client().do_request('/resource', 'GET')
+
+        client_ = self._make_client()
+        mock_request.side_effect = [
+            (resp_401, ''), (resp_401, 'bad credentials')]
+        self.assertRaises(exceptions.Unauthorized,
+                          client_.do_request, '/resource', 'GET')
+        self.assertEqual((None, None), client_.token_cache.get_auth(
+            client_._token_cache_key()))
+
+    def test_token_cache_disabled_by_default(self):
+        self.assertIsNone(client.HTTPClient(auth_url=AUTH_URL).token_cache)
+
+
+class CLITestAuthKeystoneTokenRefresh(testtools.TestCase):
+
+    def setUp(self):
+        """Prepare the test environment."""
+        super(CLITestAuthKeystoneTokenRefresh, self).setUp()
+        self.client = client.HTTPClient(username=USERNAME,
+                                        tenant_name=TENANT_NAME,
+                                        password=PASSWORD,
+                                        auth_url=AUTH_URL,
+                                        region_name=REGION)
+        self.addCleanup(self.client.close)
+
+    def _token_result(self, token=TOKEN, expires_in=3600):
+        result = copy.deepcopy(KS_TOKEN_RESULT)
+        result['access']['token']['id'] = token
+        result['access']['token']['expires'] = (
+            timeutils.utcnow() +
+            datetime.timedelta(seconds=expires_in)).isoformat()
+        return json.dumps(result)
+
+    def _token_requests(self, mock_request):
+        return [c for c in mock_request.call_args_list
+                if c[0][0] == AUTH_URL + '/tokens']
+
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_refresh_before_expiry(self, mock_request):
+        mock_request.return_value = (
+            resp_200, self._token_result(expires_in=30))
+        self.client.do_request('/resource', 'GET')
+        self.assertEqual(1, len(self._token_requests(mock_request)))
+
+        # Not refreshed again right after authentication
+        self.client.do_request('/resource', 'GET')
+        self.assertEqual(1, len(self._token_requests(mock_request)))
+
+        self.client._auth_time -= client.HTTPClient.TOKEN_REFRESH_WINDOW
+        mock_request.return_value = (resp_200, self._token_result('new'))
+        self.client.do_request('/resource', 'GET')
+        self.assertEqual(2, len(self._token_requests(mock_request)))
+        self.assertEqual('new', self.client.auth_token)
+        self.assertEqual('new',
+                         mock_request.call_args[1]['headers']['X-Auth-Token'])
+
+        stats = self.client.get_refresh_stats()
+        self.assertEqual(1, stats['refresh_count'])
+        self.assertEqual(0, stats['refresh_failures'])
+        self.assertIsNotNone(stats['last_refresh_duration'])
+
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_resend_with_new_token_on_401(self, mock_request):
+        self.client.auth_token = TOKEN
+        self.client.endpoint_url = ENDPOINT_URL
+        mock_request.side_effect = [(resp_401, ''),
+                                    (resp_200, self._token_result('new')),
+                                    (resp_200, '')]
+        self.client.do_request('/resource', 'GET')
+        self.assertEqual('new',
+                         mock_request.call_args[1]['headers']['X-Auth-Token'])
+        self.assertEqual(1, self.client.get_refresh_stats()['refresh_count'])
+
+    def test_refresh_failure_is_counted(self):
+        with mock.patch.object(self.client, 'authenticate',
+                               side_effect=exceptions.Unauthorized()):
+            self.assertRaises(exceptions.Unauthorized,
+                              self.client.refresh_token)
+        self.assertEqual(1,
+                         self.client.get_refresh_stats()['refresh_failures'])
+
+    def test_concurrent_refresh_is_single_flight(self):
+        self.client.auth_token = TOKEN
+        started = threading.Event()
+
+        def _authenticate():
+            started.set()
+            time.sleep(0.1)
+            self.client.auth_token = 'new'
+
+        with mock.patch.object(self.client, 'authenticate',
+                               side_effect=_authenticate) as mock_auth:
+            threads = [threading.Thread(target=self.client.refresh_token,
+                                        kwargs={'stale_token': TOKEN})
+                       for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(1, mock_auth.call_count)
+        self.assertEqual('new', self.client.auth_token)
+
+    @mock.patch('threading.Timer')
+    @mock.patch('tackerclient.client.HTTPClient.request')
+    def test_background_refresh(self, mock_request, mock_timer):
+        self.client.background_refresh = True
+        mock_request.return_value = (resp_200, self._token_result())
+        self.client.authenticate()
+
+        delay, refresh = mock_timer.call_args[0]
+        self.assertGreater(delay, 3400)
+        self.assertLess(delay, 3600)
+        self.assertEqual(self.client._refresh_in_background, refresh)
+        self.assertEqual((TOKEN,), mock_timer.call_args[1]['args'])
+        mock_timer.return_value.start.assert_called_once_with()
+
+        self.client.close()
+        mock_timer.return_value.cancel.assert_called_once_with()
@@ -0,0 +1,106 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from urllib import parse as urlparse
+import uuid
+
+from requests_mock.contrib import fixture as requests_mock_fixture
+import testtools
+
+from tackerclient import client
+from tackerclient.common import exceptions
+from tackerclient.common import filters
+from tackerclient.v1_0 import client as proxy_client
+
+TACKER_URL = 'http://nfv-orchestration'
+TOKEN = 'token'
+
+
+class TestGetMany(testtools.TestCase):
+
+    def setUp(self):
+        super(TestGetMany, self).setUp()
+        self.requests_mock = self.useFixture(requests_mock_fixture.Fixture())
+        self.instances = [{'id': str(uuid.uuid4()),
+                           'instantiationState': 'INSTANTIATED'}
+                          for _ in range(1000)]
+        self.instances_mock = self.requests_mock.get(
+            TACKER_URL + '/vnflcm/v1/vnf_instances',
+            json=self._select(self.instances))
+        self.tacker = proxy_client.Client(token=TOKEN,
+                                          endpoint_url=TACKER_URL)
+
+    @staticmethod
+    def _select(resources):
+        def callback(request, context):
+            query = urlparse.parse_qs(urlparse.urlsplit(request.url).query)
+            return filters.parse(query['filter'][0]).select(resources)
+        return callback
+
+    def test_get_vnf_instances(self):
+        ids = [i['id'] for i in self.instances]
+        missing = str(uuid.uuid4())
+
+        found, not_found = self.tacker.get_vnf_instances(
+            ids[::-1] + [missing, ids[0]])
+
+        self.assertEqual(self.instances[::-1], found)
+        self.assertEqual([missing], not_found)
+        self.assertLess(self.instances_mock.call_count, 10)
+        for request in self.instances_mock.request_history:
+            self.assertLessEqual(
+                len(request.url),
+                client.MAX_URI_LEN - proxy_client.BULK_URI_RESERVE)
+
+    def test_get_with_filter(self):
+        self.instances[0]['instantiationState'] = 'NOT_INSTANTIATED'
+        ids = [i['id'] for i in self.instances[:3]]
+
+        found, not_found = self.tacker.get_vnf_instances(
+            ids, filter='(eq,instantiationState,INSTANTIATED)')
+
+        self.assertEqual(self.instances[1:3], found)
+        self.assertEqual(ids[:1], not_found)
+        self.assertEqual(1, self.instances_mock.call_count)
+
+    def test_get_no_ids(self):
+        self.assertEqual(([], []), self.tacker.get_vnf_instances([]))
+        self.assertFalse(self.instances_mock.called)
+
+    def test_get_error(self):
+        self.requests_mock.get(TACKER_URL + '/vnflcm/v1/vnf_instances',
+                               status_code=500, json={})
+        self.assertRaises(exceptions.TackerClientException,
+                          self.tacker.get_vnf_instances,
+                          [i['id'] for i in self.instances])
+
+    def test_get_vnf_lcm_op_occs(self):
+        op_occs = [{'id': str(uuid.uuid4())} for _ in range(3)]
+        self.requests_mock.get(TACKER_URL + '/vnflcm/v1/vnf_lcm_op_occs',
+                               json=self._select(op_occs))
+
+        found, not_found = self.tacker.get_vnf_lcm_op_occs(
+            [op_occs[2]['id'], op_occs[0]['id']])
+
+        self.assertEqual([op_occs[2], op_occs[0]], found)
+        self.assertEqual([], not_found)
+
+    def test_get_vnf_packages(self):
+        packages = [{'id': str(uuid.uuid4())} for _ in range(3)]
+        self.requests_mock.get(TACKER_URL + '/vnfpkgm/v1/vnf_packages',
+                               json=self._select(packages))
+
+        found, not_found = self.tacker.get_vnf_packages(
+            [packages[1]['id'], 'unknown'])
+
+        self.assertEqual([packages[1]], found)
+        self.assertEqual(['unknown'], not_found)
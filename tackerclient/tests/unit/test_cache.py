@@ -0,0 +1,266 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import hashlib
+import os
+import stat
+import time
+
+import fixtures
+from keystoneclient import access
+from keystoneclient import fixture as ks_fixture
+from oslo_utils import timeutils
+import testtools
+
+from tackerclient.common import cache
+
+
+class TestFileCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestFileCache, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.cache = cache.FileCache('test', directory=self.directory)
+
+    def test_set_get(self):
+        self.cache.set('key', {'a': 1})
+        self.assertEqual({'a': 1}, self.cache.get('key'))
+        self.assertIsNone(self.cache.get('other'))
+
+    def test_permissions(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(
+            0o700, stat.S_IMODE(os.stat(self.cache.path).st_mode))
+        entry = os.path.join(self.cache.path, 'key.json')
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(entry).st_mode))
+
+    def test_expired(self):
+        self.cache.set('key', 'value', expires_at=time.time() - 1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(os.listdir(self.cache.path))
+
+    def test_ttl(self):
+        ttl_cache = cache.FileCache('test', directory=self.directory, ttl=60)
+        ttl_cache.set('key', 'value')
+        self.assertEqual('value', ttl_cache.get('key'))
+        ttl_cache.set('key', 'value', ttl=-1)
+        self.assertIsNone(ttl_cache.get('key'))
+
+    def test_corrupted_entry_is_a_miss(self):
+        self.cache.set('key', 'value')
+        with open(os.path.join(self.cache.path, 'key.json'), 'w') as f:
+            f.write('{')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_delete_and_clear(self):
+        self.cache.set('key1', 'value')
+        self.cache.set('key2', 'value')
+        self.cache.delete('key1')
+        self.assertIsNone(self.cache.get('key1'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key2'))
+
+    def test_default_directory(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR', self.directory))
+        self.assertEqual(os.path.join(self.directory, 'test'),
+                         cache.FileCache('test').path)
+
+    def test_make_key(self):
+        key = cache.make_key('url', 'user', 'secret')
+        self.assertEqual(key, cache.make_key('url', 'user', 'secret'))
+        self.assertNotEqual(key, cache.make_key('url', 'user', 'other'))
+        self.assertNotIn('secret', key)
+
+
+class TestTokenCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestTokenCache, self).setUp()
+        directory = self.useFixture(fixtures.TempDir()).path
+        self.cache = cache.TokenCache(directory=directory)
+
+    def _v2_auth_ref(self, expires=None):
+        token = ks_fixture.V2Token(expires=expires)
+        token.set_scope()
+        service = token.add_service('nfv-orchestration')
+        service.add_endpoint('http://tacker', region='RegionOne')
+        return access.AccessInfo.factory(body=token)
+
+    def test_v2_token(self):
+        auth_ref = self._v2_auth_ref()
+        self.cache.set_auth('key', auth_ref, 'http://tacker')
+
+        cached, endpoint_url = self.cache.get_auth('key')
+        self.assertEqual('http://tacker', endpoint_url)
+        self.assertEqual(auth_ref.auth_token, cached.auth_token)
+        self.assertEqual(auth_ref.project_id, cached.project_id)
+        self.assertEqual(
+            'http://tacker',
+            cached.service_catalog.url_for(service_type='nfv-orchestration'))
+
+    def test_v3_token(self):
+        token = ks_fixture.V3Token()
+        token.set_project_scope()
+        auth_ref = access.AccessInfo.factory(body=token, auth_token='abc')
+        self.cache.set_auth('key', auth_ref)
+
+        cached, endpoint_url = self.cache.get_auth('key')
+        self.assertIsNone(endpoint_url)
+        self.assertEqual('v3', cached.version)
+        self.assertEqual('abc', cached.auth_token)
+        self.assertEqual(auth_ref.user_id, cached.user_id)
+
+    def test_expiring_token_is_not_used(self):
+        expires = timeutils.utcnow() + datetime.timedelta(
+            seconds=cache.TokenCache.STALE_DURATION / 2)
+        self.cache.set_auth('key', self._v2_auth_ref(expires=expires))
+        self.assertEqual((None, None), self.cache.get_auth('key'))
+
+
+class TestContentStore(testtools.TestCase):
+
+    def setUp(self):
+        super(TestContentStore, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.store = cache.ContentStore(directory=self.directory,
+                                        max_bytes=100)
+        self.data = b'x' * 40
+        self.checksum = {'algorithm': 'SHA-256',
+                         'hash': hashlib.sha256(self.data).hexdigest()}
+        self.key = self.store.checksum_key(self.checksum)
+
+    def test_keys(self):
+        self.assertEqual('sha256-' + self.checksum['hash'], self.key)
+        self.assertIsNone(self.store.checksum_key(None))
+        self.assertIsNone(self.store.checksum_key(
+            {'algorithm': 'unknown', 'hash': 'abc'}))
+        self.assertIsNone(self.store.checksum_key(
+            {'algorithm': 'sha-256', 'hash': '../abc'}))
+        self.assertEqual(self.store.vnfd_key('vnfd', 'text/plain'),
+                         self.store.vnfd_key('vnfd', 'text/plain'))
+        self.assertNotEqual(self.store.vnfd_key('vnfd', 'text/plain'),
+                            self.store.vnfd_key('vnfd', 'application/zip'))
+        self.assertIsNone(self.store.vnfd_key(None, 'text/plain'))
+
+    def test_put_read(self):
+        self.assertIsNone(self.store.read(self.key))
+        self.assertTrue(self.store.put(self.key, self.data, self.checksum))
+        self.assertEqual(self.data, self.store.read(self.key))
+        mode = os.stat(self.store.get(self.key)).st_mode
+        self.assertEqual(0o444, stat.S_IMODE(mode))
+
+        self.assertTrue(self.store.put('text', 'déjà'))
+        self.assertEqual('déjà'.encode('utf-8'),
+                         self.store.read('text'))
+
+    def test_put_checksum_mismatch(self):
+        self.assertFalse(self.store.put(self.key, b'y' * 40, self.checksum))
+        self.assertIsNone(self.store.get(self.key))
+
+    def test_put_too_large(self):
+        self.assertFalse(self.store.put('large', b'x' * 101))
+        self.assertIsNone(self.store.get('large'))
+
+    def test_lru_eviction(self):
+        for age, key in ((20, 'a'), (10, 'b')):
+            self.store.put(key, self.data)
+            os.utime(self.store.get(key), (time.time() - age, 0))
+        self.store.get('a')
+
+        self.store.put('c', self.data)
+
+        self.assertIsNotNone(self.store.get('a'))
+        self.assertIsNone(self.store.get('b'))
+        self.assertIsNotNone(self.store.get('c'))
+
+    def test_get_keeps_mtime(self):
+        self.store.put(self.key, self.data)
+        path = self.store.get(self.key)
+        os.utime(path, (0, 1000))
+
+        self.store.get(self.key)
+
+        self.assertEqual(1000, os.stat(path).st_mtime)
+        self.assertGreater(os.stat(path).st_atime, 1000)
+
+    def test_materialize(self):
+        target = os.path.join(self.directory, 'target')
+        with open(target, 'w') as f:
+            f.write('old content')
+        self.assertFalse(self.store.materialize(self.key, target))
+
+        self.store.put(self.key, self.data)
+        self.assertTrue(self.store.materialize(self.key, target))
+
+        with open(target, 'rb') as f:
+            self.assertEqual(self.data, f.read())
+
+    def test_materialize_twice(self):
+        target = os.path.join(self.directory, 'target')
+        self.store.put(self.key, self.data)
+
+        for _i in range(2):
+            self.assertTrue(self.store.materialize(self.key, target))
+
+        with open(target, 'rb') as f:
+            self.assertEqual(self.data, f.read())
+        self.assertEqual(self.data, self.store.read(self.key))
+        self.assertEqual(['target'], [name for name in os.listdir(
+            self.directory) if name != 'content'])
+
+    def test_altered_object_is_not_served(self):
+        self.store.put(self.key, self.data)
+        path = self.store.get(self.key)
+        os.chmod(path, 0o644)
+        with open(path, 'wb') as f:
+            f.write(b'')
+
+        self.assertIsNone(self.store.read(self.key))
+        self.assertFalse(self.store.materialize(
+            self.key, os.path.join(self.directory, 'target')))
+        self.assertIsNone(self.store.get(self.key))
+
+    def test_materialize_copy(self):
+        target = os.path.join(self.directory, 'target')
+        self.store.put(self.key, self.data)
+        self.useFixture(fixtures.MockPatch('fcntl.ioctl',
+                                           side_effect=OSError))
+        self.useFixture(fixtures.MockPatch('os.link', side_effect=OSError))
+
+        self.assertTrue(self.store.materialize(self.key, target))
+
+        with open(target, 'rb') as f:
+            self.assertEqual(self.data, f.read())
+        self.assertNotEqual(os.stat(self.store.get(self.key)).st_ino,
+                            os.stat(target).st_ino)
+
+    def test_add(self):
+        path = os.path.join(self.directory, 'artifact')
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+        self.assertTrue(self.store.add(self.key, path))
+
+        self.assertEqual(self.data, self.store.read(self.key))
+        mode = os.stat(self.store.get(self.key)).st_mode
+        self.assertEqual(0o444, stat.S_IMODE(mode))
+        with open(path, 'ab') as f:
+            f.write(self.data * 2)
+        self.assertFalse(self.store.add('large', path))
+        self.assertIsNone(self.store.get('large'))
+
+    def test_clear(self):
+        self.store.put(self.key, self.data)
+        self.store.clear()
+        self.assertIsNone(self.store.get(self.key))
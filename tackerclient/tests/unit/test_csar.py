@@ -0,0 +1,272 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import io
+import os
+import shutil
+import zipfile
+
+import ddt
+import fixtures
+import testtools
+
+from tackerclient.common import csar
+from tackerclient.common import exceptions
+
+SAMPLE_PACKAGE = os.path.join(os.path.dirname(__file__), 'osc', 'v1',
+                              'fixture_data', 'sample_vnf_package')
+
+
+@ddt.ddt
+class TestCsar(testtools.TestCase):
+
+    def setUp(self):
+        super(TestCsar, self).setUp()
+        self.root = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'package')
+        shutil.copytree(SAMPLE_PACKAGE, self.root)
+        os.makedirs(os.path.join(self.root, 'Files', 'images'))
+        self.files = {
+            'Files/images/image.qcow2': os.urandom(300 * 1024),
+            'Files/images/image.img.gz': b'a' * 1000,
+            'Files/scripts/install.sh': b'echo install\n' * 20000,
+            'Files/empty': b''}
+        for name, data in self.files.items():
+            self._write(name, data)
+
+    def _write(self, name, data):
+        path = os.path.join(self.root, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def _zip(self, data):
+        archive = zipfile.ZipFile(io.BytesIO(data))
+        self.assertIsNone(archive.testzip())
+        return archive
+
+    def test_validate(self):
+        meta = csar.validate(self.root)
+        self.assertEqual('Definitions/helloworld3_top.vnfd.yaml',
+                         meta['Entry-Definitions'])
+
+    @ddt.data(('Entry-Definitions: Definitions/missing.yaml', 'not found'),
+              ('CSAR-Version: 1.1', 'lacks'),
+              ('Created-By', 'Invalid line 1'))
+    @ddt.unpack
+    def test_validate_invalid(self, meta, message):
+        content = ('TOSCA-Meta-File-Version: 1.0\nCreated-By: test\n'
+                   'CSAR-Version: 1.1\n'
+                   'Entry-Definitions: Definitions/helloworld3_top.vnfd.yaml'
+                   '\n')
+        if meta.startswith('Entry-Definitions'):
+            content = content.replace(
+                'Entry-Definitions: Definitions/helloworld3_top.vnfd.yaml',
+                meta)
+        elif meta.startswith('CSAR-Version'):
+            content = content.replace('Created-By: test\n', '')
+        else:
+            content = meta + '\n' + content
+        self._write(csar.TOSCA_META, content.encode())
+
+        e = self.assertRaises(exceptions.InvalidInput, csar.validate,
+                              self.root)
+        self.assertIn(message, str(e))
+
+    def test_validate_artifact_blocks(self):
+        with open(os.path.join(self.root, csar.TOSCA_META), 'a') as f:
+            f.write('\nName: Files/images/image.qcow2\n'
+                    'Content-Type: application/x-iso9066-image\n'
+                    '\nName: https://example.com/image.qcow2\n'
+                    '\nName: Files/images/missing.qcow2\n')
+
+        e = self.assertRaises(exceptions.InvalidInput, csar.validate,
+                              self.root)
+        self.assertIn('Files/images/missing.qcow2', str(e))
+
+    def test_iter_csar(self):
+        data = b''.join(csar.iter_csar(self.root, max_workers=3,
+                                       chunk_size=16 * 1024))
+
+        archive = self._zip(data)
+        names = archive.namelist()
+        self.assertEqual(csar.TOSCA_META, names[0])
+        self.assertEqual(sorted(csar.list_files(self.root)), sorted(names))
+        for name, content in self.files.items():
+            self.assertEqual(content, archive.read(name))
+        infos = dict((info.filename, info) for info in archive.infolist())
+        # Already compressed files are stored
+        self.assertEqual(zipfile.ZIP_STORED,
+                         infos['Files/images/image.qcow2'].compress_type)
+        self.assertEqual(zipfile.ZIP_STORED,
+                         infos['Files/images/image.img.gz'].compress_type)
+        script = infos['Files/scripts/install.sh']
+        self.assertEqual(zipfile.ZIP_DEFLATED, script.compress_type)
+        self.assertLess(script.compress_size, script.file_size / 20)
+
+    def test_iter_csar_zip64(self):
+        self.useFixture(fixtures.MockPatchObject(csar, '_ZIP64_LIMIT',
+                                                 1024))
+
+        archive = self._zip(b''.join(csar.iter_csar(self.root)))
+
+        self.assertEqual(self.files['Files/images/image.qcow2'],
+                         archive.read('Files/images/image.qcow2'))
+
+    def test_csar_stream(self):
+        stream = csar.CsarStream(self.root, chunk_size=16 * 1024)
+        data = b''.join(stream)
+
+        chunks = []
+        while True:
+            chunk = stream.read(10000)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        stream.close()
+
+        self.assertEqual(data, b''.join(chunks))
+        self.assertEqual(data, b''.join(stream))
+        self._zip(data)
+
+    def test_build(self):
+        path = os.path.join(self.root, os.pardir, 'package.zip')
+
+        csar.build(self.root, path)
+
+        with zipfile.ZipFile(path) as archive:
+            self.assertIsNone(archive.testzip())
+
+    def test_csar_stream_invalid(self):
+        os.remove(os.path.join(self.root, csar.TOSCA_META))
+        self.assertRaises(exceptions.InvalidInput, csar.CsarStream,
+                          self.root)
+
+
+@ddt.ddt
+class TestValidateArchive(testtools.TestCase):
+
+    def setUp(self):
+        super(TestValidateArchive, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+        self.path = os.path.join(self.dir, 'package.zip')
+        with open(os.path.join(SAMPLE_PACKAGE, csar.TOSCA_META)) as f:
+            self.meta = f.read()
+        self.script = b'echo install\n' * 1000
+        self.script_hash = hashlib.sha256(self.script).hexdigest()
+
+    def _zip(self, files, compression=zipfile.ZIP_DEFLATED):
+        with zipfile.ZipFile(self.path, 'w', compression) as archive:
+            for name, data in files.items():
+                archive.writestr(name, data)
+        return self.path
+
+    def _package(self, meta='', manifest=None,
+                 compression=zipfile.ZIP_DEFLATED):
+        files = {'Definitions/helloworld3_top.vnfd.yaml': 'vnfd',
+                 'Scripts/install.sh': self.script}
+        files[csar.TOSCA_META] = self.meta
+        if manifest is not None:
+            files['helloworld3.mf'] = manifest
+            files[csar.TOSCA_META] += 'ETSI-Entry-Manifest: helloworld3.mf\n'
+        files[csar.TOSCA_META] += meta
+        return self._zip(files, compression)
+
+    def test_validate_archive(self):
+        path = self._package(
+            meta='\nSource: Scripts/install.sh\nAlgorithm: SHA-256\n'
+                 'Hash: %s\n' % self.script_hash.upper(),
+            manifest='metadata:\n  vnf_product_name: hello\n\n'
+                     'Source: Scripts/install.sh\nAlgorithm: SHA-512\n'
+                     'Hash: %s\n\nSource: https://example.com/a.img\n'
+                     '-----BEGIN CMS-----\nSource: unsigned\n' %
+                     hashlib.sha512(self.script).hexdigest())
+
+        meta = csar.validate_archive(path, max_workers=2)
+
+        self.assertEqual('Definitions/helloworld3_top.vnfd.yaml',
+                         meta['Entry-Definitions'])
+
+    def test_validate_archive_hash_mismatch(self):
+        path = self._package(
+            meta='\nSource: Scripts/install.sh\nAlgorithm: SHA-256\n'
+                 'Hash: %s\n' % ('0' * 64),
+            manifest='Source: Definitions/helloworld3_top.vnfd.yaml\n'
+                     'Algorithm: SHA-256\nHash: %s\n' % ('0' * 64))
+
+        e = self.assertRaises(exceptions.InvalidInput,
+                              csar.validate_archive, path)
+        self.assertIn('Scripts/install.sh does not match its SHA-256 hash',
+                      str(e))
+        self.assertIn('Definitions/helloworld3_top.vnfd.yaml does not '
+                      'match', str(e))
+        csar.validate_archive(path, verify_hashes=False)
+
+    @ddt.data(('Source: Files/missing.img\n', 'Files/missing.img, a Source'),
+              ('Source: Scripts/install.sh\nAlgorithm: MD6\nHash: 00\n',
+               'Unsupported hash algorithm MD6'),
+              ('Source: Scripts/install.sh\nHash: 00\n', 'no algorithm'))
+    @ddt.unpack
+    def test_validate_archive_invalid_manifest(self, manifest, message):
+        path = self._package(manifest=manifest)
+
+        e = self.assertRaises(exceptions.InvalidInput,
+                              csar.validate_archive, path)
+        self.assertIn(message, str(e))
+
+    def test_validate_archive_missing_entry_definitions(self):
+        path = self._zip({csar.TOSCA_META: self.meta})
+
+        e = self.assertRaises(exceptions.InvalidInput,
+                              csar.validate_archive, path)
+        self.assertIn('Definitions/helloworld3_top.vnfd.yaml, the '
+                      'Entry-Definitions', str(e))
+
+    def test_validate_archive_nested(self):
+        path = self._zip({'package/' + csar.TOSCA_META: self.meta})
+
+        e = self.assertRaises(exceptions.InvalidInput,
+                              csar.validate_archive, path)
+        self.assertIn('is in package', str(e))
+
+    def test_validate_archive_without_tosca_metadata(self):
+        path = self._zip({'vnfd.yaml': 'vnfd', 'vnfd.mf':
+                          'Source: vnfd.yaml\nAlgorithm: SHA-256\nHash: %s\n'
+                          % hashlib.sha256(b'vnfd').hexdigest()})
+        self.assertEqual({'Entry-Definitions': 'vnfd.yaml'},
+                         csar.validate_archive(path))
+
+        path = self._zip({'a.yaml': 'a', 'b.yaml': 'b'})
+        self.assertRaises(exceptions.InvalidInput, csar.validate_archive,
+                          path)
+
+    def test_validate_archive_corrupted(self):
+        path = self._package(compression=zipfile.ZIP_STORED)
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data.replace(b'Created-by', b'Created-xx'))
+
+        e = self.assertRaises(exceptions.InvalidInput,
+                              csar.validate_archive, path)
+        self.assertIn('unreadable', str(e))
+
+    def test_validate_archive_not_a_zip(self):
+        with open(self.path, 'w') as f:
+            f.write('not a zip')
+
+        self.assertRaises(exceptions.InvalidInput, csar.validate_archive,
+                          self.path)
+        self.assertRaises(exceptions.InvalidInput, csar.validate_archive,
+                          os.path.join(self.dir, 'missing.zip'))
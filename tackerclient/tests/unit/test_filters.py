@@ -0,0 +1,97 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import filters
+
+RECORD = {
+    'id': 'a',
+    'vnfdId': 'x',
+    'vnfInstanceName': 'web,db',
+    'metadata': {'key': 'v1', 'replicas': 3, 'enabled': True},
+    'instantiatedVnfInfo': {
+        'vnfcResourceInfo': [
+            {'vduId': 'VDU1', 'computeResource': {'resourceId': 'r1'}},
+            {'vduId': 'VDU2', 'computeResource': {'resourceId': 'r2'}}],
+    },
+    'count': 3,
+}
+
+
+@ddt.ddt
+class TestFilter(testtools.TestCase):
+
+    @ddt.data(
+        '(eq,vnfdId,x)',
+        '(neq,vnfdId,y)',
+        '(in,vnfdId,y,x)',
+        '(nin,vnfdId,y,z)',
+        '(eq,metadata/key,v1)',
+        '(eq,metadata/replicas,3)',
+        '(eq,metadata/replicas,3.0)',
+        '(eq,metadata/enabled,true)',
+        '(gte,count,3)',
+        '(lt,count,10)',
+        '(gt,vnfdId,a)',
+        "(eq,vnfInstanceName,'web,db')",
+        '(cont,vnfInstanceName,db)',
+        '(ncont,vnfInstanceName,app)',
+        '(eq,instantiatedVnfInfo/vnfcResourceInfo/vduId,VDU2)',
+        '(eq,instantiatedVnfInfo/vnfcResourceInfo/computeResource/'
+        'resourceId,r1)',
+        '(neq,missing,x)',
+        '(nin,missing/key,x)',
+        '(eq,vnfdId,x);(in,metadata/key,v0,v1);(gt,count,2)',
+    )
+    def test_match(self, expr):
+        self.assertTrue(filters.parse(expr)(RECORD))
+
+    @ddt.data(
+        '(eq,vnfdId,y)',
+        '(neq,vnfdId,x)',
+        '(eq,metadata/enabled,false)',
+        '(eq,count,three)',
+        '(gt,count,3)',
+        '(gt,missing,3)',
+        '(eq,missing/key,x)',
+        '(cont,metadata,key)',
+        '(eq,vnfInstanceName,web)',
+        '(neq,instantiatedVnfInfo/vnfcResourceInfo/vduId,VDU1)',
+        '(eq,vnfdId,x);(eq,metadata/key,v2)',
+    )
+    def test_no_match(self, expr):
+        self.assertFalse(filters.parse(expr)(RECORD))
+
+    def test_parse(self):
+        f = filters.parse("(in,a/b,'x,y''z',2);(eq,c,'')")
+        self.assertEqual(
+            (filters.Expression('in', ('a', 'b'), ("x,y'z", '2')),
+             filters.Expression('eq', ('c',), ('',))),
+            f.expressions)
+        self.assertEqual("(in,a/b,'x,y''z',2);(eq,c,'')", str(f))
+        self.assertEqual(f.expressions, filters.parse(str(f)).expressions)
+
+    @ddt.data('', ';', '(eq,a)', '(eq,a,)', '(eq,,b)', '(eq,a/,b)',
+              '(like,a,b)', '(eq,a,b,c)', "(eq,a,'b)", '(eq,a,b);',
+              '(eq,a,b)(eq,c,d)', 'eq,a,b', '(eq,a,b')
+    def test_invalid(self, expr):
+        self.assertRaises(exceptions.InvalidInput, filters.parse, expr)
+
+    def test_select(self):
+        records = [{'id': str(i), 'n': i} for i in range(10)]
+        self.assertEqual(
+            ['3', '4'],
+            [r['id'] for r in filters.parse('(gte,n,3);(lt,n,5)').select(
+                records)])
@@ -0,0 +1,268 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import json
+import os
+import threading
+import warnings
+
+import ddt
+import fixtures
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import fleet
+from tackerclient.common import journal
+from tackerclient.common import scheduler
+
+
+class FakeClient(object):
+    """In-memory VNF LCM API completing instantiations immediately."""
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.lock = threading.Lock()
+        self.instances = {}
+        self.instantiated = set()
+        self.calls = []
+        self.last_vnf_lcm_op_occ_id = None
+
+    def fork(self, fresh=False):
+        return copy.copy(self)
+
+    def create_vnf_instance(self, body):
+        with self.lock:
+            vnf_id = 'id-%s' % body['vnfInstanceName']
+            self.instances[vnf_id] = body
+            self.calls.append(('create', body['vnfInstanceName']))
+        return {'id': vnf_id}
+
+    def list_vnf_instances(self, **params):
+        name = params['filter'].split(',')[2].split(')')[0]
+        with self.lock:
+            self.calls.append(('list', name))
+        return [{'id': vnf_id}
+                for vnf_id, body in self.instances.items()
+                if body['vnfInstanceName'] == name]
+
+    def instantiate_vnf_instance(self, vnf_id, body):
+        with self.lock:
+            self.calls.append(('instantiate', vnf_id, body))
+            self.instantiated.add(vnf_id)
+        self.last_vnf_lcm_op_occ_id = 'op-%s' % vnf_id[3:]
+
+    def _op_occ(self, name):
+        state = 'FAILED_TEMP' if name in self.failing else 'COMPLETED'
+        return {'id': 'op-%s' % name, 'operationState': state,
+                'startTime': '2024-01-01T00:00:00Z'}
+
+    def list_vnf_lcm_op_occs(self, **params):
+        vnf_id = params['filter'].split(',')[2].split(')')[0]
+        if vnf_id not in self.instantiated:
+            return []
+        return [self._op_occ(self.instances[vnf_id]['vnfInstanceName'])]
+
+    def show_vnf_lcm_op_occs(self, op_occ_id):
+        with self.lock:
+            self.calls.append(('show', op_occ_id))
+        return self._op_occ(op_occ_id[3:])
+
+
+@ddt.ddt
+class TestLoadManifest(testtools.TestCase):
+
+    def setUp(self):
+        super(TestLoadManifest, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+
+    def _write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_load_yaml(self):
+        path = self._write('fleet.yaml', """
+defaults:
+  vnfdId: vnfd-1
+  instantiate:
+    flavourId: simple
+    additionalParams: {a: 1, b: 2}
+vnfs:
+  - name: db
+  - name: web
+    vnfdId: vnfd-2
+    dependsOn: db
+    instantiate:
+      additionalParams: {b: 3}
+""")
+        vnfs = fleet.load_manifest(path, base_params={
+            'flavourId': 'default', 'instantiationLevelId': 'small'})
+
+        self.assertEqual([
+            {'name': 'db', 'vnfdId': 'vnfd-1', 'description': None,
+             'dependsOn': [],
+             'instantiate': {'flavourId': 'simple',
+                             'instantiationLevelId': 'small',
+                             'additionalParams': {'a': 1, 'b': 2}}},
+            {'name': 'web', 'vnfdId': 'vnfd-2', 'description': None,
+             'dependsOn': ['db'],
+             'instantiate': {'flavourId': 'simple',
+                             'instantiationLevelId': 'small',
+                             'additionalParams': {'a': 1, 'b': 3}}}],
+            vnfs)
+
+    def test_load_csv(self):
+        self._write('base.json', json.dumps(
+            {'flavourId': 'simple', 'additionalParams': {'a': 1}}))
+        path = self._write('fleet.csv', (
+            'name,vnfdId,dependsOn,instantiateFile,'
+            'instantiate.additionalParams.a,instantiate.instantiationLevelId\n'
+            'db,vnfd-1,,base.json,2,\n'
+            'web,vnfd-1,db;cache,,,large\n'
+            'cache,vnfd-2,,,,\n'))
+
+        vnfs = fleet.load_manifest(path)
+
+        self.assertEqual(
+            {'flavourId': 'simple', 'additionalParams': {'a': 2}},
+            vnfs[0]['instantiate'])
+        self.assertEqual(['db', 'cache'], vnfs[1]['dependsOn'])
+        self.assertEqual({'instantiationLevelId': 'large'},
+                         vnfs[1]['instantiate'])
+        self.assertIsNone(vnfs[2]['instantiate'])
+
+    @ddt.data('vnfs: [{name: a}]',
+              'vnfs: [{name: a, vnfdId: x}, {name: a, vnfdId: x}]',
+              'vnfs: [{name: a, vnfdId: x, dependsOn: [b]}]',
+              'vnfs: [{name: a, vnfdId: x, flavour: y}]',
+              'vnfs: [a]',
+              'vnfs: {a: b}',
+              'vnfs: [')
+    def test_load_invalid(self, content):
+        path = self._write('fleet.yaml', content)
+        self.assertRaises(exceptions.InvalidInput, fleet.load_manifest, path)
+
+    def test_load_empty(self):
+        path = self._write('fleet.yaml', 'vnfs: []')
+        self.assertRaises(exceptions.EmptyInput, fleet.load_manifest, path)
+
+
+class TestTimestamp(testtools.TestCase):
+
+    def test_timestamp(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            self.assertEqual('2024-01-01T00:00:00Z',
+                             fleet._timestamp(1704067200))
+        self.assertIsNone(fleet._timestamp(None))
+
+
+class TestDeploy(testtools.TestCase):
+
+    def _vnf(self, name, depends_on=(), instantiate=True):
+        return {'name': name, 'vnfdId': 'vnfd', 'description': None,
+                'dependsOn': list(depends_on),
+                'instantiate': {'flavourId': name} if instantiate else None}
+
+    def test_deploy(self):
+        client = FakeClient()
+        progress = []
+        vnfs = [self._vnf('web', depends_on=['db']), self._vnf('db'),
+                self._vnf('spare', instantiate=False)]
+
+        report = fleet.deploy(client, vnfs, max_workers=2,
+                              progress=lambda *args: progress.append(args))
+
+        self.assertEqual({scheduler.SUCCEEDED: 3, scheduler.FAILED: 0,
+                          scheduler.SKIPPED: 0}, report['summary'])
+        web = report['vnfs'][0]
+        self.assertEqual('id-web', web['vnfInstanceId'])
+        self.assertEqual('op-web', web['vnfLcmOpOccId'])
+        self.assertEqual(['create', 'instantiate', 'wait'],
+                         sorted(web['steps']))
+        self.assertEqual(['create'], sorted(report['vnfs'][2]['steps']))
+        self.assertLess(client.calls.index(('instantiate', 'id-db',
+                                            {'flavourId': 'db'})),
+                        client.calls.index(('create', 'web')))
+        self.assertIn(('db', 'wait', scheduler.SUCCEEDED), progress)
+
+    def test_deploy_failure(self):
+        client = FakeClient(failing=['db'])
+        vnfs = [self._vnf('db'), self._vnf('web', depends_on=['db']),
+                self._vnf('cache')]
+
+        report = fleet.deploy(client, vnfs, max_workers=4)
+
+        self.assertEqual({scheduler.SUCCEEDED: 1, scheduler.FAILED: 1,
+                          scheduler.SKIPPED: 1}, report['summary'])
+        db, web, cache = report['vnfs']
+        self.assertEqual('wait', db['failedStep'])
+        self.assertIn('FAILED_TEMP', db['error'])
+        self.assertEqual(scheduler.SKIPPED, web['status'])
+        self.assertIsNone(web['vnfInstanceId'])
+        self.assertNotIn(('create', 'web'), client.calls)
+        self.assertEqual(scheduler.SUCCEEDED, cache['status'])
+
+    def test_deploy_resume(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'fleet.journal')
+        client = FakeClient()
+        vnfs = [self._vnf('db'), self._vnf('web', depends_on=['db']),
+                self._vnf('cache')]
+        client.create_vnf_instance({'vnfInstanceName': 'web'})
+        client.create_vnf_instance({'vnfInstanceName': 'cache'})
+        client.instantiate_vnf_instance('id-cache', {'flavourId': 'cache'})
+        del client.calls[:]
+        with journal.Journal(path) as jrnl:
+            jrnl.record(kind=fleet.BATCH_CREATE, items=vnfs)
+            for step in (fleet.CREATE, fleet.INSTANTIATE, fleet.WAIT):
+                jrnl.record(item='db', step=step, status=scheduler.SUCCEEDED,
+                            vnfInstanceId='id-db')
+            # The run was interrupted after web was created and cache
+            # instantiated, before their responses were recorded.
+            jrnl.record(item='web', step=fleet.CREATE,
+                        status=scheduler.RUNNING)
+            jrnl.record(item='cache', step=fleet.CREATE,
+                        status=scheduler.SUCCEEDED, vnfInstanceId='id-cache')
+            jrnl.record(item='cache', step=fleet.INSTANTIATE,
+                        status=scheduler.RUNNING)
+
+        with journal.Journal(path) as jrnl:
+            report = fleet.deploy(client, fleet.journal_vnfs(jrnl),
+                                  journal=jrnl, poll_interval=0)
+
+        self.assertEqual({scheduler.SUCCEEDED: 3, scheduler.FAILED: 0,
+                          scheduler.SKIPPED: 0}, report['summary'])
+        self.assertEqual(['id-db', 'id-web', 'id-cache'],
+                         [vnf['vnfInstanceId'] for vnf in report['vnfs']])
+        self.assertEqual(['op-web', 'op-cache'],
+                         [vnf['vnfLcmOpOccId'] for vnf in report['vnfs'][1:]])
+        self.assertEqual(
+            sorted([('list', 'web'),
+                    ('instantiate', 'id-web', {'flavourId': 'web'}),
+                    ('show', 'op-web'), ('show', 'op-cache')]),
+            sorted(client.calls))
+        with journal.Journal(path) as jrnl:
+            self.assertEqual(scheduler.SUCCEEDED,
+                             jrnl.step_status('cache', fleet.WAIT))
+            self.assertEqual('COMPLETED',
+                             jrnl.items['cache']['operationState'])
+
+    def test_journal_vnfs_invalid(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'other.journal')
+        with journal.Journal(path) as jrnl:
+            jrnl.record(kind='other')
+            self.assertRaises(exceptions.InvalidInput, fleet.journal_vnfs,
+                              jrnl)
@@ -16,7 +16,9 @@
 import testtools
 from unittest import mock
 
+from tackerclient import client
 from tackerclient.client import HTTPClient
+from tackerclient.client import SessionClient
 from tackerclient.common import exceptions
 from tackerclient.tests.unit.test_cli10 import MyResp
 
@@ -69,3 +71,49 @@ class TestHTTPClient(testtools.TestCase):
         rv_should_be = MyResp(403), 'forbidden message'
         mock_request.return_value = rv_should_be
         self.assertEqual(rv_should_be, self.http._cs_request(URL, METHOD))
+
+
+class TestSessionClient(testtools.TestCase):
+
+    def setUp(self):
+        super(TestSessionClient, self).setUp()
+        self.session = mock.Mock()
+        self.session.auth.auth_ref = mock.sentinel.auth_ref
+        self.session.get_endpoint.return_value = END_URL
+        self.http = SessionClient(session=self.session,
+                                  service_type='nfv-orchestration')
+
+    def test_endpoint_url_is_cached(self):
+        for _ in range(3):
+            self.assertEqual(END_URL, self.http.endpoint_url)
+        self.session.get_endpoint.assert_called_once_with(
+            None, service_type='nfv-orchestration')
+
+    def test_endpoint_url_refreshed_on_reauthentication(self):
+        self.assertEqual(END_URL, self.http.endpoint_url)
+        self.session.auth.auth_ref = mock.sentinel.new_auth_ref
+        self.session.get_endpoint.return_value = 'new_url'
+        self.assertEqual('new_url', self.http.endpoint_url)
+        self.assertEqual(2, self.session.get_endpoint.call_count)
+
+    def test_endpoint_url_refreshed_on_invalidate(self):
+        self.assertEqual(END_URL, self.http.endpoint_url)
+        self.http.invalidate()
+        self.assertEqual(END_URL, self.http.endpoint_url)
+        self.assertEqual(2, self.session.get_endpoint.call_count)
+        self.session.invalidate.assert_called_once_with(None)
+
+    def test_do_request_uses_cached_endpoint(self):
+        self.session.request.return_value = mock.Mock(
+            status_code=200, headers={}, text='')
+        for _ in range(3):
+            self.http.do_request('/test', METHOD)
+        self.session.get_endpoint.assert_called_once_with(
+            None, service_type='nfv-orchestration')
+        self.assertEqual(
+            END_URL, self.session.request.call_args[1]['endpoint_override'])
+
+    def test_check_uri_length(self):
+        self.assertRaises(exceptions.RequestURITooLong,
+                          self.http.do_request,
+                          '/' + 'a' * client.MAX_URI_LEN, METHOD)
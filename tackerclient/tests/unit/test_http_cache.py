@@ -0,0 +1,224 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import fixtures
+from requests_mock.contrib import fixture as requests_mock_fixture
+import testtools
+
+from tackerclient.common import cache
+from tackerclient.v1_0 import client as proxy_client
+
+TACKER_URL = 'http://nfv-orchestration'
+TOKEN = 'token'
+PACKAGE_ID = 'f26f181d-7891-4720-b022-b074ec1733ef'
+PACKAGES_PATH = '/vnfpkgm/v1/vnf_packages'
+PACKAGE_PATH = PACKAGES_PATH + '/' + PACKAGE_ID
+INSTANCE_PATH = '/vnflcm/v1/vnf_instances/' + PACKAGE_ID
+OP_OCCS_PATH = '/vnflcm/v1/vnf_lcm_op_occs'
+
+
+class TestParseCacheControl(testtools.TestCase):
+
+    def test_parse(self):
+        self.assertEqual({'max-age': '60', 'private': None},
+                         cache.parse_cache_control('max-age=60, Private'))
+        self.assertEqual({}, cache.parse_cache_control(None))
+
+
+class TestResponseCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.cache = cache.ResponseCache(ttl=60, directory=self.directory)
+
+    def test_store_lookup(self):
+        self.cache.store('scope', '/a', 'v', 200, {}, 'body')
+        entry, fresh = self.cache.lookup('scope', '/a', 'v')
+        self.assertTrue(fresh)
+        self.assertEqual('body', entry['body'])
+        self.assertEqual((None, False), self.cache.lookup('scope', '/a', 'x'))
+        self.assertEqual((None, False), self.cache.lookup('other', '/a', 'v'))
+        stats = self.cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+
+    def test_shared_on_disk(self):
+        self.cache.store('scope', '/a', 'v', 200, {}, 'body')
+        other = cache.ResponseCache(ttl=60, directory=self.directory)
+        entry, fresh = other.lookup('scope', '/a', 'v')
+        self.assertTrue(fresh)
+        self.assertEqual('body', entry['body'])
+
+    def test_cache_control(self):
+        self.cache.store('scope', '/a', 'v', 200,
+                         {'Cache-Control': 'no-store'}, 'body')
+        self.assertIsNone(self.cache.lookup('scope', '/a', 'v')[0])
+
+        self.cache.store('scope', '/a', 'v', 200,
+                         {'Cache-Control': 'max-age=0'}, 'body')
+        self.assertIsNone(self.cache.lookup('scope', '/a', 'v')[0])
+
+        self.cache.store('scope', '/a', 'v', 200,
+                         {'Cache-Control': 'no-cache', 'ETag': '"1"'},
+                         'body')
+        entry, fresh = self.cache.lookup('scope', '/a', 'v')
+        self.assertFalse(fresh)
+        self.assertEqual('"1"', entry['headers']['ETag'])
+
+    def test_lru_eviction(self):
+        lru = cache.ResponseCache(ttl=60, max_entries=2, max_bytes=8,
+                                  persistent=False)
+        lru.store('scope', '/a', 'v', 200, {}, 'aaa')
+        lru.store('scope', '/b', 'v', 200, {}, 'bbb')
+        lru.lookup('scope', '/a', 'v')
+        lru.store('scope', '/c', 'v', 200, {}, 'ccc')
+        self.assertIsNone(lru.lookup('scope', '/b', 'v')[0])
+        self.assertIsNotNone(lru.lookup('scope', '/a', 'v')[0])
+        self.assertEqual(1, lru.get_stats()['evictions'])
+
+        lru.store('scope', '/d', 'v', 200, {}, 'ddddddd')
+        self.assertEqual(1, lru.get_stats()['entries'])
+
+    def test_invalidate(self):
+        collection = '/vnflcm/v1/vnf_instances'
+        for path in (collection, collection + '/1', collection + '/1/x',
+                     collection + '/2'):
+            self.cache.store('scope', path, 'v', 200, {}, 'body')
+        self.cache.invalidate('scope', collection + '/1')
+
+        for cache_ in (self.cache,
+                       cache.ResponseCache(ttl=60, directory=self.directory)):
+            self.assertIsNone(cache_.lookup('scope', collection, 'v')[0])
+            self.assertIsNone(
+                cache_.lookup('scope', collection + '/1', 'v')[0])
+            self.assertIsNone(
+                cache_.lookup('scope', collection + '/1/x', 'v')[0])
+            self.assertIsNotNone(
+                cache_.lookup('scope', collection + '/2', 'v')[0])
+
+    def test_invalidate_legacy_path(self):
+        self.cache.store('scope', '/v1.0/vims.json', 'v', 200, {}, 'body')
+        self.cache.invalidate('scope', '/v1.0/vims/1.json')
+        self.assertIsNone(self.cache.lookup('scope', '/v1.0/vims.json',
+                                            'v')[0])
+
+
+class TestClientHTTPCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestClientHTTPCache, self).setUp()
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR',
+            self.useFixture(fixtures.TempDir()).path))
+        self.requests_mock = self.useFixture(requests_mock_fixture.Fixture())
+        self.package = {'id': PACKAGE_ID, 'onboardingState': 'CREATED'}
+        self.tacker = proxy_client.Client(token=TOKEN,
+                                          endpoint_url=TACKER_URL,
+                                          http_cache=True)
+
+    def test_disabled_by_default(self):
+        show_mock = self.requests_mock.get(TACKER_URL + PACKAGE_PATH,
+                                           json=self.package)
+        tacker = proxy_client.Client(token=TOKEN, endpoint_url=TACKER_URL)
+        tacker.show_vnf_package(PACKAGE_ID)
+        tacker.show_vnf_package(PACKAGE_ID)
+        self.assertEqual(2, show_mock.call_count)
+        self.assertIsNone(tacker.http_cache)
+
+    def test_cache_hit(self):
+        show_mock = self.requests_mock.get(TACKER_URL + PACKAGE_PATH,
+                                           json=self.package)
+        self.assertEqual(self.package,
+                         self.tacker.show_vnf_package(PACKAGE_ID))
+        self.assertEqual(self.package,
+                         self.tacker.show_vnf_package(PACKAGE_ID))
+        self.assertEqual(1, show_mock.call_count)
+        stats = self.tacker.http_cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+
+        # The cache is shared with new clients through the disk
+        tacker = proxy_client.Client(token=TOKEN, endpoint_url=TACKER_URL,
+                                     http_cache=True)
+        tacker.show_vnf_package(PACKAGE_ID)
+        self.assertEqual(1, show_mock.call_count)
+
+    def test_revalidate_with_etag(self):
+        show_mock = self.requests_mock.get(
+            TACKER_URL + PACKAGE_PATH,
+            [{'json': self.package,
+              'headers': {'ETag': '"v1"', 'Cache-Control': 'no-cache'}},
+             {'status_code': 304, 'headers': {'ETag': '"v1"'}}])
+        self.tacker.show_vnf_package(PACKAGE_ID)
+        self.assertEqual(self.package,
+                         self.tacker.show_vnf_package(PACKAGE_ID))
+        self.assertEqual(2, show_mock.call_count)
+        self.assertEqual('"v1"',
+                         show_mock.last_request.headers['If-None-Match'])
+        self.assertEqual(1, self.tacker.http_cache.get_stats()['revalidated'])
+
+    def test_expired_entry(self):
+        show_mock = self.requests_mock.get(
+            TACKER_URL + PACKAGE_PATH, json=self.package,
+            headers={'Cache-Control': 'max-age=1'})
+        self.tacker.show_vnf_package(PACKAGE_ID)
+        entry, fresh = self.tacker.http_cache.lookup(
+            *list(self.tacker.http_cache._entries)[0])
+        entry['expires_at'] = time.time() - 1
+        self.tacker.http_cache.disk.clear()
+        self.tacker.show_vnf_package(PACKAGE_ID)
+        self.assertEqual(2, show_mock.call_count)
+
+    def test_write_invalidates(self):
+        show_mock = self.requests_mock.get(TACKER_URL + PACKAGE_PATH,
+                                           json=self.package)
+        list_mock = self.requests_mock.get(TACKER_URL + PACKAGES_PATH,
+                                           json=[self.package])
+        self.requests_mock.delete(TACKER_URL + PACKAGE_PATH,
+                                  status_code=204)
+        self.tacker.show_vnf_package(PACKAGE_ID)
+        self.tacker.list_vnf_packages()
+        self.tacker.delete_vnf_package(PACKAGE_ID)
+        self.tacker.show_vnf_package(PACKAGE_ID)
+        self.tacker.list_vnf_packages()
+        self.assertEqual(2, show_mock.call_count)
+        self.assertEqual(2, list_mock.call_count)
+
+    def test_fresh_fork(self):
+        show_mock = self.requests_mock.get(
+            TACKER_URL + PACKAGE_PATH,
+            [{'json': self.package},
+             {'json': dict(self.package, onboardingState='ONBOARDED')}])
+        self.tacker.show_vnf_package(PACKAGE_ID)
+
+        fresh = self.tacker.fork(fresh=True)
+
+        self.assertEqual('ONBOARDED', fresh.show_vnf_package(
+            PACKAGE_ID)['onboardingState'])
+        # The response refreshed the cache
+        self.assertEqual('ONBOARDED', self.tacker.show_vnf_package(
+            PACKAGE_ID)['onboardingState'])
+        self.assertEqual(2, show_mock.call_count)
+
+    def test_lcm_operation_invalidates_op_occs(self):
+        list_mock = self.requests_mock.get(TACKER_URL + OP_OCCS_PATH,
+                                           json=[])
+        self.requests_mock.post(TACKER_URL + INSTANCE_PATH + '/terminate',
+                                status_code=202)
+        self.tacker.list_vnf_lcm_op_occs()
+        self.tacker.terminate_vnf_instance(
+            PACKAGE_ID, {'terminationType': 'FORCEFUL'})
+        self.tacker.list_vnf_lcm_op_occs()
+        self.assertEqual(2, list_mock.call_count)
@@ -0,0 +1,173 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import stat
+from unittest import mock
+
+import fixtures
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import inventory
+
+SCOPE = 'scope'
+
+
+def _instance(id_, state='INSTANTIATED', vnfd_id='vnfd-1',
+              provider='Company'):
+    return {'id': id_, 'instantiationState': state, 'vnfdId': vnfd_id,
+            'vnfProvider': provider}
+
+
+def _op_occ(id_, vnf_instance_id, entered, state='COMPLETED'):
+    return {'id': id_, 'vnfInstanceId': vnf_instance_id,
+            'operation': 'INSTANTIATE', 'operationState': state,
+            'stateEnteredTime': entered}
+
+
+class TestInventory(testtools.TestCase):
+
+    def setUp(self):
+        super(TestInventory, self).setUp()
+        directory = self.useFixture(fixtures.TempDir()).path
+        self.inventory = inventory.Inventory(
+            os.path.join(directory, 'inventory.sqlite'))
+        self.addCleanup(self.inventory.close)
+        self.client = mock.Mock()
+        self.client.list_vnf_instances.return_value = [
+            _instance('1'), _instance('2', vnfd_id='vnfd-2'),
+            _instance('3', state='NOT_INSTANTIATED')]
+        self.client.list_vnf_lcm_op_occs.return_value = [
+            _op_occ('op-1', '1', '2024-01-01T00:00:00Z'),
+            _op_occ('op-2', '2', '2024-01-02T00:00:00Z')]
+        self.client.list_vnf_packages.return_value = {
+            'vnf_packages': [{'id': 'pkg-1', 'onboardingState': 'ONBOARDED',
+                              'vnfdId': 'vnfd-1'}]}
+
+    def test_file_permissions(self):
+        self.assertEqual(0o600,
+                         stat.S_IMODE(os.stat(self.inventory.path).st_mode))
+
+    def test_sync_and_query(self):
+        self.assertIsNone(self.inventory.age(SCOPE, inventory.VNF_INSTANCES))
+        self.assertTrue(self.inventory.sync(self.client, SCOPE,
+                                            inventory.VNF_INSTANCES))
+        self.assertEqual(
+            ['1', '2', '3'],
+            [r['id'] for r in self.inventory.query(
+                SCOPE, inventory.VNF_INSTANCES)])
+        self.assertEqual(
+            ['1'],
+            [r['id'] for r in self.inventory.query(
+                SCOPE, inventory.VNF_INSTANCES, state='INSTANTIATED',
+                vnfd_id='vnfd-1')])
+        self.assertEqual(
+            ['3'],
+            [r['id'] for r in self.inventory.query(
+                SCOPE, inventory.VNF_INSTANCES,
+                '(eq,instantiationState,NOT_INSTANTIATED)')])
+        self.assertEqual([], self.inventory.query(
+            'other', inventory.VNF_INSTANCES))
+
+    def test_sync_respects_max_age(self):
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_PACKAGES)
+        self.assertFalse(self.inventory.sync(
+            self.client, SCOPE, inventory.VNF_PACKAGES, max_age=60))
+        self.assertTrue(self.inventory.sync(
+            self.client, SCOPE, inventory.VNF_PACKAGES, max_age=-1))
+        self.assertEqual(2, self.client.list_vnf_packages.call_count)
+        self.client.list_vnf_packages.assert_called_with(all_fields=None)
+
+    def test_incremental_op_occs(self):
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_LCM_OP_OCCS)
+        self.client.list_vnf_lcm_op_occs.assert_called_once_with()
+
+        self.client.list_vnf_lcm_op_occs.return_value = [
+            _op_occ('op-3', '1', '2024-01-03T00:00:00Z',
+                    state='PROCESSING')]
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_LCM_OP_OCCS,
+                            max_age=-1)
+        self.client.list_vnf_lcm_op_occs.assert_called_with(
+            filter='(gte,stateEnteredTime,2024-01-02T00:00:00Z)')
+        self.assertEqual(
+            ['op-1', 'op-2', 'op-3'],
+            [r['id'] for r in self.inventory.query(
+                SCOPE, inventory.VNF_LCM_OP_OCCS)])
+
+    def test_incremental_instances(self):
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES)
+        self.client.list_vnf_lcm_op_occs.return_value = [
+            _op_occ('op-3', '1', '2024-01-03T00:00:00Z'),
+            _op_occ('op-4', '2', '2024-01-03T00:00:00Z')]
+        self.client.show_vnf_instance.side_effect = [
+            _instance('1', state='NOT_INSTANTIATED'),
+            exceptions.NotFound()]
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES,
+                            max_age=-1)
+
+        self.assertEqual(1, self.client.list_vnf_instances.call_count)
+        records = self.inventory.query(SCOPE, inventory.VNF_INSTANCES)
+        self.assertEqual(['1', '3'], [r['id'] for r in records])
+        self.assertEqual('NOT_INSTANTIATED',
+                         records[0]['instantiationState'])
+
+    def test_op_occs_then_instances(self):
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES)
+        self.client.list_vnf_lcm_op_occs.return_value = [
+            _op_occ('op-3', '3', '2024-01-03T00:00:00Z')]
+        self.client.show_vnf_instance.return_value = _instance('3')
+
+        # As "vnflcm op list --from-cache" does before "vnflcm list"
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_LCM_OP_OCCS,
+                            max_age=-1)
+        self.client.list_vnf_lcm_op_occs.return_value = []
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES,
+                            max_age=-1)
+
+        self.client.show_vnf_instance.assert_called_once_with('3')
+        self.assertEqual('INSTANTIATED', self.inventory.get(
+            SCOPE, inventory.VNF_INSTANCES, '3')['instantiationState'])
+
+    def test_full_instance_sync_interval(self):
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES)
+        with mock.patch.object(inventory, 'FULL_SYNC_INTERVAL', -1):
+            self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES,
+                                max_age=-1)
+        self.assertEqual(2, self.client.list_vnf_instances.call_count)
+
+    def test_apply_notification(self):
+        self.inventory.sync(self.client, SCOPE, inventory.VNF_INSTANCES)
+        self.inventory.apply_notification(SCOPE, {
+            'notificationType': 'VnfIdentifierDeletionNotification',
+            'vnfInstanceId': '3'})
+        self.inventory.apply_notification(SCOPE, {
+            'notificationType': 'VnfIdentifierCreationNotification',
+            'vnfInstanceId': '4'})
+        self.inventory.apply_notification(SCOPE, {
+            'notificationType': 'VnfLcmOperationOccurrenceNotification',
+            'vnfInstanceId': '1', 'vnfLcmOpOccId': 'op-1',
+            'operation': 'INSTANTIATE', 'operationState': 'FAILED_TEMP',
+            'timeStamp': '2024-01-05T00:00:00Z'})
+
+        self.assertEqual(
+            ['1', '2', '4'],
+            [r['id'] for r in self.inventory.query(
+                SCOPE, inventory.VNF_INSTANCES)])
+        self.assertEqual(
+            'FAILED_TEMP',
+            self.inventory.get(SCOPE, inventory.VNF_LCM_OP_OCCS,
+                               'op-1')['operationState'])
+
+    def test_unknown_kind(self):
+        self.assertRaises(exceptions.InvalidInput, self.inventory.sync,
+                          self.client, SCOPE, 'vims')
@@ -0,0 +1,77 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import fixtures
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import journal
+
+
+class TestJournal(testtools.TestCase):
+
+    def setUp(self):
+        super(TestJournal, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'run.journal')
+
+    def _write_records(self):
+        with journal.Journal(self.path) as jrnl:
+            self.assertIsNone(jrnl.header)
+            jrnl.record(kind='test', items=['a', 'b'])
+            jrnl.record(item='a', step='create', status='RUNNING')
+            jrnl.record(item='a', step='create', status='SUCCEEDED',
+                        vnfInstanceId='id-a')
+            jrnl.record(item='a', step='wait', status='RUNNING',
+                        operationState='PROCESSING')
+            jrnl.record(item='b', step='create', status='FAILED',
+                        error='boom')
+
+    def test_replay(self):
+        self._write_records()
+
+        with journal.Journal(self.path) as jrnl:
+            self.assertEqual('test', jrnl.header['kind'])
+            self.assertEqual(['a', 'b'], jrnl.header['items'])
+            self.assertEqual(
+                {'steps': {'create': 'SUCCEEDED', 'wait': 'RUNNING'},
+                 'vnfInstanceId': 'id-a', 'operationState': 'PROCESSING'},
+                jrnl.items['a'])
+            self.assertEqual('FAILED', jrnl.step_status('b', 'create'))
+            self.assertEqual('boom', jrnl.items['b']['error'])
+            self.assertIsNone(jrnl.step_status('b', 'wait'))
+            self.assertIsNone(jrnl.step_status('c', 'create'))
+        self.assertEqual(0o600, os.stat(self.path).st_mode & 0o777)
+
+    def test_replay_partial_record(self):
+        self._write_records()
+        size = os.path.getsize(self.path)
+        with open(self.path, 'a') as f:
+            f.write('{"item": "b", "step": "cre')
+
+        with journal.Journal(self.path) as jrnl:
+            self.assertEqual('FAILED', jrnl.step_status('b', 'create'))
+            self.assertEqual(size, os.path.getsize(self.path))
+            jrnl.record(item='b', step='create', status='SUCCEEDED')
+
+        with journal.Journal(self.path) as jrnl:
+            self.assertEqual('SUCCEEDED', jrnl.step_status('b', 'create'))
+
+    def test_replay_invalid_record(self):
+        with open(self.path, 'w') as f:
+            f.write('{"kind": "test"}\nnot json\n{"item": "a"}\n')
+
+        e = self.assertRaises(exceptions.InvalidInput, journal.Journal,
+                              self.path)
+        self.assertIn('line 2', str(e))
@@ -0,0 +1,241 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import os
+import threading
+import time
+
+import fixtures
+from keystoneclient import exceptions as ks_exc
+import requests
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import onboarding
+
+
+class FakeClient(object):
+    """In-memory VNF package API onboarding packages after a poll.
+
+    The packages whose content is named in failing go back to CREATED,
+    the upload of those in conflict is rejected.
+    """
+
+    def __init__(self, failing=(), conflict=()):
+        self.failing = failing
+        self.conflict = conflict
+        self.lock = threading.Lock()
+        self.calls = []
+        self.packages = {}
+
+    def fork(self, fresh=False):
+        return copy.copy(self)
+
+    def create_vnf_package(self, body):
+        with self.lock:
+            vnf_package_id = 'pkg-%d' % len(self.packages)
+            self.packages[vnf_package_id] = dict(
+                body, id=vnf_package_id, onboardingState='CREATED')
+            self.calls.append(('create', vnf_package_id))
+        return dict(self.packages[vnf_package_id])
+
+    def upload_vnf_package(self, vnf_package_id, file_data=None, **attrs):
+        content = attrs.get('url') or file_data.read().decode()
+        with self.lock:
+            self.calls.append(('upload', vnf_package_id, content))
+            if content in self.conflict:
+                raise exceptions.TackerClientException(
+                    message='Conflict', status_code=409)
+            package = self.packages[vnf_package_id]
+            package.update(onboardingState='PROCESSING', content=content,
+                           auth=attrs)
+
+    def get_vnf_packages(self, ids, **params):
+        with self.lock:
+            self.calls.append(('get', tuple(sorted(ids))))
+            found = [dict(self.packages[i]) for i in ids]
+            for package in self.packages.values():
+                if package['onboardingState'] != 'PROCESSING':
+                    continue
+                if package['content'] in self.failing:
+                    package['onboardingState'] = 'CREATED'
+                else:
+                    package.update(onboardingState='ONBOARDED',
+                                   vnfdId='vnfd-' + package['content'])
+        return found, []
+
+
+class TestFindSources(testtools.TestCase):
+
+    def setUp(self):
+        super(TestFindSources, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+
+    def _write(self, *names):
+        paths = []
+        for name in names:
+            path = os.path.join(self.dir, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            paths.append(path)
+        return paths
+
+    def test_find_sources(self):
+        b, a, _readme = self._write('b.zip', 'a.CSAR', 'README')
+        os.mkdir(os.path.join(self.dir, 'c.zip'))
+
+        csars = onboarding.find_sources(
+            [self.dir, 'https://example.com/d.zip'])
+
+        self.assertEqual(
+            [{'source': a, 'path': a}, {'source': b, 'path': b},
+             {'source': 'https://example.com/d.zip',
+              'url': 'https://example.com/d.zip'}],
+            csars)
+
+    def test_find_sources_invalid(self):
+        a, = self._write('a.zip')
+        self.assertRaises(exceptions.InvalidInput, onboarding.find_sources,
+                          [os.path.join(self.dir, 'missing.zip')])
+        self.assertRaises(exceptions.InvalidInput, onboarding.find_sources,
+                          [self.dir, a])
+        os.remove(a)
+        self.assertRaises(exceptions.EmptyInput, onboarding.find_sources,
+                          [self.dir])
+
+
+class TestOnboard(testtools.TestCase):
+
+    def setUp(self):
+        super(TestOnboard, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+        self.csars = []
+        for name in ('a', 'b', 'c'):
+            path = os.path.join(self.dir, name + '.zip')
+            with open(path, 'w') as f:
+                f.write(name)
+            self.csars.append({'source': path, 'path': path})
+
+    def test_onboard(self):
+        client = FakeClient()
+        progress = []
+        csars = self.csars + [{'source': 'http://host/d.zip',
+                               'url': 'http://host/d.zip'}]
+
+        results = onboarding.onboard(
+            client, csars, user_data={'release': '1'}, user_name='user',
+            password='pass', max_workers=2, poll_interval=0,
+            progress=lambda *args: progress.append(args))
+
+        self.assertEqual([onboarding.ONBOARDED] * 4,
+                         [r['status'] for r in results])
+        self.assertEqual(['vnfd-a', 'vnfd-b', 'vnfd-c',
+                          'vnfd-http://host/d.zip'],
+                         [r['vnfdId'] for r in results])
+        self.assertEqual(['create', 'upload', 'process'],
+                         list(results[0]['timings']))
+        package = client.packages[results[0]['vnfPkgId']]
+        self.assertEqual({'release': '1'}, package['userDefinedData'])
+        self.assertEqual({}, package['auth'])
+        self.assertEqual({'url': 'http://host/d.zip', 'userName': 'user',
+                          'password': 'pass'},
+                         client.packages[results[3]['vnfPkgId']]['auth'])
+        self.assertEqual(
+            [onboarding.CREATING, onboarding.UPLOADING,
+             onboarding.PROCESSING, onboarding.ONBOARDED],
+            [status for source, status in progress
+             if source == csars[0]['source']])
+
+    def test_onboard_failures(self):
+        client = FakeClient(failing=['b'], conflict=['c'])
+
+        results = onboarding.onboard(client, self.csars, poll_interval=0)
+
+        a, b, c = results
+        self.assertEqual(onboarding.ONBOARDED, a['status'])
+        self.assertEqual(onboarding.FAILED, b['status'])
+        self.assertEqual('process', b['failedStep'])
+        self.assertIn('onboardingState is CREATED', b['error'])
+        self.assertEqual(onboarding.FAILED, c['status'])
+        self.assertEqual('upload', c['failedStep'])
+        self.assertIn('Conflict', c['error'])
+        self.assertIsNotNone(c['vnfPkgId'])
+        self.assertNotIn(('get', (c['vnfPkgId'],)), client.calls)
+
+    def test_onboard_adaptive_poll(self):
+        client = FakeClient()
+        polls = []
+
+        def get_vnf_packages(ids, **params):
+            polls.append(time.time())
+            state = 'PROCESSING' if len(polls) < 6 else 'ONBOARDED'
+            return [{'id': i, 'onboardingState': state} for i in ids], []
+
+        client.get_vnf_packages = get_vnf_packages
+        self.useFixture(fixtures.MockPatchObject(
+            onboarding, 'MIN_POLL_INTERVAL', 0.01))
+
+        results = onboarding.onboard(client, self.csars[:1],
+                                     poll_interval=0.08)
+
+        self.assertEqual(onboarding.ONBOARDED, results[0]['status'])
+        gaps = [b - a for a, b in zip(polls, polls[1:])]
+        # 0.02, 0.04, 0.08 then capped to 0.08
+        self.assertLess(gaps[0], 0.06)
+        self.assertGreaterEqual(gaps[-1], 0.08)
+
+    def test_onboard_timeout(self):
+        client = FakeClient()
+        client.get_vnf_packages = lambda ids, **params: (
+            [{'id': i, 'onboardingState': 'PROCESSING'} for i in ids], [])
+
+        results = onboarding.onboard(client, self.csars[:1], timeout=0.01,
+                                     poll_interval=0.01)
+
+        self.assertEqual(onboarding.FAILED, results[0]['status'])
+        self.assertIn('not onboarded after 0.01 seconds',
+                      results[0]['error'])
+
+    def test_onboard_poll_transport_errors(self):
+        client = FakeClient()
+        get_vnf_packages = client.get_vnf_packages
+        errors = [ks_exc.ConnectionRefused('refused'),
+                  requests.exceptions.ConnectionError('reset')]
+
+        def flaky_get_vnf_packages(ids, **params):
+            if errors:
+                raise errors.pop(0)
+            return get_vnf_packages(ids, **params)
+
+        client.get_vnf_packages = flaky_get_vnf_packages
+        self.useFixture(fixtures.MockPatchObject(
+            onboarding, 'MIN_POLL_INTERVAL', 0.01))
+
+        results = onboarding.onboard(client, self.csars, poll_interval=0.01)
+
+        self.assertEqual([onboarding.ONBOARDED] * 3,
+                         [result['status'] for result in results])
+
+    def test_onboard_timeout_after_transport_errors(self):
+        client = FakeClient()
+
+        def get_vnf_packages(ids, **params):
+            raise ks_exc.ConnectionRefused('refused')
+
+        client.get_vnf_packages = get_vnf_packages
+
+        results = onboarding.onboard(client, self.csars[:1], timeout=0.01,
+                                     poll_interval=0.01)
+
+        self.assertEqual(onboarding.FAILED, results[0]['status'])
+        self.assertIn('refused', results[0]['error'])
@@ -0,0 +1,154 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import threading
+
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import recovery
+
+_ENTERED = '2024-01-01T00:00:00Z'
+
+
+class FakeClient(object):
+    """In-memory VNF LCM API settling retried operations after a poll.
+
+    The operations in failing settle back in FAILED_TEMP, those in
+    stuck keep PROCESSING and those in conflict are rejected.
+    """
+
+    def __init__(self, op_occ_ids, failing=(), stuck=(), conflict=()):
+        self.failing = failing
+        self.stuck = stuck
+        self.conflict = conflict
+        self.lock = threading.Lock()
+        self.calls = []
+        self.op_occs = dict(
+            (op_occ_id, {'id': op_occ_id, 'operationState': 'FAILED_TEMP',
+                         'stateEnteredTime': _ENTERED})
+            for op_occ_id in op_occ_ids)
+
+    def fork(self, fresh=False):
+        return copy.copy(self)
+
+    def list_vnf_lcm_op_occs(self, **params):
+        with self.lock:
+            self.calls.append(('list', params))
+        return [dict(op_occ) for op_occ in self.op_occs.values()]
+
+    def _act(self, action, op_occ_id, state):
+        with self.lock:
+            self.calls.append((action, op_occ_id))
+            if op_occ_id in self.conflict:
+                raise exceptions.TackerClientException(
+                    message='Conflict', status_code=409)
+            # The new state is only visible at the next poll
+            self.op_occs[op_occ_id]['next'] = state
+
+    def retry_vnf_instance(self, op_occ_id):
+        if op_occ_id in self.stuck:
+            state = 'PROCESSING'
+        elif op_occ_id in self.failing:
+            state = 'FAILED_TEMP'
+        else:
+            state = 'COMPLETED'
+        self._act('retry', op_occ_id, state)
+
+    def cancel_vnf_instance(self, op_occ_id, body):
+        self._act('cancel-' + body['cancelMode'], op_occ_id, 'FAILED_TEMP')
+
+    def get_vnf_lcm_op_occs(self, ids, **params):
+        with self.lock:
+            self.calls.append(('get', tuple(sorted(ids))))
+            found = []
+            for op_occ_id in ids:
+                op_occ = self.op_occs[op_occ_id]
+                found.append(dict(op_occ))
+                if 'next' in op_occ:
+                    op_occ.update(operationState=op_occ.pop('next'),
+                                  stateEnteredTime='2024-01-01T00:01:00Z')
+        return found, []
+
+
+class TestRun(testtools.TestCase):
+
+    def setUp(self):
+        super(TestRun, self).setUp()
+        self.op_occ_ids = ['op-%d' % i for i in range(4)]
+
+    def test_select_op_occs(self):
+        client = FakeClient(self.op_occ_ids)
+
+        op_occs = recovery.select_op_occs(
+            client, '(eq,operationState,FAILED_TEMP)')
+
+        self.assertEqual(self.op_occ_ids, [o['id'] for o in op_occs])
+        self.assertEqual(('list', {'filter': '(eq,operationState,FAILED_TEMP)',
+                                   'exclude_default': None}),
+                         client.calls[0])
+        self.assertRaises(exceptions.InvalidInput, recovery.select_op_occs,
+                          client, '(eq,operationState')
+
+    def test_run(self):
+        client = FakeClient(self.op_occ_ids)
+
+        results = recovery.run(client, client.list_vnf_lcm_op_occs(),
+                               recovery.CANCEL, cancel_mode='FORCEFUL')
+
+        self.assertEqual({recovery.ACCEPTED},
+                         set(r['status'] for r in results.values()))
+        self.assertEqual(
+            sorted(('cancel-FORCEFUL', i) for i in self.op_occ_ids),
+            sorted(client.calls[1:]))
+
+    def test_run_wait(self):
+        client = FakeClient(self.op_occ_ids, failing=['op-1'],
+                            conflict=['op-2'])
+        progress = []
+
+        results = recovery.run(
+            client, client.list_vnf_lcm_op_occs(), recovery.RETRY,
+            max_workers=2, rate=100, wait=True, poll_interval=0.05,
+            progress=lambda *args: progress.append(args))
+
+        self.assertEqual(
+            [recovery.SUCCEEDED, recovery.FAILED, recovery.FAILED,
+             recovery.SUCCEEDED],
+            [r['status'] for r in results.values()])
+        self.assertEqual('COMPLETED', results['op-0']['operationState'])
+        # FAILED_TEMP before the retry is not taken for its outcome
+        self.assertIn('op-1 is FAILED_TEMP', results['op-1']['error'])
+        self.assertIn('Conflict', results['op-2']['error'])
+        self.assertEqual([('op-0', recovery.ACCEPTED),
+                          ('op-0', recovery.SUCCEEDED)],
+                         [p for p in progress if p[0] == 'op-0'])
+        # The operations are checked together, with one request per poll
+        gets = [call for call in client.calls if call[0] == 'get']
+        self.assertGreaterEqual(4, len(gets))
+        self.assertTrue(any(len(ids) > 1 for _get, ids in gets))
+
+    def test_run_timeout(self):
+        client = FakeClient(self.op_occ_ids[:1], stuck=['op-0'])
+
+        results = recovery.run(client, client.list_vnf_lcm_op_occs(),
+                               recovery.RETRY, wait=True, timeout=0.05,
+                               poll_interval=0.01)
+
+        self.assertEqual(recovery.FAILED, results['op-0']['status'])
+        self.assertIn("still PROCESSING after 0.05 seconds",
+                      results['op-0']['error'])
+
+    def test_run_unknown_action(self):
+        self.assertRaises(exceptions.InvalidInput, recovery.run,
+                          FakeClient([]), [], 'heal')
@@ -0,0 +1,144 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import threading
+
+import ddt
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import rollout
+from tackerclient.common import scheduler
+
+
+class FakeClient(object):
+    """In-memory VNF LCM API, failing the operations of some instances."""
+
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.lock = threading.Lock()
+        self.calls = []
+        self.op_occs = {}
+        self.last_vnf_lcm_op_occ_id = None
+
+    def fork(self, fresh=False):
+        return copy.copy(self)
+
+    def change_vnfpkg_vnf_instance(self, vnf_id, body):
+        op_occ_id = 'op-' + vnf_id
+        with self.lock:
+            self.calls.append(('change_vnfpkg', vnf_id))
+            self.op_occs[op_occ_id] = {
+                'id': op_occ_id,
+                'operationState': ('FAILED_TEMP' if vnf_id in self.failing
+                                   else 'COMPLETED'),
+                'stateEnteredTime': '2024-01-01T00:00:00Z'}
+        self.last_vnf_lcm_op_occ_id = op_occ_id
+
+    def rollback_vnf_instance(self, op_occ_id):
+        with self.lock:
+            self.calls.append(('rollback', op_occ_id))
+
+    def show_vnf_lcm_op_occs(self, op_occ_id):
+        with self.lock:
+            op_occ = dict(self.op_occs[op_occ_id])
+            if ('rollback', op_occ_id) in self.calls:
+                op_occ.update(operationState='ROLLED_BACK',
+                              stateEnteredTime='2024-01-01T00:01:00Z')
+        return op_occ
+
+
+@ddt.ddt
+class TestPlanWaves(testtools.TestCase):
+
+    @ddt.data((10, 1, 2, [1, 2, 4, 3]),
+              (10, 2, 1.5, [2, 3, 5]),
+              (5, 2, 1, [2, 2, 1]),
+              (3, 5, 2, [3]),
+              (0, 1, 2, []))
+    @ddt.unpack
+    def test_plan_waves(self, count, canary, growth, expected):
+        self.assertEqual(expected, rollout.plan_waves(count, canary, growth))
+
+    @ddt.data((0, 2), (1, 0.5))
+    @ddt.unpack
+    def test_plan_waves_invalid(self, canary, growth):
+        self.assertRaises(exceptions.InvalidInput, rollout.plan_waves, 10,
+                          canary, growth)
+
+
+class TestChangeVnfpkg(testtools.TestCase):
+
+    def setUp(self):
+        super(TestChangeVnfpkg, self).setUp()
+        self.vnf_ids = ['vnf-%d' % i for i in range(7)]
+
+    def _change_vnfpkg(self, client, **kwargs):
+        return rollout.change_vnfpkg(client, self.vnf_ids,
+                                     {'vnfdId': 'new'}, poll_interval=0,
+                                     **kwargs)
+
+    def test_change_vnfpkg(self):
+        client = FakeClient()
+        progress = []
+
+        report = self._change_vnfpkg(
+            client, progress=lambda *args: progress.append(args))
+
+        self.assertFalse(report['stopped'])
+        self.assertEqual([1, 2, 4], [w['size'] for w in report['waves']])
+        self.assertEqual(7, report['summary'][scheduler.SUCCEEDED])
+        self.assertEqual([1, 2, 2, 3, 3, 3, 3],
+                         [vnf['wave'] for vnf in report['vnfs']])
+        self.assertEqual('op-vnf-3', report['vnfs'][3]['vnfLcmOpOccId'])
+        # The canary is finished before the next wave starts
+        self.assertEqual(('change_vnfpkg', 'vnf-0'), client.calls[0])
+        self.assertLess(progress.index((1, 'vnf-0', scheduler.SUCCEEDED)),
+                        progress.index((2, 'vnf-1', scheduler.RUNNING)))
+
+    def test_change_vnfpkg_stop(self):
+        client = FakeClient(failing=['vnf-2'])
+
+        report = self._change_vnfpkg(client, max_failure_rate=50)
+
+        # 1 of 2 failed operations in the second wave is not over 50%
+        self.assertFalse(report['stopped'])
+        client = FakeClient(failing=['vnf-2', 'vnf-3'])
+
+        report = self._change_vnfpkg(client, max_failure_rate=25)
+
+        self.assertTrue(report['stopped'])
+        self.assertEqual(2, len(report['waves']))
+        self.assertEqual({scheduler.SUCCEEDED: 2, scheduler.FAILED: 1,
+                          rollout.ROLLED_BACK: 0, rollout.NOT_STARTED: 4},
+                         dict(report['summary']))
+        self.assertEqual(3, len(client.calls))
+        self.assertIn('FAILED_TEMP', report['vnfs'][2]['error'])
+
+    def test_change_vnfpkg_rollback(self):
+        client = FakeClient(failing=['vnf-0'])
+        progress = []
+
+        report = self._change_vnfpkg(
+            client, rollback=True,
+            progress=lambda *args: progress.append(args))
+
+        self.assertTrue(report['stopped'])
+        self.assertEqual(rollout.ROLLED_BACK, report['vnfs'][0]['status'])
+        self.assertEqual('ROLLED_BACK', report['vnfs'][0]['operationState'])
+        self.assertEqual([('change_vnfpkg', 'vnf-0'),
+                          ('rollback', 'op-vnf-0')], client.calls)
+        self.assertEqual([(1, 'vnf-0', scheduler.RUNNING),
+                          (1, 'vnf-0', scheduler.FAILED),
+                          (1, 'vnf-0', rollout.ROLLING_BACK),
+                          (1, 'vnf-0', rollout.ROLLED_BACK)], progress)
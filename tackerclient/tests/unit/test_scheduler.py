@@ -0,0 +1,119 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import scheduler
+
+
+class TestScheduler(testtools.TestCase):
+
+    def test_run_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def work():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return 'ok'
+
+        sched = scheduler.Scheduler(3)
+        for i in range(10):
+            sched.add('task-%d' % i, work)
+        tasks = sched.run()
+
+        self.assertEqual(['task-%d' % i for i in range(10)],
+                         [t.name for t in tasks])
+        self.assertEqual([scheduler.SUCCEEDED] * 10,
+                         [t.status for t in tasks])
+        self.assertEqual(['ok'] * 10, [t.result for t in tasks])
+        self.assertEqual(3, running[1])
+
+    def test_run_dependencies(self):
+        order = []
+        sched = scheduler.Scheduler(4)
+        sched.add('c', lambda: order.append('c'), depends_on=['b'])
+        sched.add('b', lambda: order.append('b'), depends_on=['a'])
+        sched.add('a', lambda: order.append('a'))
+        sched.run()
+
+        self.assertEqual(['a', 'b', 'c'], order)
+
+    def test_run_skip_dependents_of_failed(self):
+        def fail():
+            raise exceptions.TackerClientException(message='boom')
+
+        statuses = []
+        sched = scheduler.Scheduler(
+            2, progress=lambda t: statuses.append((t.name, t.status)))
+        sched.add('a', fail)
+        sched.add('b', lambda: None, depends_on=['a'])
+        sched.add('c', lambda: None, depends_on=['b'])
+        sched.add('d', lambda: None)
+        tasks = dict((t.name, t) for t in sched.run())
+
+        self.assertEqual(scheduler.FAILED, tasks['a'].status)
+        self.assertEqual('boom', str(tasks['a'].error))
+        self.assertEqual(scheduler.SKIPPED, tasks['b'].status)
+        self.assertEqual(scheduler.SKIPPED, tasks['c'].status)
+        self.assertEqual(scheduler.SUCCEEDED, tasks['d'].status)
+        self.assertIn(('c', scheduler.SKIPPED), statuses)
+        self.assertNotIn(('c', scheduler.RUNNING), statuses)
+
+    def test_run_unknown_dependency(self):
+        sched = scheduler.Scheduler(1)
+        sched.add('a', lambda: None, depends_on=['b'])
+        self.assertRaises(exceptions.InvalidInput, sched.run)
+
+    def test_run_cycle(self):
+        sched = scheduler.Scheduler(1)
+        sched.add('a', lambda: None, depends_on=['c'])
+        sched.add('b', lambda: None, depends_on=['a'])
+        sched.add('c', lambda: None, depends_on=['b'])
+        sched.add('d', lambda: None)
+        e = self.assertRaises(exceptions.InvalidInput, sched.run)
+        self.assertIn('a, b, c', str(e))
+
+    def test_add_duplicate(self):
+        sched = scheduler.Scheduler(1)
+        sched.add('a', lambda: None)
+        self.assertRaises(exceptions.InvalidInput, sched.add, 'a',
+                          lambda: None)
+
+
+class TestRateLimiter(testtools.TestCase):
+
+    def test_wait(self):
+        limiter = scheduler.RateLimiter(50)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        # The first call is not delayed, the next ones are 20ms apart
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_wait_unlimited(self):
+        limiter = scheduler.RateLimiter()
+        start = time.monotonic()
+        for _ in range(100):
+            limiter.wait()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_invalid_rate(self):
+        self.assertRaises(exceptions.InvalidInput, scheduler.RateLimiter, 0)
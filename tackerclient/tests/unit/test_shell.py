@@ -24,9 +24,14 @@ import testtools
 from testtools import matchers
 from unittest import mock
 
+from keystoneclient import access
+from keystoneclient import discover
+from keystoneclient import exceptions as ks_exc
+from keystoneclient import fixture as ks_fixture
 from keystoneclient import session
 
 from tackerclient.common import clientmanager
+from tackerclient.common import exceptions as exc
 from tackerclient import shell as openstack_shell
 
 
@@ -56,6 +61,9 @@ class ShellTest(testtools.TestCase):
             self.useFixture(
                 fixtures.EnvironmentVariable(
                     var, self.FAKE_ENV[var]))
+        self.useFixture(fixtures.EnvironmentVariable(
+            'TACKERCLIENT_CACHE_DIR',
+            self.useFixture(fixtures.TempDir()).path))
 
     def shell(self, argstr, check=False):
         orig = (sys.stdout, sys.stderr)
@@ -188,3 +196,111 @@ class ShellTest(testtools.TestCase):
         # --endpoint-type and $OS_ENDPOINT_TYPE
         namespace = parser.parse_args(['--endpoint-type=admin'])
         self.assertEqual('admin', namespace.endpoint_type)
+
+    def test_os_cache_env(self):
+        for value, expected in (('1', True), ('true', True),
+                                ('0', False), ('false', False)):
+            self.useFixture(fixtures.EnvironmentVariable('OS_CACHE', value))
+            shell = openstack_shell.TackerShell(DEFAULT_API_VERSION)
+            parser = shell.build_option_parser('descr', DEFAULT_API_VERSION)
+            self.assertIs(expected, parser.parse_args([]).os_cache)
+
+    def _cached_shell(self, get_token=None):
+        shell = openstack_shell.TackerShell(DEFAULT_API_VERSION)
+        parser = shell.build_option_parser('descr', DEFAULT_API_VERSION)
+        shell.options = parser.parse_args(
+            ['--os-cache', '--os-username', 'test', '--os-password', 'test',
+             '--os-tenant-name', 'test',
+             '--os-auth-url', 'http://127.0.0.1:5000/'])
+        shell.api_version = {'nfv-orchestration': DEFAULT_API_VERSION}
+        auth = mock.Mock(auth_ref=None)
+        with mock.patch.object(session, 'Session') as mock_session, \
+                mock.patch.object(shell, 'get_v2_auth', return_value=auth), \
+                mock.patch.object(shell, 'get_v3_auth', return_value=auth), \
+                mock.patch.object(clientmanager, 'ClientManager'):
+            if get_token is not None:
+                mock_session.construct.return_value.get_token = get_token
+            shell.authenticate_user()
+        return shell, auth
+
+    @mock.patch.object(discover, 'Discover')
+    def test_token_cache(self, mock_discover):
+        token = ks_fixture.V3Token()
+        token.set_project_scope()
+
+        shell, auth = self._cached_shell()
+        self.assertIsNone(auth.auth_ref)
+        auth.auth_ref = access.AccessInfo.factory(body=token,
+                                                  auth_token=DEFAULT_TOKEN)
+        with mock.patch.object(openstack_shell, 'run_command',
+                               return_value=0):
+            self.assertEqual(0, shell.run_subcommand(['vim-list']))
+
+        # A new process reuses the token
+        shell, auth = self._cached_shell()
+        self.assertEqual(DEFAULT_TOKEN, auth.auth_ref.auth_token)
+
+        # and drops it when it is rejected
+        with mock.patch.object(openstack_shell, 'run_command',
+                               side_effect=exc.Unauthorized()):
+            self.assertEqual(1, shell.run_subcommand(['vim-list']))
+        shell, auth = self._cached_shell()
+        self.assertIsNone(auth.auth_ref)
+
+    @mock.patch.object(discover, 'Discover')
+    def test_discovery_cache(self, mock_discover):
+        mock_discover.return_value.url_for.side_effect = [
+            'http://keystone/v2.0', 'http://keystone/v3']
+        shell, auth = self._cached_shell()
+        self.assertEqual(1, mock_discover.call_count)
+
+        # Discovery results are reused by new processes
+        shell, auth = self._cached_shell()
+        self.assertEqual(1, mock_discover.call_count)
+        self.assertEqual(
+            ('http://keystone/v2.0', 'http://keystone/v3'),
+            shell._discover_auth_versions(None, 'http://127.0.0.1:5000/'))
+
+        # but not for other auth URLs
+        mock_discover.return_value.url_for.side_effect = [
+            None, 'http://other/v3']
+        self.assertEqual(
+            (None, 'http://other/v3'),
+            shell._discover_auth_versions(None, 'http://other/'))
+        self.assertEqual(2, mock_discover.call_count)
+
+    @mock.patch.object(discover, 'Discover')
+    def test_discovery_cache_invalidated_on_auth_failure(self, mock_discover):
+        mock_discover.return_value.url_for.return_value = 'http://keystone'
+        shell, auth = self._cached_shell()
+        with mock.patch.object(openstack_shell, 'run_command',
+                               side_effect=ks_exc.EndpointNotFound()):
+            self.assertEqual(1, shell.run_subcommand(['vim-list']))
+        shell, auth = self._cached_shell()
+        self.assertEqual(2, mock_discover.call_count)
+
+    @mock.patch.object(discover, 'Discover')
+    def test_cached_discovery_retried_live(self, mock_discover):
+        mock_discover.return_value.url_for.return_value = 'http://keystone'
+        self._cached_shell()
+
+        get_token = mock.Mock(side_effect=ks_exc.Unauthorized())
+        self._cached_shell(get_token=get_token)
+
+        # Authentication with the cached versions failed before any
+        # command ran, the versions were discovered again
+        get_token.assert_called_once_with()
+        self.assertEqual(2, mock_discover.call_count)
+
+    @mock.patch.object(discover, 'Discover')
+    def test_caches_kept_on_connection_failure(self, mock_discover):
+        mock_discover.return_value.url_for.return_value = 'http://keystone'
+        shell, auth = self._cached_shell()
+        with mock.patch.object(openstack_shell, 'run_command',
+                               side_effect=ks_exc.ConnectionRefused()) \
+                as mock_run:
+            self.assertEqual(1, shell.run_subcommand(['vim-list']))
+        self.assertEqual(1, mock_run.call_count)
+
+        shell, auth = self._cached_shell()
+        self.assertEqual(1, mock_discover.call_count)
@@ -0,0 +1,206 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import os
+import threading
+
+import fixtures
+import testtools
+
+from tackerclient.common import exceptions
+from tackerclient.common import journal
+from tackerclient.common import scheduler
+from tackerclient.common import teardown
+
+
+class FakeClient(object):
+    """In-memory VNF LCM API terminating instances after a few polls."""
+
+    def __init__(self, vnf_ids, polls=1, failing=(), stuck=()):
+        self.failing = failing
+        self.stuck = stuck
+        self.lock = threading.Lock()
+        self.calls = []
+        # Number of polls before each terminated instance is reported
+        # NOT_INSTANTIATED
+        self.remaining = {}
+        self.instances = set(vnf_ids)
+        self.polls = polls
+        # Operation occurrences by VNF instance ID
+        self.op_occs = {}
+        self.last_vnf_lcm_op_occ_id = None
+
+    def fork(self, fresh=False):
+        return copy.copy(self)
+
+    def terminate_vnf_instance(self, vnf_id, body):
+        with self.lock:
+            self.calls.append(('terminate', vnf_id))
+            if vnf_id in self.failing:
+                raise exceptions.TackerClientException(
+                    message='Conflict', status_code=409)
+            self.remaining[vnf_id] = self.polls
+            self.op_occs[vnf_id] = {'id': 'op-' + vnf_id,
+                                    'operationState': 'PROCESSING'}
+            self.last_vnf_lcm_op_occ_id = 'op-' + vnf_id
+
+    def list_vnf_lcm_op_occs(self, filter=None):
+        vnf_id = filter.split(';')[0].split(',')[2].rstrip(')')
+        with self.lock:
+            self.calls.append(('list', vnf_id))
+            return [self.op_occs[vnf_id]] if vnf_id in self.op_occs else []
+
+    def get_vnf_instances(self, ids, **params):
+        with self.lock:
+            self.calls.append(('get', tuple(sorted(ids))))
+            found = []
+            for vnf_id in ids:
+                if vnf_id not in self.instances:
+                    continue
+                state = 'INSTANTIATED'
+                if vnf_id not in self.stuck:
+                    self.remaining[vnf_id] -= 1
+                    if self.remaining[vnf_id] < 0:
+                        state = 'NOT_INSTANTIATED'
+                found.append({'id': vnf_id, 'instantiationState': state})
+        return found, [vnf_id for vnf_id in ids
+                       if vnf_id not in self.instances]
+
+    def delete_vnf_instance(self, vnf_id):
+        with self.lock:
+            self.calls.append(('delete', vnf_id))
+            self.instances.discard(vnf_id)
+
+
+class TestTerminate(testtools.TestCase):
+
+    def setUp(self):
+        super(TestTerminate, self).setUp()
+        self.vnf_ids = ['vnf-%d' % i for i in range(4)]
+
+    def _terminate(self, client, poll_interval=0, **kwargs):
+        return teardown.terminate(client, self.vnf_ids,
+                                  {'terminationType': 'FORCEFUL'},
+                                  poll_interval=poll_interval, **kwargs)
+
+    def test_terminate(self):
+        client = FakeClient(self.vnf_ids)
+
+        results = self._terminate(client)
+
+        self.assertEqual(self.vnf_ids, list(results))
+        self.assertEqual({teardown.TERMINATING},
+                         set(r['status'] for r in results.values()))
+        self.assertEqual(sorted(('terminate', vnf_id)
+                                for vnf_id in self.vnf_ids),
+                         sorted(client.calls))
+
+    def test_terminate_and_delete(self):
+        client = FakeClient(self.vnf_ids, polls=2)
+        progress = []
+
+        results = self._terminate(
+            client, delete=True, max_workers=2, poll_interval=0.05,
+            progress=lambda *args: progress.append(args))
+
+        self.assertEqual({teardown.DELETED},
+                         set(r['status'] for r in results.values()))
+        # The terminations are checked together, with one request per poll
+        gets = [call for call in client.calls if call[0] == 'get']
+        self.assertGreaterEqual(4, len(gets))
+        self.assertIn(('get', tuple(self.vnf_ids)), gets)
+        self.assertEqual([teardown.TERMINATING, teardown.TERMINATED,
+                          teardown.DELETING, teardown.DELETED],
+                         [status for vnf_id, status in progress
+                          if vnf_id == 'vnf-0'])
+        self.assertEqual(set(), client.instances)
+
+    def test_terminate_failures(self):
+        client = FakeClient(self.vnf_ids, failing=['vnf-1'], stuck=['vnf-2'])
+        client.instances.discard('vnf-3')
+
+        results = self._terminate(client, delete=True, timeout=0.05)
+
+        self.assertEqual(
+            [teardown.DELETED, teardown.FAILED, teardown.FAILED,
+             teardown.FAILED],
+            [r['status'] for r in results.values()])
+        self.assertIn('Conflict', results['vnf-1']['error'])
+        self.assertIn("within '0.05' seconds", results['vnf-2']['error'])
+        self.assertIn('not found', results['vnf-3']['error'])
+        self.assertNotIn(('delete', 'vnf-2'), client.calls)
+
+    def test_terminate_journal(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'terminate.journal')
+        client = FakeClient(self.vnf_ids)
+
+        with journal.Journal(path) as jrnl:
+            self._terminate(client, delete=True, journal=jrnl)
+
+        with journal.Journal(path) as jrnl:
+            self.assertEqual((self.vnf_ids, {'terminationType': 'FORCEFUL'},
+                              True), teardown.journal_request(jrnl))
+            self.assertEqual('op-vnf-0',
+                             jrnl.items['vnf-0']['vnfLcmOpOccId'])
+            self.assertEqual(scheduler.SUCCEEDED,
+                             jrnl.step_status('vnf-0', teardown.DELETE))
+
+    def test_terminate_resume(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'terminate.journal')
+        client = FakeClient(self.vnf_ids)
+        # The run was interrupted after vnf-0 was deleted, the deletion
+        # of vnf-1 was sent and the termination of vnf-2 was accepted,
+        # before their responses were recorded.
+        client.terminate_vnf_instance('vnf-1', {})
+        client.instances.discard('vnf-1')
+        client.terminate_vnf_instance('vnf-2', {})
+        client.instances.discard('vnf-0')
+        del client.calls[:]
+        with journal.Journal(path) as jrnl:
+            jrnl.record(kind=teardown.BATCH_TERMINATE, items=self.vnf_ids,
+                        body={'terminationType': 'FORCEFUL'}, delete=True)
+            for vnf_id in self.vnf_ids[:2]:
+                jrnl.record(item=vnf_id, step=teardown.TERMINATE,
+                            status=scheduler.SUCCEEDED)
+            jrnl.record(item='vnf-0', step=teardown.DELETE,
+                        status=scheduler.SUCCEEDED)
+            jrnl.record(item='vnf-1', step=teardown.DELETE,
+                        status=scheduler.RUNNING)
+            jrnl.record(item='vnf-2', step=teardown.TERMINATE,
+                        status=scheduler.RUNNING)
+
+        with journal.Journal(path) as jrnl:
+            vnf_ids, body, delete = teardown.journal_request(jrnl)
+            results = teardown.terminate(client, vnf_ids, body, delete=delete,
+                                         poll_interval=0, journal=jrnl)
+
+        self.assertEqual({teardown.DELETED},
+                         set(r['status'] for r in results.values()))
+        # Only vnf-3 is terminated, vnf-2 is waited for
+        self.assertEqual(
+            [('delete', 'vnf-2'), ('delete', 'vnf-3'), ('list', 'vnf-2'),
+             ('terminate', 'vnf-3')],
+            sorted(call for call in client.calls if call[0] != 'get'))
+        with journal.Journal(path) as jrnl:
+            self.assertEqual('op-vnf-2',
+                             jrnl.items['vnf-2']['vnfLcmOpOccId'])
+
+    def test_journal_request_invalid(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                            'other.journal')
+        with journal.Journal(path) as jrnl:
+            jrnl.record(kind='other')
+            self.assertRaises(exceptions.InvalidInput,
+                              teardown.journal_request, jrnl)
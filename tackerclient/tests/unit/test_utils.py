@@ -13,6 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import io
+import json
+import logging
+from unittest import mock
+
+import fixtures
 import testtools
 
 from tackerclient.common import exceptions
@@ -103,6 +109,120 @@ class TestUtils(testtools.TestCase):
         self.assertEqual(('test_name', 'test_id', 'test', 'pass'), act)
 
 
+class TestEnvInt(testtools.TestCase):
+
+    def test_env_int(self):
+        self.useFixture(fixtures.EnvironmentVariable('TACKER_TEST_INT', '42'))
+        self.assertEqual(42, utils.env_int('TACKER_TEST_INT', default=1))
+
+    def test_env_int_default(self):
+        self.useFixture(fixtures.EnvironmentVariable('TACKER_TEST_INT'))
+        self.assertEqual(1, utils.env_int('TACKER_TEST_INT', default=1))
+
+    def test_env_int_invalid(self):
+        self.useFixture(fixtures.EnvironmentVariable('TACKER_TEST_INT',
+                                                     'many'))
+        log = self.useFixture(fixtures.FakeLogger(name=utils.__name__))
+        self.assertEqual(1, utils.env_int('TACKER_TEST_INT', default=1))
+        self.assertIn('TACKER_TEST_INT=many', log.output)
+
+
+class TestHTTPLog(testtools.TestCase):
+
+    def setUp(self):
+        super(TestHTTPLog, self).setUp()
+        self.logger = logging.getLogger('tackerclient.tests.http_log')
+        self.log = self.useFixture(fixtures.FakeLogger(
+            name=self.logger.name, level=logging.DEBUG))
+
+    def test_http_log_body_text(self):
+        self.assertEqual('{"a": 1}', utils.http_log_body('{"a": 1}'))
+
+    def test_http_log_body_truncated(self):
+        body = 'x' * 20
+        self.assertEqual('xxxxx... <truncated 15 characters>',
+                         utils.http_log_body(body, max_length=5))
+
+    def test_http_log_body_binary(self):
+        self.assertEqual('<binary data: 3 bytes>',
+                         utils.http_log_body(b'PK\x03'))
+        self.assertEqual(
+            '<binary data: 3 bytes>',
+            utils.http_log_body('PK\x03', content_type='application/zip'))
+
+    def test_http_log_body_file(self):
+        body = mock.Mock(spec=io.BufferedReader)
+        body.name = '/tmp/package.zip'
+        self.assertEqual('<file-like object /tmp/package.zip>',
+                         utils.http_log_body(body))
+        self.assertFalse(body.read.called)
+
+    def test_http_log_req_redacts_bounded_body(self):
+        body = json.dumps({'auth': {'password': 'secret'}})
+        utils.http_log_req(self.logger, ('http://url', 'POST'),
+                           {'headers': {}, 'body': body},
+                           redact=utils.redact_credentials)
+        self.assertIn('-X POST', self.log.output)
+        self.assertIn('"password": "REDACTED"', self.log.output)
+        self.assertNotIn('secret', self.log.output)
+
+    def test_http_log_body_redacts_logged_part_only(self):
+        redact = mock.Mock(side_effect=lambda body: body.upper())
+        self.assertEqual('XXXXX... <truncated 15 characters>',
+                         utils.http_log_body('x' * 20, max_length=5,
+                                             redact=redact))
+        redact.assert_called_once_with('xxxxx')
+
+    def test_http_log_req_redacts_truncated_body(self):
+        body = json.dumps({'auth': {'password': 'secret'}, 'data': 'x' * 50})
+        with mock.patch.object(utils, 'HTTP_LOG_BODY_MAX_LENGTH', 27):
+            utils.http_log_req(
+                self.logger, ('http://url', 'POST'),
+                {'headers': {}, 'body': body},
+                redact=lambda body: utils.redact_credentials(
+                    body, secrets=('secret',)))
+        self.assertIn('<truncated', self.log.output)
+        self.assertNotIn('secr', self.log.output)
+
+    def test_http_log_req_debug_disabled(self):
+        self.logger.setLevel(logging.INFO)
+        redact = mock.Mock()
+        utils.http_log_req(self.logger, ('http://url', 'POST'),
+                           {'headers': {}, 'body': 'body'}, redact=redact)
+        self.assertFalse(redact.called)
+        self.assertEqual('', self.log.output)
+
+    def test_http_log_resp_binary(self):
+        resp = mock.Mock(status_code=200,
+                         headers={'content-type': 'application/zip'})
+        utils.http_log_resp(self.logger, resp, b'PK' * 10)
+        self.assertIn('<binary data: 20 bytes>', self.log.output)
+
+    def test_redact_credentials_json(self):
+        body = json.dumps({'auth': {'passwordCredentials': {
+            'username': 'user', 'password': 'secret'}}})
+        self.assertEqual(
+            {'auth': {'passwordCredentials': {'username': 'user',
+                                              'password': 'REDACTED'}}},
+            json.loads(utils.redact_credentials(body)))
+
+    def test_redact_credentials_keeps_body_as_sent(self):
+        body = '{"auth":{"password" : "se\\"cret","tenantName":"demo"}}'
+        self.assertEqual(
+            '{"auth":{"password" : "REDACTED","tenantName":"demo"}}',
+            utils.redact_credentials(body))
+
+    def test_redact_credentials_cut_value(self):
+        self.assertEqual('{"auth": {"password": "REDACTED',
+                         utils.redact_credentials('{"auth": {"password": "se'))
+
+    def test_redact_credentials_not_json(self):
+        body = '{"auth": {"password": "secret"... <truncated 10 characters>'
+        self.assertEqual(
+            '{"auth": {"password": "REDACTED"... <truncated 10 characters>',
+            utils.redact_credentials(body, secrets=('secret',)))
+
+
 class ImportClassTestCase(testtools.TestCase):
 
     def test_get_client_class_invalid_version(self):
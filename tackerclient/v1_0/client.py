@@ -15,15 +15,20 @@
 #    under the License.
 #
 
+from concurrent import futures
+import copy
 import logging
 import re
+import threading
 import time
 
 import requests
 from urllib import parse as urlparse
 
 from tackerclient import client
+from tackerclient.common import cache
 from tackerclient.common import exceptions
+from tackerclient.common import filters
 from tackerclient.common import serializer
 from tackerclient.common import utils
 from tackerclient.i18n import _
@@ -43,6 +48,44 @@ STATUS_CODE_MAP = {
     429: "overLimit",
     501: "notImplemented",
     503: "serviceUnavailable"}
+# Lifetime in seconds of API versions negotiated with a server
+API_VERSION_CACHE_TTL = utils.env_int('TACKERCLIENT_API_VERSION_CACHE_TTL',
+                                      default=3600)
+
+# Maximum number of requests sent concurrently by ClientBase.get_many
+BULK_CONCURRENCY = utils.DEFAULT_PARALLEL
+# Characters of MAX_URI_LEN left for pagination markers by get_many
+BULK_URI_RESERVE = 256
+
+# Negotiated API versions of this process, by endpoint and API
+_negotiated_versions = {}
+_negotiated_versions_lock = threading.Lock()
+
+
+def _parse_version(version):
+    try:
+        return tuple(int(v) for v in version.split('.'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def select_api_version(default_version, api_versions):
+    """Select the API version to use with a server.
+
+    :param default_version: the version the client is written for
+    :param api_versions: the 'apiVersions' of a SOL013 ApiVersionInformation
+    :returns: the highest version supported by the server with the same
+      major version as default_version and not newer than it, preferring
+      versions which are not deprecated, or None.
+    """
+    default = _parse_version(default_version)
+    candidates = []
+    for api_version in api_versions or []:
+        parsed = _parse_version(api_version.get('version'))
+        if parsed and parsed[0] == default[0] and parsed <= default:
+            candidates.append((not api_version.get('isDeprecated', False),
+                               parsed, api_version['version']))
+    return max(candidates)[2] if candidates else None
 
 
 def exception_handler_v10(status_code, error_content):
@@ -163,6 +206,17 @@ class ClientBase(object):
                               (default: True)
     :param session: Keystone client auth session to use. (optional)
     :param auth: Keystone auth plugin to use. (optional)
+    :param http_cache: True to cache GET responses in memory and on disk,
+                       or a tackerclient.common.cache.ResponseCache to
+                       use. (optional)
+    :param bool negotiate_api_version: Query the API versions supported by
+                                       the server before the first request
+                                       and send the best one in the Version
+                                       header. The result is cached per
+                                       endpoint. (default: False)
+    :param bool token_cache: Cache the Keystone token and the Tacker endpoint
+                             on disk so that other processes can reuse them.
+                             Only used without session. (default: False)
 
     """
 
@@ -170,11 +224,26 @@ class ClientBase(object):
     # This variable should be overridden by a child class.
     EXTED_PLURALS = {}
 
+    # SOL013 API versions resource of the API used by a child class and the
+    # headers it sends when the version is not negotiated.
+    api_versions_path = None
+    default_headers = None
+
+    # True to send every GET request to the server, see fork()
+    bypass_http_cache = False
+
     def __init__(self, **kwargs):
         """Initialize a new client for the Tacker v1.0 API."""
         super(ClientBase, self).__init__()
         self.retries = kwargs.pop('retries', 0)
         self.raise_errors = kwargs.pop('raise_errors', True)
+        self.negotiate_api_version = kwargs.pop('negotiate_api_version',
+                                                False)
+        self._headers = None
+        http_cache = kwargs.pop('http_cache', None)
+        if http_cache is True:
+            http_cache = cache.ResponseCache()
+        self.http_cache = http_cache or None
         self.httpclient = client.construct_http_client(**kwargs)
         self.version = '1.0'
         self.format = 'json'
@@ -183,6 +252,56 @@ class ClientBase(object):
         self.rel = None
         self.params = None
         self.accept = None
+        self.location = None
+
+    @property
+    def headers(self):
+        """Headers with the Version of the API to request."""
+        if self._headers is None:
+            version = None
+            if self.negotiate_api_version and self.api_versions_path:
+                version = self._negotiate_api_version()
+            if version is None:
+                self._headers = self.default_headers
+            else:
+                self._headers = {'Version': version}
+        return self._headers
+
+    def _get_endpoint_url(self):
+        if isinstance(self.httpclient, client.HTTPClient):
+            self.httpclient.authenticate_and_fetch_endpoint_url()
+        return self.httpclient.endpoint_url
+
+    def _negotiate_api_version(self):
+        default_version = self.default_headers['Version']
+        try:
+            endpoint_url = self._get_endpoint_url()
+            key = (endpoint_url, self.api_versions_path, default_version)
+            with _negotiated_versions_lock:
+                if key in _negotiated_versions:
+                    return _negotiated_versions[key]
+            disk_cache = cache.FileCache('api_versions',
+                                         ttl=API_VERSION_CACHE_TTL)
+            disk_key = cache.make_key(*key)
+            version = disk_cache.get(disk_key)
+            if version is None:
+                info = self.get(self.api_versions_path,
+                                headers=self.default_headers)
+                version = select_api_version(default_version,
+                                             info.get('apiVersions'))
+                if version is None:
+                    return None
+                disk_cache.set(disk_key, version)
+        except Exception as e:
+            _logger.debug("Unable to negotiate the API version of %s, "
+                          "using %s: %s", self.api_versions_path,
+                          default_version, e)
+            return None
+        _logger.debug("Using version %s of %s", version,
+                      self.api_versions_path)
+        with _negotiated_versions_lock:
+            _negotiated_versions[key] = version
+        return version
 
     def _handle_fault_response(self, status_code, response_body):
         # Create exception with HTTP status code and message
@@ -236,9 +355,8 @@ class ClientBase(object):
             # self.httpclient.do_request is not accept 'headers=None'.
             headers = {}
 
-        resp, replybody = self.httpclient.do_request(
-            action, method, body=body, headers=headers,
-            content_type=self.content_type(), accept=self.accept)
+        resp, replybody = self._send_request(method, action, body, headers)
+        self.location = resp.headers.get('Location')
 
         if 'application/zip' == resp.headers.get('Content-Type'):
             self.format = 'zip'
@@ -273,9 +391,76 @@ class ClientBase(object):
                 replybody = resp.reason
             self._handle_fault_response(status_code, replybody)
 
+    def _send_request(self, method, action, body, headers):
+        if self.http_cache is None:
+            return self.httpclient.do_request(
+                action, method, body=body, headers=headers,
+                content_type=self.content_type(), accept=self.accept)
+
+        self._get_endpoint_url()
+        auth_info = self.get_auth_info()
+        scope = cache.make_key(auth_info['endpoint_url'],
+                               auth_info.get('auth_tenant_id') or
+                               auth_info['auth_token'])
+        path = urlparse.urlsplit(action).path
+        if method != 'GET':
+            resp, replybody = self.httpclient.do_request(
+                action, method, body=body, headers=headers,
+                content_type=self.content_type(), accept=self.accept)
+            for invalidated_path in self._invalidated_paths(path):
+                self.http_cache.invalidate(scope, invalidated_path)
+            return resp, replybody
+
+        variant = '%s %s %s' % (action, headers.get('Version'), self.accept)
+        if self.bypass_http_cache:
+            entry, fresh = None, False
+        else:
+            entry, fresh = self.http_cache.lookup(scope, path, variant)
+        if entry is not None and not fresh:
+            headers = dict(headers, **{'If-None-Match':
+                                       entry['headers']['ETag']})
+        if not fresh:
+            resp, replybody = self.httpclient.do_request(
+                action, method, body=body, headers=headers,
+                content_type=self.content_type(), accept=self.accept)
+            if (resp.status_code != requests.codes.not_modified or
+                    entry is None):
+                if resp.status_code == requests.codes.ok:
+                    self.http_cache.store(scope, path, variant,
+                                          resp.status_code, resp.headers,
+                                          replybody)
+                return resp, replybody
+            entry = self.http_cache.revalidated(scope, path, variant, entry)
+
+        resp = requests.Response()
+        resp.status_code = entry['status_code']
+        resp.headers = requests.structures.CaseInsensitiveDict(
+            entry['headers'])
+        return resp, entry['body']
+
     def get_auth_info(self):
         return self.httpclient.get_auth_info()
 
+    def _invalidated_paths(self, path):
+        """Return the paths whose cached responses a write to path changes."""
+        return [path]
+
+    def fork(self, fresh=False):
+        """Return a copy of the client for use by another thread.
+
+        A client keeps the state of the current request, so concurrent
+        requests need one copy each. Copies share the HTTP client, thus
+        the authentication, and the response cache.
+
+        :param fresh: True for a copy sending every GET request to the
+          server and storing the responses in the response cache, to poll
+          the state of resources changed by the server
+        """
+        forked = copy.copy(self)
+        if fresh:
+            forked.bypass_http_cache = True
+        return forked
+
     def serialize(self, data):
         """Serializes a dictionary JSON.
 
@@ -348,6 +533,27 @@ class ClientBase(object):
         return self.retry_request("GET", action, body=body,
                                   headers=headers, params=params)
 
+    def get_stream(self, action, headers=None):
+        """Send a GET request and return the response with its body unread.
+
+        The body is read as it arrives with iter_content() rather than
+        loaded in memory, and the caller closes the response. Responses
+        are not cached.
+        """
+        headers = dict(headers or {})
+        headers.setdefault('Accept', '*/*')
+        resp, _body = self.httpclient.do_request(
+            self.build_action(action), 'GET', headers=headers,
+            content_type=self.content_type(), accept=self.accept,
+            stream=True)
+        if resp.status_code != requests.codes.ok:
+            try:
+                body = resp.text or resp.reason
+            finally:
+                resp.close()
+            self._handle_fault_response(resp.status_code, body)
+        return resp
+
     def post(self, action, body=None, headers=None, params=None):
         # Do not retry POST requests to avoid the orphan objects problem.
         return self.do_request("POST", action, body=body,
@@ -403,6 +609,67 @@ class ClientBase(object):
             except KeyError:
                 break
 
+    def _chunk_ids(self, path, ids, params):
+        """Split ids into (in,id,...) filters fitting in MAX_URI_LEN.
+
+        The URI length is computed as in HTTPClient._check_uri_length, and
+        BULK_URI_RESERVE characters are left for pagination markers.
+        """
+        prefix = params['filter'] + ';' if params.get('filter') else ''
+        query = self._build_params_query(
+            dict(params, filter=prefix + '(in,id)'))
+        base_len = (len(self._get_endpoint_url()) +
+                    len(self.build_action(path)) + len('?') + len(query))
+        limit = client.MAX_URI_LEN - BULK_URI_RESERVE
+        chunks = []
+        chunk, chunk_len = [], base_len
+        for id_ in ids:
+            value = ',' + filters.quote_value(id_)
+            value_len = len(urlparse.quote_plus(value))
+            if chunk and chunk_len + value_len > limit:
+                chunks.append(chunk)
+                chunk, chunk_len = [], base_len
+            chunk.append(value)
+            chunk_len += value_len
+        if chunk:
+            chunks.append(chunk)
+        return ['%s(in,id%s)' % (prefix, ''.join(chunk)) for chunk in chunks]
+
+    def get_many(self, collection, path, ids, headers=None, **params):
+        """Fetch the resources of a collection with the given ids.
+
+        The ids are requested with (in,id,...) filters split to fit in
+        the maximum URI length. Up to BULK_CONCURRENCY requests are sent
+        concurrently.
+
+        :returns: a tuple of the list of resources found, in the order of
+          ids, and the list of ids not found
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return [], []
+        id_filters = self._chunk_ids(path, ids, params)
+
+        def fetch(id_filter):
+            res = self.fork().list(collection, path, headers=headers,
+                                   **dict(params, filter=id_filter))
+            return res[collection] if collection else res
+
+        if len(id_filters) == 1:
+            results = [fetch(id_filters[0])]
+        else:
+            with futures.ThreadPoolExecutor(
+                    max_workers=min(len(id_filters),
+                                    BULK_CONCURRENCY)) as executor:
+                results = list(executor.map(fetch, id_filters))
+
+        found = {}
+        for result in results:
+            for resource in result:
+                found[resource['id']] = resource
+        return ([found[id_] for id_ in ids if id_ in found],
+                [id_ for id_ in ids if id_ not in found])
+
 
 class LegacyClient(ClientBase):
 
@@ -462,6 +729,11 @@ class VnfPackageClient(ClientBase):
                                  retrieve_all, **_params)
         return vnf_packages
 
+    @APIParamsCall
+    def get_vnf_packages(self, ids, **_params):
+        return self.get_many("vnf_packages", self.vnfpackages_path, ids,
+                             **_params)
+
     @APIParamsCall
     def show_vnf_package(self, vnf_package, **_params):
         return self.get(self.vnfpackage_path % vnf_package, params=_params)
@@ -524,6 +796,13 @@ class VnfPackageClient(ClientBase):
         return self.get(self.vnfpakcage_artifact_path %
                         {'id': vnf_package, 'artifact_path': artifact_path})
 
+    @APIParamsCall
+    def stream_artifact_from_vnf_package(self, vnf_package, artifact_path):
+        """Return the response of an artifact download, its body unread."""
+        return self.get_stream(self.vnfpakcage_artifact_path %
+                               {'id': vnf_package,
+                                'artifact_path': artifact_path})
+
     @APIParamsCall
     def update_vnf_package(self, vnf_package, body):
         return self.patch(self.vnfpackage_path % vnf_package, body=body)
@@ -538,12 +817,15 @@ class VnfLCMClient(ClientBase):
 
     def __init__(self, api_version, **kwargs):
         super(VnfLCMClient, self).__init__(**kwargs)
-        self.headers = {'Version': '1.3.0'}
+        self.default_headers = {'Version': '1.3.0'}
         sol_api_version = 'v1'
         if api_version == '2':
-            self.headers = {'Version': '2.0.0'}
+            self.default_headers = {'Version': '2.0.0'}
             sol_api_version = 'v2'
 
+        self.api_versions_path = (
+            '/vnflcm/{}/api_versions'.format(sol_api_version))
+
         self.vnf_instances_path = (
             '/vnflcm/{}/vnf_instances'.format(sol_api_version))
         self.vnf_instance_path = (
@@ -560,6 +842,13 @@ class VnfLCMClient(ClientBase):
     def build_action(self, action):
         return action
 
+    def _invalidated_paths(self, path):
+        # An LCM operation requested on a VNF instance creates or changes
+        # an op-occ, and one requested on an op-occ changes its VNF
+        # instance
+        return [path, self.vnf_instances_path,
+                self.vnf_lcm_op_occurrences_path]
+
     @APIParamsCall
     def create_vnf_instance(self, body):
         return self.post(self.vnf_instances_path, body=body,
@@ -577,6 +866,11 @@ class VnfLCMClient(ClientBase):
                                   **_params)
         return vnf_instances
 
+    @APIParamsCall
+    def get_vnf_instances(self, ids, **_params):
+        return self.get_many(None, self.vnf_instances_path, ids,
+                             headers=self.headers, **_params)
+
     @APIParamsCall
     def instantiate_vnf_instance(self, vnf_id, body):
         return self.post((self.vnf_instance_path + "/instantiate") % vnf_id,
@@ -648,11 +942,27 @@ class VnfLCMClient(ClientBase):
                                     **_params)
         return vnf_lcm_op_occs
 
+    @APIParamsCall
+    def get_vnf_lcm_op_occs(self, ids, **_params):
+        return self.get_many(None, self.vnf_lcm_op_occurrences_path, ids,
+                             headers=self.headers, **_params)
+
     @APIParamsCall
     def show_vnf_lcm_op_occs(self, occ_id):
         return self.get(self.vnf_lcm_op_occs_path % occ_id,
                         headers=self.headers)
 
+    @property
+    def last_vnf_lcm_op_occ_id(self):
+        """ID of the op-occ created by the last LCM operation request.
+
+        It is read from the Location header of the response, None if the
+        last request did not start an LCM operation.
+        """
+        if not self.location or '/vnf_lcm_op_occs/' not in self.location:
+            return None
+        return self.location.rstrip('/').rsplit('/', 1)[-1]
+
     @APIParamsCall
     def create_lccn_subscription(self, body):
         return self.post(self.lccn_subscriptions_path, body=body,
@@ -689,7 +999,8 @@ class VnfLCMClient(ClientBase):
 
 
 class VnfFMClient(ClientBase):
-    headers = {'Version': '1.3.0'}
+    default_headers = {'Version': '1.3.0'}
+    api_versions_path = '/vnffm/v1/api_versions'
     vnf_fm_alarms_path = '/vnffm/v1/alarms'
     vnf_fm_alarm_path = '/vnffm/v1/alarms/%s'
     vnf_fm_subs_path = '/vnffm/v1/subscriptions'
@@ -739,7 +1050,8 @@ class VnfFMClient(ClientBase):
 
 
 class VnfPMClient(ClientBase):
-    headers = {'Version': '2.1.0'}
+    default_headers = {'Version': '2.1.0'}
+    api_versions_path = '/vnfpm/v2/api_versions'
     vnf_pm_jobs_path = '/vnfpm/v2/pm_jobs'
     vnf_pm_job_path = '/vnfpm/v2/pm_jobs/%s'
     vnf_pm_reports_path = '/vnfpm/v2/pm_jobs/%(job_id)s/reports/%(report_id)s'
@@ -835,12 +1147,28 @@ class Client(object):
 
     def __init__(self, **kwargs):
         api_version = kwargs.pop('api_version', '1')
+        # NOTE: All API clients share one response cache.
+        if kwargs.get('http_cache') is True:
+            kwargs['http_cache'] = cache.ResponseCache()
+        self.http_cache = kwargs.get('http_cache') or None
         self.vnf_lcm_client = VnfLCMClient(api_version, **kwargs)
         self.vnf_fm_client = VnfFMClient(**kwargs)
         self.vnf_pm_client = VnfPMClient(**kwargs)
         self.vnf_package_client = VnfPackageClient(**kwargs)
         self.legacy_client = LegacyClient(**kwargs)
 
+    def fork(self, fresh=False):
+        """Return a copy of the client for use by another thread.
+
+        :param fresh: True for a copy bypassing the response cache for
+          GET requests, see ClientBase.fork()
+        """
+        forked = copy.copy(self)
+        for name in ('vnf_lcm_client', 'vnf_fm_client', 'vnf_pm_client',
+                     'vnf_package_client', 'legacy_client'):
+            setattr(forked, name, getattr(self, name).fork(fresh=fresh))
+        return forked
+
     # LegacyClient methods
 
     def delete(self, action, body=None, headers=None, params=None):
@@ -889,6 +1217,9 @@ class Client(object):
         return self.vnf_package_client.list_vnf_packages(
             retrieve_all=retrieve_all, **_params)
 
+    def get_vnf_packages(self, ids, **_params):
+        return self.vnf_package_client.get_vnf_packages(ids, **_params)
+
     def show_vnf_package(self, vnf_package, **_params):
         return self.vnf_package_client.show_vnf_package(vnf_package, **_params)
 
@@ -912,6 +1243,9 @@ class Client(object):
         return self.vnf_lcm_client.list_vnf_instances(
             retrieve_all=retrieve_all, **_params)
 
+    def get_vnf_instances(self, ids, **_params):
+        return self.vnf_lcm_client.get_vnf_instances(ids, **_params)
+
     def instantiate_vnf_instance(self, vnf_id, body):
         return self.vnf_lcm_client.instantiate_vnf_instance(vnf_id, body)
 
@@ -960,6 +1294,10 @@ class Client(object):
             vnf_package, artifact_path
         )
 
+    def stream_artifact_from_vnf_package(self, vnf_package, artifact_path):
+        return self.vnf_package_client.stream_artifact_from_vnf_package(
+            vnf_package, artifact_path)
+
     def download_vnf_package(self, vnf_package):
         return self.vnf_package_client.download_vnf_package(vnf_package)
 
@@ -967,9 +1305,16 @@ class Client(object):
         return self.vnf_lcm_client.list_vnf_lcm_op_occs(
             retrieve_all=retrieve_all, **_params)
 
+    def get_vnf_lcm_op_occs(self, ids, **_params):
+        return self.vnf_lcm_client.get_vnf_lcm_op_occs(ids, **_params)
+
     def show_vnf_lcm_op_occs(self, occ_id):
         return self.vnf_lcm_client.show_vnf_lcm_op_occs(occ_id)
 
+    @property
+    def last_vnf_lcm_op_occ_id(self):
+        return self.vnf_lcm_client.last_vnf_lcm_op_occ_id
+
     def create_lccn_subscription(self, body):
         return self.vnf_lcm_client.create_lccn_subscription(body)
 
@@ -0,0 +1,106 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the local validation of large CSAR files.
+
+A package with images whose SHA-256 hashes are declared in TOSCA.meta is
+built in a temporary directory, half of the images being random data
+stored as is, half compressible data. The archive is then validated
+without and with the verification of the hashes, with one and several
+threads. Usage::
+
+    python tools/benchmark_csar_validation.py [--size 2048] [--images 8]
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from tackerclient.common import csar
+
+BLOCK_SIZE = 1024 * 1024
+
+META = """TOSCA-Meta-File-Version: 1.0
+Created-by: Benchmark
+CSAR-Version: 1.1
+Entry-Definitions: Definitions/vnfd.yaml
+"""
+
+
+def _write_image(path, size, compressible):
+    digest = hashlib.sha256()
+    block = b'0123456789abcdef' * (BLOCK_SIZE // 16)
+    with open(path, 'wb') as f:
+        for _i in range(size):
+            data = block if compressible else os.urandom(BLOCK_SIZE)
+            digest.update(data)
+            f.write(data)
+    return digest.hexdigest()
+
+
+def _make_package(root, size, images):
+    meta = META
+    for name in ('Definitions', 'Files/images', 'TOSCA-Metadata'):
+        os.makedirs(os.path.join(root, name))
+    with open(os.path.join(root, 'Definitions', 'vnfd.yaml'), 'w') as f:
+        f.write('tosca_definitions_version: tosca_simple_yaml_1_2\n')
+    for i in range(images):
+        name = 'Files/images/image-%d.img' % i
+        digest = _write_image(os.path.join(root, name), size // images,
+                              compressible=i % 2)
+        meta += '\nSource: %s\nAlgorithm: SHA-256\nHash: %s\n' % (name,
+                                                                  digest)
+    with open(os.path.join(root, csar.TOSCA_META), 'w') as f:
+        f.write(meta)
+
+
+def _time(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=2048,
+                        help='size of the images in MiB (default: 2048)')
+    parser.add_argument('--images', type=int, default=8,
+                        help='number of images (default: 8)')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(tmpdir, 'package')
+        path = os.path.join(tmpdir, 'package.zip')
+        _make_package(root, args.size, args.images)
+        csar.build(root, path)
+        shutil.rmtree(root)
+        print('%s: %.1f MiB, %d MiB of images' % (
+            path, os.path.getsize(path) / BLOCK_SIZE, args.size))
+
+        elapsed = _time(csar.validate_archive, path, verify_hashes=False)
+        print('  %-20s %.3fs' % ('layout only', elapsed))
+        for workers in sorted({1, os.cpu_count() or 1}):
+            elapsed = _time(csar.validate_archive, path,
+                            max_workers=workers)
+            print('  %-20s %.3fs (%.0f MiB/s)' % (
+                'hashes, %d thread(s)' % workers, elapsed,
+                args.size / elapsed))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Micro-benchmark of attribute-based filter evaluation.
+
+Filters are evaluated over generated VNF instance records, and the
+result of each filter is checked against a plain Python predicate.
+Usage::
+
+    python tools/benchmark_filters.py [--records 1000000]
+"""
+
+import argparse
+import itertools
+import time
+
+from tackerclient.common import filters
+
+STATES = ('INSTANTIATED', 'NOT_INSTANTIATED')
+PROVIDERS = ('Company', 'Vendor', 'Operator')
+VDU_IDS = ('VDU1', 'VDU2', 'VDU3')
+
+# Filters and equivalent predicates
+CASES = [
+    ('(eq,instantiationState,INSTANTIATED)',
+     lambda r: r['instantiationState'] == 'INSTANTIATED'),
+    ('(in,vnfProvider,Vendor,Operator);(neq,vnfdId,vnfd-7)',
+     lambda r: (r['vnfProvider'] in ('Vendor', 'Operator') and
+                r['vnfdId'] != 'vnfd-7')),
+    ('(gte,metadata/replicas,5);(cont,vnfInstanceName,-1)',
+     lambda r: (r['metadata']['replicas'] >= 5 and
+                '-1' in r['vnfInstanceName'])),
+    ('(eq,instantiatedVnfInfo/vnfcResourceInfo/vduId,VDU3)',
+     lambda r: any(v['vduId'] == 'VDU3' for v in
+                   r['instantiatedVnfInfo']['vnfcResourceInfo'])),
+]
+
+
+def _make_records(count):
+    # Nested values are shared between records to bound memory usage.
+    metadata = [{'replicas': n, 'tier': 'web'} for n in range(10)]
+    infos = [{'vnfcResourceInfo': [{'vduId': vdu_id} for vdu_id in vdus]}
+             for n in range(1, len(VDU_IDS) + 1)
+             for vdus in itertools.combinations(VDU_IDS, n)]
+    return [{'id': str(i),
+             'vnfInstanceName': 'vnf-%d' % i,
+             'vnfdId': 'vnfd-%d' % (i % 10),
+             'vnfProvider': PROVIDERS[i % len(PROVIDERS)],
+             'instantiationState': STATES[i % len(STATES)],
+             'metadata': metadata[i % len(metadata)],
+             'instantiatedVnfInfo': infos[i % len(infos)]}
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=1000000,
+                        help='number of records (default: 1000000)')
+    args = parser.parse_args()
+
+    records = _make_records(args.records)
+    for expr, predicate in CASES:
+        start = time.perf_counter()
+        compiled = filters.parse(expr)
+        parsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        selected = compiled.select(records)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [r for r in records if predicate(r)]
+        baseline = time.perf_counter() - start
+
+        if selected != expected:
+            raise SystemExit('%s selected %d records, expected %d' % (
+                expr, len(selected), len(expected)))
+        print('%s\n  parse %.1f us, %d/%d records in %.3fs '
+              '(%.2f M records/s), plain Python %.3fs' % (
+                  expr, parsed * 1e6, len(selected), len(records), elapsed,
+                  len(records) / elapsed / 1e6, baseline))
+
+
+if __name__ == '__main__':
+    main()
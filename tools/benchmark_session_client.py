@@ -0,0 +1,123 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Micro-benchmark of sequential show_vnf_instance calls.
+
+A local HTTP server fakes both Keystone and Tacker, so the numbers only
+reflect the client side overhead of SessionClient. Usage::
+
+    python tools/benchmark_session_client.py [--calls 10000]
+"""
+
+import argparse
+from http import server
+import json
+import threading
+import time
+from unittest import mock
+import uuid
+
+from keystoneauth1 import fixture
+from keystoneauth1.identity import v3
+from keystoneauth1 import session
+
+from tackerclient import client as http_client
+from tackerclient.v1_0 import client
+
+VNF_INSTANCE_ID = str(uuid.uuid4())
+
+
+class FakeHandler(server.BaseHTTPRequestHandler):
+
+    token = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply(201, self.token,
+                    headers={'X-Subject-Token': uuid.uuid4().hex})
+
+    def do_GET(self):
+        self._reply(200, {'id': VNF_INSTANCE_ID,
+                          'instantiationState': 'NOT_INSTANTIATED'})
+
+
+def _start_server():
+    httpd = server.ThreadingHTTPServer(('127.0.0.1', 0), FakeHandler)
+    base_url = 'http://127.0.0.1:%d' % httpd.server_port
+    token = fixture.V3Token()
+    token.set_project_scope()
+    service = token.add_service('nfv-orchestration')
+    service.add_standard_endpoints(public=base_url + '/tacker',
+                                   region='RegionOne')
+    FakeHandler.token = token
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd, base_url
+
+
+def _timed(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=10000,
+                        help='number of sequential calls (default: 10000)')
+    args = parser.parse_args()
+
+    httpd, base_url = _start_server()
+    try:
+        auth = v3.Password(auth_url=base_url + '/identity/v3',
+                           username='admin', password='secret',
+                           project_name='admin', user_domain_id='default',
+                           project_domain_id='default')
+        tacker = client.Client(session=session.Session(auth=auth),
+                               service_type='nfv-orchestration',
+                               interface='public', region_name='RegionOne')
+        httpclient = tacker.vnf_lcm_client.httpclient
+
+        with mock.patch.object(http_client.SessionClient, 'get_endpoint',
+                               wraps=httpclient.get_endpoint) as m:
+            elapsed = _timed(
+                lambda: tacker.show_vnf_instance(VNF_INSTANCE_ID),
+                args.calls)
+        print('show_vnf_instance: %d calls in %.3fs (%.1f us/call), '
+              '%d service catalog lookups' % (
+                  args.calls, elapsed, elapsed / args.calls * 1e6,
+                  m.call_count))
+
+        cached = _timed(lambda: httpclient.endpoint_url, args.calls)
+        uncached = _timed(httpclient.get_endpoint, args.calls)
+        print('endpoint lookup: cached %.1f us/call, uncached %.1f us/call'
+              % (cached / args.calls * 1e6, uncached / args.calls * 1e6))
+    finally:
+        httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()